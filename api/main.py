@@ -18,10 +18,12 @@ from api.routes import (
     availability,
     affiliate,
     profiles,
+    exports,
 )
 
 # Import schemas and logic
 from infrastructure.database.connection import get_db, AsyncSessionLocal
+from application.middlewares.query_stats import QueryStatsMiddleware
 import logging
 import sentry_sdk
 import structlog
@@ -70,6 +72,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(QueryStatsMiddleware)
 
 # Include Modular Routers
 # Include Modular Routers
@@ -83,6 +86,30 @@ app.include_router(public.router)
 app.include_router(availability.router)
 app.include_router(affiliate.router)
 app.include_router(profiles.router)
+app.include_router(exports.router)
+
+
+@app.on_event("startup")
+async def ensure_table_partitions():
+    # Particiones mensuales de payments/affiliate_earnings por adelantado
+    from infrastructure.database.partitions import ensure_partitions
+
+    try:
+        async with AsyncSessionLocal() as session:
+            created = await ensure_partitions(session)
+        if created:
+            logger.info("partitions_created", partitions=created)
+    except Exception as e:
+        logger.error("partitions_ensure_failed", error=str(e))
+
+
+@app.on_event("shutdown")
+async def shutdown_payment_gateway():
+    from infrastructure.external_apis.payment_gateway import payment_gateway
+    from infrastructure.external_apis.telegram import telegram_sender
+
+    await payment_gateway.aclose()
+    await telegram_sender.aclose()
 
 
 # --- DEBUG ENDPOINTS (TEMPORARY) ---
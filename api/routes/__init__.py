@@ -9,6 +9,7 @@ from application.controllers import (
     availability_controller as availability,
     affiliate_controller as affiliate,
     profile_controller as profiles,
+    export_controller as exports,
 )
 
 __all__ = [
@@ -22,4 +23,5 @@ __all__ = [
     "availability",
     "affiliate",
     "profiles",
+    "exports",
 ]
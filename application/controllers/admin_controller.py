@@ -1,11 +1,12 @@
 from datetime import datetime
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import aliased
 from sqlalchemy.future import select
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, literal, or_
 
-from infrastructure.database.connection import get_db, AsyncSessionLocal
+from infrastructure.database.connection import get_db, get_read_db, AsyncSessionLocal, AsyncReadSessionLocal
 from core.entities import (
     User as DBUser,
     Withdrawal,
@@ -18,10 +19,14 @@ from core.entities import (
     AffiliateRank
 )
 from core.entities import OwnerLegalInfo, SignedContract
-from application.dto.user import UserAdminResponse
+from application.dto.user import UserAdminResponse, UserDirectoryPage
 from application.dto.misc import ConfigUpdate, TaxExpenseRequest
 from application.middlewares.auth import get_current_admin
+from core.use_cases.affiliate_stats import get_platform_affiliate_summary
+from core.use_cases.referrals import attach_referral, detach_user, recompute_ranks
+from core.use_cases.tax import bump_platform_revenue, get_tax_years, iter_tax_csv
 from infrastructure.storage.storage_factory import StorageFactory
+from infrastructure.utils.pagination import apply_filters, paginate
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -54,11 +59,26 @@ async def update_admin_config(
 
 @router.get("/withdrawals")
 async def get_admin_withdrawals(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
     current_user: DBUser = Depends(get_current_admin),
     db: AsyncSessionLocal = Depends(get_db),
 ):
-    result = await db.execute(select(Withdrawal).order_by(Withdrawal.created_at.desc()))
-    return result.scalars().all()
+    """Retiros paginados por (created_at, id); índice (status, created_at, id) para el filtro"""
+    query = apply_filters(
+        select(Withdrawal),
+        equals=[(Withdrawal.status, status), (Withdrawal.owner_id, owner_id)],
+        date_column=Withdrawal.created_at,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return await paginate(
+        db, query, [Withdrawal.created_at, Withdrawal.id], cursor, limit, scalars=True
+    )
 
 
 @router.post("/withdrawals/{id}/process")
@@ -80,13 +100,26 @@ async def process_withdrawal(
 
 @router.get("/tickets")
 async def get_admin_tickets(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
     current_user: DBUser = Depends(get_current_admin),
     db: AsyncSessionLocal = Depends(get_db),
 ):
-    result = await db.execute(
-        select(SupportTicket).order_by(SupportTicket.updated_at.desc())
+    """Tickets por alta (created_at, id): una clave que no cambia mientras se pagina"""
+    query = apply_filters(
+        select(SupportTicket),
+        equals=[(SupportTicket.status, status), (SupportTicket.priority, priority)],
+        date_column=SupportTicket.created_at,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return await paginate(
+        db, query, [SupportTicket.created_at, SupportTicket.id], cursor, limit, scalars=True
     )
-    return result.scalars().all()
 
 
 @router.get("/tickets/{id}")
@@ -125,57 +158,61 @@ async def reply_ticket_admin(
     return {"status": "replied"}
 
 
-@router.get("/users", response_model=List[UserAdminResponse])
+def _user_search_filter(q: str):
+    """Prefijo para términos cortos; contiene (índices trigram) desde 3 caracteres."""
+    term = q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern = f"%{term}%" if len(term) >= 3 else f"{term}%"
+    conditions = [
+        DBUser.email.ilike(pattern, escape="\\"),
+        DBUser.full_name.ilike(pattern, escape="\\"),
+        DBUser.username.ilike(pattern, escape="\\"),
+    ]
+    if term.isdigit():
+        conditions.append(DBUser.id == int(term))
+    return or_(*conditions)
+
+
+@router.get("/users", response_model=UserDirectoryPage)
 async def get_admin_users(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
     current_user: DBUser = Depends(get_current_admin),
-    db: AsyncSessionLocal = Depends(get_db),
+    db: AsyncSessionLocal = Depends(get_read_db),
 ):
-    result = await db.execute(
-        select(DBUser)
-        .options(
-            selectinload(DBUser.referrer),
-            selectinload(DBUser.legal_info)
+    """Directorio de usuarios: keyset sobre (created_at, id), solo las columnas necesarias"""
+    Referrer = aliased(DBUser)
+    query = (
+        select(
+            DBUser.id,
+            DBUser.full_name,
+            DBUser.email,
+            DBUser.is_admin,
+            DBUser.is_owner,
+            DBUser.legal_verification_status,
+            DBUser.created_at,
+            DBUser.referred_by_id,
+            DBUser.referral_code,
+            func.coalesce(Referrer.full_name, Referrer.username, Referrer.email).label("referrer_name"),
+            OwnerLegalInfo.rut_url,
+            OwnerLegalInfo.bank_cert_url,
+            OwnerLegalInfo.chamber_commerce_url,
+            func.coalesce(OwnerLegalInfo.contract_signed, False).label("contract_signed"),
         )
-        .order_by(DBUser.created_at.desc())
+        .outerjoin(Referrer, DBUser.referred_by_id == Referrer.id)
+        .outerjoin(OwnerLegalInfo, OwnerLegalInfo.owner_id == DBUser.id)
     )
-    users = result.scalars().all()
-    
-    # Map to DTO manually to ensure referrer_name is populated
-    response = []
-    for u in users:
-        referrer_name = None
-        if u.referrer:
-            referrer_name = u.referrer.full_name or u.referrer.username or u.referrer.email
-            
-        # Extract Legal Docs & Status
-        rut_url = None
-        bank_cert_url = None
-        chamber_commerce_url = None
-        contract_signed = False
-
-        if u.legal_info:
-            rut_url = u.legal_info.rut_url
-            bank_cert_url = u.legal_info.bank_cert_url
-            chamber_commerce_url = u.legal_info.chamber_commerce_url
-            contract_signed = u.legal_info.contract_signed
-
-        response.append(UserAdminResponse(
-            id=u.id,
-            full_name=u.full_name,
-            email=u.email,
-            is_admin=u.is_admin,
-            is_owner=u.is_owner,
-            legal_verification_status=u.legal_verification_status,
-            created_at=u.created_at,
-            referred_by_id=u.referred_by_id,
-            referrer_name=referrer_name,
-            referral_code=u.referral_code,
-            rut_url=rut_url,
-            bank_cert_url=bank_cert_url,
-            chamber_commerce_url=chamber_commerce_url,
-            contract_signed=contract_signed
-        ))
-    return response
+    if q and q.strip():
+        query = query.where(_user_search_filter(q))
+
+    page = await paginate(db, query, [DBUser.created_at, DBUser.id], cursor, limit, estimate=False)
+    page["items"] = [
+        UserAdminResponse(
+            **{**row._mapping, "legal_verification_status": row.legal_verification_status or "pending"}
+        )
+        for row in page["items"]
+    ]
+    return page
 
 
 @router.delete("/users/{id}")
@@ -188,6 +225,8 @@ async def delete_user_admin(
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404)
+    # Sus referidos suben al patrocinador; contadores ajustados
+    await detach_user(db, user)
     await db.delete(user)
     await db.commit()
     return {"ok": True}
@@ -324,44 +363,44 @@ async def get_user_signed_contract_pdf(
 @router.get("/tax/summary")
 async def get_tax_summary(
     year: int = None,
+    compare_years: int = Query(0, ge=0, le=10),
     current_user: DBUser = Depends(get_current_admin),
-    db: AsyncSessionLocal = Depends(get_db),
+    db: AsyncSessionLocal = Depends(get_read_db),
 ):
+    """Resumen fiscal desde el rollup mensual; `compare_years` añade los N años anteriores"""
     if not year:
         year = datetime.utcnow().year
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year, 12, 31, 23, 59, 59)
-    revenue_query = await db.execute(
-        select(func.sum(Payment.platform_amount)).where(
-            and_(
-                Payment.status == "completed",
-                Payment.created_at >= start_date,
-                Payment.created_at <= end_date,
-            )
-        )
-    )
-    gross_revenue = revenue_query.scalar() or 0.0
-    expense_query = await db.execute(
-        select(BusinessExpense).where(
-            and_(
-                BusinessExpense.user_id == current_user.id,
-                BusinessExpense.date >= start_date,
-                BusinessExpense.date <= end_date,
-            )
-        )
+    years = list(range(year - compare_years, year + 1))
+    totals = await get_tax_years(db, current_user.id, years)
+
+    summary = totals[year]
+    summary["comparison"] = [
+        {key: totals[y][key] for key in ("year", "gross_revenue", "total_expenses", "net_income")}
+        for y in years
+    ]
+    return summary
+
+
+@router.get("/tax/export.csv")
+async def export_tax_csv(
+    year: int = None,
+    current_user: DBUser = Depends(get_current_admin),
+):
+    """Ingresos y gastos del año en CSV, emitido por lotes desde un cursor del servidor"""
+    if not year:
+        year = datetime.utcnow().year
+
+    async def stream():
+        # Sesión propia: la de la dependencia se cierra antes de emitir el cuerpo
+        async with AsyncReadSessionLocal() as session:
+            async for chunk in iter_tax_csv(session, current_user.id, year):
+                yield chunk
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=fgate_tax_{year}.csv"},
     )
-    expenses = expense_query.scalars().all()
-    total_expenses = sum(e.amount for e in expenses)
-    categories = {}
-    for e in expenses:
-        categories[e.category] = categories.get(e.category, 0) + e.amount
-    return {
-        "year": year,
-        "gross_revenue": gross_revenue,
-        "total_expenses": total_expenses,
-        "net_income": gross_revenue - total_expenses,
-        "expenses_by_category": categories,
-    }
 
 
 @router.get("/expenses")
@@ -422,76 +461,57 @@ async def delete_expense(
 @router.get("/affiliates/stats")
 async def get_admin_affiliate_stats(
     current_user: DBUser = Depends(get_current_admin),
-    db: AsyncSessionLocal = Depends(get_db),
+    db: AsyncSessionLocal = Depends(get_read_db),
 ):
-    """Global affiliate metrics for Admin"""
-    # Total commissions paid through the platform
-    total_earnings_res = await db.execute(select(func.sum(AffiliateEarning.amount)))
-    total_paid = total_earnings_res.scalar() or 0.0
-
-    # Count of users who have referred at least one person
-    recruiters_count_res = await db.execute(
-        select(func.count(func.distinct(DBUser.referred_by_id)))
-        .where(DBUser.referred_by_id.is_not(None))
-    )
-    total_recruiters = recruiters_count_res.scalar() or 0
-
-    # Total earnings by level
-    levels_res = await db.execute(
-        select(AffiliateEarning.level, func.sum(AffiliateEarning.amount))
-        .group_by(AffiliateEarning.level)
-        .order_by(AffiliateEarning.level)
-    )
-    earnings_by_level = [{"level": r[0], "amount": r[1]} for r in levels_res.all()]
-
-    return {
-        "total_commissions_paid": total_paid,
-        "active_recruiters": total_recruiters,
-        "earnings_by_level": earnings_by_level
-    }
+    """Global affiliate metrics for Admin (contadores con shards, sin escanear)"""
+    return await get_platform_affiliate_summary(db)
 
 
 @router.get("/affiliates/ledger")
 async def get_admin_affiliate_ledger(
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    affiliate_id: Optional[int] = None,
+    level: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
     current_user: DBUser = Depends(get_current_admin),
-    db: AsyncSessionLocal = Depends(get_db),
+    db: AsyncSessionLocal = Depends(get_read_db),
 ):
-    """A master feed of all affiliate earning events"""
-    result = await db.execute(
-        select(AffiliateEarning)
-        .options(
-            selectinload(AffiliateEarning.affiliate),
-            selectinload(AffiliateEarning.payment).selectinload(Payment.user)
+    """A master feed of all affiliate earning events (keyset sobre created_at, id)"""
+    Affiliate = aliased(DBUser)
+    Payer = aliased(DBUser)
+    query = apply_filters(
+        select(
+            AffiliateEarning.id,
+            func.coalesce(Affiliate.full_name, Affiliate.username, literal("N/A")).label("affiliate_name"),
+            AffiliateEarning.affiliate_id,
+            func.coalesce(Payer.username, literal("N/A")).label("source_user"),
+            AffiliateEarning.amount,
+            AffiliateEarning.level,
+            AffiliateEarning.created_at,
+            AffiliateEarning.payment_id,
         )
-        .order_by(AffiliateEarning.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+        .outerjoin(Affiliate, AffiliateEarning.affiliate_id == Affiliate.id)
+        .outerjoin(Payment, AffiliateEarning.payment_id == Payment.id)
+        .outerjoin(Payer, Payment.user_id == Payer.id),
+        equals=[(AffiliateEarning.affiliate_id, affiliate_id), (AffiliateEarning.level, level)],
+        date_column=AffiliateEarning.created_at,
+        date_from=date_from,
+        date_to=date_to,
     )
-    earnings = result.scalars().all()
-
-    ledger_data = []
-    for earn in earnings:
-        ledger_data.append({
-            "id": earn.id,
-            "affiliate_name": earn.affiliate.full_name or earn.affiliate.username if earn.affiliate else "N/A",
-            "affiliate_id": earn.affiliate_id,
-            "source_user": earn.payment.user.username if earn.payment and earn.payment.user else "N/A",
-            "amount": earn.amount,
-            "level": earn.level,
-            "created_at": earn.created_at.isoformat(),
-            "payment_id": earn.payment_id
-        })
-
-    return ledger_data
+    page = await paginate(db, query, [AffiliateEarning.created_at, AffiliateEarning.id], cursor, limit)
+    page["items"] = [
+        {**row._mapping, "created_at": row.created_at.isoformat()} for row in page["items"]
+    ]
+    return page
 
 
 @router.get("/affiliates/tree/{user_id}")
 async def get_admin_user_tree(
     user_id: int,
     current_user: DBUser = Depends(get_current_admin),
-    db: AsyncSessionLocal = Depends(get_db),
+    db: AsyncSessionLocal = Depends(get_read_db),
 ):
     """Fetch the network tree for any user (Admin only)"""
     from api.routes.affiliate import get_recursive_downline
@@ -529,6 +549,12 @@ class RankResponse(RankCreate):
     class Config:
         orm_mode = True
 
+
+async def _recompute_ranks_job():
+    # Sesión propia: la de la petición ya está cerrada al ejecutar la tarea
+    async with AsyncSessionLocal() as session:
+        await recompute_ranks(session)
+
 @router.get("/ranks", response_model=List[RankResponse])
 async def get_admin_ranks(
     current_user: DBUser = Depends(get_current_admin),
@@ -541,6 +567,7 @@ async def get_admin_ranks(
 @router.post("/ranks", response_model=RankResponse)
 async def create_admin_rank(
     rank: RankCreate,
+    background_tasks: BackgroundTasks,
     current_user: DBUser = Depends(get_current_admin),
     db: AsyncSessionLocal = Depends(get_db),
 ):
@@ -558,12 +585,14 @@ async def create_admin_rank(
     db.add(new_rank)
     await db.commit()
     await db.refresh(new_rank)
+    background_tasks.add_task(_recompute_ranks_job)
     return new_rank
 
 @router.put("/ranks/{rank_id}", response_model=RankResponse)
 async def update_admin_rank(
     rank_id: int,
     rank_data: RankCreate,
+    background_tasks: BackgroundTasks,
     current_user: DBUser = Depends(get_current_admin),
     db: AsyncSessionLocal = Depends(get_db),
 ):
@@ -592,11 +621,13 @@ async def update_admin_rank(
 
     await db.commit()
     await db.refresh(rank)
+    background_tasks.add_task(_recompute_ranks_job)
     return rank
 
 @router.delete("/ranks/{rank_id}")
 async def delete_admin_rank(
     rank_id: int,
+    background_tasks: BackgroundTasks,
     current_user: DBUser = Depends(get_current_admin),
     db: AsyncSessionLocal = Depends(get_db),
 ):
@@ -607,6 +638,7 @@ async def delete_admin_rank(
     
     await db.delete(rank)
     await db.commit()
+    background_tasks.add_task(_recompute_ranks_job)
     return {"ok": True}
 
 
@@ -641,8 +673,8 @@ async def update_user_uplink(
     if referrer.referred_by_id == user.id:
         raise HTTPException(status_code=400, detail="Circular reference detected")
 
-    # Update
-    user.referred_by_id = referrer.id
+    # Update (ajusta contadores del anterior y del nuevo patrocinador)
+    await attach_referral(db, user, referrer.id)
     await db.commit()
     
     return {"ok": True, "new_referrer": referrer.full_name or referrer.username}
@@ -650,16 +682,23 @@ async def update_user_uplink(
 
 @router.get("/payments/pending")
 async def get_pending_payments(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    method: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
     current_user: DBUser = Depends(get_current_admin),
     db: AsyncSessionLocal = Depends(get_db),
 ):
-    """List all pending payments (Crypto/Manual)"""
-    result = await db.execute(
-        select(Payment)
-        .where(Payment.status == "pending")
-        .order_by(Payment.created_at.desc())
+    """List pending payments (Crypto/Manual), keyset sobre (created_at, id)"""
+    query = apply_filters(
+        select(Payment).where(Payment.status == "pending"),
+        equals=[(Payment.payment_method, method)],
+        date_column=Payment.created_at,
+        date_from=date_from,
+        date_to=date_to,
     )
-    return result.scalars().all()
+    return await paginate(db, query, [Payment.created_at, Payment.id], cursor, limit, scalars=True)
 
 
 @router.post("/payments/{payment_id}/verify-crypto")
@@ -705,5 +744,6 @@ async def verify_crypto_payment(
 
 
     payment.status = "completed"
+    await bump_platform_revenue(db, payment.created_at, payment.platform_amount)
     await db.commit()
     return {"status": "verified", "payment_id": payment_id}
@@ -4,12 +4,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import func, desc
+from sqlalchemy import desc
 
 from datetime import datetime
-from infrastructure.database.connection import get_db
+from infrastructure.database.connection import get_db, get_read_db
 from core.entities import User, Payment, AffiliateEarning
 from application.middlewares.auth import get_current_user
+from core.use_cases.affiliate_stats import get_affiliate_summary
+from core.use_cases.balances import ACCOUNT_AFFILIATE, balance_totals, from_cents
 
 router = APIRouter(prefix="/affiliate", tags=["Affiliate"])
 
@@ -54,29 +56,10 @@ async def get_recursive_downline(db: AsyncSession, user_id: int, current_level:
     
     return downline
 
-async def get_network_stats_raw(db: AsyncSession, user_id: int):
-    # Get total earnings from AffiliateEarning table
-    result = await db.execute(
-        select(func.sum(AffiliateEarning.amount))
-        .where(AffiliateEarning.affiliate_id == user_id)
-    )
-    total_earnings = result.scalar() or 0.0
-
-    # Get earnings by level
-    result = await db.execute(
-        select(AffiliateEarning.level, func.sum(AffiliateEarning.amount))
-        .where(AffiliateEarning.affiliate_id == user_id)
-        .group_by(AffiliateEarning.level)
-        .order_by(AffiliateEarning.level)
-    )
-    earnings_by_level = [{"level": row[0], "amount": row[1]} for row in result.all()]
-
-    return total_earnings, earnings_by_level
-
 # --- Endpoints ---
 
 @router.get("/network")
-async def get_affiliate_network(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def get_affiliate_network(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
     """
     Returns the hierarchical structure of the user's referral network (up to 10 levels).
     """
@@ -89,11 +72,12 @@ async def get_affiliate_network(current_user: User = Depends(get_current_user),
     }
 
 @router.get("/stats")
-async def get_affiliate_stats(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def get_affiliate_stats(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
     """
     Returns KPIs for the dashboard: Total Earnings, Level Distribution, Recent History.
     """
-    total_earnings, earnings_by_level = await get_network_stats_raw(db, current_user.id)
+    # Acumulados por nivel + ventana de 30 días (core.use_cases.affiliate_stats)
+    summary = await get_affiliate_summary(db, current_user.id)
     
     # Get recent commission history
     history_result = await db.execute(
@@ -116,19 +100,13 @@ async def get_affiliate_stats(current_user: User = Depends(get_current_user), db
             "source_user": source_user.username if source_user else "Usuario Eliminado"
         })
 
-    # Count total network size (simple count query is faster than tree traversal for just a number)
-    # This is a bit complex in SQL for infinite depth without CTE, 
-    # so we might just use the `referrals` count from User table if we only track direct, 
-    # OR unimplemented for now if we want full network size. 
-    # For now, let's return direct referrals count.
-    direct_referrals = await db.execute(
-        select(func.count(User.id)).where(User.referred_by_id == current_user.id)
-    )
-    promoters_count = direct_referrals.scalar() or 0
+    # Referidos directos: contador desnormalizado (core.use_cases.referrals)
+    promoters_count = current_user.direct_referral_count
 
     return {
-        "total_earnings": total_earnings,
-        "earnings_by_level": earnings_by_level,
+        "total_earnings": summary["total_earnings"],
+        "earnings_by_level": summary["earnings_by_level"],
+        "last_30_days_earnings": summary["last_30_days_earnings"],
         "recent_history": history_data,
         "direct_referrals": promoters_count,
         "referral_code": current_user.referral_code
@@ -168,31 +146,31 @@ async def update_referral_code(
 
 
 @router.get("/leaderboard")
-async def get_affiliate_leaderboard(db: AsyncSession = Depends(get_db)):
+async def get_affiliate_leaderboard(db: AsyncSession = Depends(get_read_db)):
     """
     Returns the top 10 affiliates by total earnings and their achievements.
     """
-    # Query top users by affiliate_balance
+    # Query top users by affiliate balance (snapshot + journal tail)
+    totals = balance_totals(ACCOUNT_AFFILIATE)
     result = await db.execute(
-        select(User)
+        select(User, totals.c.balance_cents)
+        .join(totals, totals.c.user_id == User.id)
         .where(User.is_owner)
-        .order_by(desc(User.affiliate_balance))
+        .order_by(desc(totals.c.balance_cents))
         .limit(10)
     )
-    top_users = result.scalars().all()
+    top_users = result.all()
 
     leaderboard = []
-    for user in top_users:
+    for user, balance_cents in top_users:
+        affiliate_balance = from_cents(balance_cents)
         # Calculate achievements
         badges = []
-        if user.affiliate_balance >= 1000:
+        if affiliate_balance >= 1000:
             badges.append({"id": "whale", "name": "Whale", "icon": "🐋"})
         
-        # Count direct referrals
-        ref_count_result = await db.execute(
-            select(func.count(User.id)).where(User.referred_by_id == user.id)
-        )
-        ref_count = ref_count_result.scalar() or 0
+        # Count direct referrals (columna desnormalizada)
+        ref_count = user.direct_referral_count
         if ref_count >= 50:
             badges.append({"id": "maestro", "name": "Maestro de Red", "icon": "👑"})
         
@@ -202,7 +180,7 @@ async def get_affiliate_leaderboard(db: AsyncSession = Depends(get_db)):
         leaderboard.append({
             "id": user.id,
             "name": user.full_name or user.username or f"Usuario #{user.id}",
-            "earnings": user.affiliate_balance,
+            "earnings": affiliate_balance,
             "referrals": ref_count,
             "badges": badges,
             "avatar": user.avatar_url
@@ -18,6 +18,7 @@ from application.dto.auth import (
     CreateMagicLinkRequest,
 )
 from api.services.auth_service import AuthService
+from core.use_cases.referrals import change_referral_count
 
 import structlog
 
@@ -114,6 +115,7 @@ async def register_owner(
         telegram_id=telegram_id,
     )
     db.add(new_owner)
+    await change_referral_count(db, referred_by_id, 1)
     try:
         await db.commit()
     except IntegrityError as e:
@@ -212,6 +214,7 @@ async def google_auth(
                     telegram_id=telegram_id,
                 )
                 db.add(user)
+                await change_referral_count(db, referred_by_id, 1)
 
             await db.commit()
             await db.refresh(user)
@@ -6,9 +6,10 @@ from sqlalchemy import and_
 from pydantic import BaseModel, Field
 
 from infrastructure.database.connection import get_db, AsyncSessionLocal
-from core.entities import User, CallService, AvailabilityRange, CallBooking
+from core.entities import User, CallService, AvailabilityRange
 from application.middlewares.auth import get_current_user
-from infrastructure.cache.availability_cache import invalidate_service_cache
+from infrastructure.cache.availability_cache import invalidate_owner_days, invalidate_service_cache
+from core.use_cases.call_bookings import create_call_booking
 
 router = APIRouter(prefix="/availability", tags=["Availability"])
 
@@ -83,6 +84,7 @@ async def set_availability(
         new_ranges.append(db_range)
 
     await db.commit()
+    await invalidate_owner_days(current_user.id)
     
     # Refresh to return IDs
     # (Optional, usually we just return success or re-query)
@@ -127,15 +129,13 @@ async def block_availability(
         raise HTTPException(status_code=404, detail="Service not found")
 
     # Create blocked booking
-    booking = CallBooking(
-        service_id=data.service_id,
-        start_time=data.start_time,
-        end_time=data.end_time,
-        status="blocked"
+    booking = await create_call_booking(
+        db, service, data.start_time, data.end_time, status="blocked"
     )
-    db.add(booking)
-    await db.commit()
+    if booking is None:
+        raise HTTPException(status_code=409, detail="Slot already booked")
     await invalidate_service_cache(data.service_id)
+    await invalidate_owner_days(service.owner_id, data.start_time, data.end_time)
     return {"status": "blocked", "start_time": data.start_time}
 
 
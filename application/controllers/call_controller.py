@@ -1,21 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import and_
+from sqlalchemy import insert
 from infrastructure.database.connection import get_db, AsyncSessionLocal
 from core.entities import User, CallService, CallSlot, CallBooking
 from application.middlewares.auth import get_current_user
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime, timedelta
-from infrastructure.utils.calendar import generate_calendar_links
+from typing import AsyncIterator, Iterator, List, Literal, Optional, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from infrastructure.utils.calendar import generate_calendar_links, generate_ics
+from collections import defaultdict
+import heapq
 import logging
+import os
 
 # Configurar logging para facilitar depuración en Cloud Run
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/calls", tags=["calls"])
 
+# Filas por INSERT multi-row (4 parámetros por fila, muy por debajo del límite de asyncpg)
+SLOT_INSERT_CHUNK_SIZE = int(os.getenv("SLOT_INSERT_CHUNK_SIZE", "500"))
+# A partir de este número de slots la respuesta se envía en streaming
+SLOT_STREAM_THRESHOLD = int(os.getenv("SLOT_STREAM_THRESHOLD", "1000"))
+
 # --- SCHEMAS ---
 class CallServiceSchema(BaseModel):
     channel_id: Optional[int] = None
@@ -30,6 +39,7 @@ class CallSlotIn(BaseModel):
 
 class CallSlotOut(BaseModel):
     id: int
+    kind: Literal["slot", "booking"] = "slot"  # Tabla de origen del id
     service_id: int
     start_time: datetime
     is_booked: bool
@@ -49,90 +59,110 @@ class CallServiceOut(CallServiceSchema):
 
 # --- ENDPOINTS ---
 
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _slot_window(column, from_date: Optional[datetime], to_date: Optional[datetime]):
+    conditions = []
+    if from_date:
+        conditions.append(column >= from_date)
+    if to_date:
+        conditions.append(column < to_date)
+    return conditions
+
+
+def _calendar_event(svc: CallService, start_time: datetime, end_time: Optional[datetime], link: Optional[str]) -> dict:
+    return {
+        "title": f"Llamada: {svc.description}",
+        "start_time": start_time,
+        "end_time": end_time or (start_time + timedelta(minutes=svc.duration_minutes)),
+        "description": f"Sesión reservada de {svc.description}. Link de reunión: {link}",
+        "location": link or "Online",
+    }
+
+
 @router.get("/services", response_model=List[CallServiceOut])
 async def get_services(
     channel_id: Optional[int] = None,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSessionLocal = Depends(get_db)
 ):
-    """Get all call services for the user/channel"""
+    """
+    Get all call services for the user/channel.
+    `from_date`/`to_date` limitan los slots a una ventana; los links de
+    calendario se piden aparte (/slots/{id}/calendar-links o /calendar.ics).
+    """
     try:
         query = select(CallService).where(CallService.owner_id == current_user.id)
         if channel_id:
             query = query.where(CallService.channel_id == channel_id)
 
-        # Load slots AND the booked_by user for those slots
+        # Load slots (within the window) AND the booked_by user for those slots
+        slot_filter = _slot_window(CallSlot.start_time, from_date, to_date)
+        slots_rel = CallService.slots.and_(*slot_filter) if slot_filter else CallService.slots
         result = await db.execute(
-            query.options(
-                selectinload(CallService.slots).selectinload(CallSlot.booked_by)
-            )
+            query.options(selectinload(slots_rel).selectinload(CallSlot.booked_by))
         )
         services = result.scalars().all()
-        
-        # 1. Fetch confirmed bookings (modern system)
+
+        # 1. Fetch confirmed bookings (modern system), indexed by service
         service_ids = [s.id for s in services]
-        all_bookings = []
+        bookings_by_service = defaultdict(list)
         if service_ids:
             bookings_res = await db.execute(
-                select(CallBooking).where(
-                    and_(
-                        CallBooking.service_id.in_(service_ids),
-                        CallBooking.status == "confirmed"
-                    )
-                ).options(selectinload(CallBooking.booker))
+                select(CallBooking)
+                .where(
+                    CallBooking.service_id.in_(service_ids),
+                    CallBooking.status == "confirmed",
+                    *_slot_window(CallBooking.start_time, from_date, to_date),
+                )
+                .order_by(CallBooking.start_time)
+                .options(selectinload(CallBooking.booker))
             )
-            all_bookings = bookings_res.scalars().all()
+            for b in bookings_res.scalars():
+                bookings_by_service[b.service_id].append(b)
 
         final_services = []
         for svc in services:
-            current_slots = []
-            
-            # 1.1 Process legacy slots (CallSlot)
-            for slot in svc.slots:
-                slot_data = {
-                    "id": slot.id,
-                    "service_id": slot.service_id,
-                    "start_time": slot.start_time,
-                    "is_booked": slot.is_booked,
-                    "jitsi_link": slot.jitsi_link,
-                    "booked_by_name": slot.booked_by.full_name if slot.booked_by else None,
-                    "calendar_links": None
-                }
-                
-                if slot.is_booked:
-                    end_time = slot.start_time + timedelta(minutes=svc.duration_minutes)
-                    slot_data["calendar_links"] = generate_calendar_links(
-                        title=f"Llamada: {svc.description}",
-                        start_time=slot.start_time,
-                        end_time=end_time,
-                        description=f"Sesión reservada de {svc.description}. Link de reunión: {slot.jitsi_link}",
-                        location=slot.jitsi_link or "Online"
-                    )
-                current_slots.append(slot_data)
-            
-            # 1.2 Process modern bookings (CallBooking) as pseudo-slots
-            svc_bookings = [b for b in all_bookings if b.service_id == svc.id]
-            for b in svc_bookings:
-                # Evitar duplicados si ya existe un slot para este mismo tiempo
-                if any(s["start_time"] == b.start_time for s in current_slots):
-                    continue
-
-                actual_end = b.end_time or (b.start_time + timedelta(minutes=svc.duration_minutes))
-                current_slots.append({
-                    "id": 1000000 + b.id,
+            # 1.1 Legacy slots (CallSlot)
+            legacy_slots = sorted(
+                (
+                    {
+                        "id": slot.id,
+                        "kind": "slot",
+                        "service_id": slot.service_id,
+                        "start_time": slot.start_time,
+                        "is_booked": slot.is_booked,
+                        "jitsi_link": slot.jitsi_link,
+                        "booked_by_name": slot.booked_by.full_name if slot.booked_by else None,
+                        "calendar_links": None,
+                    }
+                    for slot in svc.slots
+                ),
+                key=lambda s: s["start_time"],
+            )
+            taken_times = {s["start_time"] for s in legacy_slots}
+
+            # 1.2 Modern bookings (CallBooking) as pseudo-slots, sin duplicar horarios
+            booking_slots = [
+                {
+                    "id": b.id,
+                    "kind": "booking",
                     "service_id": svc.id,
                     "start_time": b.start_time,
                     "is_booked": True,
                     "jitsi_link": b.meeting_link,
                     "booked_by_name": b.booker.full_name if b.booker else "Usuario Telegram",
-                    "calendar_links": generate_calendar_links(
-                        title=f"Llamada: {svc.description}",
-                        start_time=b.start_time,
-                        end_time=actual_end,
-                        description=f"Sesión reservada de {svc.description}. Link de reunión: {b.meeting_link}",
-                        location=b.meeting_link or "Online"
-                    )
-                })
+                    "calendar_links": None,
+                }
+                for b in bookings_by_service.get(svc.id, [])
+                if b.start_time not in taken_times
+            ]
 
             final_services.append({
                 "id": svc.id,
@@ -141,7 +171,7 @@ async def get_services(
                 "duration_minutes": svc.duration_minutes,
                 "description": svc.description,
                 "is_active": svc.is_active,
-                "slots": current_slots
+                "slots": list(heapq.merge(legacy_slots, booking_slots, key=lambda s: s["start_time"])),
             })
 
         return final_services
@@ -149,6 +179,91 @@ async def get_services(
         logger.error(f"FATAL Error in get_services: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/slots/{slot_id}/calendar-links")
+async def get_slot_calendar_links(
+    slot_id: int,
+    kind: Literal["slot", "booking"] = "slot",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSessionLocal = Depends(get_db)
+):
+    """Links de Google/Outlook/Yahoo para un slot o booking vendido (`kind` indica la tabla)."""
+    if kind == "booking":
+        result = await db.execute(
+            select(CallBooking, CallService)
+            .join(CallService, CallBooking.service_id == CallService.id)
+            .where(
+                CallBooking.id == slot_id,
+                CallService.owner_id == current_user.id,
+            )
+        )
+        row = result.first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        booking, svc = row
+        event = _calendar_event(svc, booking.start_time, booking.end_time, booking.meeting_link)
+    else:
+        result = await db.execute(
+            select(CallSlot, CallService)
+            .join(CallService, CallSlot.service_id == CallService.id)
+            .where(CallSlot.id == slot_id, CallService.owner_id == current_user.id)
+        )
+        row = result.first()
+        if not row or not row[0].is_booked:
+            raise HTTPException(status_code=404, detail="Slot not found")
+        slot, svc = row
+        event = _calendar_event(svc, slot.start_time, None, slot.jitsi_link)
+
+    return generate_calendar_links(**event)
+
+
+@router.get("/calendar.ics")
+async def get_owner_calendar_feed(
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSessionLocal = Depends(get_db)
+):
+    """Feed ICS con las sesiones vendidas del owner (opcionalmente en una ventana)."""
+    slots_res = await db.execute(
+        select(CallSlot, CallService)
+        .join(CallService, CallSlot.service_id == CallService.id)
+        .where(
+            CallService.owner_id == current_user.id,
+            CallSlot.is_booked.is_(True),
+            *_slot_window(CallSlot.start_time, from_date, to_date),
+        )
+    )
+    bookings_res = await db.execute(
+        select(CallBooking, CallService)
+        .join(CallService, CallBooking.service_id == CallService.id)
+        .where(
+            CallService.owner_id == current_user.id,
+            CallBooking.status == "confirmed",
+            *_slot_window(CallBooking.start_time, from_date, to_date),
+        )
+    )
+
+    events = []
+    taken = set()
+    for slot, svc in slots_res:
+        taken.add((svc.id, slot.start_time))
+        events.append({"uid": f"slot-{slot.id}@fgate", **_calendar_event(svc, slot.start_time, None, slot.jitsi_link)})
+    for booking, svc in bookings_res:
+        if (svc.id, booking.start_time) in taken:
+            continue
+        events.append({
+            "uid": f"booking-{booking.id}@fgate",
+            **_calendar_event(svc, booking.start_time, booking.end_time, booking.meeting_link),
+        })
+    events.sort(key=lambda e: e["start_time"])
+
+    return Response(
+        content=generate_ics(events),
+        media_type="text/calendar",
+        headers={"Content-Disposition": 'attachment; filename="fgate-calls.ics"'},
+    )
+
 @router.post("/services", response_model=CallServiceOut)
 async def create_service(
     service_in: CallServiceSchema,
@@ -230,8 +345,6 @@ async def add_slots(
     db: AsyncSessionLocal = Depends(get_db)
 ):
     """Add availability slots"""
-    new_slots = []
-    
     # Pre-fetch services to validate ownership efficiently
     service_ids = list(set([s.service_id for s in slots]))
     services_res = await db.execute(select(CallService).where(CallService.id.in_(service_ids), CallService.owner_id == current_user.id))
@@ -241,18 +354,20 @@ async def add_slots(
         if slot_in.service_id not in valid_services:
             raise HTTPException(status_code=400, detail=f"Invalid service ID: {slot_in.service_id}")
 
-        slot = CallSlot(
-            service_id=slot_in.service_id,
-            start_time=slot_in.start_time,
-            is_booked=False
-        )
-        db.add(slot)
-        new_slots.append(slot)
-    
+    if not slots:
+        return []
+
+    # La BD guarda UTC naive: normalizar antes de comparar y deduplicar
+    keys = [(s.service_id, _naive_utc(s.start_time)) for s in slots]
+    times = [t for _, t in keys]
+    existing = await _existing_slot_keys(db, service_ids, min(times), max(times))
+    rows = _new_slot_rows(keys, existing)
+
+    new_slots = []
+    async for chunk in _insert_slot_rows(db, rows):
+        new_slots.extend(chunk)
     await db.commit()
-    for s in new_slots:
-        await db.refresh(s)
-        
+
     return new_slots
 
 @router.delete("/slots/{slot_id}")
@@ -294,6 +409,79 @@ class GenerateSlotsIn(BaseModel):
     start_date: datetime 
     end_date: datetime
 
+def _iter_slot_times(data: GenerateSlotsIn, duration: int, start_h: int, start_m: int, end_h: int, end_m: int) -> Iterator[datetime]:
+    """Horas de inicio de los slots de la regla recurrente, en orden."""
+    current_date = data.start_date.date()
+    end_date_obj = data.end_date.date()
+    step = timedelta(minutes=duration)
+
+    while current_date <= end_date_obj:
+        if current_date.weekday() in data.days_of_week:
+            current_slot = datetime.combine(current_date, datetime.min.time()).replace(hour=start_h, minute=start_m)
+            day_end = datetime.combine(current_date, datetime.min.time()).replace(hour=end_h, minute=end_m)
+            while current_slot + step <= day_end:
+                yield current_slot
+                current_slot += step
+        current_date += timedelta(days=1)
+
+
+async def _existing_slot_keys(db, service_ids: List[int], start: datetime, end: datetime) -> Set[Tuple[int, datetime]]:
+    """(service_id, start_time) ya existentes en el rango, en una sola consulta."""
+    result = await db.execute(
+        select(CallSlot.service_id, CallSlot.start_time).where(
+            CallSlot.service_id.in_(service_ids),
+            CallSlot.start_time >= start,
+            CallSlot.start_time <= end,
+        )
+    )
+    return {(row.service_id, row.start_time) for row in result}
+
+
+def _new_slot_rows(keys, existing: Set[Tuple[int, datetime]]) -> List[dict]:
+    rows = []
+    seen = set(existing)
+    for service_id, start_time in keys:
+        if (service_id, start_time) in seen:
+            continue
+        seen.add((service_id, start_time))
+        rows.append({"service_id": service_id, "start_time": start_time, "is_booked": False})
+    return rows
+
+
+async def _insert_slot_rows(db, rows: List[dict]) -> AsyncIterator[List[CallSlotOut]]:
+    """INSERT ... RETURNING por bloques; la respuesta se arma con las filas retornadas."""
+    for i in range(0, len(rows), SLOT_INSERT_CHUNK_SIZE):
+        result = await db.execute(
+            insert(CallSlot)
+            .values(rows[i:i + SLOT_INSERT_CHUNK_SIZE])
+            .returning(
+                CallSlot.id,
+                CallSlot.service_id,
+                CallSlot.start_time,
+                CallSlot.is_booked,
+                CallSlot.jitsi_link,
+            )
+        )
+        yield [CallSlotOut(**row._mapping) for row in result]
+
+
+async def _stream_slot_rows(rows: List[dict]) -> AsyncIterator[str]:
+    """
+    Inserta y emite un array JSON por bloques. Cada bloque se confirma por
+    separado: si la conexión se corta, repetir la solicitud completa el resto
+    (los slots existentes se omiten).
+    """
+    async with AsyncSessionLocal() as session:
+        first = True
+        yield "["
+        async for chunk in _insert_slot_rows(session, rows):
+            await session.commit()
+            for slot in chunk:
+                yield ("" if first else ",") + slot.model_dump_json()
+                first = False
+        yield "]"
+
+
 @router.post("/availability/generate", response_model=List[CallSlotOut])
 async def generate_slots(
     data: GenerateSlotsIn,
@@ -319,40 +507,21 @@ async def generate_slots(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid time format (HH:MM)")
 
+    # 2. Calcular en memoria y descartar los que ya existen
+    times = list(_iter_slot_times(data, duration, start_h, start_m, end_h, end_m))
+    if not times:
+        return []
+
+    existing = await _existing_slot_keys(db, [service.id], times[0], times[-1])
+    rows = _new_slot_rows(((service.id, t) for t in times), existing)
+
+    # 3. Rangos grandes: respuesta en streaming
+    if len(rows) > SLOT_STREAM_THRESHOLD:
+        return StreamingResponse(_stream_slot_rows(rows), media_type="application/json")
+
     new_slots = []
-    
-    # Iterate through days
-    from datetime import timedelta
-    
-    # Ensure we use date objects for iteration
-    current_date = data.start_date.date()
-    end_date_obj = data.end_date.date()
-    
-    while current_date <= end_date_obj:
-        # Check if day match
-        if current_date.weekday() in data.days_of_week:
-            # Generate slots for this day
-            slot_start = datetime.combine(current_date, datetime.min.time()).replace(hour=start_h, minute=start_m)
-            day_end = datetime.combine(current_date, datetime.min.time()).replace(hour=end_h, minute=end_m)
-            
-            # Use strict comparison for start_time to avoid infinite loops if duration is 0 (handled above)
-            current_slot = slot_start
-            while current_slot + timedelta(minutes=duration) <= day_end:
-                # Create slot
-                slot = CallSlot(
-                    service_id=service.id,
-                    start_time=current_slot,
-                    is_booked=False
-                )
-                db.add(slot)
-                new_slots.append(slot)
-                
-                current_slot += timedelta(minutes=duration)
-        
-        current_date += timedelta(days=1)
-    
+    async for chunk in _insert_slot_rows(db, rows):
+        new_slots.extend(chunk)
     await db.commit()
-    for s in new_slots:
-        await db.refresh(s)
-        
+
     return new_slots
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from infrastructure.database.connection import get_read_db, AsyncSessionLocal, AsyncReadSessionLocal
+from infrastructure.utils.export import ENCODERS, EXPORT_FORMATS, PARQUET_ENABLED, gzip_stream
+from core.entities import User
+from core.use_cases.exports import (
+    EXPORT_CHUNK_DAYS,
+    EXPORT_DATASETS,
+    export_columns,
+    first_export_date,
+    iter_export_batches,
+)
+from application.middlewares.auth import get_current_user
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+
+async def _stream_export(dataset: str, user: User, fmt: str, date_from, date_to, after_id, compress: bool):
+    # Sesión propia: la de la dependencia se cierra antes de emitir el cuerpo
+    async with AsyncReadSessionLocal() as session:
+        batches = iter_export_batches(session, dataset, user, date_from, date_to, after_id)
+        chunks = ENCODERS[fmt](export_columns(dataset, user), batches)
+        if compress:
+            chunks = gzip_stream(chunks)
+        async for chunk in chunks:
+            yield chunk
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    compress: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSessionLocal = Depends(get_read_db),
+):
+    """
+    Exportación en streaming (memoria constante) acotada por rol. Para reanudar
+    una descarga cortada: date_from = fecha de la última fila, after_id = su id.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail="Dataset no exportable")
+    if format == "parquet" and not PARQUET_ENABLED:
+        raise HTTPException(status_code=400, detail="Exportación Parquet no disponible en este servidor")
+
+    # Copia desligada de la sesión de auth: el cuerpo se emite después de cerrarla
+    user = User(id=current_user.id, is_admin=current_user.is_admin)
+    date_to = date_to or datetime.utcnow()
+    date_from = date_from or await first_export_date(db, dataset, user) or date_to
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"{dataset}_{date_from:%Y%m%d}_{date_to:%Y%m%d}.{extension}"
+    if compress:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+
+    return StreamingResponse(
+        _stream_export(dataset, user, format, date_from, date_to, after_id, compress),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Export-Chunk-Days": str(EXPORT_CHUNK_DAYS),
+        },
+    )
@@ -1,12 +1,14 @@
 from datetime import datetime
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.future import select
 from sqlalchemy import func, and_
 from sqlalchemy.orm import selectinload
+import logging
 import secrets
 
-from infrastructure.database.connection import get_db, AsyncSessionLocal
+from infrastructure.database.connection import get_db, get_read_db, AsyncSessionLocal
+from infrastructure.cache.catalog_cache import catalog_cache
 from core.entities import (
     User as DBUser,
     Subscription,
@@ -14,10 +16,9 @@ from core.entities import (
     Channel,
     Withdrawal,
     Promotion,
+    Broadcast,
     SupportTicket,
     TicketMessage,
-    Payment,
-    AffiliateEarning,
 )
 from application.dto.user import DashboardSummary, UserProfileResponse, ProfileUpdate
 from application.dto.auth import PasswordUpdate
@@ -30,10 +31,40 @@ from application.dto.misc import (
     TicketCreate,
     MessageCreate,
     AnalyticsResponse,
+    CohortResponse,
+    MrrResponse,
+    BroadcastCreate,
+    BroadcastResponse,
 )
 from application.middlewares.auth import get_current_owner, oauth2_scheme
 from api.services.auth_service import AuthService
 from core.use_cases.distribute_funds import get_affiliate_tier_info
+from core.use_cases.daily_stats import (
+    get_active_subscribers,
+    get_daily_series,
+    move_subscription_end,
+    since_days,
+)
+from core.use_cases.balances import (
+    ACCOUNT_AFFILIATE,
+    ACCOUNT_MAIN,
+    InsufficientBalance,
+    balance_entry,
+    get_balances,
+    post_entries,
+    withdraw_from_balances,
+)
+from core.use_cases.cohorts import (
+    add_months,
+    get_cohort_retention,
+    get_mrr_series,
+    month_start,
+    record_subscription_end,
+)
+from core.use_cases.broadcasts import BroadcastTakenOver, enqueue_broadcast, run_broadcast
+from infrastructure.external_apis.telegram import telegram_sender
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/owner", tags=["Owner"])
 
@@ -41,7 +72,7 @@ router = APIRouter(prefix="/owner", tags=["Owner"])
 @router.get("/dashboard/summary", response_model=DashboardSummary)
 async def get_owner_summary(
     current_user: DBUser = Depends(get_current_owner),
-    db: AsyncSessionLocal = Depends(get_db),
+    db: AsyncSessionLocal = Depends(get_read_db),
 ):
     print(f"DEBUG: get_owner_summary for user_id={current_user.id}, email={current_user.email}")
     # 1. Canales Activos
@@ -50,23 +81,12 @@ async def get_owner_summary(
     )
     active_channels = channels_result.scalar() or 0
 
-    # 2. Suscriptores Activos
-    subs_result = await db.execute(
-        select(func.count(Subscription.id))
-        .join(Plan)
-        .join(Channel)
-        .where(
-            and_(
-                Channel.owner_id == current_user.id,
-                Subscription.is_active,
-                Subscription.end_date > datetime.utcnow(),
-            )
-        )
-    )
-    active_subscribers = subs_result.scalar() or 0
+    # 2. Suscriptores Activos (rollup diario)
+    active_subscribers = await get_active_subscribers(db, current_user.id)
 
     # 3. Info de Afiliados
     tier_info = await get_affiliate_tier_info(db, current_user.id)
+    balances = await get_balances(db, current_user.id)
 
     return {
         "id": current_user.id,
@@ -74,8 +94,8 @@ async def get_owner_summary(
         "email": current_user.email or "",
         "avatar_url": current_user.avatar_url,
         "active_subscribers": active_subscribers,
-        "available_balance": current_user.balance,
-        "affiliate_balance": current_user.affiliate_balance,
+        "available_balance": balances[ACCOUNT_MAIN],
+        "affiliate_balance": balances[ACCOUNT_AFFILIATE],
         "active_channels": active_channels,
         "referral_code": current_user.referral_code,
         "affiliate_tier": tier_info["tier"],
@@ -87,8 +107,14 @@ async def get_owner_summary(
 
 
 @router.get("/profile", response_model=UserProfileResponse)
-async def get_profile(current_user: DBUser = Depends(get_current_owner)):
-    return current_user
+async def get_profile(
+    current_user: DBUser = Depends(get_current_owner),
+    db: AsyncSessionLocal = Depends(get_read_db),
+):
+    balances = await get_balances(db, current_user.id)
+    return UserProfileResponse.model_validate(current_user).model_copy(
+        update={"balance": balances[ACCOUNT_MAIN], "affiliate_balance": balances[ACCOUNT_AFFILIATE]}
+    )
 
 
 @router.put("/profile")
@@ -170,6 +196,7 @@ async def create_channel(
     )
     db.add(default_plan)
     await db.commit()
+    await catalog_cache.invalidate()
     await db.refresh(new_channel)
     return new_channel
 
@@ -211,7 +238,7 @@ async def check_channel_delete_cost(
         "refund_amount": round(total_refund, 2),
         "penalty_amount": round(penalty, 2),
         "total_cost": round(total_cost, 2),
-        "can_afford": current_user.balance >= total_cost,
+        "can_afford": (await get_balances(db, current_user.id))[ACCOUNT_MAIN] >= total_cost,
     }
 
 
@@ -241,7 +268,7 @@ async def delete_channel(
                 Subscription.end_date > datetime.utcnow(),
             )
         )
-        .options(selectinload(Subscription.plan), selectinload(Subscription.user))
+        .options(selectinload(Subscription.plan))
     )
     active_subs = active_subs_result.scalars().all()
 
@@ -256,22 +283,28 @@ async def delete_channel(
                 total_refund += sub.plan.price / sub.plan.duration_days * remaining_days
 
         total_cost = total_refund * 1.20
-        if current_user.balance < total_cost:
+        if (await get_balances(db, current_user.id))[ACCOUNT_MAIN] < total_cost:
             raise HTTPException(status_code=400, detail="Fondos insuficientes")
 
-        current_user.balance -= total_cost
+        entries = [balance_entry(current_user.id, ACCOUNT_MAIN, -total_cost, "channel_refund")]
+        now = datetime.utcnow()
         for sub in active_subs:
             sub.is_active = False
+            await move_subscription_end(db, current_user.id, sub.end_date, now)
+            await record_subscription_end(db, sub, sub.plan, now)
             remaining_days = (sub.end_date - datetime.utcnow()).days
             if remaining_days > 0 and sub.plan.duration_days > 0:
                 user_compensation = (
                     sub.plan.price / sub.plan.duration_days * remaining_days
                 ) * 1.20
-                if sub.user:
-                    sub.user.balance += user_compensation
+                entries.append(
+                    balance_entry(sub.user_id, ACCOUNT_MAIN, user_compensation, "compensation")
+                )
+        await post_entries(db, entries)
 
     await db.delete(channel)
     await db.commit()
+    await catalog_cache.invalidate()
     return {"status": "deleted", "id": channel_id}
 
 
@@ -310,6 +343,7 @@ async def create_channel_plan(
     new_plan = Plan(channel_id=channel_id, **data.dict(), is_active=True)
     db.add(new_plan)
     await db.commit()
+    await catalog_cache.invalidate()
     await db.refresh(new_plan)
     return new_plan
 
@@ -332,6 +366,7 @@ async def update_plan(
     for key, value in data.dict(exclude_unset=True).items():
         setattr(plan, key, value)
     await db.commit()
+    await catalog_cache.invalidate()
     return plan
 
 
@@ -357,9 +392,11 @@ async def delete_plan(
     if subs.scalars().first():
         plan.is_active = False
         await db.commit()
+        await catalog_cache.invalidate()
         return {"status": "deactivated"}
     await db.delete(plan)
     await db.commit()
+    await catalog_cache.invalidate()
     return {"status": "deleted"}
 
 
@@ -383,9 +420,67 @@ async def update_channel_branding(
     if data.expiration_message is not None:
         channel.expiration_message = data.expiration_message
     await db.commit()
+    await catalog_cache.invalidate()
     return channel
 
 
+async def _run_broadcast_job(broadcast_id: int):
+    # Sesión propia: la de la petición ya está cerrada al ejecutar la tarea
+    async with AsyncSessionLocal() as session:
+        try:
+            await run_broadcast(session, broadcast_id, telegram_sender)
+        except BroadcastTakenOver:
+            logger.warning(f"Difusión {broadcast_id} retomada por otro proceso")
+
+
+@router.post("/channels/{channel_id}/broadcasts", response_model=BroadcastResponse, status_code=202)
+async def create_broadcast(
+    channel_id: int,
+    data: BroadcastCreate,
+    background_tasks: BackgroundTasks,
+    current_user: DBUser = Depends(get_current_owner),
+    db: AsyncSessionLocal = Depends(get_db),
+):
+    """Encola un mensaje para los suscriptores activos del canal"""
+    chan_check = await db.execute(
+        select(Channel.id).where(
+            and_(Channel.id == channel_id, Channel.owner_id == current_user.id)
+        )
+    )
+    if not chan_check.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Canal no encontrado")
+    broadcast = await enqueue_broadcast(db, current_user.id, channel_id, data.text)
+    background_tasks.add_task(_run_broadcast_job, broadcast.id)
+    return broadcast
+
+
+@router.get("/broadcasts", response_model=List[BroadcastResponse])
+async def list_broadcasts(
+    channel_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: DBUser = Depends(get_current_owner),
+    db: AsyncSessionLocal = Depends(get_read_db),
+):
+    query = select(Broadcast).where(Broadcast.owner_id == current_user.id)
+    if channel_id:
+        query = query.where(Broadcast.channel_id == channel_id)
+    result = await db.execute(query.order_by(Broadcast.created_at.desc()).limit(limit))
+    return result.scalars().all()
+
+
+@router.get("/broadcasts/{broadcast_id}", response_model=BroadcastResponse)
+async def get_broadcast(
+    broadcast_id: int,
+    current_user: DBUser = Depends(get_current_owner),
+    db: AsyncSessionLocal = Depends(get_db),
+):
+    """Progreso del envío (entregados / bloqueados / fallidos)"""
+    broadcast = await db.get(Broadcast, broadcast_id)
+    if not broadcast or broadcast.owner_id != current_user.id:
+        raise HTTPException(status_code=404)
+    return broadcast
+
+
 @router.get("/channels/{channel_id}/promotions", response_model=List[PromotionResponse])
 async def get_channel_promotions(
     channel_id: int,
@@ -453,18 +548,16 @@ async def request_withdrawal(
     current_user: DBUser = Depends(get_current_owner),
     db: AsyncSessionLocal = Depends(get_db),
 ):
-    if data.amount > current_user.balance + current_user.affiliate_balance:
-        raise HTTPException(status_code=400, detail="Balance insuficiente")
     new_withdrawal = Withdrawal(
         owner_id=current_user.id, **data.dict(), status="pending"
     )
-    if current_user.balance >= data.amount:
-        current_user.balance -= data.amount
-    else:
-        remaining = data.amount - current_user.balance
-        current_user.balance = 0
-        current_user.affiliate_balance -= remaining
     db.add(new_withdrawal)
+    await db.flush()
+    try:
+        await withdraw_from_balances(db, current_user.id, data.amount, new_withdrawal.id)
+    except InsufficientBalance:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Balance insuficiente")
     await db.commit()
     return new_withdrawal
 
@@ -566,73 +659,67 @@ async def reply_ticket_owner(
 
 @router.get("/analytics", response_model=AnalyticsResponse)
 async def get_owner_analytics(
+    days: int = Query(30, ge=1, le=366),
     current_user: DBUser = Depends(get_current_owner),
-    db: AsyncSessionLocal = Depends(get_db),
+    db: AsyncSessionLocal = Depends(get_read_db),
 ):
-    """Ingresos y crecimiento de suscriptores (últimos 30 días)"""
-    from datetime import timedelta
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-
-    # 1. Ingresos diarios (Dueño)
-    rev_query = await db.execute(
-        select(
-            func.date(Payment.created_at).label("date"),
-            func.sum(Payment.owner_amount).label("revenue"),
-        )
-        .join(Plan, Payment.plan_id == Plan.id)
-        .join(Channel)
-        .where(
-            and_(
-                Channel.owner_id == current_user.id,
-                Payment.status == "completed",
-                Payment.created_at >= thirty_days_ago,
-            )
-        )
-        .group_by(func.date(Payment.created_at))
-        .order_by(func.date(Payment.created_at))
-    )
-    revenue_chart = [{"date": str(r.date), "value": r.revenue} for r in rev_query.all()]
+    """Ingresos, crecimiento de suscriptores y red (últimos `days` días, desde el rollup diario)"""
+    rows = await get_daily_series(db, current_user.id, since_days(days))
 
-    # 2. Crecimiento de suscriptores
-    sub_query = await db.execute(
-        select(
-            func.date(Subscription.start_date).label("date"),
-            func.count(Subscription.id).label("count"),
-        )
-        .join(Plan)
-        .join(Channel)
-        .where(
-            and_(
-                Channel.owner_id == current_user.id,
-                Subscription.start_date >= thirty_days_ago,
-            )
-        )
-        .group_by(func.date(Subscription.start_date))
-        .order_by(func.date(Subscription.start_date))
+    return {
+        "revenue_series": [
+            {"date": str(r.day), "value": r.revenue} for r in rows if r.revenue
+        ],
+        "subscriber_series": [
+            {"date": str(r.day), "value": r.new_subscribers} for r in rows if r.new_subscribers
+        ],
+        "mlm_series": [
+            {"date": str(r.day), "value": r.mlm_earnings} for r in rows if r.mlm_earnings
+        ],
+    }
+
+
+async def _owner_channel_ids(db, owner_id: int, channel_id: Optional[int]) -> List[int]:
+    query = select(Channel.id).where(Channel.owner_id == owner_id)
+    if channel_id:
+        query = query.where(Channel.id == channel_id)
+    result = await db.execute(query)
+    channel_ids = list(result.scalars().all())
+    if channel_id and not channel_ids:
+        raise HTTPException(status_code=404, detail="Canal no encontrado")
+    return channel_ids
+
+
+@router.get("/analytics/cohorts", response_model=CohortResponse)
+async def get_owner_cohorts(
+    months: int = Query(12, ge=1, le=36),
+    channel_id: Optional[int] = None,
+    plan_id: Optional[int] = None,
+    current_user: DBUser = Depends(get_current_owner),
+    db: AsyncSessionLocal = Depends(get_read_db),
+):
+    """Retención por cohorte mensual (mes de inicio × meses activos)"""
+    channel_ids = await _owner_channel_ids(db, current_user.id, channel_id)
+    until = month_start(datetime.utcnow())
+    cohorts = await get_cohort_retention(
+        db, channel_ids, add_months(until, -(months - 1)), until, plan_id
     )
-    subscriber_chart = [
-        {"date": str(s.date), "value": s.count} for s in sub_query.all()
-    ]
-
-    # 3. Datos de Red (MLM)
-    mlm_query = await db.execute(
-        select(
-            func.date(AffiliateEarning.created_at).label("date"),
-            func.sum(AffiliateEarning.amount).label("amount"),
-        )
-        .where(
-            and_(
-                AffiliateEarning.affiliate_id == current_user.id,
-                AffiliateEarning.created_at >= thirty_days_ago,
-            )
-        )
-        .group_by(func.date(AffiliateEarning.created_at))
-        .order_by(func.date(AffiliateEarning.created_at))
+    return {"cohorts": cohorts}
+
+
+@router.get("/analytics/mrr", response_model=MrrResponse)
+async def get_owner_mrr(
+    months: int = Query(12, ge=1, le=36),
+    channel_id: Optional[int] = None,
+    plan_id: Optional[int] = None,
+    current_user: DBUser = Depends(get_current_owner),
+    db: AsyncSessionLocal = Depends(get_read_db),
+):
+    """MRR mensual con movimientos (new/expansion/churn), churn rate y tasa de renovación"""
+    channel_ids = await _owner_channel_ids(db, current_user.id, channel_id)
+    until = month_start(datetime.utcnow())
+    series = await get_mrr_series(
+        db, channel_ids, add_months(until, -(months - 1)), until, plan_id
     )
-    mlm_chart = [{"date": str(m.date), "value": m.amount} for m in mlm_query.all()]
+    return {"series": series}
 
-    return {
-        "revenue_series": revenue_chart,
-        "subscriber_series": subscriber_chart,
-        "mlm_series": mlm_chart,
-    }
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import RedirectResponse
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import os
 import stripe
-import httpx
 import hashlib
 import logging
 from typing import Optional
@@ -13,6 +13,15 @@ from infrastructure.database.connection import get_db
 from core.entities import Plan, Payment, User, Promotion
 from application.dto.misc import PaymentRequest
 from api.services.membership_service import activate_membership
+from api.services.auth_service import AuthService
+from infrastructure.external_apis.payment_gateway import (
+    payment_gateway,
+    ProviderUnavailableError,
+    ProviderRequestError,
+    get_cached_checkout,
+    cache_checkout,
+    invalidate_checkout,
+)
 
 router = APIRouter(tags=["Payments"])
 logger = logging.getLogger(__name__)
@@ -23,7 +32,6 @@ WOMPI_PUBLIC_KEY = os.getenv("WOMPI_PUBLIC_KEY")
 WOMPI_PRIVATE_KEY = os.getenv("WOMPI_PRIVATE_KEY")
 WOMPI_INTEGRITY_SECRET = os.getenv("WOMPI_INTEGRITY_SECRET")
 WOMPI_EVENTS_SECRET = os.getenv("WOMPI_EVENTS_SECRET")
-WOMPI_API_BASE = "https://sandbox.wompi.co/v1"
 
 @router.post("/payments/create-link")
 async def create_payment_link(
@@ -48,9 +56,17 @@ async def create_payment_link(
     # Referencia única para rastrear [USER_ID]-[PLAN_ID]-[PROMO_ID]-[TIMESTAMP]
     reference = f"user_{data.user_id}_plan_{data.plan_id}_p_{data.promo_id or 0}_{int(datetime.utcnow().timestamp())}"
 
+    if data.method in ("stripe", "wompi"):
+        # Reutilizar un checkout vigente para el mismo (usuario, plan, promo)
+        cached = await get_cached_checkout(
+            data.user_id, data.plan_id, data.promo_id, data.method
+        )
+        if cached:
+            return cached
+
     if data.method == "stripe":
         try:
-            session = stripe.checkout.Session.create(
+            url = await payment_gateway.create_stripe_checkout(
                 payment_method_types=["card"],
                 line_items=[
                     {
@@ -72,11 +88,17 @@ async def create_payment_link(
                     "promo_id": str(data.promo_id)
                 }
             )
-            return {"url": session.url}
+        except ProviderUnavailableError as e:
+            logger.error(f"Stripe unavailable: {e}")
+            raise HTTPException(status_code=503, detail="Stripe no disponible, intenta de nuevo")
         except Exception as e:
             logger.error(f"Stripe error: {e}")
             raise HTTPException(status_code=400, detail=str(e))
 
+        result = {"url": url}
+        await cache_checkout(data.user_id, data.plan_id, data.promo_id, "stripe", result)
+        return result
+
     elif data.method == "wompi":
         # Lógica de Wompi (Colombia)
         amount_in_cop = int(final_price * 4000)
@@ -93,17 +115,18 @@ async def create_payment_link(
             "redirect_url": f"{os.getenv('DASHBOARD_URL')}/success",
         }
 
-        async with httpx.AsyncClient() as client:
-            headers = {"Authorization": f"Bearer {WOMPI_PUBLIC_KEY}"}
-            resp = await client.post(
-                f"{WOMPI_API_BASE}/payment_links", json=payload, headers=headers
-            )
-            if resp.status_code != 201:
-                logger.error(f"Wompi error: {resp.text}")
-                raise HTTPException(status_code=400, detail=f"Error Wompi: {resp.text}")
-
-            wompi_data = resp.json().get("data", {})
-            return {"url": f"https://checkout.wompi.co/l/{wompi_data.get('id')}"}
+        try:
+            url = await payment_gateway.create_wompi_link(payload)
+        except ProviderUnavailableError as e:
+            logger.error(f"Wompi unavailable: {e}")
+            raise HTTPException(status_code=503, detail="Wompi no disponible, intenta de nuevo")
+        except ProviderRequestError as e:
+            logger.error(f"Wompi error: {e}")
+            raise HTTPException(status_code=400, detail=f"Error Wompi: {e}")
+
+        result = {"url": url}
+        await cache_checkout(data.user_id, data.plan_id, data.promo_id, "wompi", result)
+        return result
 
     elif data.method == "crypto":
         new_payment = Payment(
@@ -131,6 +154,17 @@ async def create_payment_link(
 
     raise HTTPException(status_code=400, detail="Método de pago no soportado")
 
+@router.get("/payments/renew/{token}")
+async def renew_from_reminder(token: str, db: AsyncSession = Depends(get_db)):
+    """Link de los recordatorios de renovación: abre el checkout del mismo plan"""
+    payload = AuthService.decode_token(token)
+    if not payload or payload.get("type") != "renewal":
+        raise HTTPException(status_code=400, detail="Link de renovación inválido o vencido")
+    result = await create_payment_link(
+        PaymentRequest(user_id=int(payload["sub"]), plan_id=payload["plan_id"], method="stripe"), db
+    )
+    return RedirectResponse(result["url"], status_code=303)
+
 @router.post("/webhook/stripe")
 async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     """Webhook centralizado para Stripe"""
@@ -156,6 +190,7 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
         promo_id = session["metadata"].get("promo_id")
         promo_id = int(promo_id) if promo_id and promo_id != "None" else None
 
+        await invalidate_checkout(user_id, plan_id, promo_id, "stripe")
         await activate_membership(
             user_id=user_id,
             plan_id=plan_id,
@@ -188,6 +223,9 @@ async def wompi_webhook(request: Request, db: AsyncSession = Depends(get_db)):
             plan_id = int(parts[3])
             promo_id = int(parts[5])
 
+            await invalidate_checkout(
+                user_id, plan_id, promo_id if promo_id > 0 else None, "wompi"
+            )
             await activate_membership(
                 user_id=user_id,
                 plan_id=plan_id,
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
@@ -85,3 +85,54 @@ class AnalyticsResponse(BaseModel):
     revenue_series: list[ChartDataPoint]
     subscriber_series: list[ChartDataPoint]
     mlm_series: list[ChartDataPoint]
+
+
+class CohortRow(BaseModel):
+    cohort: str  # YYYY-MM-01
+    size: int
+    active: list[int]
+    retention: list[float]
+
+
+class CohortResponse(BaseModel):
+    cohorts: list[CohortRow]
+
+
+class MrrPoint(BaseModel):
+    month: str
+    mrr: float
+    active_subscriptions: int
+    new_mrr: float
+    expansion_mrr: float
+    churned_mrr: float
+    new_subscriptions: int
+    churned_subscriptions: int
+    renewals: int
+    churn_rate: Optional[float] = None
+    renewal_rate: Optional[float] = None
+
+
+class MrrResponse(BaseModel):
+    series: list[MrrPoint]
+
+
+class BroadcastCreate(BaseModel):
+    text: str = Field(..., min_length=1, max_length=4096)  # Límite de sendMessage
+
+
+class BroadcastResponse(BaseModel):
+    id: int
+    channel_id: int
+    text: str
+    status: str
+    total: int
+    delivered: int
+    failed: int
+    blocked: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -23,6 +23,11 @@ class UserAdminResponse(BaseModel):
         from_attributes = True
 
 
+class UserDirectoryPage(BaseModel):
+    items: List[UserAdminResponse]
+    next_cursor: Optional[str] = None
+
+
 class UserProfileResponse(BaseModel):
     id: int
     telegram_id: Optional[int]
@@ -0,0 +1,48 @@
+import os
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+import structlog
+
+from infrastructure.database.instrumentation import track_queries
+
+logger = structlog.get_logger(__name__)
+
+ENV = os.getenv("ENV", "development")
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """
+    Cuenta consultas, tiempo en BD y filas por request. Fuera de producción
+    además las expone en headers (X-DB-*) para verlas desde el dashboard.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        with track_queries() as stats:
+            response = await call_next(request)
+
+        if stats.count == 0:
+            return response
+
+        fields = stats.as_log_fields()
+        if fields["db_n_plus_one"]:
+            logger.warning(
+                "Possible N+1 detected",
+                method=request.method,
+                path=request.url.path,
+                **fields,
+            )
+        else:
+            logger.info(
+                "db_query_stats",
+                method=request.method,
+                path=request.url.path,
+                **{k: v for k, v in fields.items() if k != "db_repeated_statements"},
+            )
+
+        if ENV != "production":
+            response.headers["X-DB-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Time-Ms"] = str(stats.total_time_ms)
+            response.headers["X-DB-Rows"] = str(stats.rows)
+            response.headers["X-DB-N-Plus-One"] = str(fields["db_n_plus_one"])
+        return response
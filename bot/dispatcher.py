@@ -0,0 +1,43 @@
+from typing import Iterable, Optional
+
+from aiogram import Dispatcher, Router
+from aiogram.fsm.storage.base import BaseStorage
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.middlewares import DbSessionMiddleware, QueryStatsMiddleware
+from bot.storage import create_fsm_storage
+
+
+def default_routers() -> list:
+    from bot.handlers import (
+        initial,
+        menu,
+        support,
+        call_handlers,
+        signature_handlers,
+    )
+
+    # Orden de registro importa (handlers más específicos primero)
+    return [
+        initial.router,
+        menu.router,
+        support.router,
+        call_handlers.router,
+        signature_handlers.signature_router,
+    ]
+
+
+def create_dispatcher(
+    storage: Optional[BaseStorage] = None,
+    routers: Optional[Iterable[Router]] = None,
+    session_factory: Optional[async_sessionmaker] = None,
+) -> Dispatcher:
+    """Dispatcher con FSM en Redis y aislamiento por chat entre réplicas."""
+    storage = storage or create_fsm_storage()
+    dp = Dispatcher(storage=storage, events_isolation=storage.create_isolation())
+    dp.update.outer_middleware(QueryStatsMiddleware())
+    # Inyecta `session` y `user_id` (telegram_id -> user_id cacheado en Redis)
+    dp.update.outer_middleware(DbSessionMiddleware(session_factory, redis=getattr(storage, "redis", None)))
+    for router in routers if routers is not None else default_routers():
+        dp.include_router(router)
+    return dp
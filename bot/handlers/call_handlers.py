@@ -4,17 +4,29 @@ from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.future import select
 from sqlalchemy import and_
-from infrastructure.database.connection import AsyncSessionLocal
-from core.entities import CallService, User
+from infrastructure.cache.availability_cache import (
+    day_slot_starts,
+    get_day_entries,
+    invalidate_owner_days,
+    invalidate_service_cache,
+)
+from infrastructure.cache.slot_holds import HOLD_TTL, slot_holds
+from infrastructure.utils.calendar import generate_calendar_links
+from core.entities import CallBooking, CallService
+from core.use_cases.call_bookings import create_call_booking
 
-from datetime import datetime
-# from shared.utils.calendar import generate_calendar_links # TODO: Check if this exists or implementation moved
+from datetime import datetime, timedelta
 
 router = Router()
 
+BOOKING_DAYS = 14
+# Límite de botones de un teclado inline (100) con margen para la navegación
+MAX_DAY_SLOTS = 96
+WEEKDAYS = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+
 @router.message(Command("llamada"))
 @router.callback_query(F.data == "book_call_menu")
-async def cmd_llamada(message_or_callback: Union[types.Message, types.CallbackQuery]):
+async def cmd_llamada(message_or_callback: Union[types.Message, types.CallbackQuery], session):
     """
     Muestra la oferta de llamadas. Soporta Message (comando) y Callback (botón).
     """
@@ -23,247 +35,276 @@ async def cmd_llamada(message_or_callback: Union[types.Message, types.CallbackQu
     if isinstance(message_or_callback, types.CallbackQuery):
         message = message_or_callback.message
         await message_or_callback.answer()
-    async with AsyncSessionLocal() as session:
-        # 1. Identificar al usuario y su dueño (si es que la lógica es 1 dueño por bot instance/global?)
-        # En este sistema parece que es Multi-Tenant pero el bot es "FullT_GuardBot".
-        # Asumiremos que el dueño es el admin principal o buscamos por contexto?
-        # Revisando `main.py`, el bot parece ser único.
-        # ¿Cómo sabe el bot qué "dueño" ofrece la llamada?
-        # Opción A: El bot está vinculado a UN solo dueño (Single Tenant Logic actual parecida).
-        # Opción B: El usuario selecciona de qué canal quiere la llamada.
-        
-        # Para simplificar MVP: Asumimos que buscamos CUALQUIER servicio activo.
-        result = await session.execute(select(CallService).where(CallService.is_active.is_(True)))
-        services = result.scalars().all()
-        
-        if not services:
-            await message.answer("🚫 Actualmente no hay disponibilidad de llamadas privadas.")
-            return
-
-        # Si hay multiples servicios, mostrar selector
-        if len(services) > 1:
-            builder = InlineKeyboardBuilder()
-            for svc in services:
-                 builder.button(text=f"{svc.description} ({svc.duration_minutes}m) - ${svc.price}", callback_data=f"select_svc_{svc.id}")
-            builder.adjust(1)
-            await message.answer("📞 **Selecciona el tipo de llamada:**", reply_markup=builder.as_markup())
-            return
-
-        # Si solo hay uno, mostrar detalles directo
-        service = services[0]
-
-        # Mostrar Info
+    # 1. Identificar al usuario y su dueño (si es que la lógica es 1 dueño por bot instance/global?)
+    # En este sistema parece que es Multi-Tenant pero el bot es "FullT_GuardBot".
+    # Asumiremos que el dueño es el admin principal o buscamos por contexto?
+    # Revisando `main.py`, el bot parece ser único.
+    # ¿Cómo sabe el bot qué "dueño" ofrece la llamada?
+    # Opción A: El bot está vinculado a UN solo dueño (Single Tenant Logic actual parecida).
+    # Opción B: El usuario selecciona de qué canal quiere la llamada.
+
+    # Para simplificar MVP: Asumimos que buscamos CUALQUIER servicio activo.
+    result = await session.execute(select(CallService).where(CallService.is_active.is_(True)))
+    services = result.scalars().all()
+
+    if not services:
+        await message.answer("🚫 Actualmente no hay disponibilidad de llamadas privadas.")
+        return
+
+    # Si hay multiples servicios, mostrar selector
+    if len(services) > 1:
         builder = InlineKeyboardBuilder()
-        builder.button(text="📅 Ver Horarios Disponibles", callback_data=f"view_slots_{service.id}")
-        
-        await message.answer(
-            f"📞 **Sesión Privada 1 a 1**\n\n"
-            f"💬 {service.description}\n"
-            f"⏱ Duración: {service.duration_minutes} min\n"
-            f"💲 Inversión: ${service.price} USD\n\n"
-            f"👇 Toca abajo para ver disponibilidad:",
-            reply_markup=builder.as_markup(),
-            parse_mode="Markdown"
-        )
+        for svc in services:
+             builder.button(text=f"{svc.description} ({svc.duration_minutes}m) - ${svc.price}", callback_data=f"select_svc_{svc.id}")
+        builder.adjust(1)
+        await message.answer("📞 **Selecciona el tipo de llamada:**", reply_markup=builder.as_markup())
+        return
+
+    # Si solo hay uno, mostrar detalles directo
+    service = services[0]
+
+    # Mostrar Info
+    builder = InlineKeyboardBuilder()
+    builder.button(text="📅 Ver Horarios Disponibles", callback_data=f"view_slots_{service.id}")
+
+    await message.answer(
+        f"📞 **Sesión Privada 1 a 1**\n\n"
+        f"💬 {service.description}\n"
+        f"⏱ Duración: {service.duration_minutes} min\n"
+        f"💲 Inversión: ${service.price} USD\n\n"
+        f"👇 Toca abajo para ver disponibilidad:",
+        reply_markup=builder.as_markup(),
+        parse_mode="Markdown"
+    )
 
 @router.callback_query(F.data.startswith("select_svc_"))
-async def select_service_details(callback: types.CallbackQuery):
+async def select_service_details(callback: types.CallbackQuery, session):
     service_id = int(callback.data.split("_")[2])
     
-    async with AsyncSessionLocal() as session:
-        service = await session.get(CallService, service_id)
-        if not service:
-             await callback.answer("Servicio no encontrado", show_alert=True)
-             return
+    service = await session.get(CallService, service_id)
+    if not service:
+         await callback.answer("Servicio no encontrado", show_alert=True)
+         return
 
-        builder = InlineKeyboardBuilder()
-        builder.button(text="📅 Ver Horarios Disponibles", callback_data=f"view_slots_{service.id}")
-        builder.button(text="🔙 Volver", callback_data="book_call_menu")
-        builder.adjust(1)
-        
-        await callback.message.edit_text(
-            f"📞 **{service.description}**\n\n"
-            f"⏱ Duración: {service.duration_minutes} min\n"
-            f"💲 Inversión: ${service.price} USD\n\n"
-            f"👇 Toca abajo para ver disponibilidad:",
-            reply_markup=builder.as_markup(),
-            parse_mode="Markdown"
-        )
+    builder = InlineKeyboardBuilder()
+    builder.button(text="📅 Ver Horarios Disponibles", callback_data=f"view_slots_{service.id}")
+    builder.button(text="🔙 Volver", callback_data="book_call_menu")
+    builder.adjust(1)
+
+    await callback.message.edit_text(
+        f"📞 **{service.description}**\n\n"
+        f"⏱ Duración: {service.duration_minutes} min\n"
+        f"💲 Inversión: ${service.price} USD\n\n"
+        f"👇 Toca abajo para ver disponibilidad:",
+        reply_markup=builder.as_markup(),
+        parse_mode="Markdown"
+    )
 
 @router.callback_query(F.data.startswith("view_slots_"))
-async def show_slots(callback: types.CallbackQuery):
+async def show_slots(callback: types.CallbackQuery, session):
+    """Selector de días: solo marca qué días tienen algún horario libre."""
     service_id = int(callback.data.split("_")[2])
-    
-    async with AsyncSessionLocal() as session:
-        # Calculate dynamic slots for next 14 days
-        from datetime import timedelta
-        now = datetime.utcnow()
-        from_date = now.strftime("%Y-%m-%d")
-        to_date = (now + timedelta(days=14)).strftime("%Y-%m-%d")
-        
-        from infrastructure.cache.availability_cache import get_available_slots
-        slots = await get_available_slots(session, service_id, from_date, to_date)
-        
-        # Filter only future slots (double check execution time)
-        future_slots = [s for s in slots if s["start_time"] > now]
-        # Sort and limit
-        future_slots.sort(key=lambda x: x["start_time"])
-        display_slots = future_slots[:10]
-        
-        if not display_slots:
-            await callback.message.edit_text("🚫 No hay horarios disponibles en los próximos 14 días.", reply_markup=None)
-            return
 
-        builder = InlineKeyboardBuilder()
-        for slot in display_slots:
-            # Format: "Lun 15 - 10:00"
-            date_str = slot["start_time"].strftime("%d/%m %H:%M")
-            # Encoder timestamp: YYYYMMDDHHMM
-            ts_str = slot["start_time"].strftime("%Y%m%d%H%M")
-            builder.button(text=date_str, callback_data=f"book_slot_{service_id}_{ts_str}")
-        
-        builder.adjust(2) # 2 columnas
-        builder.button(text="🔙 Cancelar", callback_data="cancel_booking")
-        
-        await callback.message.edit_text(
-            "📅 **Selecciona un horario:**\n\n"
-            "🕒 Las horas se muestran en **UTC (Tiempo Universal)**.\n"
-            "💡 [Consulta tu hora local aquí](https://www.worldtimebuddy.com/?pl=1&lid=100&h=100)\n\n"
-            "👇 Toca un bloque para reservar:",
-            reply_markup=builder.as_markup(),
-            parse_mode="Markdown",
-            disable_web_page_preview=True
+    service = await session.get(CallService, service_id)
+    if not service or not service.is_active:
+        await callback.message.edit_text("🚫 Este servicio ya no está disponible.", reply_markup=None)
+        return
+
+    now = datetime.utcnow()
+    days = [now.date() + timedelta(days=i) for i in range(BOOKING_DAYS + 1)]
+    entries = await get_day_entries(session, service.owner_id, days)
+
+    open_days = [
+        d for d in days
+        if next(day_slot_starts(entries[d], service.duration_minutes, d, now), None) is not None
+    ]
+    if not open_days:
+        await callback.message.edit_text("🚫 No hay horarios disponibles en los próximos 14 días.", reply_markup=None)
+        return
+
+    builder = InlineKeyboardBuilder()
+    for day in open_days:
+        builder.button(
+            text=f"{WEEKDAYS[day.weekday()]} {day.strftime('%d/%m')}",
+            callback_data=f"slot_day_{service_id}_{day.strftime('%Y%m%d')}"
         )
+    builder.adjust(3)
+    builder.row(types.InlineKeyboardButton(text="🔙 Cancelar", callback_data="cancel_booking"))
+
+    await callback.message.edit_text(
+        "📅 **Elige un día:**\n\n"
+        "🕒 Las horas se muestran en **UTC (Tiempo Universal)**.\n"
+        "💡 [Consulta tu hora local aquí](https://www.worldtimebuddy.com/?pl=1&lid=100&h=100)",
+        reply_markup=builder.as_markup(),
+        parse_mode="Markdown",
+        disable_web_page_preview=True
+    )
+
+@router.callback_query(F.data.startswith("slot_day_"))
+async def show_day_slots(callback: types.CallbackQuery, session):
+    """Horarios de un día: se calculan al abrirlo, desde la entrada cacheada del día."""
+    parts = callback.data.split("_")
+    service_id = int(parts[2])
+    day = datetime.strptime(parts[3], "%Y%m%d").date()
+
+    service = await session.get(CallService, service_id)
+    if not service:
+        await callback.answer("Servicio no encontrado", show_alert=True)
+        return
+    entries = await get_day_entries(session, service.owner_id, [day])
+
+    now = datetime.utcnow()
+    day_start = datetime.combine(day, datetime.min.time())
+    slots = [
+        {"start_time": day_start + timedelta(minutes=minute)}
+        for minute in day_slot_starts(entries[day], service.duration_minutes, day, now)
+    ]
+    slots = [s for s in slots if s["start_time"] > now]
+    # Sin los horarios que otro usuario está pagando en este momento
+    slots = await slot_holds.filter_available(service.owner_id, slots, callback.from_user.id)
+    if not slots:
+        await callback.answer("🚫 Ese día ya no tiene horarios libres.", show_alert=True)
+        return
+
+    builder = InlineKeyboardBuilder()
+    for slot in slots[:MAX_DAY_SLOTS]:
+        # Encoder timestamp: YYYYMMDDHHMM
+        ts_str = slot["start_time"].strftime("%Y%m%d%H%M")
+        builder.button(text=slot["start_time"].strftime("%H:%M"), callback_data=f"book_slot_{service_id}_{ts_str}")
+    builder.adjust(4)
+    builder.row(types.InlineKeyboardButton(text="🔙 Otros días", callback_data=f"view_slots_{service_id}"))
+
+    await callback.message.edit_text(
+        f"📅 **{WEEKDAYS[day.weekday()]} {day.strftime('%d/%m/%Y')}** (UTC)\n\n"
+        "👇 Toca un bloque para reservar:",
+        reply_markup=builder.as_markup(),
+        parse_mode="Markdown"
+    )
 
 @router.callback_query(F.data.startswith("book_slot_"))
-async def ask_payment(callback: types.CallbackQuery):
+async def ask_payment(callback: types.CallbackQuery, session):
     # Data: book_slot_{service_id}_{timestamp}
     parts = callback.data.split("_")
     service_id = int(parts[2])
     ts_str = parts[3]
-    
+
     # Parse timestamp
     start_time = datetime.strptime(ts_str, "%Y%m%d%H%M")
-    
-    async with AsyncSessionLocal() as session:
-        from core.entities import CallBooking
-        # Check against CallBooking (Capacity)
-        # Note: We should technically checking AvailabilityRange equality too, but overlapping check is enough for safety.
-        # Check if already booked
-        existing = await session.execute(
-            select(CallBooking).where(
-                and_(
-                    CallBooking.service_id == service_id,
-                    CallBooking.status != "cancelled",
-                    CallBooking.start_time == start_time
-                )
+
+    # Get Service Info for Price
+    service = await session.get(CallService, service_id)
+    if not service:
+        await callback.answer("Error: Servicio no encontrado.", show_alert=True)
+        return
+
+    # Reserva temporal mientras paga: el primero en elegir el horario lo retiene
+    if not await slot_holds.hold(service.owner_id, start_time, callback.from_user.id):
+        await callback.answer("⏳ Otro usuario está reservando ese horario. Elige otro.", show_alert=True)
+        return
+
+    existing = await session.execute(
+        select(CallBooking.id).where(
+            and_(
+                CallBooking.owner_id == service.owner_id,
+                CallBooking.status != "cancelled",
+                CallBooking.start_time == start_time
             )
         )
-        if existing.scalar_one_or_none():
-             await callback.answer("🚫 Ese horario ya ha sido ocupado.", show_alert=True)
-             return
+    )
+    if existing.first():
+        await slot_holds.release(service.owner_id, start_time, callback.from_user.id)
+        await callback.answer("🚫 Ese horario ya ha sido ocupado.", show_alert=True)
+        return
 
-        # Get Service Info for Price
-        service = await session.get(CallService, service_id)
-        
-        builder = InlineKeyboardBuilder()
-        # Mock Payment Button - pass service_id and timestamp
-        builder.button(text=f"💳 Pagar ${service.price} USD", callback_data=f"pay_slot_{service_id}_{ts_str}")
-        builder.button(text="🔙 Cancelar", callback_data="cancel_booking")
-        builder.adjust(1)
-        
-        await callback.message.edit_text(
-            f"🛒 **Confirmar Reserva**\n\n"
-            f"📞 **Servicio**: {service.description}\n"
-            f"🗓 **Fecha**: {start_time.strftime('%Y-%m-%d %H:%M')} UTC\n"
-            f"⏱ **Duración**: {service.duration_minutes} min\n"
-            f"💵 **Total a Pagar**: `${service.price} USD`\n\n"
-            f"Selecciona una opción para continuar:",
-            reply_markup=builder.as_markup(),
-            parse_mode="Markdown"
-        )
+    builder = InlineKeyboardBuilder()
+    # Mock Payment Button - pass service_id and timestamp
+    builder.button(text=f"💳 Pagar ${service.price} USD", callback_data=f"pay_slot_{service_id}_{ts_str}")
+    builder.button(text="🔙 Cancelar", callback_data=f"release_slot_{service_id}_{ts_str}")
+    builder.adjust(1)
+
+    await callback.message.edit_text(
+        f"🛒 **Confirmar Reserva**\n\n"
+        f"📞 **Servicio**: {service.description}\n"
+        f"🗓 **Fecha**: {start_time.strftime('%Y-%m-%d %H:%M')} UTC\n"
+        f"⏱ **Duración**: {service.duration_minutes} min\n"
+        f"💵 **Total a Pagar**: `${service.price} USD`\n\n"
+        f"⏳ Te guardamos el horario por {HOLD_TTL // 60} minutos.\n"
+        f"Selecciona una opción para continuar:",
+        reply_markup=builder.as_markup(),
+        parse_mode="Markdown"
+    )
 
 @router.callback_query(F.data.startswith("pay_slot_"))
-async def finalize_booking(callback: types.CallbackQuery):
+async def finalize_booking(callback: types.CallbackQuery, session, user_id=None):
     parts = callback.data.split("_")
     service_id = int(parts[2])
     ts_str = parts[3]
     start_time = datetime.strptime(ts_str, "%Y%m%d%H%M")
-    
+
     # Aquí iría la integración real de Stripe/Telegram Payments.
     # Por ahora, simulamos que el pago fue exitoso.
-    
-    async with AsyncSessionLocal() as session:
-        service = await session.get(CallService, service_id)
-        if not service:
-             await callback.answer("Error: Servicio no encontrado.", show_alert=True)
-             return
-
-        # Double Check Overlap / Availability
-        from core.entities import CallBooking
-        existing = await session.execute(
-            select(CallBooking).where(
-                and_(
-                    CallBooking.service_id == service_id,
-                    CallBooking.status != "cancelled",
-                    CallBooking.start_time == start_time
-                )
-            )
-        )
-        if existing.scalar_one_or_none():
-             await callback.answer("🚫 Lo sentimos, alguien ganó el horario hace un momento.", show_alert=True)
-             return
-        
-        # Generar Link Jitsi
-        import uuid
-        room_id = f"FGate-{uuid.uuid4()}"
-        jitsi_link = f"https://meet.jit.si/{room_id}"
-        
-        # Calculate End Time
-        from datetime import timedelta
-        end_time = start_time + timedelta(minutes=service.duration_minutes)
-
-        # Create Booking
-        booking = CallBooking(
-            service_id=service_id,
-            start_time=start_time,
-            end_time=end_time,
-            status="confirmed",
-            meeting_link=jitsi_link,
-            booker_id=None # Default
-        )
-        
-        # Vincular usuario si existe
-        user_res = await session.execute(select(User).where(User.telegram_id == callback.from_user.id))
-        user = user_res.scalar_one_or_none()
-        if user:
-            booking.booker_id = user.id
-            
-        session.add(booking)
-        await session.commit()
-        
-        # Generate calendar links
-        cal_links = generate_calendar_links(
-            title=f"Llamada: {service.description}",
-            start_time=start_time,
-            end_time=end_time,
-            description=f"Sesión reservada de {service.description}. Link de reunión: {jitsi_link}",
-            location=jitsi_link
-        )
-        
-        builder = InlineKeyboardBuilder()
-        builder.button(text="📅 Google Calendar", url=cal_links["google"])
-        builder.button(text="📆 Outlook / Office", url=cal_links["outlook"])
-        builder.adjust(2)
-            
-        await callback.message.edit_text(
-            f"✅ **¡Pago Exitoso y Reserva Confirmada!**\n\n"
-            f"🗓 Fecha: {start_time.strftime('%Y-%m-%d %H:%M')} UTC\n"
-            f"🔗 **Tu Enlace de Acceso:**\n`{jitsi_link}`\n\n"
-            f"Te recomendamos guardar este enlace y añadir la fecha a tu calendario:",
-            reply_markup=builder.as_markup(),
-            parse_mode="Markdown"
-        )
+
+    service = await session.get(CallService, service_id)
+    if not service:
+        await callback.answer("Error: Servicio no encontrado.", show_alert=True)
+        return
+
+    # Renueva la reserva temporal; si venció y otro la tomó, el horario ya no es nuestro
+    if not await slot_holds.hold(service.owner_id, start_time, callback.from_user.id):
+        await callback.answer("🚫 Tu reserva venció y otro usuario tomó el horario.", show_alert=True)
+        return
+
+    # Generar Link Jitsi
+    import uuid
+    room_id = f"FGate-{uuid.uuid4()}"
+    jitsi_link = f"https://meet.jit.si/{room_id}"
+
+    # El índice único (owner, inicio) decide si alguien ganó el horario.
+    # Se vincula al usuario si existe (user_id lo resuelve el middleware)
+    booking = await create_call_booking(
+        session, service, start_time, booker_id=user_id, meeting_link=jitsi_link
+    )
+    await slot_holds.release(service.owner_id, start_time, callback.from_user.id)
+    if booking is None:
+        await callback.answer("🚫 Lo sentimos, alguien ganó el horario hace un momento.", show_alert=True)
+        return
+    await invalidate_service_cache(service_id)
+    await invalidate_owner_days(service.owner_id, start_time, booking.end_time)
+    end_time = booking.end_time
+
+    # Generate calendar links
+    cal_links = generate_calendar_links(
+        title=f"Llamada: {service.description}",
+        start_time=start_time,
+        end_time=end_time,
+        description=f"Sesión reservada de {service.description}. Link de reunión: {jitsi_link}",
+        location=jitsi_link
+    )
+
+    builder = InlineKeyboardBuilder()
+    builder.button(text="📅 Google Calendar", url=cal_links["google"])
+    builder.button(text="📆 Outlook / Office", url=cal_links["outlook"])
+    builder.adjust(2)
+
+    await callback.message.edit_text(
+        f"✅ **¡Pago Exitoso y Reserva Confirmada!**\n\n"
+        f"🗓 Fecha: {start_time.strftime('%Y-%m-%d %H:%M')} UTC\n"
+        f"🔗 **Tu Enlace de Acceso:**\n`{jitsi_link}`\n\n"
+        f"Te recomendamos guardar este enlace y añadir la fecha a tu calendario:",
+        reply_markup=builder.as_markup(),
+        parse_mode="Markdown"
+    )
+
+@router.callback_query(F.data.startswith("release_slot_"))
+async def release_slot(callback: types.CallbackQuery, session):
+    parts = callback.data.split("_")
+    service_id = int(parts[2])
+    start_time = datetime.strptime(parts[3], "%Y%m%d%H%M")
+
+    service = await session.get(CallService, service_id)
+    if service:
+        await slot_holds.release(service.owner_id, start_time, callback.from_user.id)
+    await callback.message.edit_text("❌ Reserva cancelada.")
 
 @router.callback_query(F.data == "cancel_booking")
 async def cancel_booking(callback: types.CallbackQuery):
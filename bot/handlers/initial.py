@@ -1,68 +1,66 @@
 from aiogram import Router, types, F
 from aiogram.filters import Command, CommandObject
 from sqlalchemy import select
-from infrastructure.database.connection import AsyncSessionLocal
 from core.entities import User as DBUser, Promotion, RegistrationToken
+from core.use_cases.referrals import attach_referral
+from core.use_cases.telegram_users import get_or_create_telegram_user
 from datetime import datetime, timedelta
 import random
 
 router = Router()
 
-async def get_or_create_user(tg_user: types.User, session):
-    result = await session.execute(
-        select(DBUser).where(DBUser.telegram_id == tg_user.id)
+async def get_or_create_user(tg_user: types.User, session, user_id=None):
+    """Usuario de la BD; con `user_id` pre-resuelto por el middleware es un get por PK."""
+    if user_id is not None:
+        user = await session.get(DBUser, user_id)
+        # La caché puede apuntar a un usuario borrado o re-vinculado
+        if user is not None and user.telegram_id == tg_user.id:
+            return user
+    return await get_or_create_telegram_user(
+        session, tg_user.id, tg_user.username, tg_user.full_name
     )
-    user = result.scalar_one_or_none()
-    if not user:
-        user = DBUser(
-            telegram_id=tg_user.id,
-            username=tg_user.username,
-            full_name=tg_user.full_name,
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-    return user
 
 @router.message(Command("start"))
-async def send_welcome(message: types.Message, command: CommandObject):
+async def send_welcome(message: types.Message, command: CommandObject, session, user_id=None):
     from .menu import cmd_menu
-    async with AsyncSessionLocal() as session:
-        args = command.args
-        if args:
-            processed = await process_code(message, args, session)
-            if processed:
-                # If it was a deep link, we don't necessarily want the menu immediately
-                # especially for 'registro' which has its own flow
-                if args == "registro":
-                    return 
-                
-                await cmd_menu(message)
-                return
-        
-        await get_or_create_user(message.from_user, session)
-        
-        # Welcome message with buttons
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🚀 Registrarme en la Web", callback_data="start_registration")],
-            [InlineKeyboardButton(text="📱 Abrir Menú", callback_data="main_menu")]
-        ])
+    args = command.args
+    if args:
+        processed = await process_code(message, args, session, user_id)
+        if processed:
+            # If it was a deep link, we don't necessarily want the menu immediately
+            # especially for 'registro' which has its own flow
+            if args == "registro":
+                return 
+            
+            await cmd_menu(message)
+            return
+    
+    await get_or_create_user(message.from_user, session, user_id)
+    
+    # Welcome message with buttons
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🚀 Registrarme en la Web", callback_data="start_registration")],
+        [InlineKeyboardButton(text="📱 Abrir Menú", callback_data="main_menu")]
+    ])
 
-        await message.reply(
-            "¡Hola! Soy tu bot de membresía **FGate**.\n\n"
-            "Usa un link de invitación para unirte a un canal, o regístrate para empezar a gestionar tus propias suscripciones.",
-            reply_markup=keyboard,
-            parse_mode="Markdown"
-        )
+    await message.reply(
+        "¡Hola! Soy tu bot de membresía **FGate**.\n\n"
+        "Usa un link de invitación para unirte a un canal, o regístrate para empezar a gestionar tus propias suscripciones.",
+        reply_markup=keyboard,
+        parse_mode="Markdown"
+    )
 
-async def handle_registration_request(message: types.Message, session):
+async def handle_registration_request(message: types.Message, session, user_id=None, tg_user=None):
     """Common logic for registration code generation"""
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     import os
-    
+
+    # Desde un callback, `message` es el mensaje del bot: el usuario va aparte
+    tg_user = tg_user or message.from_user
+
     # 1. Verificar si ya está registrado
-    existing_user = await get_or_create_user(message.from_user, session)
+    existing_user = await get_or_create_user(tg_user, session, user_id)
     if existing_user.email: # Ya tiene cuenta vinculada
         await message.reply(
             "✅ **Ya estás registrado**\n\n"
@@ -76,9 +74,9 @@ async def handle_registration_request(message: types.Message, session):
     # 3. Guardar en DB (Upsert)
     new_token = RegistrationToken(
         token=token,
-        telegram_id=message.from_user.id,
-        username=message.from_user.username,
-        full_name=message.from_user.full_name,
+        telegram_id=tg_user.id,
+        username=tg_user.username,
+        full_name=tg_user.full_name,
         expires_at=datetime.utcnow() + timedelta(minutes=15)
     )
     session.add(new_token)
@@ -116,7 +114,7 @@ async def handle_registration_request(message: types.Message, session):
     )
     return True
 
-async def process_code(message: types.Message, code: str, session):
+async def process_code(message: types.Message, code: str, session, user_id=None):
     # 🟢 CASO A: Sincronización de Cuenta de Dueño/Afiliado
     if code.startswith("sync_"):
         sync_code = code.replace("sync_", "")
@@ -148,11 +146,11 @@ async def process_code(message: types.Message, code: str, session):
         referrer = result.scalar_one_or_none()
         
         # Ensure user exists
-        current_user = await get_or_create_user(message.from_user, session)
+        current_user = await get_or_create_user(message.from_user, session, user_id)
         
         if referrer and referrer.id != current_user.id:
             if not current_user.referred_by_id:
-                current_user.referred_by_id = referrer.id
+                await attach_referral(session, current_user, referrer.id)
                 await session.commit()
                 # Notify referrer
                 try:
@@ -177,7 +175,7 @@ async def process_code(message: types.Message, code: str, session):
             return True
 
         # Continuar al flujo de registro automático con el referido ya asignado
-        await handle_registration_request(message, session)
+        await handle_registration_request(message, session, user_id)
         return True
 
     # 🔵 CASO B: Promociones / Checkout Deep Links (promo_CODE)
@@ -198,15 +196,14 @@ async def process_code(message: types.Message, code: str, session):
 
     # 🟣 CASO D: Solicitud de Código de Registro
     if code == "registro":
-        return await handle_registration_request(message, session)
+        return await handle_registration_request(message, session, user_id)
         
     return False
 
 @router.callback_query(F.data == "start_registration")
-async def cb_start_registration(callback: types.CallbackQuery):
-    async with AsyncSessionLocal() as session:
-        await handle_registration_request(callback.message, session)
-        await callback.answer()
+async def cb_start_registration(callback: types.CallbackQuery, session, user_id=None):
+    await handle_registration_request(callback.message, session, user_id, tg_user=callback.from_user)
+    await callback.answer()
 
 @router.callback_query(F.data == "main_menu")
 async def cb_main_menu(callback: types.CallbackQuery):
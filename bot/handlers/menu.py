@@ -3,9 +3,10 @@ from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.future import select
 from sqlalchemy import and_
-from infrastructure.database.connection import AsyncSessionLocal
 from core.entities import Subscription, Plan, Channel
 from bot.handlers.initial import get_or_create_user
+from infrastructure.cache.catalog_cache import catalog_cache
+from infrastructure.cache.profile_cache import PROFILE_TTL, profile_cache
 from datetime import datetime
 
 router = Router()
@@ -32,146 +33,160 @@ async def cmd_menu(message: types.Message):
     )
 
 @router.callback_query(F.data == "profile")
-async def handle_profile_callback(callback: types.CallbackQuery):
-    await show_profile(callback.message, callback.from_user)
+async def handle_profile_callback(callback: types.CallbackQuery, session, user_id=None):
+    await show_profile(callback.message, callback.from_user, session, user_id)
     await callback.answer()
 
 @router.message(Command("me"))
-async def cmd_profile(message: types.Message):
-    await show_profile(message, message.from_user)
-
-async def show_profile(message: types.Message, tg_user: types.User):
-    # Check Cache First
-    # from shared.cache import memory_cache # TODO: Move to infra
-    # cache_key = f"profile_msg_{tg_user.id}"
-    # cached_text = await memory_cache.get(cache_key)
-    cached_text = None # Temp bypass until cache is refactored
-    
+async def cmd_profile(message: types.Message, session, user_id=None):
+    await show_profile(message, message.from_user, session, user_id)
+
+def profile_card_ttl(end_dates, now: datetime) -> int:
+    """Segundos hasta que cambie algún "días restantes" de la tarjeta."""
+    ttl = PROFILE_TTL
+    for end_date in end_dates:
+        remaining = (end_date - now).total_seconds()
+        ttl = min(ttl, int(remaining % 86400) + 1)
+    return ttl
+
+async def show_profile(message: types.Message, tg_user: types.User, session, user_id=None):
+    # Tarjeta ya renderizada (se invalida al cambiar saldo, suscripciones o red)
+    cached_text = await profile_cache.get(user_id) if user_id else None
     if cached_text:
         await message.answer(cached_text, parse_mode="Markdown")
         return
 
-    async with AsyncSessionLocal() as session:
-        user = await get_or_create_user(tg_user, session)
-        
-        # 1. Obtener Suscripciones Activas
-        sub_res = await session.execute(
-            select(Subscription, Plan, Channel)
-            .select_from(Subscription)
-            .join(Plan, Subscription.plan_id == Plan.id)
-            .join(Channel, Plan.channel_id == Channel.id)
-            .where(
-                and_(
-                    Subscription.user_id == user.id,
-                    Subscription.is_active,
-                    Subscription.end_date > datetime.utcnow(),
-                )
+    user = await get_or_create_user(tg_user, session, user_id)
+    now = datetime.utcnow()
+    
+    # 1. Obtener Suscripciones Activas
+    sub_res = await session.execute(
+        select(Subscription, Plan, Channel)
+        .select_from(Subscription)
+        .join(Plan, Subscription.plan_id == Plan.id)
+        .join(Channel, Plan.channel_id == Channel.id)
+        .where(
+            and_(
+                Subscription.user_id == user.id,
+                Subscription.is_active,
+                Subscription.end_date > now,
             )
         )
-        subs = sub_res.all()
-
-        # 2. Obtener Info de Afiliados
-        from core.use_cases.distribute_funds import get_affiliate_tier_info
-
-        tier_info = await get_affiliate_tier_info(session, user.id)
-        
-        bot_info = await message.bot.get_me()
-
-        profile_text = (
-            f"👤 **PERFIL FGATE: {tg_user.full_name}**\n"
-            f"━━━━━━━━━━━━━━━━━━\n\n"
-            f"🆔 **ID**: `{user.id}`\n"
-            f"🏆 **Rango**: {tier_info['tier']}\n"
-            f"💰 **Balance**: `${user.balance:.2f} USD`\n"
-            f"🤝 **Invitados**: `{tier_info['count']}`\n\n"
-            f"🔗 **Tu Link de Referido**:\n"
-            f"`https://t.me/{bot_info.username}?start=ref_{user.referral_code}`\n\n"
-            f"📅 **Tus Membresías Activas**:\n"
-        )
+    )
+    subs = sub_res.all()
+
+    # 2. Obtener Info de Afiliados
+    from core.use_cases.distribute_funds import get_affiliate_tier_info
 
-        if subs:
-            for sub, plan, chan in subs:
-                days_left = (sub.end_date - datetime.utcnow()).days
-                profile_text += (
-                    f"• **{chan.title}**: {plan.name} ({days_left} días restantes)\n"
-                )
-        else:
-            profile_text += "_No tienes membresías activas._\n"
-
-        profile_text += "\n\n_Powered by FGate_"
-        
-        # Cache message for 60 seconds
-        # await memory_cache.set(cache_key, profile_text, ttl_seconds=60)
-        
-        await message.answer(profile_text, parse_mode="Markdown")
+    tier_info = await get_affiliate_tier_info(session, user.id)
+
+    from core.use_cases.balances import ACCOUNT_MAIN, get_balances
+
+    balances = await get_balances(session, user.id)
+    
+    # Identidad del bot: se obtiene una vez al arrancar y queda en memoria
+    bot_info = await message.bot.me()
+
+    profile_text = (
+        f"👤 **PERFIL FGATE: {tg_user.full_name}**\n"
+        f"━━━━━━━━━━━━━━━━━━\n\n"
+        f"🆔 **ID**: `{user.id}`\n"
+        f"🏆 **Rango**: {tier_info['tier']}\n"
+        f"💰 **Balance**: `${balances[ACCOUNT_MAIN]:.2f} USD`\n"
+        f"🤝 **Invitados**: `{tier_info['count']}`\n\n"
+        f"🔗 **Tu Link de Referido**:\n"
+        f"`https://t.me/{bot_info.username}?start=ref_{user.referral_code}`\n\n"
+        f"📅 **Tus Membresías Activas**:\n"
+    )
+
+    if subs:
+        for sub, plan, chan in subs:
+            days_left = (sub.end_date - now).days
+            profile_text += (
+                f"• **{chan.title}**: {plan.name} ({days_left} días restantes)\n"
+            )
+    else:
+        profile_text += "_No tienes membresías activas._\n"
+
+    profile_text += "\n\n_Powered by FGate_"
+
+    await profile_cache.set(user.id, profile_text, ttl=profile_card_ttl([sub.end_date for sub, _, _ in subs], now))
+    await message.answer(profile_text, parse_mode="Markdown")
 
 @router.callback_query(F.data == "channels")
-async def handle_channels_callback(callback: types.CallbackQuery):
-    # This logic assumes we want to show available channels or user's channels
-    # For now, let's just show a placeholder or basic list
-    async with AsyncSessionLocal() as session:
-         result = await session.execute(select(Channel).where(Channel.is_verified.is_(True)))
-         channels = result.scalars().all()
-         
-         if not channels:
-             await callback.message.edit_text("📺 No hay canales públicos disponibles por ahora.")
-             return
-
-         text = "📺 **Canales Disponibles**\n\n"
-         builder = InlineKeyboardBuilder()
-         
-         for channel in channels:
-             builder.row(types.InlineKeyboardButton(text=channel.title, callback_data=f"channel_view_{channel.id}"))
-        
-         await callback.message.edit_text(text, reply_markup=builder.as_markup(), parse_mode="Markdown")
+@router.callback_query(F.data.startswith("catalog_page_"))
+async def handle_channels_callback(callback: types.CallbackQuery, session):
+    # Página del catálogo en caché; el cursor es el id del último canal visto
+    after_id = int(callback.data.rsplit("_", 1)[1]) if callback.data != "channels" else 0
+    catalog = await catalog_cache.get(session)
+    channels, next_cursor = catalog.page(after_id)
+
+    if not channels:
+        await callback.message.edit_text("📺 No hay canales públicos disponibles por ahora.")
+        return
+
+    text = "📺 **Canales Disponibles**\n\n"
+    builder = InlineKeyboardBuilder()
+
+    for channel in channels:
+        builder.row(types.InlineKeyboardButton(text=channel["title"], callback_data=f"channel_view_{channel['id']}"))
+
+    nav = []
+    previous_cursor = catalog.previous_cursor(after_id)
+    if previous_cursor is not None:
+        nav.append(types.InlineKeyboardButton(text="⬅️ Anterior", callback_data=f"catalog_page_{previous_cursor}"))
+    if next_cursor is not None:
+        nav.append(types.InlineKeyboardButton(text="Siguiente ➡️", callback_data=f"catalog_page_{next_cursor}"))
+    if nav:
+        builder.row(*nav)
+
+    await callback.message.edit_text(text, reply_markup=builder.as_markup(), parse_mode="Markdown")
 
 @router.callback_query(F.data.startswith("channel_view_"))
-async def view_channel_plans(callback: types.CallbackQuery):
+async def view_channel_plans(callback: types.CallbackQuery, session):
     channel_id = int(callback.data.split("_")[2])
-    
-    async with AsyncSessionLocal() as session:
-        # Get Channel Info
-        channel = await session.get(Channel, channel_id)
-        if not channel:
-            await callback.answer("❌ Canal no encontrado.")
-            return
-
-        # Get Plans
-        result = await session.execute(
-            select(Plan).where(Plan.channel_id == channel_id, Plan.is_active.is_(True))
-        )
-        plans = result.scalars().all()
-
-        if not plans:
-            await callback.message.edit_text(
-                f"📺 **{channel.title}**\n\n"
-                f"🚫 No hay planes de suscripción disponibles en este momento.",
-                reply_markup=InlineKeyboardBuilder().button(text="🔙 Volver", callback_data="channels").as_markup(),
-                parse_mode="Markdown"
-            )
-            return
 
-        text = (
-            f"📺 **{channel.title}**\n"
-            f"_{channel.description or 'Sin descripción'}_ \n\n"
-            f"👇 **Elige un Plan de Suscripción:**"
-        )
+    catalog = await catalog_cache.get(session)
+    channel = catalog.get_channel(channel_id)
+    if not channel:
+        await callback.answer("❌ Canal no encontrado.")
+        return
 
-        builder = InlineKeyboardBuilder()
-        for plan in plans:
-            # Emulamos link de pago o acción
-            builder.row(types.InlineKeyboardButton(
-                text=f"{plan.name} - ${plan.price} USD", 
-                callback_data=f"select_plan_{plan.id}"
-            ))
-        
-        builder.row(types.InlineKeyboardButton(text="🔙 Volver", callback_data="channels"))
+    back = types.InlineKeyboardButton(
+        text="🔙 Volver", callback_data=f"catalog_page_{catalog.cursor_before(channel_id)}"
+    )
+    plans = channel["plans"]
 
+    if not plans:
         await callback.message.edit_text(
-            text,
-            reply_markup=builder.as_markup(),
+            f"📺 **{channel['title']}**\n\n"
+            f"🚫 No hay planes de suscripción disponibles en este momento.",
+            reply_markup=InlineKeyboardBuilder().row(back).as_markup(),
             parse_mode="Markdown"
         )
+        return
+
+    text = (
+        f"📺 **{channel['title']}**\n"
+        f"_{channel['welcome_message'] or 'Sin descripción'}_ \n\n"
+        f"👇 **Elige un Plan de Suscripción:**"
+    )
+
+    builder = InlineKeyboardBuilder()
+    for plan in plans:
+        # Emulamos link de pago o acción
+        builder.row(types.InlineKeyboardButton(
+            text=f"{plan['name']} - ${plan['price']} USD", 
+            callback_data=f"select_plan_{plan['id']}"
+        ))
+    
+    builder.row(back)
+
+    await callback.message.edit_text(
+        text,
+        reply_markup=builder.as_markup(),
+        parse_mode="Markdown"
+    )
 
 @router.callback_query(F.data.startswith("select_plan_"))
 async def select_plan_callback(callback: types.CallbackQuery):
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 from aiogram import Router, types, F
@@ -11,10 +12,12 @@ from aiogram.types import (
     ReplyKeyboardRemove,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
+    BufferedInputFile,
 )
+from sqlalchemy import select
 
 from bot.states.signature_states import SignatureFlow
-from infrastructure.database.connection import AsyncSessionLocal
+from bot.handlers.initial import get_or_create_user
 from core.entities.user import User
 from core.entities.legal import OwnerLegalInfo, SignedContract, SignatureCode
 
@@ -93,71 +96,56 @@ def kbd_sign_contract():
 
 
 @signature_router.message(Command("legal"))
-async def cmd_legal_start(message: types.Message, state: FSMContext):
+async def cmd_legal_start(message: types.Message, state: FSMContext, session, user_id=None):
     """Iniciar proceso de firma digital"""
-    user_id = message.from_user.id
+    # Verificar si el usuario existe y si es OWNER (tiene canales)
+    # Por ahora asumimos que cualquiera que use /legal es un owner potencial o existente.
+    # Se crea si no existe (aunque debería existir por /start)
+    user = await get_or_create_user(message.from_user, session, user_id)
 
-    async with AsyncSessionLocal() as session:
-        # Verificar si el usuario existe y si es OWNER (tiene canales)
-        # Por ahora asumimos que cualquiera que use /legal es un owner potencial o existente
-        stmt = select(User).where(User.telegram_id == user_id)
-        result = await session.execute(stmt)
-        user = result.scalar_one_or_none()
-
-        if not user:
-            # Crear usuario si no existe (aunque debería existir por /start)
-            user = User(
-                telegram_id=user_id,
-                username=message.from_user.username,
-                full_name=message.from_user.full_name,
-            )
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
+    # Verificar si ya firmó
+    contract_stmt = select(SignedContract).where(SignedContract.owner_id == user.id)
+    contract_res = await session.execute(contract_stmt)
+    contract = contract_res.scalar_one_or_none()
 
-        # Verificar si ya firmó
-        contract_stmt = select(SignedContract).where(SignedContract.owner_id == user.id)
-        contract_res = await session.execute(contract_stmt)
-        contract = contract_res.scalar_one_or_none()
-
-        if contract:
-            await message.answer(
-                "✅ **Ya tienes un contrato firmado.**\n\n"
-                f"📅 Fecha: {contract.signed_at.strftime('%Y-%m-%d %H:%M')}\n"
-                f"🔗 Hash: `{contract.blockchain_tx_hash[:10]}...`\n\n"
-                "Usa `/contract` para descargarlo.",
-                parse_mode="Markdown",
-            )
-            return
+    if contract:
+        await message.answer(
+            "✅ **Ya tienes un contrato firmado.**\n\n"
+            f"📅 Fecha: {contract.signed_at.strftime('%Y-%m-%d %H:%M')}\n"
+            f"🔗 Hash: `{contract.blockchain_tx_hash[:10]}...`\n\n"
+            "Usa `/contract` para descargarlo.",
+            parse_mode="Markdown",
+        )
+        return
 
-        # Verificar si ya tiene info legal guardada pero no firmada
-        legal_stmt = select(OwnerLegalInfo).where(OwnerLegalInfo.owner_id == user.id)
-        legal_res = await session.execute(legal_stmt)
-        legal_info = legal_res.scalar_one_or_none()
+    # Verificar si ya tiene info legal guardada pero no firmada
+    legal_stmt = select(OwnerLegalInfo).where(OwnerLegalInfo.owner_id == user.id)
+    legal_res = await session.execute(legal_stmt)
+    legal_info = legal_res.scalar_one_or_none()
 
-        if legal_info:
-            await state.update_data(legal_info_id=legal_info.id)
-            await message.answer(
-                "📝 **Información Legal Registrada**\n\n"
-                "Ya tenemos tus datos pero falta la firma del contrato.\n"
-                "¿Deseas continuar hacia la firma o actualizar tus datos?",
-                reply_markup=InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [
-                            InlineKeyboardButton(
-                                text="✍️ Ir a Firma", callback_data="legal_goto_sign"
-                            )
-                        ],
-                        [
-                            InlineKeyboardButton(
-                                text="🔄 Actualizar Datos",
-                                callback_data="legal_restart",
-                            )
-                        ],
-                    ]
-                ),
-            )
-            return
+    if legal_info:
+        await state.update_data(legal_info_id=legal_info.id)
+        await message.answer(
+            "📝 **Información Legal Registrada**\n\n"
+            "Ya tenemos tus datos pero falta la firma del contrato.\n"
+            "¿Deseas continuar hacia la firma o actualizar tus datos?",
+            reply_markup=InlineKeyboardMarkup(
+                inline_keyboard=[
+                    [
+                        InlineKeyboardButton(
+                            text="✍️ Ir a Firma", callback_data="legal_goto_sign"
+                        )
+                    ],
+                    [
+                        InlineKeyboardButton(
+                            text="🔄 Actualizar Datos",
+                            callback_data="legal_restart",
+                        )
+                    ],
+                ]
+            ),
+        )
+        return
 
     # Iniciar flujo desde cero
     await state.set_state(SignatureFlow.waiting_for_person_type)
@@ -387,16 +375,15 @@ async def process_account_number(message: types.Message, state: FSMContext):
 
 
 @signature_router.callback_query(F.data == "legal_restart")
-async def handle_restart(callback: types.CallbackQuery, state: FSMContext):
+async def handle_restart(callback: types.CallbackQuery, state: FSMContext, session):
     await state.clear()
     await callback.message.edit_text("🔄 Proceso reiniciado.")
-    await cmd_legal_start(callback.message, state)
+    await cmd_legal_start(callback.message, state, session)
 
 
 @signature_router.callback_query(F.data == "legal_confirm_data")
-async def handle_save_and_preview(callback: types.CallbackQuery, state: FSMContext):
+async def handle_save_and_preview(callback: types.CallbackQuery, state: FSMContext, session, user_id=None):
     data = await state.get_data()
-    user_id = callback.from_user.id
 
     # Preparar payload para API
     legal_data = {
@@ -409,7 +396,7 @@ async def handle_save_and_preview(callback: types.CallbackQuery, state: FSMConte
         "account_type": data["account_type"],
         "account_number": data["account_number"],
         "account_holder_name": data["account_holder_name"],
-        "owner_id_telegram": str(user_id),  # Para identificar al usuario
+        "owner_id_telegram": str(callback.from_user.id),  # Para identificar al usuario
     }
 
     if data["person_type"] == "natural":
@@ -437,33 +424,27 @@ async def handle_save_and_preview(callback: types.CallbackQuery, state: FSMConte
     text = "⏳ Guardando información y generando contrato..."
     await callback.message.edit_text(text)
 
-    async with AsyncSessionLocal() as session:
-        # Encontrar user DB ID
-        res = await session.execute(select(User).where(User.telegram_id == user_id))
-        db_user = res.scalar_one_or_none()
+    # Encontrar user DB ID
+    db_user = await get_or_create_user(callback.from_user, session, user_id)
 
-        if not db_user:
-            await callback.message.edit_text("❌ Error: Usuario no encontrado.")
-            return
-
-        # Insert/Update OwnerLegalInfo
-        stmt = select(OwnerLegalInfo).where(OwnerLegalInfo.owner_id == db_user.id)
-        existing = (await session.execute(stmt)).scalar_one_or_none()
+    # Insert/Update OwnerLegalInfo
+    stmt = select(OwnerLegalInfo).where(OwnerLegalInfo.owner_id == db_user.id)
+    existing = (await session.execute(stmt)).scalar_one_or_none()
 
-        if existing:
-            for k, v in legal_data.items():
-                if k != "owner_id_telegram" and hasattr(existing, k):
-                    setattr(existing, k, v)
-        else:
-            # Filtrar campos que no son del modelo
-            model_data = {
-                k: v for k, v in legal_data.items() if k != "owner_id_telegram"
-            }
-            new_info = OwnerLegalInfo(owner_id=db_user.id, **model_data)
-            session.add(new_info)
+    if existing:
+        for k, v in legal_data.items():
+            if k != "owner_id_telegram" and hasattr(existing, k):
+                setattr(existing, k, v)
+    else:
+        # Filtrar campos que no son del modelo
+        model_data = {
+            k: v for k, v in legal_data.items() if k != "owner_id_telegram"
+        }
+        new_info = OwnerLegalInfo(owner_id=db_user.id, **model_data)
+        session.add(new_info)
 
-        db_user.legal_verification_status = "info_submitted"
-        await session.commit()
+    db_user.legal_verification_status = "info_submitted"
+    await session.commit()
 
     # Pasar al estado de firma
     await state.set_state(SignatureFlow.waiting_for_contract_review)
@@ -481,67 +462,66 @@ async def handle_save_and_preview(callback: types.CallbackQuery, state: FSMConte
 
 
 @signature_router.callback_query(F.data == "legal_read_pdf")
-async def handle_read_pdf(callback: types.CallbackQuery):
+async def handle_read_pdf(callback: types.CallbackQuery, session):
     await callback.message.edit_text("⏳ Generando documento... (Por favor espera)")
 
     user_id = callback.from_user.id
     WORKER_URL = os.getenv("WORKER_URL", "http://localhost:8001")
 
     try:
-        async with AsyncSessionLocal() as session:
-            # Recuperar datos legales
-            stmt = select(OwnerLegalInfo).join(User).where(User.telegram_id == user_id)
-            result = await session.execute(stmt)
-            legal_info_model = result.scalar_one_or_none()
-
-            if not legal_info_model:
-                await callback.message.edit_text(
-                    "❌ Error: No se encontró información legal. Usa /legal para reiniciar."
-                )
-                return
+        # Recuperar datos legales
+        stmt = select(OwnerLegalInfo).join(User).where(User.telegram_id == user_id)
+        result = await session.execute(stmt)
+        legal_info_model = result.scalar_one_or_none()
 
-            # Convertir modelo a diccionario
-            legal_info_dict = {
-                c.name: getattr(legal_info_model, c.name)
-                for c in legal_info_model.__table__.columns
-            }
+        if not legal_info_model:
+            await callback.message.edit_text(
+                "❌ Error: No se encontró información legal. Usa /legal para reiniciar."
+            )
+            return
+
+        # Convertir modelo a diccionario
+        legal_info_dict = {
+            c.name: getattr(legal_info_model, c.name)
+            for c in legal_info_model.__table__.columns
+        }
 
-            import httpx
-            import base64
-
-            # Llamar al Worker Service
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        f"{WORKER_URL}/generate-preview",
-                        json={"legal_data": legal_info_dict}
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    pdf_bytes = base64.b64decode(data["pdf_base64"])
-                
-                file_data = pdf_bytes
-                filename = "Contrato_Mandato.pdf"
-                caption = "📄 **Contrato de Mandato** (PDF)\nRevisa los términos antes de firmar."
-
-            except Exception as e_api:
-                logging.error(f"Worker call failed: {e_api}")
-                await callback.message.edit_text(
-                    "⚠️ El servicio de documentos está ocupado. Intenta en unos segundos."
+        import httpx
+        import base64
+
+        # Llamar al Worker Service
+        try:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.post(
+                    f"{WORKER_URL}/generate-preview",
+                    json={"legal_data": legal_info_dict}
                 )
-                return
+                response.raise_for_status()
+                data = response.json()
+                pdf_bytes = base64.b64decode(data["pdf_base64"])
 
-            # Enviar documento
-            input_file = BufferedInputFile(file_data, filename=filename)
+            file_data = pdf_bytes
+            filename = "Contrato_Mandato.pdf"
+            caption = "📄 **Contrato de Mandato** (PDF)\nRevisa los términos antes de firmar."
 
-            # Borramos el mensaje de "Generando" y enviamos el documento
-            await callback.message.delete()
-            await callback.message.answer_document(
-                document=input_file,
-                caption=caption,
-                parse_mode="Markdown",
-                reply_markup=kbd_sign_contract(),
+        except Exception as e_api:
+            logging.error(f"Worker call failed: {e_api}")
+            await callback.message.edit_text(
+                "⚠️ El servicio de documentos está ocupado. Intenta en unos segundos."
             )
+            return
+
+        # Enviar documento
+        input_file = BufferedInputFile(file_data, filename=filename)
+
+        # Borramos el mensaje de "Generando" y enviamos el documento
+        await callback.message.delete()
+        await callback.message.answer_document(
+            document=input_file,
+            caption=caption,
+            parse_mode="Markdown",
+            reply_markup=kbd_sign_contract(),
+        )
 
     except Exception as e:
         logging.error(f"Handler error: {e}")
@@ -552,9 +532,7 @@ async def handle_read_pdf(callback: types.CallbackQuery):
 
 
 @signature_router.callback_query(F.data == "legal_sign_now")
-async def handle_sign_request(callback: types.CallbackQuery, state: FSMContext):
-    user_id = callback.from_user.id
-
+async def handle_sign_request(callback: types.CallbackQuery, state: FSMContext, session, user_id=None):
     await callback.message.edit_text("⏳ Solicitando código de firma segura...")
 
     # Llamar a API /request-signature
@@ -568,41 +546,39 @@ async def handle_sign_request(callback: types.CallbackQuery, state: FSMContext):
         from datetime import datetime
         from core.entities.legal import SignatureCode
 
-        async with AsyncSessionLocal() as session:
-            # Get user
-            res = await session.execute(select(User).where(User.telegram_id == user_id))
-            db_user = res.scalar_one_or_none()
+        # Get user
+        db_user = await get_or_create_user(callback.from_user, session, user_id)
 
-            # Generar OTP
-            otp = secrets.token_hex(3).upper()  # 6 caracteres
+        # Generar OTP
+        otp = secrets.token_hex(3).upper()  # 6 caracteres
 
-            # Guardar OTP
-            # En producción deberíamos calcular hash real del PDF aquí.
-            # Usaremos un hash placeholder por ahora.
-            dummy_hash = "0x" + secrets.token_hex(32)
+        # Guardar OTP
+        # En producción deberíamos calcular hash real del PDF aquí.
+        # Usaremos un hash placeholder por ahora.
+        dummy_hash = "0x" + secrets.token_hex(32)
 
-            # Invalidar anteriores
-            # ... (logica de invalidación)
+        # Invalidar anteriores
+        # ... (logica de invalidación)
 
-            new_code = SignatureCode(
-                owner_id=db_user.id,
-                code=otp,
-                contract_hash=dummy_hash,
-                expires_at=datetime.utcnow() + timedelta(minutes=15),
-            )
-            session.add(new_code)
-            await session.commit()
+        new_code = SignatureCode(
+            owner_id=db_user.id,
+            code=otp,
+            contract_hash=dummy_hash,
+            expires_at=datetime.utcnow() + timedelta(minutes=15),
+        )
+        session.add(new_code)
+        await session.commit()
 
-            await state.update_data(signature_otp=otp)
+        await state.update_data(signature_otp=otp)
 
-            await state.set_state(SignatureFlow.waiting_for_otp)
-            await callback.message.edit_text(
-                "🔐 **CÓDIGO DE FIRMA GENERADO**\n\n"
-                f"Tu código de seguridad es: `{otp}`\n\n"
-                "⚠️ Copia este código y envíalo en este chat para firmar el contrato legalmente.\n"
-                "Al enviar el código, aceptas los términos y condiciones del Contrato de Mandato.",
-                parse_mode="Markdown",
-            )
+        await state.set_state(SignatureFlow.waiting_for_otp)
+        await callback.message.edit_text(
+            "🔐 **CÓDIGO DE FIRMA GENERADO**\n\n"
+            f"Tu código de seguridad es: `{otp}`\n\n"
+            "⚠️ Copia este código y envíalo en este chat para firmar el contrato legalmente.\n"
+            "Al enviar el código, aceptas los términos y condiciones del Contrato de Mandato.",
+            parse_mode="Markdown",
+        )
 
     except Exception as e:
         logging.error(f"Error signing request: {e}")
@@ -610,7 +586,7 @@ async def handle_sign_request(callback: types.CallbackQuery, state: FSMContext):
 
 
 @signature_router.message(SignatureFlow.waiting_for_otp)
-async def process_otp_verification(message: types.Message, state: FSMContext):
+async def process_otp_verification(message: types.Message, state: FSMContext, session, user_id=None):
     input_otp = message.text.strip().upper()
     data = await state.get_data()
 
@@ -640,86 +616,80 @@ async def process_otp_verification(message: types.Message, state: FSMContext):
         try:
             from infrastructure.external_apis.pdf_generator import PDFContractService
             from infrastructure.storage.storage_factory import StorageFactory
-            from core.entities import User, OwnerLegalInfo, SignedContract
+            from core.entities import OwnerLegalInfo, SignedContract
             from aiogram.types import BufferedInputFile
             
-            async with AsyncSessionLocal() as session:
-                # 1. Recuperar Usuario y Datos Legales
-                res = await session.execute(select(User).where(User.telegram_id == message.from_user.id))
-                db_user = res.scalar_one_or_none()
-                
-                if not db_user:
-                     await message.answer("❌ Error: Usuario no encontrado.")
-                     return
-
-                res_legal = await session.execute(
-                    select(OwnerLegalInfo).where(OwnerLegalInfo.owner_id == db_user.id)
-                )
-                legal_info = res_legal.scalar_one_or_none()
-                
-                if not legal_info:
-                    raise Exception("Falta información legal asociada al usuario.")
-
-                # 2. Generar UUID y Hash Simulado
-                process_id = uuid.uuid4().hex
-                fake_tx = "0x" + uuid.uuid4().hex + uuid.uuid4().hex
-                doc_hash = "0x" + uuid.uuid4().hex 
-                
-                # 3. Preparar Datos para PDF
-                pdf_data = {
-                    "contract_id": f"CTR-{process_id[:8].upper()}",
-                    "signature_date": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
-                    "full_name": legal_info.full_name,
-                    "id_type": legal_info.id_type,
-                    "id_number": legal_info.id_number,
-                    "email": db_user.email or "N/A",
-                    "telegram_id": str(db_user.telegram_id),
-                    "address": legal_info.address,
-                    "city": legal_info.city,
-                    "signature_code": input_otp,
-                    "document_hash": doc_hash,
-                    "blockchain_tx_hash": fake_tx,
-                    "blockchain_network": "Polygon Amoy (Testnet)",
-                    "ip_address": "127.0.0.1 (Local)"
-                }
-                
-                # 4. Generar PDF (CPU Bound -> run_in_executor)
-                loop = asyncio.get_running_loop()
-                pdf_bytes = await loop.run_in_executor(None, PDFContractService.generate_contract_pdf, legal_info.__dict__, pdf_data)
-                
-                # 5. Guardar en Disco/Nube
-                filename = f"contract_{db_user.id}_{process_id}.pdf"
-                storage = StorageFactory.get_provider()
-                await storage.save_file(pdf_bytes, filename)
-                
-                # 6. Guardar en BD
-                signed = SignedContract(
-                    owner_id=db_user.id,
-                    pdf_url=filename, 
-                    pdf_hash=doc_hash,
-                    blockchain_tx_hash=fake_tx,
-                    blockchain_confirmed=True,
-                    signature_code=input_otp,
-                    signed_at=datetime.utcnow()
-                )
-                session.add(signed)
-                
-                db_user.legal_verification_status = "contract_signed"
-                db_user.can_create_channels = True
-                await session.commit()
-                
-                # Enviar PDF al usuario
-                doc_file = BufferedInputFile(pdf_bytes, filename="Contrato_FGate_Firmado.pdf")
-                await message.reply_document(doc_file, caption="✅ **Aquí tienes tu copia del contrato firmado.**")
-
-                await state.clear()
-                await message.answer(
-                    "🎉 **¡CONTRATO FIRMADO EXITOSAMENTE!**\n\n"
-                    "Tu cuenta ha sido verificada y habilitada para recibir pagos.\n\n"
-                    f"🔗 **Registro Blockchain (Polygon):**\n`{fake_tx}`\n\n"
-                    "Guardaremos una copia de seguridad. Puedes descargar tu contrato en cualquier momento con `/contract`.",
-                    parse_mode="Markdown",
-                )
+            # 1. Recuperar Usuario y Datos Legales
+            db_user = await get_or_create_user(message.from_user, session, user_id)
+
+            res_legal = await session.execute(
+                select(OwnerLegalInfo).where(OwnerLegalInfo.owner_id == db_user.id)
+            )
+            legal_info = res_legal.scalar_one_or_none()
+
+            if not legal_info:
+                raise Exception("Falta información legal asociada al usuario.")
+
+            # 2. Generar UUID y Hash Simulado
+            process_id = uuid.uuid4().hex
+            fake_tx = "0x" + uuid.uuid4().hex + uuid.uuid4().hex
+            doc_hash = "0x" + uuid.uuid4().hex 
+
+            # 3. Preparar Datos para PDF
+            pdf_data = {
+                "contract_id": f"CTR-{process_id[:8].upper()}",
+                "signature_date": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
+                "full_name": legal_info.full_legal_name or legal_info.business_name,
+                "id_type": legal_info.id_type,
+                "id_number": legal_info.id_number,
+                "email": db_user.email or "N/A",
+                "telegram_id": str(db_user.telegram_id),
+                "address": legal_info.address,
+                "city": legal_info.city,
+                "signature_code": input_otp,
+                "document_hash": doc_hash,
+                "blockchain_tx_hash": fake_tx,
+                "blockchain_network": "Polygon Amoy (Testnet)",
+                "ip_address": "127.0.0.1 (Local)"
+            }
+
+            # 4. Generar PDF (CPU Bound -> run_in_executor)
+            loop = asyncio.get_running_loop()
+            pdf_bytes = await loop.run_in_executor(None, PDFContractService.generate_contract_pdf, legal_info.__dict__, pdf_data)
+
+            # 5. Guardar en Disco/Nube
+            filename = f"contract_{db_user.id}_{process_id}.pdf"
+            storage = StorageFactory.get_provider()
+            await storage.save_file(pdf_bytes, filename)
+
+            # 6. Guardar en BD
+            signed = SignedContract(
+                owner_id=db_user.id,
+                pdf_url=filename, 
+                pdf_hash=doc_hash,
+                blockchain_tx_hash=fake_tx,
+                blockchain_confirmed=True,
+                signature_code=input_otp,
+                signed_at=datetime.utcnow()
+            )
+            session.add(signed)
+
+            db_user.legal_verification_status = "contract_signed"
+            db_user.can_create_channels = True
+            await session.commit()
+
+            # Enviar PDF al usuario
+            doc_file = BufferedInputFile(pdf_bytes, filename="Contrato_FGate_Firmado.pdf")
+            await message.reply_document(doc_file, caption="✅ **Aquí tienes tu copia del contrato firmado.**")
+
+            await state.clear()
+            await message.answer(
+                "🎉 **¡CONTRATO FIRMADO EXITOSAMENTE!**\n\n"
+                "Tu cuenta ha sido verificada y habilitada para recibir pagos.\n\n"
+                f"🔗 **Registro Blockchain (Polygon):**\n`{fake_tx}`\n\n"
+                "Guardaremos una copia de seguridad. Puedes descargar tu contrato en cualquier momento con `/contract`.",
+                parse_mode="Markdown",
+            )
 
         except Exception as e:
              logging.error(f"Error generando contrato local: {e}", exc_info=True)
@@ -738,7 +708,7 @@ async def process_otp_verification(message: types.Message, state: FSMContext):
 
 
 @signature_router.message(Command("contract"))
-async def cmd_download_contract(message: types.Message):
+async def cmd_download_contract(message: types.Message, session):
     """Permite al usuario descargar su contrato firmado"""
     user_id = message.from_user.id
 
@@ -749,89 +719,88 @@ async def cmd_download_contract(message: types.Message):
         filename = None
         caption = None
         
-        async with AsyncSessionLocal() as session:
-            # 1. Buscar contrato firmado
-            res_contract = await session.execute(
-                select(SignedContract).join(User).where(User.telegram_id == user_id)
+        # 1. Buscar contrato firmado
+        res_contract = await session.execute(
+            select(SignedContract).join(User).where(User.telegram_id == user_id)
+        )
+        signed_contract = res_contract.scalar_one_or_none()
+
+        if not signed_contract:
+            await message.answer(
+                "❌ No tienes un contrato firmado todavía.\nUsa /legal para iniciar el proceso."
             )
-            signed_contract = res_contract.scalar_one_or_none()
+            return
 
-            if not signed_contract:
-                await message.answer(
-                    "❌ No tienes un contrato firmado todavía.\nUsa /legal para iniciar el proceso."
-                )
-                return
+        # 2. Buscar info legal
+        res_legal = await session.execute(
+            select(OwnerLegalInfo).where(
+                OwnerLegalInfo.owner_id == signed_contract.owner_id
+            )
+        )
+        legal_info = res_legal.scalar_one_or_none()
 
-            # 2. Buscar info legal
-            res_legal = await session.execute(
-                select(OwnerLegalInfo).where(
-                    OwnerLegalInfo.owner_id == signed_contract.owner_id
-                )
+        if not legal_info:
+            await message.answer(
+                "❌ Error: Contrato encontrado pero falta información legal asociada."
             )
-            legal_info = res_legal.scalar_one_or_none()
+            return
 
-            if not legal_info:
-                await message.answer(
-                    "❌ Error: Contrato encontrado pero falta información legal asociada."
-                )
-                return
+        # 3. Obtener Documento (Factory)
+        from infrastructure.storage.storage_factory import StorageFactory
+        from infrastructure.external_apis.pdf_generator import PDFContractService
 
-            # 3. Obtener Documento (Factory)
-            from infrastructure.storage.storage_factory import StorageFactory
-            from infrastructure.external_apis.pdf_generator import PDFContractService
-            
-            storage = StorageFactory.get_provider()
-            filename = signed_contract.pdf_url
-            
-            # Verificar si existe como archivo local (no URL http)
-            is_local_file = filename and not filename.startswith("http") and storage.file_exists(filename)
-            
-            if is_local_file:
-                 logging.info(f"Serving local contract: {filename}")
-                 file_data = await storage.read_file(filename)
-            else:
-                 # Fallback: Regenerar PDF si no existe en disco o es registro antiguo
-                 logging.warning(f"Contract file not found locally ({filename}). Regenerating...")
-                 await message.bot.send_chat_action(chat_id=user_id, action="upload_document")
-                 
-                 # Generar datos
-                 process_id = uuid.uuid4().hex
-                 doc_hash = signed_contract.pdf_hash or ("0x" + uuid.uuid4().hex)
-                 
-                 pdf_data = {
-                    "contract_id": f"CTR-{signed_contract.id}",
-                    "signature_date": signed_contract.signed_at.strftime("%Y-%m-%d %H:%M:%S UTC"),
-                    "full_name": legal_info.full_name,
-                    "id_type": legal_info.id_type,
-                    "id_number": legal_info.id_number,
-                    "email": "N/A",
-                    "telegram_id": str(user_id),
-                    "address": legal_info.address,
-                    "city": legal_info.city,
-                    "signature_code": signed_contract.signature_code,
-                    "document_hash": doc_hash,
-                    "blockchain_tx_hash": signed_contract.blockchain_tx_hash,
-                    "blockchain_network": "Polygon Amoy",
-                    "ip_address": "N/A (Regenerated)"
-                 }
-                 
-                 loop = asyncio.get_running_loop()
-                 file_data = await loop.run_in_executor(None, PDFContractService.generate_contract_pdf, legal_info.__dict__, pdf_data)
-                 
-                 # Guardar el regenerado
-                 new_filename = f"contract_{signed_contract.id}_{process_id}.pdf"
-                 await storage.save_file(file_data, new_filename)
-                 
-                 # Actualizar BD
-                 signed_contract.pdf_url = new_filename
-                 await session.commit()
-                 filename = new_filename
-
-            caption = (
-                "✅ **CONTRATO DE MANDATO (FIRMADO)**\n\n"
-                f"📅 Fecha: {signed_contract.signed_at.strftime('%Y-%m-%d')}\n"
-                f"🔗 Blockchain TX: `{signed_contract.blockchain_tx_hash}`"
-            )
+        storage = StorageFactory.get_provider()
+        filename = signed_contract.pdf_url
+
+        # Verificar si existe como archivo local (no URL http)
+        is_local_file = filename and not filename.startswith("http") and storage.file_exists(filename)
+
+        if is_local_file:
+             logging.info(f"Serving local contract: {filename}")
+             file_data = await storage.read_file(filename)
+        else:
+             # Fallback: Regenerar PDF si no existe en disco o es registro antiguo
+             logging.warning(f"Contract file not found locally ({filename}). Regenerating...")
+             await message.bot.send_chat_action(chat_id=user_id, action="upload_document")
+
+             # Generar datos
+             process_id = uuid.uuid4().hex
+             doc_hash = signed_contract.pdf_hash or ("0x" + uuid.uuid4().hex)
+
+             pdf_data = {
+                "contract_id": f"CTR-{signed_contract.id}",
+                "signature_date": signed_contract.signed_at.strftime("%Y-%m-%d %H:%M:%S UTC"),
+                "full_name": legal_info.full_legal_name or legal_info.business_name,
+                "id_type": legal_info.id_type,
+                "id_number": legal_info.id_number,
+                "email": "N/A",
+                "telegram_id": str(user_id),
+                "address": legal_info.address,
+                "city": legal_info.city,
+                "signature_code": signed_contract.signature_code,
+                "document_hash": doc_hash,
+                "blockchain_tx_hash": signed_contract.blockchain_tx_hash,
+                "blockchain_network": "Polygon Amoy",
+                "ip_address": "N/A (Regenerated)"
+             }
+
+             loop = asyncio.get_running_loop()
+             file_data = await loop.run_in_executor(None, PDFContractService.generate_contract_pdf, legal_info.__dict__, pdf_data)
+
+             # Guardar el regenerado
+             new_filename = f"contract_{signed_contract.id}_{process_id}.pdf"
+             await storage.save_file(file_data, new_filename)
+
+             # Actualizar BD
+             signed_contract.pdf_url = new_filename
+             await session.commit()
+             filename = new_filename
+
+        caption = (
+            "✅ **CONTRATO DE MANDATO (FIRMADO)**\n\n"
+            f"📅 Fecha: {signed_contract.signed_at.strftime('%Y-%m-%d')}\n"
+            f"🔗 Blockchain TX: `{signed_contract.blockchain_tx_hash}`"
+        )
 
         # 5. Enviar (Fuera del session para no bloquear)
         if file_data and filename:
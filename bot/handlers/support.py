@@ -1,7 +1,6 @@
 from aiogram import Router, types, F
 from aiogram.filters import Command, CommandObject
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from infrastructure.database.connection import AsyncSessionLocal
 from core.entities import SupportTicket, TicketMessage
 from bot.handlers.initial import get_or_create_user
 
@@ -45,33 +44,32 @@ async def support_help_callback(callback: types.CallbackQuery):
     )
 
 @router.callback_query(F.data == "ticket_confirm")
-async def handle_confirm_ticket(callback: types.CallbackQuery):
+async def handle_confirm_ticket(callback: types.CallbackQuery, session, user_id=None):
     try:
         content = callback.message.text.split("**Contenido**: ")[1].split("\n\n")[0]
     except IndexError:
         await callback.message.edit_text("❌ Error al procesar el ticket. Intenta de nuevo.")
         return
 
-    async with AsyncSessionLocal() as session:
-        user = await get_or_create_user(callback.from_user, session)
+    user = await get_or_create_user(callback.from_user, session, user_id)
 
-        new_ticket = SupportTicket(
-            user_id=user.id, subject="Ticket desde Bot", priority="normal"
-        )
-        session.add(new_ticket)
-        await session.flush()
+    new_ticket = SupportTicket(
+        user_id=user.id, subject="Ticket desde Bot", priority="normal"
+    )
+    session.add(new_ticket)
+    await session.flush()
 
-        initial_msg = TicketMessage(
-            ticket_id=new_ticket.id, sender_id=user.id, content=content
-        )
-        session.add(initial_msg)
-        await session.commit()
+    initial_msg = TicketMessage(
+        ticket_id=new_ticket.id, sender_id=user.id, content=content
+    )
+    session.add(initial_msg)
+    await session.commit()
 
-        await callback.message.edit_text(
-            f"✅ **Ticket #{new_ticket.id} Creado**\n\n"
-            "Nuestro equipo revisará tu solicitud y te responderemos por este mismo chat en breve.",
-            parse_mode="Markdown",
-        )
+    await callback.message.edit_text(
+        f"✅ **Ticket #{new_ticket.id} Creado**\n\n"
+        "Nuestro equipo revisará tu solicitud y te responderemos por este mismo chat en breve.",
+        parse_mode="Markdown",
+    )
 
 @router.callback_query(F.data == "ticket_cancel")
 async def handle_cancel_ticket(callback: types.CallbackQuery):
@@ -2,10 +2,14 @@ import os
 import logging
 import asyncio
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
-from aiogram import Bot, Dispatcher, types
+from fastapi import FastAPI, Request, Response
+from aiogram import Bot, types
 from aiogram.types import Update
 
+from bot.dispatcher import create_dispatcher
+from bot.update_bus import DISPATCH_MODE, STREAM_MODE, StreamWorker, UpdateBus
+from bot.updates import BUSY, UpdateDeduplicator, UpdateWorkerPool
+
 # load_dotenv(override=True)  # Disabled for production to use Cloud Run env vars
 
 # Forzar el uso del Loop por defecto (Asyncio) en lugar de uvloop si está instalado
@@ -30,6 +34,11 @@ else:
         bot = None
 
 dp = None
+update_pool = None
+# BOT_DISPATCH_MODE=stream: el webhook solo publica en Redis Streams y los
+# procesos SERVICE_TYPE=bot-worker ejecutan los handlers
+update_bus = None
+stream_worker = None
 
 # --- Configuración para Despliegue (Webhook vs Polling) ---
 
@@ -38,18 +47,37 @@ app = FastAPI()
 @app.post(WEBHOOK_PATH)
 async def bot_webhook(request: Request):
     payload = await request.json()
-    logging.info(f"RECIBIDO WEBHOOK: {payload}")
     try:
         update = Update.model_validate(payload, context={"bot": bot})
-        logging.info(
-            f"Update validado. ID={update.update_id}, Type={update.event_type}"
-        )
-        await dp.feed_update(bot, update)
-        return {"ok": True}
     except Exception as e:
-        logging.error(f"Error procesando update: {e}")
+        logging.error(f"Update inválido: {e}")
         return {"ok": False, "error": str(e)}
 
+    logging.debug(f"Update recibido. ID={update.update_id}, Type={update.event_type}")
+    if update_bus is not None:
+        try:
+            entry_id = await update_bus.publish(update, payload)
+        except Exception as e:
+            logging.error(f"No se pudo publicar update {update.update_id}: {e}")
+            return Response(status_code=503)
+        return {"ok": True, "status": "queued" if entry_id else "duplicate"}
+
+    # Se responde sin esperar al handler; los workers procesan en segundo plano
+    status = await update_pool.submit(update)
+    if status == BUSY:
+        logging.warning(f"Cola de updates llena, Telegram reintentará {update.update_id}")
+        return Response(status_code=503)
+    return {"ok": True, "status": status}
+
+@app.get("/metrics")
+async def bot_metrics():
+    """Cola de updates, latencia de handlers y duplicados descartados"""
+    if stream_worker is not None:
+        return stream_worker.snapshot()
+    if update_pool is None:
+        return Response(status_code=503)
+    return update_pool.snapshot()
+
 @app.get("/health")
 async def bot_health_check():
     """Bot service health check"""
@@ -59,45 +87,33 @@ async def bot_health_check():
         "components": {
             "bot": {"status": "configured" if bot else "not_initialized"},
             "dispatcher": {"status": "configured" if dp else "not_initialized"},
+            "update_queue": {"depth": update_pool.queue_depth() if update_pool else None},
             "telegram_token": {"status": "configured" if API_TOKEN else "missing"},
         },
     }
 
     if not bot or not dp or not API_TOKEN:
         health_status["status"] = "unhealthy"
-        from fastapi import Response
-
         return Response(content=str(health_status), status_code=503)
 
     return health_status
 
 @app.on_event("startup")
 async def on_bot_startup():
-    global dp
+    global dp, update_pool, update_bus
     if dp is None:
-        dp = Dispatcher()
-
-    # Registrar routers modulares
-    from bot.handlers import (
-        initial,
-        menu,
-        support,
-        call_handlers,
-        signature_handlers,
-    )
-
-    # Orden de registro importa (handlers más específicos primero)
-    routers = [
-        initial.router,
-        menu.router,
-        support.router,
-        call_handlers.router,
-        signature_handlers.signature_router,
-    ]
-
-    for router in routers:
-        if router not in dp.sub_routers:
-            dp.include_router(router)
+        # FSM y aislamiento por chat en Redis: cualquier réplica continúa el flujo
+        dp = create_dispatcher()
+    dedupe = UpdateDeduplicator(dp.storage.redis, bot.id)
+    if DISPATCH_MODE == STREAM_MODE:
+        update_bus = update_bus or UpdateBus(dp.storage.redis, dedupe)
+    elif update_pool is None:
+        update_pool = UpdateWorkerPool(dp, bot, dedupe=dedupe)
+        update_pool.start()
+
+    # Identidad del bot en memoria (bot.me()): /me no llama a getMe por vista
+    me = await bot.me()
+    logging.info(f"Bot @{me.username} listo")
 
     # Configurar Menú de Comandos
     await bot.set_my_commands(
@@ -133,31 +149,30 @@ async def on_bot_startup():
         logging.info("Starting in POLLING mode (Background Task)")
         asyncio.create_task(run_polling())
 
+@app.on_event("shutdown")
+async def on_bot_shutdown():
+    if update_pool is not None:
+        await update_pool.stop()
+
+async def start_stream_worker():
+    """Arranque de SERVICE_TYPE=bot-worker: consume el stream de updates."""
+    global dp, stream_worker
+    if dp is None:
+        dp = create_dispatcher()
+    if stream_worker is None:
+        await bot.me()
+        stream_worker = StreamWorker(dp, bot, dp.storage.redis)
+        asyncio.create_task(stream_worker.run())
+
+async def stop_stream_worker():
+    if stream_worker is not None:
+        stream_worker.stop()
+        await stream_worker.shutdown()
+
 async def run_polling():
     global dp
     if dp is None:
-        dp = Dispatcher()
-
-    # Registrar routers (mismo set que arriba)
-    from bot.handlers import (
-        initial,
-        menu,
-        support,
-        call_handlers,
-        signature_handlers,
-    )
-
-    routers = [
-        initial.router,
-        menu.router,
-        support.router,
-        call_handlers.router,
-        signature_handlers.signature_router,
-    ]
-
-    for router in routers:
-        if router not in dp.sub_routers:
-            dp.include_router(router)
+        dp = create_dispatcher()
 
     logging.info("Deleting webhook to start polling...")
     await bot.delete_webhook(drop_pending_updates=True)
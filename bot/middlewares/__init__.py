@@ -0,0 +1,2 @@
+from .query_stats import QueryStatsMiddleware as QueryStatsMiddleware
+from .db_session import DbSessionMiddleware as DbSessionMiddleware
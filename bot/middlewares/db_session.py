@@ -0,0 +1,81 @@
+"""
+Sesión de BD por update y usuario pre-resuelto para los handlers del bot.
+
+- `session`: una sola AsyncSession por update. No toma conexión del pool
+  hasta el primer query, así que los updates que no tocan la BD no pagan el
+  checkout; se cierra al terminar el update.
+- `user_id`: id en `users` del remitente, o None si aún no existe.
+  telegram_id -> user_id se cachea en Redis; en un fallo de caché se busca por
+  telegram_id. No crea usuarios: eso lo hace `get_or_create_user` en los
+  handlers que lo necesitan (un `sync_` debe poder vincular el telegram_id a
+  una cuenta web existente).
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TgUser
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.entities import User
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL = 24 * 3600
+
+
+def user_cache_key(telegram_id: int) -> str:
+    return f"bot:tg_user:{telegram_id}"
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker] = None,
+        redis: Optional[Redis] = None,
+    ):
+        self.session_factory = session_factory
+        self.redis = redis
+
+    async def resolve_user_id(self, session: AsyncSession, tg_user: TgUser) -> Optional[int]:
+        key = user_cache_key(tg_user.id)
+        if self.redis is not None:
+            try:
+                cached = await self.redis.get(key)
+                if cached is not None:
+                    return int(cached)
+            except Exception as e:
+                logger.warning(f"Caché de usuarios no disponible: {e}")
+
+        user_id = (await session.execute(select(User.id).where(User.telegram_id == tg_user.id))).scalar()
+        if user_id is not None and self.redis is not None:
+            try:
+                await self.redis.set(key, user_id, ex=USER_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"Caché de usuarios no disponible: {e}")
+        return user_id
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if self.session_factory is None:
+            from infrastructure.database.connection import AsyncSessionLocal
+
+            self.session_factory = AsyncSessionLocal
+
+        session = self.session_factory()
+        try:
+            tg_user = data.get("event_from_user")
+            data["session"] = session
+            data["user_id"] = (
+                await self.resolve_user_id(session, tg_user) if tg_user and not tg_user.is_bot else None
+            )
+            return await handler(event, data)
+        finally:
+            await session.close()
@@ -0,0 +1,36 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from infrastructure.database.instrumentation import track_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware(BaseMiddleware):
+    """Cuenta consultas y tiempo en BD por cada update procesado."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with track_queries() as stats:
+            try:
+                return await handler(event, data)
+            finally:
+                if stats.count:
+                    fields = stats.as_log_fields()
+                    update_id = event.update_id if isinstance(event, Update) else None
+                    if fields["db_n_plus_one"]:
+                        logger.warning(
+                            f"Posible N+1 en update {update_id}: {fields}"
+                        )
+                    else:
+                        logger.info(
+                            f"Update {update_id}: {stats.count} queries, "
+                            f"{stats.total_time_ms} ms, {stats.rows} rows"
+                        )
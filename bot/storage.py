@@ -0,0 +1,77 @@
+"""
+Almacenamiento FSM compartido en Redis para correr el bot en N réplicas.
+
+- Estado y datos viven en Redis (JSON compacto); cualquier instancia puede
+  atender el siguiente mensaje del flujo.
+- TTL por grupo de estados: al entrar en un estado se renueva el TTL del
+  estado y de sus datos; un flujo abandonado expira solo.
+- Aislamiento por chat con un lock en Redis: dos réplicas no procesan a la vez
+  updates del mismo chat/usuario.
+"""
+
+import json
+import os
+from datetime import timedelta
+from functools import partial
+from typing import Any, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseEventIsolation, StateType, StorageKey
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisEventIsolation, RedisStorage
+from redis.asyncio import Redis
+
+# Grupo de estados (prefijo antes de ":") -> TTL
+STATE_GROUP_TTLS = {
+    "SignatureFlow": timedelta(hours=2),  # Incluye ir a buscar documentos/datos bancarios
+}
+DEFAULT_STATE_TTL = timedelta(minutes=int(os.getenv("BOT_FSM_TTL_MINUTES", "30")))
+# Un handler que tarde más que esto pierde el lock del chat
+ISOLATION_LOCK_TIMEOUT = 60
+
+_compact_dumps = partial(json.dumps, separators=(",", ":"), ensure_ascii=False)
+
+
+def state_ttl(state: Optional[str]) -> timedelta:
+    group = (state or "").split(":", 1)[0]
+    return STATE_GROUP_TTLS.get(group, DEFAULT_STATE_TTL)
+
+
+class GroupTTLRedisStorage(RedisStorage):
+    """`RedisStorage` con TTL según el grupo del estado actual."""
+
+    def __init__(self, redis: Redis, **kwargs: Any):
+        kwargs.setdefault("key_builder", DefaultKeyBuilder(prefix="fsm", with_bot_id=True))
+        kwargs.setdefault("json_dumps", _compact_dumps)
+        super().__init__(redis, **kwargs)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_key = self.key_builder.build(key, "state")
+        if state is None:
+            await self.redis.delete(state_key)
+            return
+        state = state.state if isinstance(state, State) else state
+        ttl = state_ttl(state)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(state_key, state, ex=ttl)
+            pipe.expire(self.key_builder.build(key, "data"), ttl)
+            await pipe.execute()
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not data or not isinstance(data, dict):
+            return await super().set_data(key, data)
+        data_key = self.key_builder.build(key, "data")
+        # Conserva el TTL fijado por el estado; sin estado, el TTL por defecto
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(data_key, self.json_dumps(data), keepttl=True)
+            pipe.expire(data_key, DEFAULT_STATE_TTL, nx=True)
+            await pipe.execute()
+
+    def create_isolation(self, **kwargs: Any) -> BaseEventIsolation:
+        kwargs.setdefault("lock_kwargs", {"timeout": ISOLATION_LOCK_TIMEOUT})
+        return RedisEventIsolation(redis=self.redis, key_builder=self.key_builder, **kwargs)
+
+
+def create_fsm_storage(redis: Optional[Redis] = None) -> GroupTTLRedisStorage:
+    if redis is None:
+        from infrastructure.database.connection import redis_client as redis
+    return GroupTTLRedisStorage(redis)
@@ -0,0 +1,312 @@
+"""
+Bus de updates en Redis Streams: separa la recepción del webhook de los
+workers que ejecutan los handlers (SERVICE_TYPE=bot-worker).
+
+- El ingress solo valida, deduplica y hace XADD al stream de la partición del
+  chat (`bot:updates:{n}`); responde sin ejecutar handlers.
+- Cada partición pertenece a un solo worker a la vez (lease en Redis), por eso
+  los updates de un chat se procesan en orden. Los workers vivos se reparten
+  las particiones (heartbeat en `bot:workers`). Una tarea aparte renueva los
+  leases cada LEASE_REFRESH aunque un handler tarde más que LEASE_TTL.
+- Grupo de consumidores por stream: la entrada se confirma (XACK) después del
+  handler. Si un worker muere, el dueño de la partición reclama (XAUTOCLAIM)
+  las pendientes inactivas más de LEASE_TTL: las de un worker vivo nunca.
+  Mientras queden pendientes de otro consumidor la partición no se lee con
+  ">", así lo nuevo de un chat no se adelanta a lo que dejó el worker caído.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from redis.asyncio import Redis
+from redis.exceptions import LockError, ResponseError
+
+from bot.updates import UpdateDeduplicator, UpdateMetrics, chat_key
+
+logger = logging.getLogger(__name__)
+
+STREAM_PARTITIONS = int(os.getenv("BOT_STREAM_PARTITIONS", "16"))
+STREAM_GROUP = "bot-workers"
+# Recorte aproximado de cada stream; lo confirmado hace tiempo sobra
+STREAM_MAXLEN = int(os.getenv("BOT_STREAM_MAXLEN", "10000"))
+# segundos; un worker caído libera sus particiones al vencer. Igual al lock
+# de aislamiento por chat
+LEASE_TTL = 60
+LEASE_REFRESH = 10
+# Una entrada sin actividad durante un lease completo es de un worker caído
+CLAIM_MIN_IDLE_MS = LEASE_TTL * 1000
+READ_BLOCK_MS = 2000
+READ_COUNT = 20
+# Entregas tras las que una entrada que tumba workers se descarta
+MAX_DELIVERIES = 5
+
+STREAM_MODE = "stream"
+DISPATCH_MODE = os.getenv("BOT_DISPATCH_MODE", "local").lower()
+
+
+def stream_key(partition: int) -> str:
+    return f"bot:updates:{partition}"
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class UpdateBus:
+    """Lado ingress: publica updates en el stream de su partición."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        dedupe: Optional[UpdateDeduplicator] = None,
+        partitions: int = STREAM_PARTITIONS,
+    ):
+        self.redis = redis
+        self.dedupe = dedupe
+        self.partitions = partitions
+
+    async def publish(self, update: Update, payload: dict) -> Optional[str]:
+        """Id de la entrada, o None si el update es un duplicado."""
+        if self.dedupe and not await self.dedupe.mark_seen(update.update_id):
+            return None
+        partition = chat_key(update) % self.partitions
+        try:
+            entry_id = await self.redis.xadd(
+                stream_key(partition),
+                {"update": json.dumps(payload, separators=(",", ":"), ensure_ascii=False)},
+                maxlen=STREAM_MAXLEN,
+                approximate=True,
+            )
+        except Exception:
+            # Sin encolar: el reintento de Telegram no debe tomarse por duplicado
+            if self.dedupe:
+                await self.dedupe.forget(update.update_id)
+            raise
+        return _text(entry_id)
+
+
+class StreamWorker:
+    """Consume las particiones que le tocan y ejecuta los handlers en orden."""
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        redis: Redis,
+        name: Optional[str] = None,
+        partitions: int = STREAM_PARTITIONS,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.redis = redis
+        self.name = name or f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        self.partitions = partitions
+        self.metrics = UpdateMetrics()
+        self.leases: Dict[int, object] = {}
+        # Particiones propias con pendientes de otro consumidor: no se leen
+        self.draining: Set[int] = set()
+        self._running = False
+
+    # --- Reparto de particiones ---
+
+    async def _fair_share(self) -> int:
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd("bot:workers", {self.name: now})
+            pipe.zremrangebyscore("bot:workers", "-inf", now - LEASE_TTL)
+            pipe.zcard("bot:workers")
+            _, _, alive = await pipe.execute()
+        return math.ceil(self.partitions / max(alive, 1))
+
+    async def renew_leases(self) -> None:
+        """Heartbeat del worker y renovación de los leases propios."""
+        await self.redis.zadd("bot:workers", {self.name: time.time()})
+        for partition, lease in list(self.leases.items()):
+            try:
+                await lease.reacquire()
+            except LockError:
+                logger.warning(f"Worker {self.name} perdió la partición {partition}")
+                self.leases.pop(partition, None)
+                self.draining.discard(partition)
+
+    async def _heartbeat(self) -> None:
+        # Independiente del bucle de lectura: un handler lento no deja vencer el lease
+        while True:
+            await asyncio.sleep(LEASE_REFRESH)
+            try:
+                await self.renew_leases()
+            except Exception as e:
+                logger.warning(f"No se pudieron renovar los leases de {self.name}: {e}")
+
+    async def rebalance(self) -> List[int]:
+        """Renueva leases propios, suelta el exceso y toma particiones libres."""
+        await self.renew_leases()
+
+        share = await self._fair_share()
+        while len(self.leases) > share:
+            partition, lease = self.leases.popitem()
+            self.draining.discard(partition)
+            await self._release(partition, lease)
+
+        for partition in range(self.partitions):
+            if len(self.leases) >= share:
+                break
+            if partition in self.leases:
+                continue
+            lease = self.redis.lock(f"{stream_key(partition)}:owner", timeout=LEASE_TTL)
+            if await lease.acquire(blocking=False):
+                await self._ensure_group(partition)
+                self.leases[partition] = lease
+                # Lo que dejó el dueño anterior va antes que lo nuevo
+                if await self._foreign_pending(partition):
+                    self.draining.add(partition)
+        return sorted(self.leases)
+
+    async def _release(self, partition: int, lease) -> None:
+        try:
+            await lease.release()
+        except LockError:
+            pass
+
+    async def _ensure_group(self, partition: int) -> None:
+        try:
+            await self.redis.xgroup_create(stream_key(partition), STREAM_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    # --- Consumo ---
+
+    async def _handle(self, partition: int, entry_id, fields: dict) -> None:
+        started = time.perf_counter()
+        try:
+            raw = _text(fields.get("update") or fields.get(b"update"))
+            update = Update.model_validate_json(raw, context={"bot": self.bot})
+            await self.dp.feed_update(self.bot, update)
+            self.metrics.processed += 1
+        except Exception:
+            # Error del handler: se confirma igual, reintentar no lo arregla
+            self.metrics.failed += 1
+            logger.exception(f"Error procesando entrada {_text(entry_id)} de la partición {partition}")
+        finally:
+            self.metrics.observe_latency(time.perf_counter() - started)
+        await self.redis.xack(stream_key(partition), STREAM_GROUP, entry_id)
+
+    async def reclaim(self, partition: int) -> int:
+        """Procesa lo que quedó pendiente de un worker caído (inactivo > LEASE_TTL)."""
+        stream = stream_key(partition)
+        pending = await self.redis.xpending_range(stream, STREAM_GROUP, min="-", max="+", count=READ_COUNT)
+        for entry in pending:
+            if entry["times_delivered"] >= MAX_DELIVERIES:
+                logger.error(f"Entrada {_text(entry['message_id'])} descartada tras {MAX_DELIVERIES} entregas")
+                await self.redis.xack(stream, STREAM_GROUP, entry["message_id"])
+
+        handled = 0
+        start = "0-0"
+        while True:
+            result = await self.redis.xautoclaim(stream, STREAM_GROUP, self.name, min_idle_time=CLAIM_MIN_IDLE_MS, start_id=start, count=READ_COUNT)
+            start, entries = result[0], result[1]
+            for entry_id, fields in entries:
+                if fields is None:  # Borrada por el recorte del stream
+                    await self.redis.xack(stream, STREAM_GROUP, entry_id)
+                    continue
+                await self._handle(partition, entry_id, fields)
+                handled += 1
+            if _text(start) == "0-0" or not entries:
+                break
+
+        if await self._foreign_pending(partition):
+            self.draining.add(partition)
+        else:
+            self.draining.discard(partition)
+        return handled
+
+    async def _foreign_pending(self, partition: int) -> int:
+        summary = await self.redis.xpending(stream_key(partition), STREAM_GROUP)
+        return sum(
+            consumer["pending"]
+            for consumer in summary.get("consumers") or []
+            if _text(consumer["name"]) != self.name
+        )
+
+    def readable(self) -> List[int]:
+        """Particiones propias que se pueden leer con ">" sin romper el orden."""
+        return [p for p in self.leases if p not in self.draining]
+
+    async def _consume_partition(self, partition: int, entries: list) -> None:
+        for entry_id, fields in entries:
+            await self._handle(partition, entry_id, fields)
+
+    async def poll_once(self, block_ms: int = READ_BLOCK_MS) -> int:
+        """Una lectura de las particiones propias sin pendientes ajenas; en paralelo."""
+        partitions = self.readable()
+        if not partitions:
+            return 0
+        response = await self.redis.xreadgroup(
+            STREAM_GROUP,
+            self.name,
+            {stream_key(p): ">" for p in partitions},
+            count=READ_COUNT,
+            block=block_ms,
+        )
+        batches = [
+            self._consume_partition(int(_text(stream).rsplit(":", 1)[1]), entries)
+            for stream, entries in response or []
+        ]
+        await asyncio.gather(*batches)
+        self.metrics.received += sum(len(entries) for _, entries in response or [])
+        return sum(len(entries) for _, entries in response or [])
+
+    async def run(self) -> None:
+        self._running = True
+        logger.info(f"Worker de updates {self.name} iniciado")
+        last_rebalance = 0.0
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while self._running:
+                if time.monotonic() - last_rebalance >= LEASE_REFRESH:
+                    await self.rebalance()
+                    last_rebalance = time.monotonic()
+                    # En cada vuelta: lo de un worker caído se vuelve reclamable
+                    # cuando cumple CLAIM_MIN_IDLE_MS, no al tomar la partición
+                    for partition in list(self.leases):
+                        await self.reclaim(partition)
+                if not self.readable():
+                    await asyncio.sleep(LEASE_REFRESH)
+                    continue
+                await self.poll_once()
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            await self.shutdown()
+
+    def stop(self) -> None:
+        self._running = False
+
+    async def shutdown(self) -> None:
+        """Suelta particiones para que otro worker las tome sin esperar el TTL."""
+        for partition, lease in list(self.leases.items()):
+            await self._release(partition, lease)
+        self.leases.clear()
+        self.draining.clear()
+        await self.redis.zrem("bot:workers", self.name)
+
+    def snapshot(self) -> dict:
+        m = self.metrics
+        return {
+            "worker": self.name,
+            "partitions": sorted(self.leases),
+            "received": m.received,
+            "processed": m.processed,
+            "failed": m.failed,
+            "handler_latency_ms": m.latency_ms(),
+        }
@@ -0,0 +1,209 @@
+"""
+Procesamiento de updates del webhook fuera del request HTTP.
+
+- El webhook responde 200 en cuanto el update queda encolado; Telegram no
+  reintenta por culpa de un handler lento (PDF, reservas).
+- Pool acotado de workers, una cola por worker; el update va al worker de su
+  chat (hash del chat_id), así cada chat conserva el orden y chats distintos
+  avanzan en paralelo.
+- Deduplicación por ventana deslizante de update_id en Redis (ZSET). El
+  update_id se registra cuando el handler termina, no al encolarlo: un update
+  aceptado y perdido antes de procesarse no bloquea su reintento.
+- Métricas en memoria: profundidad de cola, latencia de handlers, duplicados.
+
+Ventana de pérdida: la cola vive en memoria y Telegram ya recibió el 200. Lo
+encolado se pierde si la instancia muere sin drenar (SIGTERM con más de
+DRAIN_TIMEOUT de trabajo, OOM). En Cloud Run el servicio se despliega con
+`--no-cpu-throttling` para que los workers sigan con CPU después de responder;
+si esa ventana no es aceptable, usar BOT_DISPATCH_MODE=stream (bot/update_bus.py).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, List, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+UPDATE_WORKERS = int(os.getenv("BOT_UPDATE_WORKERS", "8"))
+# Capacidad por worker; con la cola llena el webhook responde 503 y Telegram reintenta
+UPDATE_QUEUE_SIZE = int(os.getenv("BOT_UPDATE_QUEUE_SIZE", "100"))
+# update_ids recordados (Telegram los emite crecientes por bot)
+DEDUPE_WINDOW = int(os.getenv("BOT_UPDATE_DEDUPE_WINDOW", "5000"))
+DEDUPE_KEY_TTL = 24 * 3600
+LATENCY_SAMPLES = 500
+DRAIN_TIMEOUT = 10
+
+QUEUED = "queued"
+DUPLICATE = "duplicate"
+BUSY = "busy"
+
+
+class UpdateDeduplicator:
+    """Ventana deslizante de update_id compartida por todas las réplicas."""
+
+    def __init__(self, redis: Redis, bot_id: int, window: int = DEDUPE_WINDOW):
+        self.redis = redis
+        self.key = f"bot:{bot_id}:update_ids"
+        self.window = window
+
+    async def is_seen(self, update_id: int) -> bool:
+        """True si el update ya se procesó. Si Redis falla se procesa igual."""
+        try:
+            return await self.redis.zscore(self.key, str(update_id)) is not None
+        except Exception as e:
+            logger.warning(f"Dedupe de updates no disponible: {e}")
+            return False
+
+    async def mark_seen(self, update_id: int) -> bool:
+        """True si el update es nuevo. Si Redis falla se procesa igual."""
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(self.key, {str(update_id): update_id}, nx=True)
+                pipe.zremrangebyscore(self.key, "-inf", update_id - self.window)
+                pipe.expire(self.key, DEDUPE_KEY_TTL)
+                added, _, _ = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Dedupe de updates no disponible: {e}")
+            return True
+        return bool(added)
+
+    async def forget(self, update_id: int) -> None:
+        """Libera el update_id (no se encoló; el reintento debe procesarse)."""
+        try:
+            await self.redis.zrem(self.key, str(update_id))
+        except Exception as e:
+            logger.warning(f"No se pudo liberar update {update_id}: {e}")
+
+
+class UpdateMetrics:
+    def __init__(self):
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.duplicates_dropped = 0
+        self.rejected_busy = 0
+        self.latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def latency_ms(self) -> dict:
+        if not self.latencies:
+            return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(self.latencies)
+
+        def pick(q: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+        return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1] * 1000, 2)}
+
+
+def chat_key(update: Update) -> int:
+    """Chat (o usuario) que fija el orden de procesamiento del update."""
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat:
+        return context.chat.id
+    if context.user:
+        return context.user.id
+    return update.update_id
+
+
+class UpdateWorkerPool:
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        dedupe: Optional[UpdateDeduplicator] = None,
+        workers: int = UPDATE_WORKERS,
+        queue_size: int = UPDATE_QUEUE_SIZE,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.dedupe = dedupe
+        self.metrics = UpdateMetrics()
+        self.queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        # Encolados o en curso en esta réplica (aún no registrados en Redis)
+        self._pending: Set[int] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(q)) for q in self.queues]
+
+    async def stop(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Procesa lo encolado (hasta `timeout`) y detiene los workers."""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self.queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Se descartan {self.queue_depth()} updates pendientes al detener el bot")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def queue_depth(self) -> int:
+        return sum(q.qsize() for q in self.queues)
+
+    async def submit(self, update: Update) -> str:
+        self.metrics.received += 1
+        queue = self.queues[chat_key(update) % len(self.queues)]
+        if queue.full():
+            self.metrics.rejected_busy += 1
+            return BUSY
+        if update.update_id in self._pending:
+            self.metrics.duplicates_dropped += 1
+            return DUPLICATE
+        self._pending.add(update.update_id)
+        if self.dedupe and await self.dedupe.is_seen(update.update_id):
+            self._pending.discard(update.update_id)
+            self.metrics.duplicates_dropped += 1
+            return DUPLICATE
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Se llenó mientras consultábamos Redis
+            self._pending.discard(update.update_id)
+            self.metrics.rejected_busy += 1
+            return BUSY
+        return QUEUED
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            update = await queue.get()
+            started = time.perf_counter()
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.metrics.processed += 1
+            except Exception:
+                self.metrics.failed += 1
+                logger.exception(f"Error procesando update {update.update_id}")
+            finally:
+                self.metrics.observe_latency(time.perf_counter() - started)
+                # Visto solo con el handler terminado (también si falló:
+                # reintentarlo no lo arregla)
+                if self.dedupe:
+                    await self.dedupe.mark_seen(update.update_id)
+                self._pending.discard(update.update_id)
+                queue.task_done()
+
+    def snapshot(self) -> dict[str, Any]:
+        m = self.metrics
+        return {
+            "queue_depth": self.queue_depth(),
+            "queue_capacity": sum(q.maxsize for q in self.queues),
+            "workers": len(self.queues),
+            "received": m.received,
+            "processed": m.processed,
+            "failed": m.failed,
+            "duplicates_dropped": m.duplicates_dropped,
+            "rejected_busy": m.rejected_busy,
+            "handler_latency_ms": m.latency_ms(),
+        }
@@ -2,14 +2,17 @@ from .base import Base
 from .user import User
 from .config import SystemConfig, BusinessExpense
 from .channel import Channel, Plan
-from .subscription import Subscription, Payment
-from .affiliate import AffiliateEarning, AffiliateRank
+from .subscription import Subscription, Payment, PaymentProviderTx, RenewalReminder
+from .affiliate import AffiliateEarning, AffiliateEarningTotals, AffiliateRank
 from .withdrawal import Withdrawal
 from .promotion import Promotion, RegistrationToken
 from .support import SupportTicket, TicketMessage
 from .call_service import CallService, CallSlot, AvailabilityRange, CallBooking
 from .profile import PublicProfile, ProfileLink
 from .legal import OwnerLegalInfo, SignatureCode, SignedContract
+from .analytics import OwnerDailyStats, SubscriptionCohort, MrrMovement, PlatformMonthlyRevenue, PlatformCounter
+from .ledger import BalanceEntry, BalanceSnapshot
+from .broadcast import Broadcast
 
 __all__ = [
     "Base",
@@ -20,7 +23,10 @@ __all__ = [
     "Plan",
     "Subscription",
     "Payment",
+    "PaymentProviderTx",
+    "RenewalReminder",
     "AffiliateEarning",
+    "AffiliateEarningTotals",
     "AffiliateRank",
     "Withdrawal",
     "Promotion",
@@ -36,4 +42,12 @@ __all__ = [
     "OwnerLegalInfo",
     "SignatureCode",
     "SignedContract",
+    "OwnerDailyStats",
+    "SubscriptionCohort",
+    "MrrMovement",
+    "PlatformMonthlyRevenue",
+    "PlatformCounter",
+    "BalanceEntry",
+    "BalanceSnapshot",
+    "Broadcast",
 ]
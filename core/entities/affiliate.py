@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
@@ -6,20 +6,44 @@ from .base import Base
 class AffiliateEarning(Base):
     """
     Registra la ganancia de cada nivel en el sistema multinivel (hasta 10 niveles).
+    Particionada por mes sobre `created_at` en PostgreSQL, como `payments`.
     """
 
     __tablename__ = "affiliate_earnings"
+    __table_args__ = (
+        # Ledger admin: keyset global y por afiliado
+        Index("ix_affiliate_earnings_created_at_id", "created_at", "id"),
+        Index("ix_affiliate_earnings_affiliate_created_at_id", "affiliate_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    payment_id = Column(Integer, ForeignKey("payments.id"))
+    payment_id = Column(Integer)  # Sin FK: `payments` está particionada
     affiliate_id = Column(Integer, ForeignKey("users.id"), index=True)
     level = Column(Integer)  # 1 a 10
     amount = Column(Float)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
-    payment = relationship("Payment", back_populates="affiliate_earnings")
+    payment = relationship(
+        "Payment",
+        primaryjoin="foreign(AffiliateEarning.payment_id) == Payment.id",
+        back_populates="affiliate_earnings",
+    )
     affiliate = relationship("User")
 
 
+class AffiliateEarningTotals(Base):
+    """
+    Acumulado por afiliado y nivel de `affiliate_earnings`. Se actualiza en la
+    misma transacción que inserta la ganancia (core.use_cases.affiliate_stats).
+    """
+
+    __tablename__ = "affiliate_earning_totals"
+    affiliate_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    level = Column(Integer, primary_key=True)
+    amount = Column(Float, default=0.0, nullable=False)
+    earnings_count = Column(Integer, default=0, nullable=False)
+    last_earned_at = Column(DateTime, nullable=True)
+
+
 class AffiliateRank(Base):
     """
     Rangos dinámicos de afiliados (Ej: Bronce, Plata, Oro).
@@ -0,0 +1,80 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, Boolean, ForeignKey, JSON, String
+from .base import Base
+
+
+class OwnerDailyStats(Base):
+    """
+    Rollup diario por usuario (owner y/o afiliado). Se actualiza de forma
+    incremental en la misma transacción que pagos, suscripciones y ganancias;
+    `scripts/rebuild_daily_stats.py` lo reconstruye desde el histórico.
+    """
+
+    __tablename__ = "owner_daily_stats"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    revenue = Column(Float, default=0.0, nullable=False)  # Suma de owner_amount
+    new_subscribers = Column(Integer, default=0, nullable=False)  # Por start_date
+    ending_subscribers = Column(Integer, default=0, nullable=False)  # Por end_date (o baja)
+    mlm_earnings = Column(Float, default=0.0, nullable=False)  # Como afiliado
+
+
+class SubscriptionCohort(Base):
+    """
+    Cohorte mensual por canal/plan: suscripciones que empezaron en
+    `cohort_month`. `active_counts[k]` / `active_mrr[k]` = suscripciones (y su
+    MRR) de la cohorte activas en el mes cohort_month + k.
+    """
+
+    __tablename__ = "subscription_cohorts"
+    channel_id = Column(Integer, ForeignKey("channels.id", ondelete="CASCADE"), primary_key=True)
+    plan_id = Column(Integer, ForeignKey("plans.id", ondelete="CASCADE"), primary_key=True)
+    cohort_month = Column(Date, primary_key=True)  # Primer día del mes
+
+    size = Column(Integer, default=0, nullable=False)
+    active_counts = Column(JSON, default=list, nullable=False)
+    active_mrr = Column(JSON, default=list, nullable=False)
+
+
+class MrrMovement(Base):
+    """Movimientos de MRR por canal/plan y mes (new / expansion / churn)."""
+
+    __tablename__ = "mrr_movements"
+    channel_id = Column(Integer, ForeignKey("channels.id", ondelete="CASCADE"), primary_key=True)
+    plan_id = Column(Integer, ForeignKey("plans.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)
+
+    new_mrr = Column(Float, default=0.0, nullable=False)
+    expansion_mrr = Column(Float, default=0.0, nullable=False)
+    churned_mrr = Column(Float, default=0.0, nullable=False)  # Por mes de vencimiento
+    new_count = Column(Integer, default=0, nullable=False)
+    renewals = Column(Integer, default=0, nullable=False)
+    churned_count = Column(Integer, default=0, nullable=False)
+
+
+class PlatformMonthlyRevenue(Base):
+    """
+    Ingreso de plataforma (`Payment.platform_amount` completados) por mes.
+    Los meses cerrados (`closed`) no se recalculan; el mes en curso sí.
+    """
+
+    __tablename__ = "platform_monthly_revenue"
+    month = Column(Date, primary_key=True)  # Primer día del mes
+
+    gross_revenue = Column(Float, default=0.0, nullable=False)
+    payments_count = Column(Integer, default=0, nullable=False)
+    closed = Column(Boolean, default=False, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+
+class PlatformCounter(Base):
+    """
+    Contadores globales (p. ej. comisiones por nivel). Cada escritura suma en
+    un shard aleatorio para no serializar pagos sobre una única fila; el valor
+    es la suma de sus shards.
+    """
+
+    __tablename__ = "platform_counters"
+    name = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    value = Column(Float, default=0.0, nullable=False)
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+from datetime import datetime
+from .base import Base
+
+
+class Broadcast(Base):
+    """
+    Mensaje de un owner a los suscriptores activos de un canal.
+
+    El envío avanza en páginas por `users.id`; `cursor_user_id` es el último
+    destinatario confirmado, de modo que otro proceso puede reanudar un envío
+    cuyo `heartbeat_at` quedó viejo.
+    """
+
+    __tablename__ = "broadcasts"
+    __table_args__ = (
+        Index("ix_broadcasts_owner_id_created_at", "owner_id", "created_at"),
+        # Cola de envíos pendientes / a reanudar
+        Index("ix_broadcasts_status_heartbeat_at", "status", "heartbeat_at"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    channel_id = Column(Integer, ForeignKey("channels.id", ondelete="CASCADE"), nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String(16), default="queued", nullable=False)  # queued, running, completed
+
+    # Progreso (se confirma por página junto con el cursor)
+    cursor_user_id = Column(Integer, default=0, nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    delivered = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    blocked = Column(Integer, default=0, nullable=False)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
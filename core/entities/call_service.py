@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
@@ -64,14 +64,26 @@ class CallBooking(Base):
     Disponibilidad = (AvailabilityRanges - CallBookings).
     """
     __tablename__ = "call_bookings"
+    __table_args__ = (
+        # Guarda final contra reservas dobles: un horario por owner (todos sus servicios)
+        Index(
+            "ux_call_bookings_owner_start_time",
+            "owner_id",
+            "start_time",
+            unique=True,
+            postgresql_where=text("status != 'cancelled'"),
+            sqlite_where=text("status != 'cancelled'"),
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
     service_id = Column(Integer, ForeignKey("call_services.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # = service.owner_id (desnormalizado)
     booker_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
     start_time = Column(DateTime) # UTC
     end_time = Column(DateTime)   # UTC (Calculado: start + service.duration)
     
-    status = Column(String, default="confirmed") # pending, confirmed, cancelled, completed
+    status = Column(String, default="confirmed") # pending, confirmed, cancelled, completed, blocked
     meeting_link = Column(String, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
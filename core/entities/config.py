@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
@@ -17,6 +17,10 @@ class SystemConfig(Base):
 
 class BusinessExpense(Base):
     __tablename__ = "business_expenses"
+    __table_args__ = (
+        # Agregados fiscales por admin y rango de fechas
+        Index("ix_business_expenses_user_id_date", "user_id", "date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))  # Admin Owner
     description = Column(String)
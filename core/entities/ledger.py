@@ -0,0 +1,44 @@
+from sqlalchemy import BigInteger, Column, DateTime, FetchedValue, ForeignKey, Index, Integer, String, func
+from datetime import datetime
+from .base import Base
+
+# BIGINT en Postgres; INTEGER en SQLite para conservar el autoincremento (rowid)
+LedgerId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class BalanceEntry(Base):
+    """
+    Diario de saldos, solo inserción y en centavos. Cada movimiento (venta,
+    comisión de red, retiro, compensación) es una fila; nunca se actualiza.
+    """
+
+    __tablename__ = "balance_entries"
+    id = Column(LedgerId, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    account = Column(String(16), nullable=False)  # main, affiliate
+    amount_cents = Column(BigInteger, nullable=False)  # Con signo: + abono, - cargo
+    kind = Column(String(32), nullable=False)  # sale, commission, withdrawal, channel_refund, compensation, opening
+    payment_id = Column(Integer, nullable=True)  # Sin FK: `payments` está particionada
+    withdrawal_id = Column(Integer, ForeignKey("withdrawals.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Postgres: xid de la transacción que la insertó (DEFAULT pg_current_xact_id(),
+    # ver migración). NULL en SQLite, donde la clave de consolidación es el id.
+    txid = Column(BigInteger, server_default=FetchedValue(), nullable=True)
+
+
+# Clave de consolidación: orden de confirmación posible, no de asignación de id
+BALANCE_FOLD_KEY = func.coalesce(BalanceEntry.txid, BalanceEntry.id)
+
+# Cola no consolidada por usuario/cuenta (clave >= folded_txid)
+Index("ix_balance_entries_user_account_fold", BalanceEntry.user_id, BalanceEntry.account, BALANCE_FOLD_KEY)
+
+
+class BalanceSnapshot(Base):
+    """Saldo consolidado por usuario/cuenta: entradas con clave < `folded_txid`."""
+
+    __tablename__ = "balance_snapshots"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    account = Column(String(16), primary_key=True)
+    balance_cents = Column(BigInteger, default=0, nullable=False)
+    folded_txid = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Destinatarios de difusiones: suscripciones por plan, recorridas por usuario
+        Index("ix_subscriptions_plan_id_user_id", "plan_id", "user_id"),
+        # Recordatorios de renovación: rango de vencimientos por ventana
+        Index("ix_subscriptions_is_active_end_date", "is_active", "end_date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     plan_id = Column(Integer, ForeignKey("plans.id"))
@@ -12,6 +18,7 @@ class Subscription(Base):
     end_date = Column(DateTime)
     is_active = Column(Boolean, default=True)
     is_trial = Column(Boolean, default=False)
+    monthly_value = Column(Float, nullable=True)  # MRR aportado (precio pagado normalizado a 30 días)
 
     user = relationship("User", back_populates="subscriptions")
     plan = relationship("Plan", backref="subscriptions_list")
@@ -20,9 +27,18 @@ class Subscription(Base):
 class Payment(Base):
     """
     Registra cada transacción procesada, sin importar el proveedor.
+
+    En PostgreSQL la tabla está particionada por mes sobre `created_at`
+    (infrastructure.database.partitions): la PK física es (id, created_at) y
+    ninguna tabla puede declarar FK hacia `payments.id`. Para el ORM, `id`
+    sigue siendo la identidad.
     """
 
     __tablename__ = "payments"
+    __table_args__ = (
+        # Cola de pagos pendientes (keyset por estado)
+        Index("ix_payments_status_created_at_id", "status", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     plan_id = Column(Integer, ForeignKey("plans.id"), nullable=True)
@@ -31,7 +47,7 @@ class Payment(Base):
     amount = Column(Float)
     currency = Column(String, default="usd")
     payment_method = Column(String)  # stripe, crypto, paypal, etc.
-    provider_tx_id = Column(String, unique=True, nullable=True)
+    provider_tx_id = Column(String, nullable=True, index=True)  # Unicidad: PaymentProviderTx
     status = Column(String)  # pending, completed, failed
 
     # DESGLOSE PARA MULTI-TENANT Y AFILIADOS
@@ -40,7 +56,48 @@ class Payment(Base):
     affiliate_amount = Column(Float, default=0.0)  # Del que lo refirió (vitalicia)
     affiliate_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     user = relationship("User", foreign_keys=[user_id], back_populates="payments")
-    affiliate_earnings = relationship("AffiliateEarning", back_populates="payment")
+    affiliate_earnings = relationship(
+        "AffiliateEarning",
+        primaryjoin="Payment.id == foreign(AffiliateEarning.payment_id)",
+        back_populates="payment",
+    )
+
+
+class PaymentProviderTx(Base):
+    """
+    Unicidad global de `provider_tx_id` (idempotencia de webhooks): un índice
+    único sobre la tabla particionada tendría que incluir `created_at`.
+    """
+
+    __tablename__ = "payment_provider_txs"
+    provider_tx_id = Column(String, primary_key=True)
+    payment_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RenewalReminder(Base):
+    """
+    Recordatorio de renovación enviado (o reclamado para enviar) por
+    suscripción, ventana (días antes) y `end_date`. El índice único hace que
+    un solo intento esté en curso aunque varias réplicas corran el
+    programador; `failed` y `pending` vencidos se reintentan dentro de la
+    ventana. Una renovación mueve `end_date` y abre un ciclo nuevo.
+    """
+
+    __tablename__ = "renewal_reminders"
+    __table_args__ = (
+        Index("ux_renewal_reminders_subscription_offset_end", "subscription_id", "offset_days", "end_date", unique=True),
+    )
+    id = Column(Integer, primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    offset_days = Column(Integer, nullable=False)  # 7, 3, 1
+    end_date = Column(DateTime, nullable=False)
+    status = Column(String(16), default="pending", nullable=False)  # pending, sent, blocked, failed
+    attempts = Column(Integer, default=1, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Último reclamo
+    sent_at = Column(DateTime, nullable=True)
@@ -1,17 +1,23 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
 
 class SupportTicket(Base):
     __tablename__ = "support_tickets"
+    __table_args__ = (
+        # Paginación keyset del panel admin: clave inmutable (updated_at cambia
+        # mientras se pagina y saltaría o repetiría tickets)
+        Index("ix_support_tickets_created_at_id", "created_at", "id"),
+        Index("ix_support_tickets_status_created_at_id", "status", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     subject = Column(String)
     status = Column(String, default="open")  # open, closed, pending
     priority = Column(String, default="normal")  # low, normal, high
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     user = relationship("User")
     messages = relationship("TicketMessage", back_populates="ticket")
@@ -7,6 +7,7 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Float,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -21,6 +22,10 @@ class User(Base):
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Paginación keyset del directorio admin
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     telegram_id = Column(BigInteger, unique=True, index=True, nullable=True)
     username = Column(String, nullable=True)
@@ -48,15 +53,21 @@ class User(Base):
         String, unique=True, index=True, default=lambda: str(uuid.uuid4())[:8]
     )
     # Quién invitó a este usuario
-    referred_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    referred_by_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    # Desnormalizados (core.use_cases.referrals): sin COUNT por pago
+    direct_referral_count = Column(Integer, default=0, nullable=False)
+    rank_id = Column(Integer, ForeignKey("affiliate_ranks.id", ondelete="SET NULL"), nullable=True)
+    max_depth = Column(Integer, default=1, nullable=False)
 
     # --- BALANCES ---
+    # Legacy: congelados al migrar a `balance_entries`; el saldo vigente es
+    # snapshot + cola del diario (core.use_cases.balances.get_balances)
     balance = Column(Float, default=0.0)  # Ganancia de sus canales
     affiliate_balance = Column(Float, default=0.0)  # Ganancia por referir otros dueños
     pending_balance = Column(Float, default=0.0)
     avatar_url = Column(String, nullable=True)  # URL de foto de perfil
 
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relaciones
     subscriptions = relationship("Subscription", back_populates="user")
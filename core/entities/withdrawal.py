@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
 
 class Withdrawal(Base):
     __tablename__ = "withdrawals"
+    __table_args__ = (
+        # Paginación keyset del panel admin (con y sin filtro de estado)
+        Index("ix_withdrawals_created_at_id", "created_at", "id"),
+        Index("ix_withdrawals_status_created_at_id", "status", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
 
@@ -17,7 +22,7 @@ class Withdrawal(Base):
 
     is_express = Column(Boolean, default=False)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     payout_id = Column(Integer, ForeignKey("withdrawals.id"), nullable=True)
 
     owner = relationship("User", back_populates="withdrawals")
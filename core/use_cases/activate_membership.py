@@ -4,6 +4,12 @@ from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.entities import User, Plan, Subscription, Payment, Channel, Promotion
 from core.use_cases.distribute_funds import distribute_payment_funds
+from core.use_cases.daily_stats import bump_daily_stats, move_subscription_end
+from core.use_cases.cohorts import (
+    monthly_value,
+    record_subscription_extension,
+    record_subscription_start,
+)
 from infrastructure.database.connection import redis_client
 
 async def activate_membership(
@@ -69,9 +75,15 @@ async def activate_membership(
     )
     sub = existing_sub.scalar_one_or_none()
 
+    owner_res = await db.execute(select(Channel.owner_id).where(Channel.id == plan.channel_id))
+    owner_id = owner_res.scalar_one_or_none()
+
     now = datetime.utcnow()
     if sub and sub.end_date > now:
+        old_end = sub.end_date
         sub.end_date += timedelta(days=plan.duration_days)
+        await move_subscription_end(db, owner_id, old_end, sub.end_date)
+        await record_subscription_extension(db, sub, plan, old_end)
     else:
         sub = Subscription(
             user_id=user_id,
@@ -79,8 +91,28 @@ async def activate_membership(
             start_date=now,
             end_date=now + timedelta(days=plan.duration_days),
             is_active=True,
+            monthly_value=monthly_value(plan, final_price),
         )
         db.add(sub)
+        await bump_daily_stats(db, owner_id, now, new_subscribers=1)
+        await bump_daily_stats(db, owner_id, sub.end_date, ending_subscribers=1)
+
+        # Otra suscripción activa en el mismo canal => expansión, no alta nueva
+        other_res = await db.execute(
+            select(Subscription.id)
+            .join(Plan, Subscription.plan_id == Plan.id)
+            .where(
+                Subscription.user_id == user_id,
+                Subscription.plan_id != plan_id,
+                Subscription.is_active,
+                Subscription.end_date > now,
+                Plan.channel_id == plan.channel_id,
+            )
+            .limit(1)
+        )
+        await record_subscription_start(
+            db, sub, plan, expansion=other_res.scalar_one_or_none() is not None
+        )
 
     if provider_tx_id:
         await redis_client.setex(f"processed_tx:{provider_tx_id}", 86400 * 7, "1")
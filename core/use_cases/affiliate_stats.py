@@ -0,0 +1,240 @@
+"""
+Resúmenes de ganancias de red sin escanear `affiliate_earnings`.
+
+- Por afiliado: `affiliate_earning_totals` (una fila por nivel, PK
+  affiliate_id, level) y ventana de 30 días desde `owner_daily_stats`.
+- Global: `platform_counters` con shards (comisiones por nivel y reclutadores
+  activos).
+
+Todo se actualiza en la transacción que inserta la ganancia (o que vincula el
+referido); `reconcile_affiliate_counters` lo verifica contra la tabla cruda.
+"""
+
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import AffiliateEarning, AffiliateEarningTotals, OwnerDailyStats, PlatformCounter, User
+from core.use_cases.daily_stats import dialect_insert, execute_upsert
+
+COUNTER_SHARDS = int(os.getenv("PLATFORM_COUNTER_SHARDS", "16"))
+WINDOW_DAYS = 30
+MAX_LEVEL = 10
+RECONCILE_BATCH_SIZE = 1000
+
+ACTIVE_RECRUITERS = "active_recruiters"
+
+
+def level_counter(level: int) -> str:
+    return f"affiliate_level_{level}_commissions"
+
+
+LEVEL_COUNTERS = [level_counter(level) for level in range(1, MAX_LEVEL + 1)]
+
+
+async def bump_platform_counters(db: AsyncSession, deltas: Dict[str, float]):
+    """Suma `deltas` ({nombre: delta}) en un shard aleatorio. No confirma."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    shard = random.randrange(COUNTER_SHARDS)
+    upsert = dialect_insert(db)
+    stmt = upsert(PlatformCounter).values(
+        [{"name": name, "shard": shard, "value": delta} for name, delta in deltas.items()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PlatformCounter.name, PlatformCounter.shard],
+        set_={"value": PlatformCounter.value + stmt.excluded.value},
+    )
+    await execute_upsert(db, stmt)
+
+
+async def get_platform_counters(db: AsyncSession, names: Iterable[str]) -> Dict[str, float]:
+    names = list(names)
+    result = await db.execute(
+        select(PlatformCounter.name, func.sum(PlatformCounter.value))
+        .where(PlatformCounter.name.in_(names))
+        .group_by(PlatformCounter.name)
+    )
+    counters = dict.fromkeys(names, 0.0)
+    counters.update({name: value or 0.0 for name, value in result})
+    return counters
+
+
+async def set_platform_counter(db: AsyncSession, name: str, value: float):
+    """Reemplaza todos los shards de `name` por un único valor exacto. No confirma."""
+    await db.execute(delete(PlatformCounter).where(PlatformCounter.name == name))
+    await db.execute(insert(PlatformCounter).values(name=name, shard=0, value=value))
+
+
+async def record_affiliate_earnings(db: AsyncSession, earnings: List[dict], earned_at: datetime):
+    """
+    Acumula las ganancias de un pago (dicts con affiliate_id, level, amount):
+    un upsert multi-fila por afiliado/nivel y otro para los contadores globales.
+    """
+    if not earnings:
+        return
+    upsert = dialect_insert(db)
+    stmt = upsert(AffiliateEarningTotals).values([
+        {
+            "affiliate_id": earn["affiliate_id"],
+            "level": earn["level"],
+            "amount": earn["amount"],
+            "earnings_count": 1,
+            "last_earned_at": earned_at,
+        }
+        for earn in earnings
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AffiliateEarningTotals.affiliate_id, AffiliateEarningTotals.level],
+        set_={
+            "amount": AffiliateEarningTotals.amount + stmt.excluded.amount,
+            "earnings_count": AffiliateEarningTotals.earnings_count + 1,
+            "last_earned_at": stmt.excluded.last_earned_at,
+        },
+    )
+    await execute_upsert(db, stmt)
+
+    level_deltas: Dict[str, float] = {}
+    for earn in earnings:
+        name = level_counter(earn["level"])
+        level_deltas[name] = level_deltas.get(name, 0.0) + earn["amount"]
+    await bump_platform_counters(db, level_deltas)
+
+
+async def get_affiliate_summary(db: AsyncSession, user_id: int, now: Optional[datetime] = None) -> dict:
+    """Total, reparto por nivel y últimos 30 días del afiliado."""
+    now = now or datetime.utcnow()
+    levels = await db.execute(
+        select(AffiliateEarningTotals.level, AffiliateEarningTotals.amount, AffiliateEarningTotals.earnings_count)
+        .where(AffiliateEarningTotals.affiliate_id == user_id)
+        .order_by(AffiliateEarningTotals.level)
+    )
+    earnings_by_level = [{"level": level, "amount": amount, "count": count} for level, amount, count in levels]
+
+    window = await db.execute(
+        select(func.coalesce(func.sum(OwnerDailyStats.mlm_earnings), 0.0)).where(
+            OwnerDailyStats.owner_id == user_id,
+            OwnerDailyStats.day > (now - timedelta(days=WINDOW_DAYS)).date(),
+            OwnerDailyStats.day <= now.date(),
+        )
+    )
+    return {
+        "total_earnings": sum(row["amount"] for row in earnings_by_level),
+        "earnings_count": sum(row["count"] for row in earnings_by_level),
+        "earnings_by_level": earnings_by_level,
+        "last_30_days_earnings": window.scalar() or 0.0,
+    }
+
+
+async def get_platform_affiliate_summary(db: AsyncSession) -> dict:
+    counters = await get_platform_counters(db, LEVEL_COUNTERS + [ACTIVE_RECRUITERS])
+    earnings_by_level = [
+        {"level": level, "amount": counters[level_counter(level)]}
+        for level in range(1, MAX_LEVEL + 1)
+        if counters[level_counter(level)]
+    ]
+    return {
+        "total_commissions_paid": sum(row["amount"] for row in earnings_by_level),
+        "active_recruiters": int(counters[ACTIVE_RECRUITERS]),
+        "earnings_by_level": earnings_by_level,
+    }
+
+
+def _differs(a: float, b: float) -> bool:
+    # Tolerancia sub-centavo: las sumas en Float no son asociativas
+    return round((a or 0.0) - (b or 0.0), 4) != 0
+
+
+async def reconcile_affiliate_counters(db: AsyncSession, fix: bool = False) -> List[dict]:
+    """
+    Compara los contadores con `affiliate_earnings`/`users` y devuelve las
+    discrepancias. Con `fix=True` las corrige y confirma.
+    """
+    raw = await db.execute(
+        select(
+            AffiliateEarning.affiliate_id,
+            AffiliateEarning.level,
+            func.sum(AffiliateEarning.amount),
+            func.count(AffiliateEarning.id),
+            func.max(AffiliateEarning.created_at),
+        )
+        .where(AffiliateEarning.affiliate_id.is_not(None), AffiliateEarning.level.is_not(None))
+        .group_by(AffiliateEarning.affiliate_id, AffiliateEarning.level)
+    )
+    expected = {(a, level): (amount or 0.0, count, last) for a, level, amount, count, last in raw}
+    stored = {
+        (a, level): (amount, count)
+        for a, level, amount, count in await db.execute(
+            select(
+                AffiliateEarningTotals.affiliate_id,
+                AffiliateEarningTotals.level,
+                AffiliateEarningTotals.amount,
+                AffiliateEarningTotals.earnings_count,
+            )
+        )
+    }
+
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        amount, count, _ = expected.get(key, (0.0, 0, None))
+        got_amount, got_count = stored.get(key, (0.0, 0))
+        if _differs(amount, got_amount) or count != got_count:
+            mismatches.append({
+                "counter": "affiliate_earning_totals",
+                "affiliate_id": key[0],
+                "level": key[1],
+                "expected": amount,
+                "stored": got_amount,
+            })
+
+    expected_global = {name: 0.0 for name in LEVEL_COUNTERS}
+    for (_, level), (amount, _, _) in expected.items():
+        expected_global[level_counter(level)] = expected_global.get(level_counter(level), 0.0) + amount
+    expected_global[ACTIVE_RECRUITERS] = (
+        await db.execute(select(func.count(User.id)).where(User.direct_referral_count > 0))
+    ).scalar() or 0
+    stored_global = await get_platform_counters(db, expected_global)
+    for name, value in expected_global.items():
+        if _differs(value, stored_global[name]):
+            mismatches.append({"counter": name, "expected": value, "stored": stored_global[name]})
+
+    if fix and mismatches:
+        rows, stale = [], []
+        for mismatch in mismatches:
+            if mismatch["counter"] != "affiliate_earning_totals":
+                await set_platform_counter(db, mismatch["counter"], mismatch["expected"])
+                continue
+            key = (mismatch["affiliate_id"], mismatch["level"])
+            if key not in expected:
+                stale.append(key)
+                continue
+            amount, count, last = expected[key]
+            rows.append({
+                "affiliate_id": key[0],
+                "level": key[1],
+                "amount": amount,
+                "earnings_count": count,
+                "last_earned_at": last,
+            })
+        for affiliate_id, level in stale:
+            await db.execute(
+                delete(AffiliateEarningTotals).where(
+                    AffiliateEarningTotals.affiliate_id == affiliate_id,
+                    AffiliateEarningTotals.level == level,
+                )
+            )
+        upsert = dialect_insert(db)
+        for start in range(0, len(rows), RECONCILE_BATCH_SIZE):
+            stmt = upsert(AffiliateEarningTotals).values(rows[start:start + RECONCILE_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AffiliateEarningTotals.affiliate_id, AffiliateEarningTotals.level],
+                set_={col: stmt.excluded[col] for col in ("amount", "earnings_count", "last_earned_at")},
+            )
+            await execute_upsert(db, stmt)
+        await db.commit()
+    return mismatches
@@ -0,0 +1,175 @@
+"""
+Saldos derivados de un diario de solo inserción (`balance_entries`).
+
+Saldo = `balance_snapshots.balance_cents` + suma de las entradas con clave de
+consolidación >= `folded_txid`. El procesamiento de pagos solo inserta entradas
+(sin UPDATE sobre filas de usuario calientes); `snapshot_balances` consolida la
+cola de forma periódica (scripts/snapshot_balances.py).
+
+La clave es el xid de la transacción que insertó la entrada, no su id: un id
+menor puede confirmarse después de uno mayor, pero ninguna transacción con xid
+por debajo del xmin del snapshot actual puede confirmarse ya.
+"""
+
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func, insert, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import BalanceEntry, BalanceSnapshot, User
+from core.entities.ledger import BALANCE_FOLD_KEY
+from core.use_cases.daily_stats import dialect_insert, execute_upsert
+from infrastructure.cache.profile_cache import mark_profile_dirty
+
+ACCOUNT_MAIN = "main"  # Ganancia de canales (antes User.balance)
+ACCOUNT_AFFILIATE = "affiliate"  # Comisiones de red (antes User.affiliate_balance)
+ACCOUNTS = (ACCOUNT_MAIN, ACCOUNT_AFFILIATE)
+
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+class InsufficientBalance(Exception):
+    pass
+
+
+def to_cents(amount: float) -> int:
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> float:
+    return (cents or 0) / 100
+
+
+def balance_entry(
+    user_id: int,
+    account: str,
+    amount: float,
+    kind: str,
+    payment_id: Optional[int] = None,
+    withdrawal_id: Optional[int] = None,
+) -> dict:
+    return {
+        "user_id": user_id,
+        "account": account,
+        "amount_cents": to_cents(amount),
+        "kind": kind,
+        "payment_id": payment_id,
+        "withdrawal_id": withdrawal_id,
+        "created_at": datetime.utcnow(),
+    }
+
+
+async def post_entries(db: AsyncSession, entries: Iterable[dict]):
+    """Inserta las entradas en un único INSERT multi-fila. No confirma."""
+    entries = [e for e in entries if e["amount_cents"]]
+    if entries:
+        await db.execute(insert(BalanceEntry).values(entries))
+        mark_profile_dirty(db, (e["user_id"] for e in entries))
+
+
+def _unfolded_entries(*columns):
+    """Entradas aún no consolidadas en el snapshot de su usuario/cuenta."""
+    return (
+        select(*columns)
+        .outerjoin(
+            BalanceSnapshot,
+            and_(
+                BalanceSnapshot.user_id == BalanceEntry.user_id,
+                BalanceSnapshot.account == BalanceEntry.account,
+            ),
+        )
+        .where(BALANCE_FOLD_KEY >= func.coalesce(BalanceSnapshot.folded_txid, 0))
+    )
+
+
+def balance_totals(account: Optional[str] = None, user_ids: Optional[List[int]] = None):
+    """Subconsulta (user_id, account, balance_cents): snapshot + cola sin consolidar."""
+    snapshots = select(
+        BalanceSnapshot.user_id, BalanceSnapshot.account, BalanceSnapshot.balance_cents.label("cents")
+    )
+    tail = _unfolded_entries(BalanceEntry.user_id, BalanceEntry.account, BalanceEntry.amount_cents.label("cents"))
+    if account is not None:
+        snapshots = snapshots.where(BalanceSnapshot.account == account)
+        tail = tail.where(BalanceEntry.account == account)
+    if user_ids is not None:
+        snapshots = snapshots.where(BalanceSnapshot.user_id.in_(user_ids))
+        tail = tail.where(BalanceEntry.user_id.in_(user_ids))
+    parts = union_all(snapshots, tail).subquery()
+    return (
+        select(parts.c.user_id, parts.c.account, func.sum(parts.c.cents).label("balance_cents"))
+        .group_by(parts.c.user_id, parts.c.account)
+        .subquery()
+    )
+
+
+async def get_balances(db: AsyncSession, user_id: int) -> Dict[str, float]:
+    """Saldos vigentes en USD: {"main": ..., "affiliate": ...}. Una sola consulta."""
+    balances = dict.fromkeys(ACCOUNTS, 0.0)
+    totals = balance_totals(user_ids=[user_id])
+    result = await db.execute(select(totals.c.account, totals.c.balance_cents))
+    balances.update({account: from_cents(cents) for account, cents in result})
+    return balances
+
+
+async def withdraw_from_balances(db: AsyncSession, user_id: int, amount: float, withdrawal_id: int):
+    """
+    Cargo de un retiro: primero la cuenta principal y el resto a la de afiliado.
+    Bloquea la fila del usuario (ruta fría) para evitar retiros dobles
+    concurrentes; los abonos de pagos no toman ese bloqueo.
+    """
+    await db.execute(select(User.id).where(User.id == user_id).with_for_update())
+    balances = await get_balances(db, user_id)
+    if to_cents(amount) > to_cents(balances[ACCOUNT_MAIN] + balances[ACCOUNT_AFFILIATE]):
+        raise InsufficientBalance()
+
+    from_main = min(amount, max(balances[ACCOUNT_MAIN], 0.0))
+    await post_entries(db, [
+        balance_entry(user_id, ACCOUNT_MAIN, -from_main, "withdrawal", withdrawal_id=withdrawal_id),
+        balance_entry(user_id, ACCOUNT_AFFILIATE, -(amount - from_main), "withdrawal", withdrawal_id=withdrawal_id),
+    ])
+
+
+async def fold_watermark(db: AsyncSession) -> int:
+    """Clave por debajo de la cual ya no puede aparecer ninguna entrada nueva."""
+    if db.get_bind().dialect.name == "postgresql":
+        # Toda transacción con xid < xmin terminó (confirmada o abortada)
+        result = await db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+        return result.scalar()
+    # SQLite: un único escritor, todo lo visible ya está confirmado
+    return ((await db.execute(select(func.max(BalanceEntry.id)))).scalar() or 0) + 1
+
+
+async def snapshot_balances(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """
+    Consolida la cola de cada usuario/cuenta hasta `fold_watermark`. Las
+    entradas de transacciones aún abiertas quedan en la cola para la próxima
+    pasada. Devuelve los snapshots movidos.
+    """
+    now = now or datetime.utcnow()
+    watermark = await fold_watermark(db)
+
+    tail = await db.execute(
+        _unfolded_entries(BalanceEntry.user_id, BalanceEntry.account, func.sum(BalanceEntry.amount_cents))
+        .where(BALANCE_FOLD_KEY < watermark)
+        .group_by(BalanceEntry.user_id, BalanceEntry.account)
+    )
+    rows = [
+        {"user_id": user_id, "account": account, "balance_cents": cents, "folded_txid": watermark, "updated_at": now}
+        for user_id, account, cents in tail
+    ]
+    upsert = dialect_insert(db)
+    for start in range(0, len(rows), SNAPSHOT_BATCH_SIZE):
+        stmt = upsert(BalanceSnapshot).values(rows[start:start + SNAPSHOT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BalanceSnapshot.user_id, BalanceSnapshot.account],
+            set_={
+                "balance_cents": BalanceSnapshot.balance_cents + stmt.excluded.balance_cents,
+                "folded_txid": stmt.excluded.folded_txid,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await execute_upsert(db, stmt)
+    await db.commit()
+    return len(rows)
@@ -0,0 +1,195 @@
+"""
+Difusiones de un owner a los suscriptores activos de un canal (`broadcasts`).
+
+El endpoint solo encola; el envío recorre los destinatarios en páginas keyset
+por `users.id`, manda cada página en paralelo detrás del límite global del
+`TelegramSender` y confirma cursor + contadores al terminar la página. Si el
+proceso muere, el envío queda en `running` con un `heartbeat_at` viejo y
+`run_pending_broadcasts` (scripts/run_broadcasts.py) lo retoma desde el cursor:
+como mucho se repite la página en curso.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import Broadcast, Plan, Subscription, User
+from infrastructure.external_apis.telegram import BLOCKED, SENT
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+
+PAGE_SIZE = int(os.getenv("BROADCAST_PAGE_SIZE", "200"))
+# Sin latido durante este tiempo, otro proceso puede retomar el envío
+STALE_AFTER = timedelta(seconds=int(os.getenv("BROADCAST_STALE_SECONDS", "120")))
+
+
+class BroadcastTakenOver(Exception):
+    """Otro proceso retomó el envío (nuestro latido se consideró vencido)."""
+
+
+def _recipients(channel_id: int, now: datetime):
+    return (
+        select(User.id, User.telegram_id)
+        .join(Subscription, Subscription.user_id == User.id)
+        .join(Plan, Plan.id == Subscription.plan_id)
+        .where(
+            Plan.channel_id == channel_id,
+            Subscription.is_active.is_(True),
+            Subscription.end_date > now,
+            User.telegram_id.isnot(None),
+        )
+    )
+
+
+async def count_recipients(db: AsyncSession, channel_id: int) -> int:
+    query = _recipients(channel_id, datetime.utcnow()).with_only_columns(func.count(func.distinct(User.id)))
+    return (await db.execute(query)).scalar() or 0
+
+
+async def recipients_page(
+    db: AsyncSession, channel_id: int, after_user_id: int = 0, limit: int = PAGE_SIZE
+) -> List:
+    """Siguiente página de (user_id, telegram_id) con `user_id > after_user_id`."""
+    query = (
+        _recipients(channel_id, datetime.utcnow())
+        .where(User.id > after_user_id)
+        .distinct()
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return (await db.execute(query)).all()
+
+
+async def enqueue_broadcast(db: AsyncSession, owner_id: int, channel_id: int, text: str) -> Broadcast:
+    broadcast = Broadcast(
+        owner_id=owner_id,
+        channel_id=channel_id,
+        text=text,
+        status=STATUS_QUEUED,
+        total=await count_recipients(db, channel_id),
+    )
+    db.add(broadcast)
+    await db.commit()
+    return broadcast
+
+
+async def claim_broadcast(db: AsyncSession, broadcast_id: int) -> Optional[Broadcast]:
+    """Toma el envío si está en cola o si su dueño anterior dejó de latir."""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(Broadcast)
+        .where(
+            Broadcast.id == broadcast_id,
+            or_(
+                Broadcast.status == STATUS_QUEUED,
+                and_(
+                    Broadcast.status == STATUS_RUNNING,
+                    or_(Broadcast.heartbeat_at.is_(None), Broadcast.heartbeat_at < now - STALE_AFTER),
+                ),
+            ),
+        )
+        .values(status=STATUS_RUNNING, heartbeat_at=now, started_at=func.coalesce(Broadcast.started_at, now))
+    )
+    await db.commit()
+    if result.rowcount != 1:
+        return None
+    return (
+        await db.execute(
+            select(Broadcast).where(Broadcast.id == broadcast_id).execution_options(populate_existing=True)
+        )
+    ).scalar_one()
+
+
+async def _checkpoint(db: AsyncSession, broadcast: Broadcast, cursor: int, **values) -> None:
+    # El cursor esperado hace de cerrojo optimista frente a un proceso que retomó el envío
+    result = await db.execute(
+        update(Broadcast)
+        .where(Broadcast.id == broadcast.id, Broadcast.cursor_user_id == cursor)
+        .values(heartbeat_at=datetime.utcnow(), **values)
+    )
+    await db.commit()
+    if result.rowcount != 1:
+        raise BroadcastTakenOver(broadcast.id)
+
+
+async def run_broadcast(db: AsyncSession, broadcast_id: int, sender, page_size: int = PAGE_SIZE) -> Optional[Broadcast]:
+    """Envía (o reanuda) una difusión. None si otro proceso la tiene tomada."""
+    broadcast = await claim_broadcast(db, broadcast_id)
+    if broadcast is None:
+        return None
+
+    cursor = broadcast.cursor_user_id
+    while True:
+        page = await recipients_page(db, broadcast.channel_id, cursor, page_size)
+        if not page:
+            break
+        results = await asyncio.gather(*(sender.send_message(r.telegram_id, broadcast.text) for r in page))
+
+        delivered = sum(1 for status, _ in results if status == SENT)
+        blocked = sum(1 for status, _ in results if status == BLOCKED)
+        failed = len(results) - delivered - blocked
+        errors = [error for status, error in results if status not in (SENT, BLOCKED)]
+        values = dict(
+            cursor_user_id=page[-1].id,
+            delivered=Broadcast.delivered + delivered,
+            blocked=Broadcast.blocked + blocked,
+            failed=Broadcast.failed + failed,
+        )
+        if errors:
+            values["last_error"] = errors[-1][:500]
+        await _checkpoint(db, broadcast, cursor, **values)
+        cursor = page[-1].id
+
+    await _checkpoint(
+        db,
+        broadcast,
+        cursor,
+        status=STATUS_COMPLETED,
+        total=Broadcast.delivered + Broadcast.blocked + Broadcast.failed,
+        finished_at=datetime.utcnow(),
+    )
+    await db.refresh(broadcast)
+    logger.info(
+        f"Difusión {broadcast.id} terminada: {broadcast.delivered} entregados, "
+        f"{broadcast.blocked} bloqueados, {broadcast.failed} fallidos"
+    )
+    return broadcast
+
+
+async def run_pending_broadcasts(session_factory, sender) -> int:
+    """Procesa las difusiones en cola y retoma las abandonadas. Devuelve cuántas terminó."""
+    async with session_factory() as db:
+        ids = (
+            await db.execute(
+                select(Broadcast.id)
+                .where(
+                    or_(
+                        Broadcast.status == STATUS_QUEUED,
+                        and_(
+                            Broadcast.status == STATUS_RUNNING,
+                            Broadcast.heartbeat_at < datetime.utcnow() - STALE_AFTER,
+                        ),
+                    )
+                )
+                .order_by(Broadcast.id)
+            )
+        ).scalars().all()
+
+    finished = 0
+    for broadcast_id in ids:
+        async with session_factory() as db:
+            try:
+                if await run_broadcast(db, broadcast_id, sender) is not None:
+                    finished += 1
+            except BroadcastTakenOver:
+                logger.warning(f"Difusión {broadcast_id} retomada por otro proceso")
+    return finished
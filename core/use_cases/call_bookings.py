@@ -0,0 +1,44 @@
+"""
+Alta de reservas de llamadas (`call_bookings`).
+
+El índice único parcial `ux_call_bookings_owner_start_time` es la guarda final
+contra reservas dobles del mismo horario de un owner: en vez de comprobar y
+luego insertar (dos viajes y una carrera), se inserta y se trata el conflicto.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import CallBooking, CallService
+
+
+async def create_call_booking(
+    db: AsyncSession,
+    service: CallService,
+    start_time: datetime,
+    end_time: Optional[datetime] = None,
+    status: str = "confirmed",
+    booker_id: Optional[int] = None,
+    meeting_link: Optional[str] = None,
+) -> Optional[CallBooking]:
+    """Inserta y confirma la reserva; None si el horario ya estaba ocupado."""
+    booking = CallBooking(
+        service_id=service.id,
+        owner_id=service.owner_id,
+        booker_id=booker_id,
+        start_time=start_time,
+        end_time=end_time or start_time + timedelta(minutes=service.duration_minutes),
+        status=status,
+        meeting_link=meeting_link,
+    )
+    try:
+        # Savepoint: el conflicto no expira el resto de objetos de la sesión
+        async with db.begin_nested():
+            db.add(booking)
+    except IntegrityError:
+        return None
+    await db.commit()
+    return booking
@@ -0,0 +1,276 @@
+"""
+Motor incremental de cohortes y MRR por canal/plan.
+
+El ciclo de vida de la suscripción (alta, extensión, baja) actualiza en la
+misma transacción:
+- `subscription_cohorts`: arrays compactos mes-a-mes por cohorte de inicio.
+- `mrr_movements`: new / expansion / churn por mes.
+Las consultas leen esos arrays, O(meses²), sin tocar `subscriptions`.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import Channel, MrrMovement, Plan, Subscription, SubscriptionCohort
+from core.use_cases.daily_stats import dialect_insert, execute_upsert
+from infrastructure.cache.profile_cache import mark_profile_dirty
+
+MOVEMENT_COLUMNS = ("new_mrr", "expansion_mrr", "churned_mrr", "new_count", "renewals", "churned_count")
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def months_between(start: date, end: date) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def add_months(value: date, months: int) -> date:
+    total = value.year * 12 + value.month - 1 + months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def monthly_value(plan: Plan, price: Optional[float] = None) -> float:
+    """Precio pagado normalizado a un mes de 30 días."""
+    price = plan.price if price is None else price
+    if not plan.duration_days:
+        return price or 0.0
+    return round((price or 0.0) * 30 / plan.duration_days, 6)
+
+
+def _subscription_mrr(sub: Subscription, plan: Plan) -> float:
+    return sub.monthly_value if sub.monthly_value is not None else monthly_value(plan)
+
+
+def _shift(values: List, start: int, end: int, delta) -> List:
+    """Suma `delta` a values[start..end] (inclusive), ampliando el array si hace falta."""
+    values = list(values or [])
+    if end >= len(values):
+        values.extend([0] * (end + 1 - len(values)))
+    for i in range(max(start, 0), end + 1):
+        values[i] = round(values[i] + delta, 6)
+    return values
+
+
+async def _cohort_for_update(db: AsyncSession, channel_id: int, plan_id: int, cohort: date) -> SubscriptionCohort:
+    insert = dialect_insert(db)
+    await execute_upsert(
+        db,
+        insert(SubscriptionCohort)
+        .values(channel_id=channel_id, plan_id=plan_id, cohort_month=cohort, size=0, active_counts=[], active_mrr=[])
+        .on_conflict_do_nothing(),
+    )
+    result = await db.execute(
+        select(SubscriptionCohort)
+        .where(
+            SubscriptionCohort.channel_id == channel_id,
+            SubscriptionCohort.plan_id == plan_id,
+            SubscriptionCohort.cohort_month == cohort,
+        )
+        .with_for_update()
+    )
+    return result.scalar_one()
+
+
+async def _bump_movement(db: AsyncSession, channel_id: int, plan_id: int, month, **deltas):
+    insert = dialect_insert(db)
+    stmt = insert(MrrMovement).values(
+        channel_id=channel_id,
+        plan_id=plan_id,
+        month=month_start(month),
+        **{col: deltas.get(col, 0) for col in MOVEMENT_COLUMNS},
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MrrMovement.channel_id, MrrMovement.plan_id, MrrMovement.month],
+        set_={col: getattr(MrrMovement, col) + stmt.excluded[col] for col in deltas},
+    )
+    await execute_upsert(db, stmt)
+
+
+async def _shift_active_months(db: AsyncSession, sub: Subscription, plan: Plan, first: date, last: date, sign: int):
+    """Marca (sign=1) o desmarca (sign=-1) los meses first..last como activos."""
+    cohort_month = month_start(sub.start_date)
+    start_idx = months_between(cohort_month, month_start(first))
+    end_idx = months_between(cohort_month, month_start(last))
+    if end_idx < start_idx:
+        return
+    cohort = await _cohort_for_update(db, plan.channel_id, plan.id, cohort_month)
+    cohort.active_counts = _shift(cohort.active_counts, start_idx, end_idx, sign)
+    cohort.active_mrr = _shift(cohort.active_mrr, start_idx, end_idx, sign * _subscription_mrr(sub, plan))
+
+
+async def record_subscription_start(db: AsyncSession, sub: Subscription, plan: Plan, expansion: bool = False):
+    """
+    Alta de suscripción. Si el usuario ya tenía otra suscripción activa en el
+    canal, el MRR cuenta como expansión en lugar de nuevo.
+    """
+    mrr = _subscription_mrr(sub, plan)
+    mark_profile_dirty(db, [sub.user_id])
+    cohort = await _cohort_for_update(db, plan.channel_id, plan.id, month_start(sub.start_date))
+    cohort.size += 1
+    await _shift_active_months(db, sub, plan, sub.start_date, sub.end_date, 1)
+
+    if expansion:
+        await _bump_movement(db, plan.channel_id, plan.id, sub.start_date, expansion_mrr=mrr)
+    else:
+        await _bump_movement(db, plan.channel_id, plan.id, sub.start_date, new_mrr=mrr, new_count=1)
+    await _bump_movement(db, plan.channel_id, plan.id, sub.end_date, churned_mrr=mrr, churned_count=1)
+
+
+async def record_subscription_extension(db: AsyncSession, sub: Subscription, plan: Plan, old_end: datetime):
+    """Renovación: extiende los meses activos y mueve el churn al nuevo vencimiento."""
+    mrr = _subscription_mrr(sub, plan)
+    mark_profile_dirty(db, [sub.user_id])
+    if month_start(sub.end_date) > month_start(old_end):
+        await _shift_active_months(db, sub, plan, add_months(month_start(old_end), 1), sub.end_date, 1)
+        await _bump_movement(db, plan.channel_id, plan.id, old_end, churned_mrr=-mrr, churned_count=-1)
+        await _bump_movement(db, plan.channel_id, plan.id, sub.end_date, churned_mrr=mrr, churned_count=1)
+    await _bump_movement(db, plan.channel_id, plan.id, datetime.utcnow(), renewals=1)
+
+
+async def record_subscription_end(db: AsyncSession, sub: Subscription, plan: Plan, ended_at: datetime):
+    """Baja anticipada: los meses posteriores dejan de contar y el churn pasa a `ended_at`."""
+    mrr = _subscription_mrr(sub, plan)
+    mark_profile_dirty(db, [sub.user_id])
+    if month_start(sub.end_date) > month_start(ended_at):
+        await _shift_active_months(db, sub, plan, add_months(month_start(ended_at), 1), sub.end_date, -1)
+        await _bump_movement(db, plan.channel_id, plan.id, sub.end_date, churned_mrr=-mrr, churned_count=-1)
+        await _bump_movement(db, plan.channel_id, plan.id, ended_at, churned_mrr=mrr, churned_count=1)
+
+
+# --- Consultas ---
+
+
+def _scope(query, model, channel_ids: List[int], plan_id: Optional[int]):
+    query = query.where(model.channel_id.in_(channel_ids))
+    if plan_id:
+        query = query.where(model.plan_id == plan_id)
+    return query
+
+
+async def get_cohort_retention(
+    db: AsyncSession, channel_ids: List[int], since: date, until: date, plan_id: Optional[int] = None
+) -> List[Dict]:
+    """Matriz de retención: por cohorte, suscriptores activos en cada mes desde su inicio."""
+    result = await db.execute(
+        _scope(select(SubscriptionCohort), SubscriptionCohort, channel_ids, plan_id).where(
+            SubscriptionCohort.cohort_month >= since,
+            SubscriptionCohort.cohort_month <= until,
+        )
+    )
+    merged = defaultdict(lambda: {"size": 0, "active": []})
+    for row in result.scalars():
+        entry = merged[row.cohort_month]
+        entry["size"] += row.size
+        for k, count in enumerate(row.active_counts or []):
+            entry["active"] = _shift(entry["active"], k, k, count)
+
+    cohorts = []
+    for cohort_month in sorted(merged):
+        entry = merged[cohort_month]
+        # Solo meses ya transcurridos (el resto es proyección de vencimientos)
+        elapsed = months_between(cohort_month, until) + 1
+        active = entry["active"][:elapsed]
+        cohorts.append({
+            "cohort": cohort_month.isoformat(),
+            "size": entry["size"],
+            "active": active,
+            "retention": [round(c / entry["size"], 4) if entry["size"] else 0.0 for c in active],
+        })
+    return cohorts
+
+
+async def get_mrr_series(
+    db: AsyncSession, channel_ids: List[int], since: date, until: date, plan_id: Optional[int] = None
+) -> List[Dict]:
+    """MRR por mes (desde los arrays de cohortes) más sus movimientos, churn y renovación."""
+    months = months_between(since, until) + 1
+    mrr = [0.0] * months
+    active = [0] * months
+
+    cohorts = await db.execute(
+        _scope(
+            select(SubscriptionCohort.cohort_month, SubscriptionCohort.active_counts, SubscriptionCohort.active_mrr),
+            SubscriptionCohort,
+            channel_ids,
+            plan_id,
+        ).where(SubscriptionCohort.cohort_month <= until)
+    )
+    for cohort_month, counts, values in cohorts:
+        offset = months_between(since, cohort_month)
+        for k, value in enumerate(values or []):
+            i = offset + k
+            if 0 <= i < months:
+                mrr[i] += value
+                active[i] += counts[k]
+
+    movements = defaultdict(lambda: dict.fromkeys(MOVEMENT_COLUMNS, 0))
+    result = await db.execute(
+        _scope(select(MrrMovement), MrrMovement, channel_ids, plan_id).where(
+            MrrMovement.month >= since,
+            MrrMovement.month <= until,
+        )
+    )
+    for row in result.scalars():
+        entry = movements[row.month]
+        for col in MOVEMENT_COLUMNS:
+            entry[col] += getattr(row, col)
+
+    series = []
+    for i in range(months):
+        month = add_months(since, i)
+        m = movements[month]
+        opening = active[i - 1] if i > 0 else None
+        decided = m["renewals"] + m["churned_count"]
+        series.append({
+            "month": month.isoformat(),
+            "mrr": round(mrr[i], 2),
+            "active_subscriptions": active[i],
+            "new_mrr": round(m["new_mrr"], 2),
+            "expansion_mrr": round(m["expansion_mrr"], 2),
+            "churned_mrr": round(m["churned_mrr"], 2),
+            "new_subscriptions": m["new_count"],
+            "churned_subscriptions": m["churned_count"],
+            "renewals": m["renewals"],
+            "churn_rate": round(m["churned_count"] / opening, 4) if opening else None,
+            "renewal_rate": round(m["renewals"] / decided, 4) if decided else None,
+        })
+    return series
+
+
+async def rebuild_cohorts(db: AsyncSession, owner_id: Optional[int] = None) -> int:
+    """
+    Reconstruye cohortes y movimientos desde `subscriptions`. El histórico no
+    guarda extensiones, así que renovaciones y expansión empiezan en cero.
+    """
+    now = datetime.utcnow()
+    query = (
+        select(Subscription, Plan)
+        .join(Plan, Subscription.plan_id == Plan.id)
+        .join(Channel, Plan.channel_id == Channel.id)
+        .where(Subscription.start_date.is_not(None), Subscription.end_date.is_not(None))
+        .order_by(Subscription.id)
+    )
+    channel_ids = select(Channel.id)
+    if owner_id:
+        query = query.where(Channel.owner_id == owner_id)
+        channel_ids = channel_ids.where(Channel.owner_id == owner_id)
+
+    await db.execute(delete(SubscriptionCohort).where(SubscriptionCohort.channel_id.in_(channel_ids)))
+    await db.execute(delete(MrrMovement).where(MrrMovement.channel_id.in_(channel_ids)))
+
+    count = 0
+    for sub, plan in (await db.execute(query)).all():
+        if sub.monthly_value is None:
+            sub.monthly_value = monthly_value(plan)
+        await record_subscription_start(db, sub, plan)
+        if not sub.is_active and sub.end_date > now:
+            await record_subscription_end(db, sub, plan, now)
+        count += 1
+    await db.commit()
+    return count
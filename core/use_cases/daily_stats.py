@@ -0,0 +1,266 @@
+"""
+Rollup diario por owner (`owner_daily_stats`).
+
+Las escrituras (pagos, suscripciones, ganancias de red) llaman a
+`bump_daily_stats` dentro de su propia transacción; analytics y el resumen del
+dashboard leen unas pocas filas agregadas en lugar de escanear el histórico.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import bindparam, delete, func, insert as core_insert, inspect, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import (
+    AffiliateEarning,
+    Channel,
+    OwnerDailyStats,
+    Payment,
+    Plan,
+    Subscription,
+)
+
+STAT_COLUMNS = ("revenue", "new_subscribers", "ending_subscribers", "mlm_earnings")
+
+
+_NATIVE_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def dialect_insert(db: AsyncSession):
+    """INSERT con ON CONFLICT del dialecto; en otros motores, `PortableInsert`."""
+    return _NATIVE_INSERTS.get(db.get_bind().dialect.name, PortableInsert)
+
+
+async def execute_upsert(db: AsyncSession, stmt):
+    """Ejecuta lo construido con `dialect_insert` (nativo o portable)."""
+    if isinstance(stmt, PortableInsert):
+        return await stmt.execute(db)
+    return await db.execute(stmt)
+
+
+class _Excluded:
+    """`excluded.col` del fallback: parámetro con el valor de la fila que chocó."""
+
+    def __getitem__(self, col: str):
+        return bindparam(f"excluded_{col}")
+
+    def __getattr__(self, col: str):
+        return self[col]
+
+
+class PortableInsert:
+    """
+    Misma interfaz que el insert de postgresql/sqlite para los usos de este
+    paquete, ejecutada fila a fila: INSERT en un savepoint y, si choca con el
+    índice único, UPDATE por `index_elements` (o nada). Más lento que el upsert
+    nativo, pero correcto en cualquier motor.
+    """
+
+    excluded = _Excluded()
+
+    def __init__(self, entity):
+        self.entity = entity
+        self.rows = []
+        self.index_elements = []
+        self.set_ = None
+        self.returning_cols = ()
+
+    def values(self, *args, **kwargs):
+        self.rows = list(args[0]) if args and isinstance(args[0], list) else [dict(*args, **kwargs)]
+        return self
+
+    def on_conflict_do_nothing(self, index_elements=None):
+        self.index_elements = [c if isinstance(c, str) else c.key for c in index_elements or []]
+        self.set_ = None
+        return self
+
+    def on_conflict_do_update(self, index_elements, set_):
+        self.on_conflict_do_nothing(index_elements)
+        self.set_ = set_
+        return self
+
+    def returning(self, *cols):
+        self.returning_cols = cols
+        return self
+
+    async def execute(self, db: AsyncSession):
+        table = self.entity.__table__
+        update_stmt = None
+        if self.set_:
+            update_stmt = (
+                update(self.entity)
+                .where(*(table.c[col] == bindparam(f"key_{col}") for col in self.index_elements))
+                .values(self.set_)
+                .execution_options(synchronize_session=False)
+            )
+        inserted = []
+        for row in self.rows:
+            try:
+                async with db.begin_nested():
+                    result = await db.execute(core_insert(table).values(**row))
+                inserted.append(tuple(result.inserted_primary_key))
+            except IntegrityError:
+                if update_stmt is not None:
+                    params = {f"excluded_{col}": value for col, value in row.items()}
+                    params.update({f"key_{col}": row[col] for col in self.index_elements})
+                    await db.execute(update_stmt, params)
+        if not self.returning_cols:
+            return None
+        pk = inspect(self.entity).primary_key
+        key = pk[0] if len(pk) == 1 else tuple_(*pk)
+        ids = [p[0] for p in inserted] if len(pk) == 1 else inserted
+        return await db.execute(select(*self.returning_cols).where(key.in_(ids)))
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+async def bump_daily_stats(db: AsyncSession, owner_id: Optional[int], day, **deltas):
+    """Suma `deltas` a la fila (owner_id, day), creándola si no existe."""
+    if not owner_id or not deltas:
+        return
+    insert = dialect_insert(db)
+    stmt = insert(OwnerDailyStats).values(
+        owner_id=owner_id,
+        day=_as_date(day),
+        **{col: deltas.get(col, 0) for col in STAT_COLUMNS},
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OwnerDailyStats.owner_id, OwnerDailyStats.day],
+        set_={col: getattr(OwnerDailyStats, col) + stmt.excluded[col] for col in deltas},
+    )
+    await execute_upsert(db, stmt)
+
+
+async def move_subscription_end(
+    db: AsyncSession, owner_id: Optional[int], old_end: datetime, new_end: datetime
+):
+    """Una extensión o baja cambia el día en que la suscripción deja de contar."""
+    if _as_date(old_end) == _as_date(new_end):
+        return
+    await bump_daily_stats(db, owner_id, old_end, ending_subscribers=-1)
+    await bump_daily_stats(db, owner_id, new_end, ending_subscribers=1)
+
+
+async def get_daily_series(db: AsyncSession, owner_id: int, since: date):
+    result = await db.execute(
+        select(OwnerDailyStats)
+        .where(OwnerDailyStats.owner_id == owner_id, OwnerDailyStats.day >= since)
+        .order_by(OwnerDailyStats.day)
+    )
+    return result.scalars().all()
+
+
+async def get_active_subscribers(db: AsyncSession, owner_id: int) -> int:
+    """
+    Altas menos bajas hasta hoy. Granularidad diaria: una suscripción que
+    vence hoy ya no se cuenta como activa.
+    """
+    today = datetime.utcnow().date()
+    result = await db.execute(
+        select(
+            func.coalesce(func.sum(OwnerDailyStats.new_subscribers), 0),
+            func.coalesce(
+                func.sum(OwnerDailyStats.ending_subscribers).filter(OwnerDailyStats.day <= today),
+                0,
+            ),
+        ).where(OwnerDailyStats.owner_id == owner_id)
+    )
+    started, ended = result.one()
+    return max(int(started) - int(ended), 0)
+
+
+async def rebuild_daily_stats(db: AsyncSession, owner_id: Optional[int] = None) -> int:
+    """Reconstruye el rollup desde payments/subscriptions/affiliate_earnings."""
+    today = datetime.utcnow().date()
+    rows = defaultdict(lambda: dict.fromkeys(STAT_COLUMNS, 0))
+
+    def _scoped(query, column):
+        return query.where(column == owner_id) if owner_id else query
+
+    revenue = await db.execute(
+        _scoped(
+            select(
+                Channel.owner_id,
+                func.date(Payment.created_at),
+                func.sum(Payment.owner_amount),
+            )
+            .join(Plan, Payment.plan_id == Plan.id)
+            .join(Channel, Plan.channel_id == Channel.id)
+            .where(Payment.status == "completed")
+            .group_by(Channel.owner_id, func.date(Payment.created_at)),
+            Channel.owner_id,
+        )
+    )
+    for owner, day, amount in revenue:
+        rows[(owner, _as_date(day))]["revenue"] += amount or 0.0
+
+    started = await db.execute(
+        _scoped(
+            select(Channel.owner_id, func.date(Subscription.start_date), func.count(Subscription.id))
+            .join(Plan, Subscription.plan_id == Plan.id)
+            .join(Channel, Plan.channel_id == Channel.id)
+            .group_by(Channel.owner_id, func.date(Subscription.start_date)),
+            Channel.owner_id,
+        )
+    )
+    for owner, day, count in started:
+        rows[(owner, _as_date(day))]["new_subscribers"] += count
+
+    ending = await db.execute(
+        _scoped(
+            select(
+                Channel.owner_id,
+                func.date(Subscription.end_date),
+                Subscription.is_active,
+                func.count(Subscription.id),
+            )
+            .join(Plan, Subscription.plan_id == Plan.id)
+            .join(Channel, Plan.channel_id == Channel.id)
+            .group_by(Channel.owner_id, func.date(Subscription.end_date), Subscription.is_active),
+            Channel.owner_id,
+        )
+    )
+    for owner, day, is_active, count in ending:
+        day = _as_date(day) if day else today
+        if not is_active and day > today:
+            # Dada de baja antes de vencer: no sabemos cuándo, cuenta desde hoy
+            day = today
+        rows[(owner, day)]["ending_subscribers"] += count
+
+    mlm = await db.execute(
+        _scoped(
+            select(
+                AffiliateEarning.affiliate_id,
+                func.date(AffiliateEarning.created_at),
+                func.sum(AffiliateEarning.amount),
+            ).group_by(AffiliateEarning.affiliate_id, func.date(AffiliateEarning.created_at)),
+            AffiliateEarning.affiliate_id,
+        )
+    )
+    for affiliate, day, amount in mlm:
+        rows[(affiliate, _as_date(day))]["mlm_earnings"] += amount or 0.0
+
+    await db.execute(_scoped(delete(OwnerDailyStats), OwnerDailyStats.owner_id))
+    values = [
+        {"owner_id": owner, "day": day, **stats}
+        for (owner, day), stats in rows.items()
+        if owner is not None
+    ]
+    for i in range(0, len(values), 1000):
+        await db.execute(core_insert(OwnerDailyStats), values[i:i + 1000])
+    await db.commit()
+    return len(values)
+
+
+def since_days(days: int) -> date:
+    return datetime.utcnow().date() - timedelta(days=days)
@@ -1,8 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func
-from core.entities import User, Payment, Channel, Plan, SystemConfig, AffiliateEarning, AffiliateRank
+from core.entities import User, Payment, PaymentProviderTx, Channel, Plan, SystemConfig, AffiliateEarning, AffiliateRank
 from infrastructure.external_apis.telegram import send_telegram_notification
+from core.use_cases.daily_stats import bump_daily_stats
+from core.use_cases.tax import bump_platform_revenue
+from core.use_cases.affiliate_stats import record_affiliate_earnings
+from core.use_cases.balances import (
+    ACCOUNT_AFFILIATE,
+    ACCOUNT_MAIN,
+    balance_entry,
+    post_entries,
+)
 from datetime import datetime
 
 
@@ -89,41 +98,20 @@ async def distribute_payment_funds(
 
     current_referrer_id = owner.referred_by_id if owner else None
 
-    # Cache ranks to avoid fetching in loop
-    ranks_res = await db.execute(select(AffiliateRank).order_by(AffiliateRank.min_referrals.desc()))
-    all_ranks = ranks_res.scalars().all()
-
-    async def _get_rank_depth(user_id: int) -> int:
-        # Count direct referrals
-        res = await db.execute(select(func.count(User.id)).where(User.referred_by_id == user_id))
-        count = res.scalar() or 0
-        
-        # Determine Rank
-        for rank in all_ranks:
-            if count >= rank.min_referrals:
-                return rank.max_depth
-        return 1 # Default (Bronze-ish) usually level 1
-
     for level in range(1, 11):
         if not current_referrer_id:
             break
 
-        # Check if Referrer qualifies for this level
-        referrer_depth = await _get_rank_depth(current_referrer_id)
-        
-        if level > referrer_depth:
-            # User NOT qualified for this level. 
-            # Money stays with platform (Breakage).
-            # We must still move up the chain!
-            
-            # ... but first we simply SKIP this payment
-            # Fetch next referrer and continue
-            ref_result = await db.execute(select(User).where(User.id == current_referrer_id))
-            referrer_user = ref_result.scalar_one_or_none()
-            if referrer_user:
-                current_referrer_id = referrer_user.referred_by_id
-            else:
-                current_referrer_id = None
+        # Rango/profundidad ya desnormalizados en la fila (core.use_cases.referrals)
+        ref_result = await db.execute(select(User).where(User.id == current_referrer_id))
+        referrer_user = ref_result.scalar_one_or_none()
+        if not referrer_user:
+            break
+
+        if level > referrer_user.max_depth:
+            # No califica para este nivel: el monto queda en la plataforma
+            # (breakage) y se sigue subiendo por la cadena.
+            current_referrer_id = referrer_user.referred_by_id
             continue
 
         # Obtener porcentaje para este nivel
@@ -149,29 +137,20 @@ async def distribute_payment_funds(
             }
         )
 
-        # Subir un nivel en la cadena
-        ref_result = await db.execute(
-            select(User).where(User.id == current_referrer_id)
-        )
-        referrer_user = ref_result.scalar_one_or_none()
-
-        if referrer_user:
-            # Sumar al balance del afiliado inmediatamente (siempre en USD)
-            referrer_user.affiliate_balance += level_amount
+        # El abono al balance del afiliado se registra en el diario (paso 6)
 
-            # Notificar vía Telegram si tiene telegram_id vinculado
-            if referrer_user.telegram_id:
-                level_name = LEVEL_NAMES.get(level, f"Nivel {level}")
-                notif_msg = (
-                    f"💰 *¡Comisión de Red Recibida!*\n\n"
-                    f"Has ganado **${level_amount:.2f} USD** por una compra en tu **{level_name}**.\n"
-                    f"Tu balance de afiliado ha sido actualizado."
-                )
-                await send_telegram_notification(referrer_user.telegram_id, notif_msg)
+        # Notificar vía Telegram si tiene telegram_id vinculado
+        if referrer_user.telegram_id:
+            level_name = LEVEL_NAMES.get(level, f"Nivel {level}")
+            notif_msg = (
+                f"💰 *¡Comisión de Red Recibida!*\n\n"
+                f"Has ganado **${level_amount:.2f} USD** por una compra en tu **{level_name}**.\n"
+                f"Tu balance de afiliado ha sido actualizado."
+            )
+            await send_telegram_notification(referrer_user.telegram_id, notif_msg)
 
-            current_referrer_id = referrer_user.referred_by_id
-        else:
-            current_referrer_id = None
+        # Subir un nivel en la cadena
+        current_referrer_id = referrer_user.referred_by_id
 
     # Lo que le queda neto a la plataforma (Plataforma - Total Afiliados)
     platform_net_amount = total_commission_pool - total_affiliate_distributed
@@ -194,6 +173,9 @@ async def distribute_payment_funds(
     )
     db.add(payment)
     await db.flush()  # Para obtener el payment.id
+    if provider_tx_id:
+        # Duplicado -> IntegrityError, como el antiguo índice único
+        db.add(PaymentProviderTx(provider_tx_id=provider_tx_id, payment_id=payment.id, created_at=payment.created_at))
 
     # 5. Registrar cada ganancia individual de los niveles
     for earn_data in affiliate_earnings_list:
@@ -206,43 +188,46 @@ async def distribute_payment_funds(
             )
         )
 
-    # 6. Actualizar Balance del Dueño
+    # Acumulados por afiliado/nivel y contadores globales (misma transacción)
+    await record_affiliate_earnings(db, affiliate_earnings_list, payment.created_at)
+
+    # 6. Abonos en el diario de saldos: solo INSERT, sin bloquear filas de usuario
+    entries = [
+        balance_entry(
+            earn_data["affiliate_id"], ACCOUNT_AFFILIATE, earn_data["amount"], "commission", payment_id=payment.id
+        )
+        for earn_data in affiliate_earnings_list
+    ]
     if owner:
-        owner.balance += owner_amount
+        entries.append(balance_entry(owner.id, ACCOUNT_MAIN, owner_amount, "sale", payment_id=payment.id))
+    await post_entries(db, entries)
+
+    # 7. Rollups diario y mensual de plataforma (misma transacción)
+    await bump_daily_stats(db, owner_id, payment.created_at, revenue=owner_amount)
+    await bump_platform_revenue(db, payment.created_at, payment.platform_amount)
+    for earn_data in affiliate_earnings_list:
+        await bump_daily_stats(
+            db, earn_data["affiliate_id"], payment.created_at, mlm_earnings=earn_data["amount"]
+        )
 
     await db.commit()
     return payment
 
 
 async def get_affiliate_tier_info(db: AsyncSession, user_id: int):
-    # Nota: Esta función podría quedarse para el "Rango Visual" del usuario,
-    # aunque ahora la lógica sea multinivel de profundidad.
+    """Rango visual: contador y rango desnormalizados + el siguiente objetivo."""
     result = await db.execute(
-        select(func.count(User.id)).where(User.referred_by_id == user_id)
+        select(User.direct_referral_count, AffiliateRank.name)
+        .outerjoin(AffiliateRank, AffiliateRank.id == User.rank_id)
+        .where(User.id == user_id)
     )
-    referral_count = result.scalar() or 0
+    row = result.one_or_none()
+    referral_count = row.direct_referral_count if row else 0
+    current_tier = (row.name if row else None) or "Bronce"  # Default fallback
+
+    next_res = await db.execute(
+        select(func.min(AffiliateRank.min_referrals)).where(AffiliateRank.min_referrals > referral_count)
+    )
+    next_goal = next_res.scalar()
 
-    # Dynamic Rank Logic
-    # from .models import AffiliateRank -> core imports
-    
-    # Get all ranks sorted by difficulty (descending)
-    ranks_res = await db.execute(select(AffiliateRank).order_by(AffiliateRank.min_referrals.desc()))
-    ranks = ranks_res.scalars().all()
-    
-    current_tier = "Bronce" # Default fallback
-    next_goal = None
-    
-    # Find current rank
-    for rank in ranks:
-        if referral_count >= rank.min_referrals:
-            current_tier = rank.name
-            break
-            
-    # Find next goal (first rank required > current count)
-    # We iterate reversed (Ascending) to find the next immediate step
-    for rank in reversed(ranks):
-        if rank.min_referrals > referral_count:
-            next_goal = rank.min_referrals
-            break
-            
     return {"tier": current_tier, "count": referral_count, "next_min": next_goal}
@@ -0,0 +1,100 @@
+"""
+Exportación masiva de pagos, ganancias de red, suscripciones y retiros.
+
+Las filas se leen con cursor del servidor (`yield_per`) en tramos de fechas de
+`EXPORT_CHUNK_DAYS`, ordenadas por (fecha, id): cada tramo es una consulta
+corta y una descarga cortada se reanuda con `date_from` = fecha de la última
+fila recibida y `after_id` = su id.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import AffiliateEarning, Channel, Payment, Plan, Subscription, User, Withdrawal
+
+EXPORT_CHUNK_DAYS = int(os.getenv("EXPORT_CHUNK_DAYS", "31"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+# dataset -> (modelo, columna de fecha)
+EXPORT_DATASETS = {
+    "payments": (Payment, Payment.created_at),
+    "affiliate_earnings": (AffiliateEarning, AffiliateEarning.created_at),
+    "subscriptions": (Subscription, Subscription.start_date),
+    "withdrawals": (Withdrawal, Withdrawal.created_at),
+}
+
+
+# Columnas que ve un owner (el admin ve todas): ni el reparto de plataforma y
+# afiliados ni la identidad del pagador o del proveedor
+OWNER_EXPORT_COLUMNS = {
+    "payments": ("id", "plan_id", "amount", "currency", "payment_method", "status", "owner_amount", "created_at"),
+    "affiliate_earnings": ("id", "affiliate_id", "level", "amount", "created_at"),
+    "subscriptions": ("id", "plan_id", "start_date", "end_date", "is_active", "is_trial", "monthly_value"),
+    "withdrawals": (
+        "id", "owner_id", "amount", "fee_applied", "status", "method", "details", "is_express", "created_at",
+    ),
+}
+
+
+def export_columns(dataset: str, user: User) -> List:
+    model, _ = EXPORT_DATASETS[dataset]
+    columns = model.__table__.columns
+    if user.is_admin:
+        return list(columns)
+    return [columns[name] for name in OWNER_EXPORT_COLUMNS[dataset]]
+
+
+def scope_export(query, dataset: str, user: User):
+    """Admin ve todo; un owner, lo de sus canales y sus propias ganancias/retiros."""
+    if user.is_admin:
+        return query
+    if dataset in ("payments", "subscriptions"):
+        model, _ = EXPORT_DATASETS[dataset]
+        owned_plans = (
+            select(Plan.id)
+            .join(Channel, Plan.channel_id == Channel.id)
+            .where(Channel.owner_id == user.id)
+        )
+        return query.where(model.plan_id.in_(owned_plans))
+    if dataset == "affiliate_earnings":
+        return query.where(AffiliateEarning.affiliate_id == user.id)
+    return query.where(Withdrawal.owner_id == user.id)
+
+
+async def first_export_date(db: AsyncSession, dataset: str, user: User) -> Optional[datetime]:
+    _, date_column = EXPORT_DATASETS[dataset]
+    result = await db.execute(scope_export(select(func.min(date_column)), dataset, user))
+    return result.scalar()
+
+
+async def iter_export_batches(
+    db: AsyncSession,
+    dataset: str,
+    user: User,
+    date_from: datetime,
+    date_to: datetime,
+    after_id: Optional[int] = None,
+) -> AsyncIterator[Sequence[tuple]]:
+    """Lotes de hasta `EXPORT_BATCH_SIZE` tuplas (columnas de `export_columns`)."""
+    model, date_column = EXPORT_DATASETS[dataset]
+    columns = export_columns(dataset, user)
+
+    chunk_start = date_from
+    while chunk_start < date_to:
+        chunk_end = min(chunk_start + timedelta(days=EXPORT_CHUNK_DAYS), date_to)
+        query = scope_export(select(*columns), dataset, user).where(
+            date_column >= chunk_start, date_column < chunk_end
+        )
+        if after_id is not None and chunk_start == date_from:
+            query = query.where(or_(date_column > date_from, model.id > after_id))
+
+        result = await db.stream(
+            query.order_by(date_column, model.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for batch in result.partitions():
+            yield batch
+        chunk_start = chunk_end
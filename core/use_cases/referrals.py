@@ -0,0 +1,136 @@
+"""
+Contadores de red desnormalizados en `users`.
+
+`direct_referral_count`, `rank_id` y `max_depth` se mantienen de forma
+incremental al vincular, re-vincular o eliminar referidos (un UPDATE atómico
+sobre el patrocinador, en la misma transacción). Al editar `/admin/ranks` se
+lanza `recompute_ranks`, que recalcula rango y profundidad por lotes de ids.
+"""
+
+import os
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import AffiliateRank, User
+from core.use_cases.affiliate_stats import ACTIVE_RECRUITERS, bump_platform_counters, set_platform_counter
+from infrastructure.cache.profile_cache import mark_profile_dirty, profile_cache
+
+DEFAULT_MAX_DEPTH = 1  # Sin rango alcanzado: solo comisiones de nivel 1
+RECOMPUTE_BATCH_SIZE = int(os.getenv("REFERRAL_RECOMPUTE_BATCH_SIZE", "1000"))
+
+
+def rank_values(count):
+    """Columnas rank_id/max_depth para un número de referidos (expresión SQL)."""
+    best_rank = (
+        select(AffiliateRank.id, AffiliateRank.max_depth)
+        .where(AffiliateRank.min_referrals <= count)
+        .order_by(AffiliateRank.min_referrals.desc())
+        .limit(1)
+    )
+    return {
+        "rank_id": best_rank.with_only_columns(AffiliateRank.id).scalar_subquery(),
+        "max_depth": func.coalesce(
+            best_rank.with_only_columns(AffiliateRank.max_depth).scalar_subquery(),
+            DEFAULT_MAX_DEPTH,
+        ),
+    }
+
+
+async def change_referral_count(db: AsyncSession, user_id: Optional[int], delta: int):
+    """Suma `delta` a los referidos directos de `user_id` y ajusta su rango. No confirma."""
+    if not user_id or not delta:
+        return
+    new_count = User.direct_referral_count + delta
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(direct_referral_count=new_count, **rank_values(new_count))
+        .returning(User.direct_referral_count)
+        .execution_options(synchronize_session="fetch")
+    )
+    count = result.scalar()
+    if count is None:
+        return
+    mark_profile_dirty(db, [user_id])
+    # Reclutadores activos: usuarios con al menos un referido directo
+    await bump_platform_counters(db, {ACTIVE_RECRUITERS: int(count > 0) - int(count - delta > 0)})
+
+
+async def attach_referral(db: AsyncSession, user: User, referrer_id: Optional[int]):
+    """Vincula (o re-vincula) `user` bajo `referrer_id`. No confirma."""
+    previous_id = user.referred_by_id
+    if previous_id == referrer_id:
+        return
+    user.referred_by_id = referrer_id
+    await change_referral_count(db, previous_id, -1)
+    await change_referral_count(db, referrer_id, 1)
+
+
+async def detach_user(db: AsyncSession, user: User):
+    """
+    Prepara el borrado de `user`: sus referidos directos pasan a su
+    patrocinador y los contadores se ajustan. No confirma.
+    """
+    children = (
+        await db.execute(
+            update(User)
+            .where(User.referred_by_id == user.id)
+            .values(referred_by_id=user.referred_by_id)
+            .returning(User.id)
+            .execution_options(synchronize_session="fetch")
+        )
+    ).all()
+    parent_delta = (len(children) if user.referred_by_id else 0) - 1
+    await change_referral_count(db, user.referred_by_id, parent_delta)
+    # El propio usuario deja de contar como reclutador activo
+    if user.direct_referral_count > 0:
+        await bump_platform_counters(db, {ACTIVE_RECRUITERS: -1})
+
+
+async def recompute_ranks(db: AsyncSession, batch_size: int = RECOMPUTE_BATCH_SIZE) -> int:
+    """Recalcula rank_id/max_depth desde el contador, por lotes de ids. Confirma cada lote."""
+    return await _recompute(db, batch_size, recount=False)
+
+
+async def recompute_referral_stats(db: AsyncSession, batch_size: int = RECOMPUTE_BATCH_SIZE) -> int:
+    """Recuenta referidos directos y rango de todos los usuarios (reparación)."""
+    return await _recompute(db, batch_size, recount=True)
+
+
+async def _recompute(db: AsyncSession, batch_size: int, recount: bool) -> int:
+    last_id = (await db.execute(select(func.max(User.id)))).scalar()
+    if last_id is None:
+        return 0
+
+    Referral = User.__table__.alias("referral")
+    count = User.direct_referral_count
+    if recount:
+        count = (
+            select(func.count(Referral.c.id))
+            .where(Referral.c.referred_by_id == User.id)
+            .scalar_subquery()
+        )
+    values = rank_values(count)
+    if recount:
+        values["direct_referral_count"] = count
+
+    updated = 0
+    for start in range(0, last_id + 1, batch_size):
+        result = await db.execute(
+            update(User)
+            .where(User.id >= start, User.id < start + batch_size)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        updated += result.rowcount or 0
+
+    if recount:
+        recruiters = await db.execute(select(func.count(User.id)).where(User.direct_referral_count > 0))
+        await set_platform_counter(db, ACTIVE_RECRUITERS, recruiters.scalar() or 0)
+        await db.commit()
+    # El rango mostrado en /me puede haber cambiado para cualquiera
+    await profile_cache.invalidate_all()
+    return updated
@@ -0,0 +1,219 @@
+"""
+Recordatorios de renovación antes de `end_date` (7, 3 y 1 días antes).
+
+Cada ventana es un balde de la rueda de tiempos: en cada pasada se piden las
+suscripciones cuyo vencimiento cae en `(now + d - CATCHUP, now + d]` con una
+consulta por rango sobre `ix_subscriptions_is_active_end_date`, paginada por
+(end_date, id). Una pasada perdida se recupera mientras no pase `CATCHUP`.
+
+Antes de enviar, la página se reclama en `renewal_reminders` con INSERT ... ON
+CONFLICT DO NOTHING: solo la réplica que insertó la fila envía. Las filas
+`failed` y las `pending` reclamadas hace más de STALE_CLAIM (proceso caído
+entre el reclamo y el envío) se vuelven a reclamar con un UPDATE condicional
+en las pasadas siguientes de la ventana, hasta MAX_ATTEMPTS intentos.
+
+Es al menos una vez: si el proceso muere después de enviar y antes de marcar
+`sent`, el recordatorio se repite tras STALE_CLAIM.
+"""
+
+import asyncio
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, exists, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import Channel, Plan, RenewalReminder, Subscription, User
+from core.use_cases.auth import AuthService
+from core.use_cases.daily_stats import dialect_insert, execute_upsert
+from infrastructure.external_apis.telegram import BLOCKED, FAILED, SENT
+
+logger = logging.getLogger(__name__)
+
+REMINDER_OFFSETS = (7, 3, 1)
+CATCHUP = timedelta(hours=int(os.getenv("REMINDER_CATCHUP_HOURS", "12")))
+BATCH_SIZE = 200
+# Un `pending` más viejo que esto es de un proceso que murió antes de enviar
+STALE_CLAIM = timedelta(minutes=int(os.getenv("REMINDER_STALE_MINUTES", "15")))
+MAX_ATTEMPTS = 3
+API_URL = os.getenv("API_URL", "http://localhost:8000").rstrip("/")
+
+
+def reminder_window(offset_days: int, now: datetime):
+    end = now + timedelta(days=offset_days)
+    return end - CATCHUP, end
+
+
+def retryable(cutoff: datetime):
+    """Recordatorio reclamado que se puede volver a intentar."""
+    return and_(
+        RenewalReminder.attempts < MAX_ATTEMPTS,
+        or_(
+            RenewalReminder.status == FAILED,
+            and_(RenewalReminder.status == "pending", RenewalReminder.claimed_at < cutoff),
+        ),
+    )
+
+
+def renewal_link(user_id: int, plan_id: int, end_date: datetime) -> str:
+    """Link firmado que abre el checkout del mismo plan (válido hasta 2 días tras vencer)."""
+    token = AuthService.create_access_token(
+        {"sub": str(user_id), "plan_id": plan_id, "type": "renewal"},
+        expires_delta=end_date + timedelta(days=2) - datetime.utcnow(),
+    )
+    return f"{API_URL}/payments/renew/{token}"
+
+
+def reminder_text(channel_title: str, plan_name: str, end_date: datetime, now: datetime) -> str:
+    days = max(1, math.ceil((end_date - now).total_seconds() / 86400))
+    when = "mañana" if days == 1 else f"en {days} días"
+    return (
+        f"⏰ Tu suscripción a {channel_title} ({plan_name}) vence {when}, "
+        f"el {end_date:%d/%m/%Y}.\n\nRenueva para no perder el acceso."
+    )
+
+
+async def due_reminders(
+    db: AsyncSession,
+    offset_days: int,
+    now: datetime,
+    after: Optional[tuple] = None,
+    limit: int = BATCH_SIZE,
+) -> List:
+    """Página del balde `offset_days` sin recordatorio previo (o reintentable), por (end_date, id)."""
+    start, end = reminder_window(offset_days, now)
+    already_sent = exists().where(
+        RenewalReminder.subscription_id == Subscription.id,
+        RenewalReminder.offset_days == offset_days,
+        RenewalReminder.end_date == Subscription.end_date,
+        ~retryable(datetime.utcnow() - STALE_CLAIM),
+    )
+    query = (
+        select(
+            Subscription.id,
+            Subscription.user_id,
+            Subscription.plan_id,
+            Subscription.end_date,
+            User.telegram_id,
+            Plan.name.label("plan_name"),
+            Channel.title.label("channel_title"),
+        )
+        .join(User, User.id == Subscription.user_id)
+        .join(Plan, Plan.id == Subscription.plan_id)
+        .join(Channel, Channel.id == Plan.channel_id)
+        .where(
+            Subscription.is_active.is_(True),
+            Subscription.end_date > start,
+            Subscription.end_date <= end,
+            User.telegram_id.isnot(None),
+            ~already_sent,
+        )
+        .order_by(Subscription.end_date, Subscription.id)
+        .limit(limit)
+    )
+    if after is not None:
+        after_end, after_id = after
+        query = query.where(
+            or_(
+                Subscription.end_date > after_end,
+                and_(Subscription.end_date == after_end, Subscription.id > after_id),
+            )
+        )
+    return (await db.execute(query)).all()
+
+
+async def claim_reminders(db: AsyncSession, offset_days: int, rows) -> Dict[int, int]:
+    """
+    Reclama la página; devuelve {subscription_id: reminder_id} de lo que ganó
+    esta réplica. Filas nuevas por INSERT; reintentos por UPDATE condicional
+    (solo una réplica ve la condición todavía cierta).
+    """
+    if not rows:
+        return {}
+    insert = dialect_insert(db)
+    now = datetime.utcnow()
+    stmt = (
+        insert(RenewalReminder)
+        .values([
+            {
+                "subscription_id": r.id,
+                "user_id": r.user_id,
+                "offset_days": offset_days,
+                "end_date": r.end_date,
+                "status": "pending",
+                "attempts": 1,
+                "created_at": now,
+                "claimed_at": now,
+            }
+            for r in rows
+        ])
+        .on_conflict_do_nothing(index_elements=["subscription_id", "offset_days", "end_date"])
+        .returning(RenewalReminder.subscription_id, RenewalReminder.id)
+    )
+    claimed = dict((await execute_upsert(db, stmt)).all())
+
+    retries = [(r.id, r.end_date) for r in rows if r.id not in claimed]
+    if retries:
+        result = await db.execute(
+            update(RenewalReminder)
+            .where(
+                tuple_(RenewalReminder.subscription_id, RenewalReminder.end_date).in_(retries),
+                RenewalReminder.offset_days == offset_days,
+                retryable(now - STALE_CLAIM),
+            )
+            .values(status="pending", attempts=RenewalReminder.attempts + 1, claimed_at=now)
+            .returning(RenewalReminder.subscription_id, RenewalReminder.id)
+        )
+        claimed.update(result.all())
+    await db.commit()
+    return claimed
+
+
+async def _send(sender, row, now: datetime):
+    try:
+        link = renewal_link(row.user_id, row.plan_id, row.end_date)
+        markup = {"inline_keyboard": [[{"text": "🔄 Renovar ahora", "url": link}]]}
+        text = reminder_text(row.channel_title, row.plan_name, row.end_date, now)
+        return await sender.send_message(row.telegram_id, text, reply_markup=markup)
+    except Exception as e:
+        logger.error(f"Recordatorio de la suscripción {row.id} no enviado: {e}")
+        return FAILED, str(e)
+
+
+async def send_reminder_bucket(db: AsyncSession, offset_days: int, sender, now: Optional[datetime] = None) -> Dict[str, int]:
+    now = now or datetime.utcnow()
+    counts = {SENT: 0, BLOCKED: 0, FAILED: 0, "skipped": 0}
+    after = None
+    while True:
+        rows = await due_reminders(db, offset_days, now, after)
+        if not rows:
+            break
+        after = (rows[-1].end_date, rows[-1].id)
+
+        claimed = await claim_reminders(db, offset_days, rows)
+        mine = [r for r in rows if r.id in claimed]
+        counts["skipped"] += len(rows) - len(mine)
+        results = await asyncio.gather(*(_send(sender, r, now) for r in mine))
+
+        by_status: Dict[str, List[int]] = {}
+        for row, (status, _) in zip(mine, results):
+            status = status if status in (SENT, BLOCKED) else FAILED
+            by_status.setdefault(status, []).append(claimed[row.id])
+        for status, ids in by_status.items():
+            await db.execute(
+                update(RenewalReminder)
+                .where(RenewalReminder.id.in_(ids))
+                .values(status=status, sent_at=datetime.utcnow())
+            )
+            counts[status] += len(ids)
+        await db.commit()
+    return counts
+
+
+async def send_renewal_reminders(db: AsyncSession, sender, now: Optional[datetime] = None) -> Dict[int, Dict[str, int]]:
+    """Una pasada del programador por todas las ventanas."""
+    now = now or datetime.utcnow()
+    return {offset: await send_reminder_bucket(db, offset, sender, now) for offset in REMINDER_OFFSETS}
@@ -0,0 +1,285 @@
+"""
+Resumen fiscal del admin con agregados SQL.
+
+- Ingresos: rollup mensual `platform_monthly_revenue`, sumado por
+  `bump_platform_revenue` en la misma transacción que completa cada pago. El
+  resumen solo lee (sesión de réplica); `scripts/rebuild_platform_revenue.py`
+  lo rellena con un GROUP BY sobre `payments` (primer despliegue o
+  correcciones). Un mes se muestra cerrado cuando han pasado
+  `TAX_MONTH_CLOSE_GRACE_DAYS` desde su fin.
+- Gastos: GROUP BY año/categoría directamente sobre `business_expenses`.
+"""
+
+import csv
+import io
+import os
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import delete, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import BusinessExpense, Payment, PlatformMonthlyRevenue
+from core.use_cases.cohorts import add_months, month_start
+from core.use_cases.daily_stats import dialect_insert, execute_upsert
+
+CLOSE_GRACE_DAYS = int(os.getenv("TAX_MONTH_CLOSE_GRACE_DAYS", "7"))
+EXPORT_BATCH_SIZE = int(os.getenv("TAX_EXPORT_BATCH_SIZE", "1000"))
+
+CSV_HEADER = ("tipo", "fecha", "referencia", "categoria", "descripcion", "moneda", "monto")
+
+
+def _year_range(year: int):
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def _is_closed(month: date, now: datetime) -> bool:
+    month_end = add_months(month, 1)
+    return datetime(month_end.year, month_end.month, 1) + timedelta(days=CLOSE_GRACE_DAYS) <= now
+
+
+async def bump_platform_revenue(db: AsyncSession, created_at: datetime, platform_amount: Optional[float]):
+    """Suma un pago completado a su mes. No confirma la transacción."""
+    insert = dialect_insert(db)
+    stmt = insert(PlatformMonthlyRevenue).values(
+        month=month_start(created_at),
+        gross_revenue=platform_amount or 0.0,
+        payments_count=1,
+        closed=False,
+        computed_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PlatformMonthlyRevenue.month],
+        set_={
+            "gross_revenue": PlatformMonthlyRevenue.gross_revenue + stmt.excluded.gross_revenue,
+            "payments_count": PlatformMonthlyRevenue.payments_count + 1,
+            "computed_at": stmt.excluded.computed_at,
+        },
+    )
+    await execute_upsert(db, stmt)
+
+
+async def refresh_platform_revenue(db: AsyncSession, start: date, end: date, now: Optional[datetime] = None):
+    """
+    Recalcula los meses no cerrados de [start, end) con un único GROUP BY sobre
+    `payments` (índice status, created_at). No confirma la transacción.
+    """
+    now = now or datetime.utcnow()
+    end = min(end, add_months(month_start(now), 1))
+    if start >= end:
+        return
+
+    closed = set(
+        (
+            await db.execute(
+                select(PlatformMonthlyRevenue.month).where(
+                    PlatformMonthlyRevenue.month >= start,
+                    PlatformMonthlyRevenue.month < end,
+                    PlatformMonthlyRevenue.closed,
+                )
+            )
+        ).scalars()
+    )
+    pending = []
+    month = start
+    while month < end:
+        if month not in closed:
+            pending.append(month)
+        month = add_months(month, 1)
+    if not pending:
+        return
+
+    year_col = extract("year", Payment.created_at)
+    month_col = extract("month", Payment.created_at)
+    result = await db.execute(
+        select(
+            year_col,
+            month_col,
+            func.coalesce(func.sum(Payment.platform_amount), 0.0),
+            func.count(Payment.id),
+        )
+        .where(
+            Payment.status == "completed",
+            Payment.created_at >= pending[0],
+            Payment.created_at < add_months(pending[-1], 1),
+        )
+        .group_by(year_col, month_col)
+    )
+    totals = {date(int(y), int(m), 1): (float(revenue), count) for y, m, revenue, count in result}
+
+    insert = dialect_insert(db)
+    stmt = insert(PlatformMonthlyRevenue).values([
+        {
+            "month": month,
+            "gross_revenue": totals.get(month, (0.0, 0))[0],
+            "payments_count": totals.get(month, (0.0, 0))[1],
+            "closed": _is_closed(month, now),
+            "computed_at": now,
+        }
+        for month in pending
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PlatformMonthlyRevenue.month],
+        set_={
+            col: stmt.excluded[col]
+            for col in ("gross_revenue", "payments_count", "closed", "computed_at")
+        },
+    )
+    await execute_upsert(db, stmt)
+
+
+async def rebuild_platform_revenue(db: AsyncSession, year: Optional[int] = None) -> int:
+    """
+    Reabre y recalcula los meses de `year` (o todo el histórico), p. ej. tras
+    corregir pagos de un mes ya cerrado. Devuelve los meses recalculados.
+    """
+    if year:
+        start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    else:
+        first_payment = (
+            await db.execute(select(func.min(Payment.created_at)).where(Payment.status == "completed"))
+        ).scalar()
+        if first_payment is None:
+            return 0
+        start, end = month_start(first_payment), add_months(month_start(datetime.utcnow()), 1)
+
+    await db.execute(
+        delete(PlatformMonthlyRevenue).where(
+            PlatformMonthlyRevenue.month >= start, PlatformMonthlyRevenue.month < end
+        )
+    )
+    await refresh_platform_revenue(db, start, end)
+    await db.commit()
+    return len(
+        (
+            await db.execute(
+                select(PlatformMonthlyRevenue.month).where(
+                    PlatformMonthlyRevenue.month >= start, PlatformMonthlyRevenue.month < end
+                )
+            )
+        ).all()
+    )
+
+
+async def get_tax_years(
+    db: AsyncSession, user_id: int, years: List[int], now: Optional[datetime] = None
+) -> Dict[int, dict]:
+    """Ingresos (rollup mensual), gastos por categoría y neto para cada año. Solo lee."""
+    now = now or datetime.utcnow()
+    first, last = min(years), max(years)
+    start, end = date(first, 1, 1), date(last + 1, 1, 1)
+
+    summary = {
+        year: {
+            "year": year,
+            "gross_revenue": 0.0,
+            "total_expenses": 0.0,
+            "net_income": 0.0,
+            "expenses_by_category": {},
+            "monthly_revenue": [],
+        }
+        for year in years
+    }
+
+    revenue = await db.execute(
+        select(
+            PlatformMonthlyRevenue.month,
+            PlatformMonthlyRevenue.gross_revenue,
+            PlatformMonthlyRevenue.payments_count,
+        )
+        .where(PlatformMonthlyRevenue.month >= start, PlatformMonthlyRevenue.month < end)
+    )
+    by_month = {row.month: (row.gross_revenue, row.payments_count) for row in revenue}
+    # Hasta el mes en curso; los meses sin pagos no tienen fila
+    month, last_month = start, min(end, add_months(month_start(now), 1))
+    while month < last_month:
+        if month.year in summary:
+            gross, count = by_month.get(month, (0.0, 0))
+            entry = summary[month.year]
+            entry["gross_revenue"] += gross
+            entry["monthly_revenue"].append({
+                "month": month.isoformat(),
+                "gross_revenue": round(gross, 2),
+                "payments_count": count,
+                "closed": _is_closed(month, now),
+            })
+        month = add_months(month, 1)
+
+    year_col = extract("year", BusinessExpense.date)
+    expenses = await db.execute(
+        select(year_col, BusinessExpense.category, func.sum(BusinessExpense.amount))
+        .where(
+            BusinessExpense.user_id == user_id,
+            BusinessExpense.date >= datetime(first, 1, 1),
+            BusinessExpense.date < datetime(last + 1, 1, 1),
+        )
+        .group_by(year_col, BusinessExpense.category)
+    )
+    for year, category, amount in expenses:
+        entry = summary.get(int(year))
+        if entry is None:
+            continue
+        entry["expenses_by_category"][category] = amount
+        entry["total_expenses"] += amount
+
+    for entry in summary.values():
+        entry["gross_revenue"] = round(entry["gross_revenue"], 2)
+        entry["total_expenses"] = round(entry["total_expenses"], 2)
+        entry["net_income"] = round(entry["gross_revenue"] - entry["total_expenses"], 2)
+    return summary
+
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def iter_tax_csv(db: AsyncSession, user_id: int, year: int) -> AsyncIterator[str]:
+    """
+    CSV del año (ingresos de plataforma por pago y gastos) leído con cursor del
+    servidor en lotes de `EXPORT_BATCH_SIZE`, sin cargar el año en memoria.
+    """
+    start, end = _year_range(year)
+    yield _csv_chunk([CSV_HEADER])
+
+    payments = await db.stream(
+        select(
+            Payment.created_at,
+            Payment.id,
+            Payment.payment_method,
+            Payment.currency,
+            Payment.platform_amount,
+        )
+        .where(Payment.status == "completed", Payment.created_at >= start, Payment.created_at < end)
+        .order_by(Payment.created_at, Payment.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async for batch in payments.partitions():
+        yield _csv_chunk(
+            ("ingreso", created_at.isoformat(), f"payment:{pid}", method or "", "", (currency or "usd").upper(), amount or 0.0)
+            for created_at, pid, method, currency, amount in batch
+        )
+
+    expenses = await db.stream(
+        select(
+            BusinessExpense.date,
+            BusinessExpense.id,
+            BusinessExpense.category,
+            BusinessExpense.description,
+            BusinessExpense.currency,
+            BusinessExpense.amount,
+        )
+        .where(
+            BusinessExpense.user_id == user_id,
+            BusinessExpense.date >= start,
+            BusinessExpense.date < end,
+        )
+        .order_by(BusinessExpense.date, BusinessExpense.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async for batch in expenses.partitions():
+        yield _csv_chunk(
+            ("gasto", spent_at.isoformat() if spent_at else "", f"expense:{eid}", category or "", description or "", currency or "USD", amount or 0.0)
+            for spent_at, eid, category, description, currency, amount in batch
+        )
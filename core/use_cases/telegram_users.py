@@ -0,0 +1,36 @@
+"""
+Alta de usuarios que llegan por el bot de Telegram.
+
+Un solo `INSERT ... ON CONFLICT (telegram_id) DO NOTHING RETURNING`: el
+usuario nuevo vuelve en la misma ida a la BD y dos updates simultáneos del
+mismo chat no chocan con el índice único. Si ya existía, un SELECT por
+`telegram_id` (el bot cachea telegram_id -> user_id y no suele llegar aquí).
+"""
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import User
+from core.use_cases.daily_stats import dialect_insert, execute_upsert
+
+
+async def get_or_create_telegram_user(
+    db: AsyncSession,
+    telegram_id: int,
+    username: Optional[str] = None,
+    full_name: Optional[str] = None,
+) -> User:
+    insert = dialect_insert(db)
+    stmt = (
+        insert(User)
+        .values(telegram_id=telegram_id, username=username, full_name=full_name)
+        .on_conflict_do_nothing(index_elements=[User.telegram_id])
+        .returning(User)
+    )
+    user = (await execute_upsert(db, stmt)).scalars().one_or_none()
+    if user is not None:
+        await db.commit()
+        return user
+    return (await db.scalars(select(User).where(User.telegram_id == telegram_id))).one()
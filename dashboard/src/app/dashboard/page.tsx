@@ -9,7 +9,7 @@ import {
 } from '@/lib/api';
 import {
   SummaryData, Channel, ConfigItem, Withdrawal, SupportTicket,
-  TicketMessage, AnalyticsData, Promotion, Payment, UserAdmin
+  TicketMessage, AnalyticsData, Promotion, Payment
 } from '@/lib/types';
 
 // Components
@@ -50,11 +50,15 @@ export default function Dashboard() {
   const [supportTickets, setSupportTickets] = useState<SupportTicket[]>([]);
 
   // Admin Data States
-  const [adminUsers, setAdminUsers] = useState<UserAdmin[]>([]);
   const [configs, setConfigs] = useState<ConfigItem[]>([]);
   const [adminWithdrawals, setAdminWithdrawals] = useState<Withdrawal[]>([]);
   const [adminPayments, setAdminPayments] = useState<Payment[]>([]);
   const [adminTickets, setAdminTickets] = useState<SupportTicket[]>([]);
+  // Listados admin paginados (keyset): cursor de la siguiente página, null = no hay más
+  const [adminWithdrawalStatus, setAdminWithdrawalStatus] = useState("pending"); // "" = todos
+  const [adminWithdrawalsCursor, setAdminWithdrawalsCursor] = useState<string | null>(null);
+  const [adminPaymentsCursor, setAdminPaymentsCursor] = useState<string | null>(null);
+  const [adminTicketsCursor, setAdminTicketsCursor] = useState<string | null>(null);
 
   // UI States
   const [isViewingAsAdmin, setIsViewingAsAdmin] = useState(false);
@@ -127,25 +131,70 @@ export default function Dashboard() {
     }
   };
 
-  const fetchAdminData = async () => {
+  const fetchAdminData = async (withdrawalStatus: string = adminWithdrawalStatus) => {
     try {
-      const [users, configData, withdrawals, payments, tickets] = await Promise.all([
-        adminApi.getUsers(),
+      const [configData, withdrawals, payments, tickets] = await Promise.all([
         adminApi.getConfig(),
-        adminApi.getWithdrawals(),
+        adminApi.getWithdrawals({ status: withdrawalStatus }),
         adminApi.getPayments(),
         adminApi.getTickets()
       ]);
-      setAdminUsers(users);
       setConfigs(configData);
-      setAdminWithdrawals(withdrawals);
-      setAdminPayments(payments);
-      setAdminTickets(tickets);
+      setAdminWithdrawals(withdrawals.items);
+      setAdminWithdrawalsCursor(withdrawals.next_cursor);
+      setAdminPayments(payments.items);
+      setAdminPaymentsCursor(payments.next_cursor);
+      setAdminTickets(tickets.items);
+      setAdminTicketsCursor(tickets.next_cursor);
     } catch (err) {
       console.error("Error fetching admin data:", err);
     }
   };
 
+  const handleWithdrawalStatusChange = async (status: string) => {
+    setAdminWithdrawalStatus(status);
+    try {
+      const page = await adminApi.getWithdrawals({ status });
+      setAdminWithdrawals(page.items);
+      setAdminWithdrawalsCursor(page.next_cursor);
+    } catch (err: any) {
+      alert(err.message);
+    }
+  };
+
+  const loadMoreAdminWithdrawals = async () => {
+    if (!adminWithdrawalsCursor) return;
+    try {
+      const page = await adminApi.getWithdrawals({ status: adminWithdrawalStatus, cursor: adminWithdrawalsCursor });
+      setAdminWithdrawals(prev => [...prev, ...page.items]);
+      setAdminWithdrawalsCursor(page.next_cursor);
+    } catch (err: any) {
+      alert(err.message);
+    }
+  };
+
+  const loadMoreAdminPayments = async () => {
+    if (!adminPaymentsCursor) return;
+    try {
+      const page = await adminApi.getPayments({ cursor: adminPaymentsCursor });
+      setAdminPayments(prev => [...prev, ...page.items]);
+      setAdminPaymentsCursor(page.next_cursor);
+    } catch (err: any) {
+      alert(err.message);
+    }
+  };
+
+  const loadMoreAdminTickets = async () => {
+    if (!adminTicketsCursor) return;
+    try {
+      const page = await adminApi.getTickets({ cursor: adminTicketsCursor });
+      setAdminTickets(prev => [...prev, ...page.items]);
+      setAdminTicketsCursor(page.next_cursor);
+    } catch (err: any) {
+      alert(err.message);
+    }
+  };
+
   // --- Handlers ---
   const handleLogout = () => {
     authApi.logout();
@@ -440,10 +489,15 @@ export default function Dashboard() {
             {/* Admin Tabs */}
             {activeTab === "admin" && summary?.is_admin && (
               <AdminSystem
-                adminUsers={adminUsers}
                 adminWithdrawals={adminWithdrawals}
+                withdrawalStatus={adminWithdrawalStatus}
+                onWithdrawalStatusChange={handleWithdrawalStatusChange}
+                hasMoreWithdrawals={!!adminWithdrawalsCursor}
+                onLoadMoreWithdrawals={loadMoreAdminWithdrawals}
                 handleProcessWithdrawal={handleProcessWithdrawal}
                 adminTickets={adminTickets}
+                hasMoreTickets={!!adminTicketsCursor}
+                onLoadMoreTickets={loadMoreAdminTickets}
                 handleOpenTicket={handleOpenTicket}
                 setActiveTab={setActiveTab}
                 mounted={mounted}
@@ -457,6 +511,8 @@ export default function Dashboard() {
             {activeTab === "admin_payments" && summary?.is_admin && (
               <AdminPayments
                 adminPayments={adminPayments}
+                hasMorePayments={!!adminPaymentsCursor}
+                onLoadMorePayments={loadMoreAdminPayments}
                 handleVerifyCrypto={handleVerifyCrypto}
                 mounted={mounted}
               />
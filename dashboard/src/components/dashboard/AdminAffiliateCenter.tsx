@@ -12,6 +12,8 @@ import { toast } from 'sonner';
 export function AdminAffiliateCenter() {
     const [stats, setStats] = useState<AdminAffiliateStats | null>(null);
     const [ledger, setLedger] = useState<AffiliateLedgerEntry[]>([]);
+    const [ledgerCursor, setLedgerCursor] = useState<string | null>(null);
+    const [loadingLedger, setLoadingLedger] = useState(false);
     const [configs, setConfigs] = useState<ConfigItem[]>([]);
     const [loading, setLoading] = useState(true);
     const [activeView, setActiveView] = useState<'stats' | 'ledger' | 'audit' | 'control' | 'ranks'>('stats');
@@ -34,11 +36,12 @@ export function AdminAffiliateCenter() {
         try {
             const [s, l, c] = await Promise.all([
                 adminApi.getAffiliateStats(),
-                adminApi.getAffiliateLedger(50, 0),
+                adminApi.getAffiliateLedger({ limit: 50 }),
                 adminApi.getConfig()
             ]);
             setStats(s);
-            setLedger(l);
+            setLedger(l.items);
+            setLedgerCursor(l.next_cursor);
             setConfigs(c);
 
             // Map configs to local state
@@ -54,6 +57,20 @@ export function AdminAffiliateCenter() {
         }
     };
 
+    const loadMoreLedger = async () => {
+        if (!ledgerCursor) return;
+        setLoadingLedger(true);
+        try {
+            const page = await adminApi.getAffiliateLedger({ limit: 50, cursor: ledgerCursor });
+            setLedger(prev => [...prev, ...page.items]);
+            setLedgerCursor(page.next_cursor);
+        } catch (error) {
+            toast.error("Error al cargar más comisiones");
+        } finally {
+            setLoadingLedger(false);
+        }
+    };
+
     const handleUpdateConfig = async (key: string, value: number) => {
         setSavingConfig(key);
         try {
@@ -191,7 +208,7 @@ export function AdminAffiliateCenter() {
                         <h3 className="font-bold flex items-center gap-2">
                             <List className="w-5 h-5 text-primary" /> Historial Maestro de Comisiones
                         </h3>
-                        <p className="text-xs text-muted">Muestra los últimos 50 eventos de pago registrados en la red multinivel.</p>
+                        <p className="text-xs text-muted">Eventos de pago registrados en la red multinivel, del más reciente al más antiguo.</p>
                     </div>
                     <div className="overflow-x-auto">
                         <table className="w-full text-left">
@@ -238,6 +255,17 @@ export function AdminAffiliateCenter() {
                             </tbody>
                         </table>
                     </div>
+                    {ledgerCursor && (
+                        <div className="p-4 flex justify-center border-t border-surface-border">
+                            <button
+                                onClick={loadMoreLedger}
+                                disabled={loadingLedger}
+                                className="px-4 py-2 bg-background border border-surface-border rounded-lg text-xs font-bold hover:text-primary transition-colors disabled:opacity-50"
+                            >
+                                {loadingLedger ? "Cargando..." : "Cargar más"}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
@@ -4,11 +4,13 @@ import { Payment } from '@/lib/types';
 
 interface AdminPaymentsProps {
     adminPayments: Payment[];
+    hasMorePayments: boolean;
+    onLoadMorePayments: () => void;
     handleVerifyCrypto: (id: number) => void;
     mounted: boolean;
 }
 
-export function AdminPayments({ adminPayments, handleVerifyCrypto, mounted }: AdminPaymentsProps) {
+export function AdminPayments({ adminPayments, hasMorePayments, onLoadMorePayments, handleVerifyCrypto, mounted }: AdminPaymentsProps) {
     return (
         <div className="space-y-10 animate-fade-in">
             <header>
@@ -60,6 +62,16 @@ export function AdminPayments({ adminPayments, handleVerifyCrypto, mounted }: Ad
                                 ))}
                             </tbody>
                         </table>
+                        {hasMorePayments && (
+                            <div className="p-4 flex justify-center border-t border-surface-border">
+                                <button
+                                    onClick={onLoadMorePayments}
+                                    className="px-4 py-2 bg-background border border-surface-border rounded-lg text-xs font-bold hover:text-primary transition-colors"
+                                >
+                                    Cargar más
+                                </button>
+                            </div>
+                        )}
                     </div>
                 ) : (
                     <div className="p-20 text-center premium-card border-emerald-500/20 bg-emerald-500/5">
@@ -1,26 +1,34 @@
 
 import { ShieldEllipsis, Users, LayoutGrid, Zap, History, ShieldCheck, Wallet, LifeBuoy, AlertTriangle, CheckCircle2, Search, Trash2, Edit, FileText, X } from 'lucide-react';
 import { UserAdmin, Withdrawal, SupportTicket } from '@/lib/types';
-import { useState, useMemo } from 'react';
+import { useState, useEffect } from 'react';
 import { adminApi } from '@/lib/api';
 
 interface AdminSystemProps {
-    adminUsers: UserAdmin[];
     adminWithdrawals: Withdrawal[];
+    withdrawalStatus: string; // "" = todos
+    onWithdrawalStatusChange: (status: string) => void;
+    hasMoreWithdrawals: boolean;
+    onLoadMoreWithdrawals: () => void;
     handleProcessWithdrawal: (id: number, status: string) => void;
     adminTickets: SupportTicket[];
+    hasMoreTickets: boolean;
+    onLoadMoreTickets: () => void;
     handleOpenTicket: (id: number, isAdmin: boolean) => void;
     setActiveTab: (tab: string) => void;
     mounted: boolean;
 }
 
 export function AdminSystem({
-    adminUsers: initialUsers, adminWithdrawals, handleProcessWithdrawal,
-    adminTickets, handleOpenTicket, setActiveTab, mounted
+    adminWithdrawals, withdrawalStatus, onWithdrawalStatusChange, hasMoreWithdrawals, onLoadMoreWithdrawals,
+    handleProcessWithdrawal, adminTickets, hasMoreTickets, onLoadMoreTickets,
+    handleOpenTicket, setActiveTab, mounted
 }: AdminSystemProps) {
 
-    // Local state for optimistic updates
-    const [users, setUsers] = useState<UserAdmin[]>(initialUsers);
+    // Directorio paginado (keyset) con búsqueda en el servidor
+    const [users, setUsers] = useState<UserAdmin[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingUsers, setLoadingUsers] = useState(false);
 
     // Search & Filter
     const [searchTerm, setSearchTerm] = useState("");
@@ -31,15 +39,38 @@ export function AdminSystem({
     const [editingUplink, setEditingUplink] = useState<UserAdmin | null>(null);
     const [newReferrerId, setNewReferrerId] = useState("");
 
-    const filteredUsers = useMemo(() => {
-        if (!searchTerm) return users;
-        const lower = searchTerm.toLowerCase();
-        return users.filter(u =>
-            (u.full_name?.toLowerCase().includes(lower)) ||
-            (u.email?.toLowerCase().includes(lower)) ||
-            (u.id.toString().includes(lower))
-        );
-    }, [users, searchTerm]);
+    useEffect(() => {
+        const timer = setTimeout(async () => {
+            setLoadingUsers(true);
+            try {
+                const page = await adminApi.getUsers({ q: searchTerm.trim() || undefined });
+                setUsers(page.items);
+                setNextCursor(page.next_cursor);
+                setSelectedUsers([]);
+            } catch (e) {
+                console.error("Error fetching users:", e);
+            } finally {
+                setLoadingUsers(false);
+            }
+        }, 300);
+        return () => clearTimeout(timer);
+    }, [searchTerm]);
+
+    const loadMoreUsers = async () => {
+        if (!nextCursor) return;
+        setLoadingUsers(true);
+        try {
+            const page = await adminApi.getUsers({ cursor: nextCursor, q: searchTerm.trim() || undefined });
+            setUsers(prev => [...prev, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (e: any) {
+            alert(e.message);
+        } finally {
+            setLoadingUsers(false);
+        }
+    };
+
+    const filteredUsers = users;
 
     // Handlers
     const toggleSelectUser = (id: number) => {
@@ -231,6 +262,17 @@ export function AdminSystem({
                             )}
                         </tbody>
                     </table>
+                    {nextCursor && (
+                        <div className="p-4 flex justify-center border-t border-surface-border">
+                            <button
+                                onClick={loadMoreUsers}
+                                disabled={loadingUsers}
+                                className="px-4 py-2 bg-background border border-surface-border rounded-lg text-xs font-bold hover:text-primary transition-colors disabled:opacity-50"
+                            >
+                                {loadingUsers ? "Cargando..." : "Cargar más"}
+                            </button>
+                        </div>
+                    )}
                 </div>
             </div>
 
@@ -351,12 +393,24 @@ export function AdminSystem({
 
             {/* Gestión de Retiros (Admin) */}
             <div className="space-y-6">
-                <h3 className="text-xl font-bold flex items-center gap-2 text-primary">
-                    <Wallet className="w-6 h-6" /> Gestión de Retiros Pendientes
-                </h3>
-                {adminWithdrawals.filter(w => w.status === 'pending').length > 0 ? (
+                <div className="flex items-center justify-between gap-4">
+                    <h3 className="text-xl font-bold flex items-center gap-2 text-primary">
+                        <Wallet className="w-6 h-6" /> Gestión de Retiros
+                    </h3>
+                    <select
+                        value={withdrawalStatus}
+                        onChange={(e) => onWithdrawalStatusChange(e.target.value)}
+                        className="bg-background border border-surface-border rounded-lg px-3 py-2 text-xs font-bold"
+                    >
+                        <option value="pending">Pendientes</option>
+                        <option value="completed">Completados</option>
+                        <option value="rejected">Rechazados</option>
+                        <option value="">Todos</option>
+                    </select>
+                </div>
+                {adminWithdrawals.length > 0 ? (
                     <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
-                        {adminWithdrawals.filter(w => w.status === 'pending').map(w => (
+                        {adminWithdrawals.map(w => (
                             <div key={w.id} className="premium-card p-6 space-y-4 border-amber-500/20 bg-amber-500/5">
                                 <div className="flex justify-between items-start">
                                     <div>
@@ -364,14 +418,16 @@ export function AdminSystem({
                                         <p className="text-xs text-muted font-bold">Solicitado por ID: {w.owner_id}</p>
                                         <p className="text-[10px] text-muted">{mounted ? new Date(w.created_at).toLocaleString() : '...'}</p>
                                     </div>
-                                    <span className="px-2 py-1 bg-amber-500 text-white rounded text-[10px] font-bold uppercase">Pendiente</span>
+                                    <span className={`px-2 py-1 text-white rounded text-[10px] font-bold uppercase ${w.status === 'pending' ? 'bg-amber-500' : w.status === 'completed' ? 'bg-emerald-500' : 'bg-red-500'}`}>
+                                        {w.status === 'pending' ? 'Pendiente' : w.status === 'completed' ? 'Completado' : 'Rechazado'}
+                                    </span>
                                 </div>
                                 <div className="p-3 bg-background rounded-lg border border-surface-border">
                                     <p className="text-[10px] font-black uppercase text-muted">Método & Detalles</p>
                                     <p className="text-xs font-bold">{w.method}</p>
                                     <p className="text-[10px] text-muted-foreground mt-1">{w.details}</p>
                                 </div>
-                                <div className="flex gap-2">
+                                {w.status === 'pending' && <div className="flex gap-2">
                                     <button
                                         onClick={() => handleProcessWithdrawal(w.id, "completed")}
                                         className="flex-1 py-2 bg-emerald-500 text-white rounded-lg font-bold text-sm hover:bg-emerald-600 transition-colors"
@@ -384,13 +440,25 @@ export function AdminSystem({
                                     >
                                         Rechazar
                                     </button>
-                                </div>
+                                </div>}
                             </div>
                         ))}
                     </div>
                 ) : (
                     <div className="p-10 text-center premium-card border-emerald-500/20 bg-emerald-500/5">
-                        <p className="text-sm font-bold text-emerald-500">No hay retiros pendientes por procesar. ✨</p>
+                        <p className="text-sm font-bold text-emerald-500">
+                            {withdrawalStatus === 'pending' ? "No hay retiros pendientes por procesar. ✨" : "No hay retiros con este estado."}
+                        </p>
+                    </div>
+                )}
+                {hasMoreWithdrawals && (
+                    <div className="flex justify-center">
+                        <button
+                            onClick={onLoadMoreWithdrawals}
+                            className="px-4 py-2 bg-background border border-surface-border rounded-lg text-xs font-bold hover:text-primary transition-colors"
+                        >
+                            Cargar más
+                        </button>
                     </div>
                 )}
             </div>
@@ -426,6 +494,16 @@ export function AdminSystem({
                     )) : (
                         <div className="p-10 text-center text-xs text-muted font-bold">No hay tickets hoy. Todo en orden.</div>
                     )}
+                    {hasMoreTickets && (
+                        <div className="p-4 flex justify-center">
+                            <button
+                                onClick={onLoadMoreTickets}
+                                className="px-4 py-2 bg-background border border-surface-border rounded-lg text-xs font-bold hover:text-primary transition-colors"
+                            >
+                                Cargar más
+                            </button>
+                        </div>
+                    )}
                 </div>
             </div>
         </div>
@@ -17,16 +17,18 @@ import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 
 interface CallSlot {
     id: number;
+    kind: "slot" | "booking"; // El id es de CallSlot o de CallBooking
     start_time: string;
     is_booked: boolean;
     jitsi_link?: string;
     booked_by_name?: string;
     service_id: number;
-    calendar_links?: {
-        google: string;
-        outlook: string;
-        yahoo: string;
-    };
+}
+
+interface CalendarLinks {
+    google: string;
+    outlook: string;
+    yahoo: string;
 }
 
 interface CallService {
@@ -130,6 +132,22 @@ export default function CallsManagement() {
         staleTime: 1000 * 60, // 1 min (matches backend cache)
     });
 
+    // Links de calendario bajo demanda (no vienen en /calls/services)
+    const openCalendarLink = async (slot: CallSlot, provider: keyof CalendarLinks) => {
+        // Abrir la ventana antes del await para que no la bloquee el navegador
+        const win = window.open("", "_blank");
+        try {
+            const links = await apiRequest<CalendarLinks>(`/api/calls/slots/${slot.id}/calendar-links?kind=${slot.kind}`);
+            if (win) {
+                win.opener = null;
+                win.location.href = links[provider];
+            }
+        } catch (e) {
+            win?.close();
+            toast.error((e as Error).message);
+        }
+    };
+
     // --- MUTATIONS ---
 
     const createServiceMutation = useMutation({
@@ -432,7 +450,7 @@ export default function CallsManagement() {
                             <p className="text-gray-500">Aún no tienes ventas.</p>
                         )}
                         {services.flatMap(s => s.slots.map(slot => ({ ...slot, serviceName: s.description }))).filter(s => s.is_booked).map(slot => (
-                            <div key={slot.id} className="flex flex-col md:flex-row justify-between gap-4 p-4 bg-green-900/10 border border-green-800/30 rounded-xl">
+                            <div key={`${slot.kind}-${slot.id}`} className="flex flex-col md:flex-row justify-between gap-4 p-4 bg-green-900/10 border border-green-800/30 rounded-xl">
                                 <div className="space-y-1">
                                     <div className="flex items-center gap-2">
                                         <span className="font-bold text-green-400">
@@ -449,28 +467,24 @@ export default function CallsManagement() {
                                     </p>
                                 </div>
 
-                                {slot.calendar_links && (
-                                    <div className="flex items-center gap-2">
-                                        <a
-                                            href={slot.calendar_links.google}
-                                            target="_blank"
-                                            rel="noopener noreferrer"
-                                            className="px-3 py-1.5 bg-neutral-950/50 hover:bg-neutral-800 border border-neutral-800 rounded-lg text-xs font-bold text-white transition-all flex items-center gap-2"
-                                        >
-                                            <CalendarIcon className="w-3.5 h-3.5 text-blue-400" />
-                                            Google
-                                        </a>
-                                        <a
-                                            href={slot.calendar_links.outlook}
-                                            target="_blank"
-                                            rel="noopener noreferrer"
-                                            className="px-3 py-1.5 bg-neutral-950/50 hover:bg-neutral-800 border border-neutral-800 rounded-lg text-xs font-bold text-white transition-all flex items-center gap-2"
-                                        >
-                                            <CalendarIcon className="w-3.5 h-3.5 text-blue-400" />
-                                            Outlook
-                                        </a>
-                                    </div>
-                                )}
+                                <div className="flex items-center gap-2">
+                                    <button
+                                        type="button"
+                                        onClick={() => openCalendarLink(slot, "google")}
+                                        className="px-3 py-1.5 bg-neutral-950/50 hover:bg-neutral-800 border border-neutral-800 rounded-lg text-xs font-bold text-white transition-all flex items-center gap-2"
+                                    >
+                                        <CalendarIcon className="w-3.5 h-3.5 text-blue-400" />
+                                        Google
+                                    </button>
+                                    <button
+                                        type="button"
+                                        onClick={() => openCalendarLink(slot, "outlook")}
+                                        className="px-3 py-1.5 bg-neutral-950/50 hover:bg-neutral-800 border border-neutral-800 rounded-lg text-xs font-bold text-white transition-all flex items-center gap-2"
+                                    >
+                                        <CalendarIcon className="w-3.5 h-3.5 text-blue-400" />
+                                        Outlook
+                                    </button>
+                                </div>
                             </div>
                         ))}
                     </div>
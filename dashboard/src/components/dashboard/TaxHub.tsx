@@ -4,7 +4,7 @@ import { useState, useEffect } from "react";
 import {
     Calculator, Receipt, Calendar, ShieldCheck,
     Plus, Trash2, DollarSign,
-    TrendingDown, TrendingUp, AlertTriangle, CheckCircle2, Loader2
+    TrendingDown, TrendingUp, AlertTriangle, CheckCircle2, Loader2, Download
 } from "lucide-react";
 import { adminApi } from "@/lib/api";
 
@@ -24,7 +24,7 @@ export function TaxHub() {
         try {
             setLoading(true);
             const [summaryData, expensesData] = await Promise.all([
-                adminApi.getTaxSummary(year),
+                adminApi.getTaxSummary(year, 2),
                 adminApi.getExpenses(year)
             ]);
             setSummary(summaryData);
@@ -51,6 +51,22 @@ export function TaxHub() {
         }
     };
 
+    const handleExportCsv = async () => {
+        try {
+            const blob = await adminApi.exportTaxCsv(year);
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `fgate_tax_${year}.csv`;
+            document.body.appendChild(a);
+            a.click();
+            window.URL.revokeObjectURL(url);
+            document.body.removeChild(a);
+        } catch (err) {
+            alert("Error al exportar CSV");
+        }
+    };
+
     const handleDeleteExpense = async (id: number) => {
         if (!confirm("¿Eliminar este gasto?")) return;
         try {
@@ -89,6 +105,12 @@ export function TaxHub() {
                         <option value={2025}>Año Fiscal 2025</option>
                         <option value={2026}>Año Fiscal 2026</option>
                     </select>
+                    <button
+                        onClick={handleExportCsv}
+                        className="flex items-center gap-2 px-4 py-2 bg-surface border border-surface-border rounded-xl font-bold hover:text-primary transition-all"
+                    >
+                        <Download className="w-5 h-5" /> CSV
+                    </button>
                     <button
                         onClick={() => setIsAddOpen(true)}
                         className="flex items-center gap-2 px-4 py-2 bg-primary text-primary-foreground rounded-xl font-bold shadow-lg shadow-primary/20 hover:scale-[1.02] active:scale-[0.98] transition-all"
@@ -137,6 +159,32 @@ export function TaxHub() {
                 </div>
             </div>
 
+            {/* Year-over-year */}
+            {summary?.comparison?.length > 1 && (
+                <div className="premium-card overflow-hidden border-surface-border">
+                    <table className="w-full text-left">
+                        <thead className="bg-surface/50 border-b border-surface-border">
+                            <tr className="text-xs font-bold text-muted uppercase tracking-wider">
+                                <th className="px-6 py-4">Año</th>
+                                <th className="px-6 py-4 text-right">Ingresos</th>
+                                <th className="px-6 py-4 text-right">Gastos</th>
+                                <th className="px-6 py-4 text-right">Neto</th>
+                            </tr>
+                        </thead>
+                        <tbody className="divide-y divide-surface-border">
+                            {summary.comparison.map((row: any) => (
+                                <tr key={row.year} className={row.year === year ? "font-black" : "opacity-70"}>
+                                    <td className="px-6 py-3">{row.year}</td>
+                                    <td className="px-6 py-3 text-right text-emerald-500">${row.gross_revenue.toLocaleString()}</td>
+                                    <td className="px-6 py-3 text-right text-red-400">-${row.total_expenses.toLocaleString()}</td>
+                                    <td className="px-6 py-3 text-right">${row.net_income.toLocaleString()}</td>
+                                </tr>
+                            ))}
+                        </tbody>
+                    </table>
+                </div>
+            )}
+
             <div className="grid grid-cols-1 lg:grid-cols-3 gap-8">
                 {/* Expenses Table */}
                 <div className="lg:col-span-2 space-y-6">
@@ -1,7 +1,7 @@
 import {
     AuthResponse, SummaryData, Channel, Withdrawal, SupportTicket,
     TicketDetailsResponse, ConfigItem, AnalyticsData, Promotion, Payment,
-    LegalInfo, LegalStatus, UserAdmin, AdminAffiliateStats, AffiliateLedgerEntry,
+    LegalInfo, LegalStatus, UserDirectoryPage, CursorPage, AdminListParams, AdminAffiliateStats, AffiliateLedgerEntry,
     AffiliateNetworkResponse, AffiliateRank, RankCreate, AffiliateStats, LeaderboardEntry
 } from "./types";
 
@@ -82,7 +82,7 @@ export const ownerApi = {
     deletePromotion: (promoId: number) => apiRequest<void>(`/api/owner/promotions/${promoId}`, {
         method: "DELETE",
     }),
-    getAnalytics: () => apiRequest<AnalyticsData>("/api/owner/analytics"),
+    getAnalytics: (days: number = 30) => apiRequest<AnalyticsData>(`/api/owner/analytics?days=${days}`),
     getProfile: () => apiRequest<any>("/api/owner/profile"),
 };
 
@@ -138,29 +138,50 @@ export const walletApi = ownerApi;
 export const channelApi = ownerApi;
 export const supportApi = ownerApi;
 
+const listQuery = (params: AdminListParams = {}) => {
+    const qs = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined && value !== null && value !== "") qs.set(key, String(value));
+    });
+    return qs.toString();
+};
+
 export const adminApi = {
     getConfig: () => apiRequest<ConfigItem[]>("/api/admin/config"),
     updateConfig: (key: string, value: number) => apiRequest<ConfigItem>("/api/admin/config", {
         method: "POST",
         body: JSON.stringify({ key, value }),
     }),
-    getWithdrawals: () => apiRequest<Withdrawal[]>("/api/admin/withdrawals"),
+    getWithdrawals: (params: AdminListParams = {}) =>
+        apiRequest<CursorPage<Withdrawal>>(`/api/admin/withdrawals?${listQuery(params)}`),
     processWithdrawal: (id: number, status: string) => apiRequest<Withdrawal>(`/api/admin/withdrawals/${id}/process`, {
         method: "POST",
         body: JSON.stringify({ status }),
     }),
-    getTickets: () => apiRequest<SupportTicket[]>("/api/admin/tickets"),
+    getTickets: (params: AdminListParams = {}) =>
+        apiRequest<CursorPage<SupportTicket>>(`/api/admin/tickets?${listQuery(params)}`),
     getTicketDetails: (id: number) => apiRequest<TicketDetailsResponse>(`/api/admin/tickets/${id}`),
     replyTicket: (id: number, content: string) => apiRequest<void>(`/api/admin/tickets/${id}/reply`, {
         method: "POST",
         body: JSON.stringify({ content }),
     }),
-    getPayments: () => apiRequest<Payment[]>("/api/admin/payments/pending"),
+    getPayments: (params: AdminListParams = {}) =>
+        apiRequest<CursorPage<Payment>>(`/api/admin/payments/pending?${listQuery(params)}`),
     verifyPayment: (id: number) => apiRequest<Payment>(`/api/admin/payments/${id}/verify-crypto`, {
         method: "POST",
     }),
-    getUsers: () => apiRequest<UserAdmin[]>("/api/admin/users"),
-    getTaxSummary: (year?: number) => apiRequest<any>(`/api/admin/tax/summary${year ? `?year=${year}` : ''}`),
+    getUsers: (params: { cursor?: string | null; q?: string; limit?: number } = {}) =>
+        apiRequest<UserDirectoryPage>(`/api/admin/users?${listQuery(params)}`),
+    getTaxSummary: (year?: number, compareYears: number = 0) =>
+        apiRequest<any>(`/api/admin/tax/summary?${listQuery({ year, compare_years: compareYears })}`),
+    exportTaxCsv: async (year: number) => {
+        const token = localStorage.getItem("token");
+        const response = await fetch(`${API_URL}/api/admin/tax/export.csv?year=${year}`, {
+            headers: { "Authorization": `Bearer ${token}` }
+        });
+        if (!response.ok) throw new Error("Error exportando CSV");
+        return response.blob();
+    },
     getExpenses: (year?: number) => apiRequest<any[]>(`/api/admin/expenses${year ? `?year=${year}` : ''}`),
     createExpense: (data: any) => apiRequest<any>(`/api/admin/expenses`, { method: "POST", body: JSON.stringify(data) }),
     deleteExpense: (id: number) => apiRequest<void>(`/api/admin/expenses/${id}`, { method: "DELETE" }),
@@ -180,7 +201,8 @@ export const adminApi = {
     },
     // Affiliate Admin
     getAffiliateStats: () => apiRequest<AdminAffiliateStats>("/api/admin/affiliates/stats"),
-    getAffiliateLedger: (limit: number, offset: number) => apiRequest<AffiliateLedgerEntry[]>(`/api/admin/affiliates/ledger?limit=${limit}&offset=${offset}`),
+    getAffiliateLedger: (params: AdminListParams = {}) =>
+        apiRequest<CursorPage<AffiliateLedgerEntry>>(`/api/admin/affiliates/ledger?${listQuery(params)}`),
     getAffiliateTree: (userId: number) => apiRequest<AffiliateNetworkResponse>(`/api/admin/affiliates/tree/${userId}`),
     getAffiliateRanks: () => apiRequest<AffiliateRank[]>("/api/admin/ranks"),
     createAffiliateRank: (data: RankCreate) => apiRequest<AffiliateRank>("/api/admin/ranks", { method: "POST", body: JSON.stringify(data) }),
@@ -190,6 +190,23 @@ export interface UserAdmin {
     contract_signed?: boolean;
 }
 
+export interface CursorPage<T> {
+    items: T[];
+    next_cursor: string | null;
+    total_estimate?: number | null;
+}
+
+export type UserDirectoryPage = CursorPage<UserAdmin>;
+
+export interface AdminListParams {
+    cursor?: string | null;
+    limit?: number;
+    status?: string;
+    date_from?: string;
+    date_to?: string;
+    [filter: string]: string | number | null | undefined;
+}
+
 export interface RegisterData {
     email: string;
     password: string;
@@ -274,7 +291,8 @@ export interface AffiliateNetworkResponse {
 
 export interface AffiliateStats {
     total_earnings: number;
-    earnings_by_level: { level: number; amount: number }[];
+    earnings_by_level: { level: number; amount: number; count?: number }[];
+    last_30_days_earnings?: number;
     recent_history: {
         id: number;
         amount: number;
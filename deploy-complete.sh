@@ -35,12 +35,15 @@ echo ""
 # 2. Deploy Main Service (Bot/API)
 echo "🤖 Deploying Main Bot/API Service..."
 # Using the same safe configuration as deploy-safe.sh but adding WORKER_URL
+# --no-cpu-throttling: los updates del bot se procesan después de responder el
+# webhook; sin CPU entre requests la cola en memoria se congela (bot/updates.py)
 gcloud run deploy $MAIN_SERVICE \
   --source . \
   --region $REGION \
   --project $PROJECT_ID \
   --platform managed \
   --allow-unauthenticated \
+  --no-cpu-throttling \
   --timeout=300 \
   --memory=1Gi \
   --set-secrets="DATABASE_URL=DATABASE_URL:latest,JWT_SECRET_KEY=JWT_SECRET_KEY:latest,TELEGRAM_BOT_TOKEN=BOT_TOKEN:latest" \
@@ -20,11 +20,14 @@ echo "Checking Secret Manager configuration..."
 
 # 2. Deploy to Cloud Run using SECRETS (not env vars)
 # Extended timeout and resources for initialization
+# --no-cpu-throttling: los updates del bot se procesan después de responder el
+# webhook; sin CPU entre requests la cola en memoria se congela (bot/updates.py)
 /Users/felipegomez/google-cloud-sdk/bin/gcloud run deploy $SERVICE_NAME \
   --source . \
   --region $REGION \
   --platform managed \
   --allow-unauthenticated \
+  --no-cpu-throttling \
   --timeout=300 \
   --cpu=2 \
   --memory=1Gi \
@@ -21,11 +21,14 @@ echo ""
 # Build and deploy using Cloud Build (no local Docker needed)
 # 1. First Deploy (to ensure service exists and get URL)
 echo "🚀 Building and deploying core service..."
+# --no-cpu-throttling: los updates del bot se procesan después de responder el
+# webhook; sin CPU entre requests la cola en memoria se congela (bot/updates.py)
 gcloud run deploy $SERVICE_NAME \
   --source . \
   --region $REGION \
   --platform managed \
   --allow-unauthenticated \
+  --no-cpu-throttling \
   --set-env-vars="SERVICE_TYPE=unified,DASHBOARD_URL=https://app.fgate.co" \
   --set-secrets="BOT_TOKEN=BOT_TOKEN:latest,DATABASE_URL=DATABASE_URL:latest,JWT_SECRET_KEY=JWT_SECRET_KEY:latest" \
   --project $PROJECT_ID \
@@ -1,13 +1,16 @@
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
 from sqlalchemy.future import select
 from sqlalchemy import and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import json
+import logging
 from core.entities.call_service import CallService, AvailabilityRange, CallBooking
 from infrastructure.database.connection import redis_client
 
+logger = logging.getLogger(__name__)
+
 async def invalidate_service_cache(service_id: int):
     """Invalidate all availability caches for a specific service"""
     # Pattern match is slow, simpler to just rely on TTL or precise keys if possible.
@@ -166,3 +169,132 @@ async def get_available_slots(
         pass
 
     return available_slots
+
+
+# --- Disponibilidad por día (selector de días del bot) ---
+#
+# Una entrada por owner y día: las ventanas del día en minutos y un bitmap de
+# minutos ocupados (1440 bits). Con eso, saber si un día tiene algún horario
+# libre para un servicio, o listar los de ese día, son operaciones de bits; no
+# hace falta generar los slots de 14 días para pintar el selector.
+
+DAY_CACHE_TTL = 60
+MINUTES_PER_DAY = 24 * 60
+
+
+def day_cache_key(owner_id: int, day: date) -> str:
+    return f"avail_day:{owner_id}:{day:%Y%m%d}"
+
+
+def _minutes(hhmm: str) -> int:
+    h, m = map(int, hhmm.split(":"))
+    return h * 60 + m
+
+
+def build_day_entry(day: date, ranges, bookings) -> Dict[str, Any]:
+    """Ventanas recurrentes del día y minutos ocupados por reservas de cualquier servicio."""
+    windows = []
+    for r in ranges:
+        if r.day_of_week != day.weekday() or not r.is_recurring:
+            continue
+        try:
+            start, end = _minutes(r.start_time), _minutes(r.end_time)
+        except ValueError:
+            continue
+        if end > start:
+            windows.append([start, end])
+
+    day_start = datetime.combine(day, time.min)
+    busy = 0
+    for b in bookings:
+        first = max(0, int((b.start_time - day_start).total_seconds() // 60))
+        last = min(MINUTES_PER_DAY, -int(-(b.end_time - day_start).total_seconds() // 60))
+        if last > first:
+            busy |= ((1 << (last - first)) - 1) << first
+    return {"windows": windows, "busy": busy}
+
+
+def day_slot_starts(entry: Dict[str, Any], duration_minutes: int, day: date, now: Optional[datetime] = None):
+    """Minutos de inicio libres del día, con la misma rejilla que `get_available_slots`."""
+    now = now or datetime.utcnow()
+    day_start = datetime.combine(day, time.min)
+    past = -int(-(now - day_start).total_seconds() // 60) if now > day_start else 0
+    mask = (1 << duration_minutes) - 1
+    busy = entry["busy"]
+    for start, end in entry["windows"]:
+        t = start
+        while t + duration_minutes <= end:
+            if t >= past and not busy & (mask << t):
+                yield t
+            t += duration_minutes
+
+
+async def get_day_entries(db: AsyncSession, owner_id: int, days: List[date]) -> Dict[date, Dict[str, Any]]:
+    """Entradas por día desde Redis; las que faltan se calculan juntas (2 consultas)."""
+    entries: Dict[date, Dict[str, Any]] = {}
+    try:
+        cached = await redis_client.mget([day_cache_key(owner_id, d) for d in days])
+        for d, raw in zip(days, cached):
+            if raw:
+                data = json.loads(raw)
+                entries[d] = {"windows": data["windows"], "busy": int(data["busy"], 16)}
+    except Exception as e:
+        logger.warning(f"Días de disponibilidad sin caché: {e}")
+
+    missing = [d for d in days if d not in entries]
+    if not missing:
+        return entries
+
+    window_start = datetime.combine(min(missing), time.min)
+    window_end = datetime.combine(max(missing), time.min) + timedelta(days=1)
+    ranges = (
+        await db.execute(select(AvailabilityRange).where(AvailabilityRange.owner_id == owner_id))
+    ).scalars().all()
+    bookings = (
+        await db.execute(
+            select(CallBooking.start_time, CallBooking.end_time)
+            .join(CallService)
+            .where(
+                and_(
+                    CallService.owner_id == owner_id,
+                    CallBooking.start_time < window_end,
+                    CallBooking.end_time > window_start,
+                    CallBooking.status != "cancelled",
+                )
+            )
+        )
+    ).all()
+
+    for d in missing:
+        day_start = datetime.combine(d, time.min)
+        day_end = day_start + timedelta(days=1)
+        entries[d] = build_day_entry(
+            d, ranges, [b for b in bookings if b.start_time < day_end and b.end_time > day_start]
+        )
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for d in missing:
+                payload = {"windows": entries[d]["windows"], "busy": format(entries[d]["busy"], "x")}
+                pipe.set(day_cache_key(owner_id, d), json.dumps(payload), ex=DAY_CACHE_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"No se pudieron cachear los días de {owner_id}: {e}")
+    return entries
+
+
+async def invalidate_owner_days(owner_id: int, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None):
+    """Tras una reserva/bloqueo (días que toca) o un cambio de horarios (todos)."""
+    try:
+        if start_time is None:
+            async for key in redis_client.scan_iter(match=f"avail_day:{owner_id}:*", count=100):
+                await redis_client.delete(key)
+            return
+        day, last = start_time.date(), (end_time or start_time).date()
+        keys = []
+        while day <= last:
+            keys.append(day_cache_key(owner_id, day))
+            day += timedelta(days=1)
+        await redis_client.delete(*keys)
+    except Exception as e:
+        logger.warning(f"No se pudieron invalidar los días de {owner_id}: {e}")
@@ -0,0 +1,145 @@
+"""
+Catálogo del bot: canales verificados con sus planes activos.
+
+Snapshot precalculado y versionado en Redis (`catalog:v{n}`). Los cambios de
+canales, planes o branding incrementan `catalog:version` y el siguiente lector
+reconstruye; los snapshots viejos expiran solos. Cada proceso guarda además el
+snapshot de la versión vigente en memoria: navegar el catálogo cuesta un GET
+de la versión y ninguna consulta a la BD.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.entities import Channel, Plan
+from infrastructure.database.connection import redis_client
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "catalog:version"
+# Red de seguridad para cambios hechos fuera de los endpoints (SQL manual)
+SNAPSHOT_TTL = 600
+PAGE_SIZE = 8
+
+
+def _sort_key(channel: dict) -> tuple:
+    return ((channel["title"] or "").lower(), channel["id"])
+
+
+async def build_snapshot(db: AsyncSession) -> List[Dict[str, Any]]:
+    channels = (
+        await db.execute(
+            select(Channel.id, Channel.title, Channel.welcome_message).where(Channel.is_verified.is_(True))
+        )
+    ).all()
+    plans = (
+        await db.execute(
+            select(Plan.id, Plan.channel_id, Plan.name, Plan.description, Plan.price, Plan.duration_days)
+            .join(Channel, Plan.channel_id == Channel.id)
+            .where(Channel.is_verified.is_(True), Plan.is_active.is_(True))
+            .order_by(Plan.price, Plan.id)
+        )
+    ).all()
+
+    by_channel: Dict[int, list] = {}
+    for plan in plans:
+        by_channel.setdefault(plan.channel_id, []).append({
+            "id": plan.id,
+            "name": plan.name,
+            "description": plan.description,
+            "price": plan.price,
+            "duration_days": plan.duration_days,
+        })
+    snapshot = [
+        {"id": c.id, "title": c.title, "welcome_message": c.welcome_message, "plans": by_channel.get(c.id, [])}
+        for c in channels
+    ]
+    snapshot.sort(key=_sort_key)
+    return snapshot
+
+
+class Catalog:
+    """Snapshot de una versión con índice por id para paginar por cursor."""
+
+    def __init__(self, version: int, channels: List[Dict[str, Any]]):
+        self.version = version
+        self.channels = channels
+        self._position = {c["id"]: i for i, c in enumerate(channels)}
+
+    def get_channel(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        position = self._position.get(channel_id)
+        return self.channels[position] if position is not None else None
+
+    def page(self, after_id: int = 0, size: int = PAGE_SIZE) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Canales que siguen al cursor `after_id` (0 = inicio) y el cursor de la
+        página siguiente (None si es la última). Un cursor de un canal que ya
+        no está en el catálogo vuelve al inicio.
+        """
+        start = self._position.get(after_id, -1) + 1
+        items = self.channels[start:start + size]
+        has_more = start + size < len(self.channels)
+        return items, items[-1]["id"] if items and has_more else None
+
+    def previous_cursor(self, after_id: int, size: int = PAGE_SIZE) -> Optional[int]:
+        """Cursor de la página anterior a la que sigue a `after_id`."""
+        start = self._position.get(after_id, -1) + 1
+        if start == 0:
+            return None
+        previous_start = max(0, start - size)
+        return self.channels[previous_start - 1]["id"] if previous_start else 0
+
+    def cursor_before(self, channel_id: int, size: int = PAGE_SIZE) -> int:
+        """Cursor de la página que contiene `channel_id` (para "Volver")."""
+        position = self._position.get(channel_id)
+        if not position:
+            return 0
+        page_start = position - position % size
+        return self.channels[page_start - 1]["id"] if page_start else 0
+
+
+class CatalogCache:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._local: Optional[Catalog] = None
+        self._local_at = 0.0
+
+    async def _version(self) -> int:
+        return int(await self.redis.get(VERSION_KEY) or 0)
+
+    async def get(self, db: AsyncSession) -> Catalog:
+        try:
+            version = await self._version()
+        except Exception as e:
+            logger.warning(f"Catálogo sin caché: {e}")
+            return Catalog(-1, await build_snapshot(db))
+
+        local = self._local
+        if local is not None and local.version == version and time.monotonic() - self._local_at < SNAPSHOT_TTL:
+            return local
+
+        key = f"catalog:v{version}"
+        raw = await self.redis.get(key)
+        if raw is not None:
+            channels = json.loads(raw)
+        else:
+            channels = await build_snapshot(db)
+            await self.redis.set(key, json.dumps(channels, separators=(",", ":")), ex=SNAPSHOT_TTL)
+        self._local, self._local_at = Catalog(version, channels), time.monotonic()
+        return self._local
+
+    async def invalidate(self) -> None:
+        """Llamar tras crear/editar/borrar canales, planes o branding."""
+        try:
+            await self.redis.incr(VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"No se pudo invalidar el catálogo: {e}")
+
+
+catalog_cache = CatalogCache(redis_client)
@@ -0,0 +1,92 @@
+"""
+Tarjetas de perfil del bot (/me) ya renderizadas, por usuario, en Redis.
+
+Se invalidan de forma incremental: quien cambia algo que la tarjeta muestra
+(saldo, suscripciones, referidos) marca al usuario en la sesión con
+`mark_profile_dirty` y las claves se borran después del commit. Editar rangos
+borra todas las tarjetas. El TTL de cada tarjeta vence cuando cambiaría algún
+"días restantes" o expiraría una suscripción.
+"""
+
+import asyncio
+import logging
+from typing import Iterable, Optional, Set
+
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from infrastructure.database.connection import redis_client
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TTL = 3600
+_DIRTY_KEY = "profile_dirty"
+_pending: Set[asyncio.Task] = set()
+
+
+def profile_key(user_id: int) -> str:
+    return f"bot:profile:{user_id}"
+
+
+class ProfileCardCache:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def get(self, user_id: int) -> Optional[str]:
+        try:
+            card = await self.redis.get(profile_key(user_id))
+        except Exception as e:
+            logger.warning(f"Caché de perfiles no disponible: {e}")
+            return None
+        return card.decode() if isinstance(card, bytes) else card
+
+    async def set(self, user_id: int, card: str, ttl: int = PROFILE_TTL) -> None:
+        try:
+            await self.redis.set(profile_key(user_id), card, ex=max(1, min(ttl, PROFILE_TTL)))
+        except Exception as e:
+            logger.warning(f"Caché de perfiles no disponible: {e}")
+
+    async def invalidate(self, *user_ids: int) -> None:
+        if not user_ids:
+            return
+        try:
+            await self.redis.delete(*(profile_key(u) for u in user_ids))
+        except Exception as e:
+            logger.warning(f"No se pudieron invalidar perfiles {list(user_ids)[:10]}: {e}")
+
+    async def invalidate_all(self) -> None:
+        """Tras editar rangos: cambia el rango mostrado de cualquier usuario."""
+        try:
+            async for key in self.redis.scan_iter(match=profile_key("*"), count=500):
+                await self.redis.delete(key)
+        except Exception as e:
+            logger.warning(f"No se pudieron invalidar los perfiles: {e}")
+
+
+profile_cache = ProfileCardCache(redis_client)
+
+
+def mark_profile_dirty(db, user_ids: Iterable[Optional[int]]) -> None:
+    """Invalida las tarjetas de `user_ids` cuando `db` confirme la transacción."""
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault(_DIRTY_KEY, set()).update(u for u in user_ids if u)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if not dirty:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Sesión síncrona (scripts): las tarjetas vencen por TTL
+    task = loop.create_task(profile_cache.invalidate(*dirty))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_DIRTY_KEY, None)
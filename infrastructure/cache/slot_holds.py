@@ -0,0 +1,130 @@
+"""
+Reservas temporales de horarios de llamada mientras el usuario paga.
+
+Tomar un horario es un script Lua (comparar + SET con TTL por owner e inicio),
+atómico en Redis: dos usuarios que eligen el mismo horario no llegan juntos al
+INSERT. Cada owner
+tiene además un ZSET `slot_holds:{owner_id}` (miembro = inicio, score =
+vencimiento) para que la vista de disponibilidad excluya los horarios tomados
+por otros sin esperar al TTL de su caché; una reserva liberada o vencida vuelve
+a aparecer en la siguiente lectura. La guarda final es el índice único
+`ux_call_bookings_owner_start_time`.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Set
+
+from redis.asyncio import Redis
+
+from infrastructure.database.connection import redis_client
+
+logger = logging.getLogger(__name__)
+
+HOLD_TTL = int(os.getenv("SLOT_HOLD_SECONDS", "600"))
+
+# KEYS: hold, índice | ARGV: holder, ttl, vencimiento, miembro
+_HOLD = """
+local current = redis.call('GET', KEYS[1])
+if current and current ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 1
+"""
+
+# KEYS: hold, índice | ARGV: holder, miembro
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('ZREM', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def slot_member(start_time: datetime) -> str:
+    return start_time.strftime("%Y%m%d%H%M")
+
+
+def hold_key(owner_id: int, start_time: datetime) -> str:
+    return f"slot_hold:{owner_id}:{slot_member(start_time)}"
+
+
+def index_key(owner_id: int) -> str:
+    return f"slot_holds:{owner_id}"
+
+
+class SlotHolds:
+    def __init__(self, redis: Redis, ttl: int = HOLD_TTL):
+        self.redis = redis
+        self.ttl = ttl
+
+    async def hold(self, owner_id: int, start_time: datetime, holder: int) -> bool:
+        """Toma (o renueva, si ya es suyo) el horario. False si lo tiene otro."""
+        try:
+            taken = await self.redis.eval(
+                _HOLD,
+                2,
+                hold_key(owner_id, start_time),
+                index_key(owner_id),
+                str(holder),
+                self.ttl,
+                time.time() + self.ttl,
+                slot_member(start_time),
+            )
+        except Exception as e:
+            # Sin Redis la guarda es solo el índice único de la BD
+            logger.warning(f"Reservas temporales no disponibles: {e}")
+            return True
+        return bool(taken)
+
+    async def release(self, owner_id: int, start_time: datetime, holder: int) -> None:
+        try:
+            await self.redis.eval(
+                _RELEASE, 2, hold_key(owner_id, start_time), index_key(owner_id), str(holder), slot_member(start_time)
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el horario {hold_key(owner_id, start_time)}: {e}")
+
+    async def holder(self, owner_id: int, start_time: datetime) -> Optional[int]:
+        try:
+            value = await self.redis.get(hold_key(owner_id, start_time))
+        except Exception as e:
+            logger.warning(f"Reservas temporales no disponibles: {e}")
+            return None
+        return int(value) if value is not None else None
+
+    async def held_by_others(self, owner_id: int, holder: Optional[int] = None) -> Set[str]:
+        """Inicios (`slot_member`) con una reserva vigente de otro usuario."""
+        key = index_key(owner_id)
+        now = time.time()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zremrangebyscore(key, "-inf", now)
+                pipe.zrangebyscore(key, now, "+inf")
+                _, members = await pipe.execute()
+            members = [m.decode() if isinstance(m, bytes) else m for m in members]
+            if holder is None or not members:
+                return set(members)
+            owners = await self.redis.mget([f"slot_hold:{owner_id}:{m}" for m in members])
+        except Exception as e:
+            logger.warning(f"Reservas temporales no disponibles: {e}")
+            return set()
+        mine = str(holder)
+        return {
+            m for m, value in zip(members, owners)
+            if value is not None and (value.decode() if isinstance(value, bytes) else value) != mine
+        }
+
+    async def filter_available(self, owner_id: int, slots: Iterable[dict], holder: Optional[int] = None) -> List[dict]:
+        held = await self.held_by_others(owner_id, holder)
+        return [s for s in slots if slot_member(s["start_time"]) not in held]
+
+
+slot_holds = SlotHolds(redis_client)
@@ -1,18 +1,45 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Insert, Update, Delete
+from sqlalchemy import text
 from redis.asyncio import Redis
 import os
+import time
+import logging
 from dotenv import load_dotenv
 
+from infrastructure.database.instrumentation import install_query_instrumentation
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Valor por defecto para desarrollo local si no hay DB configurada
 DEFAULT_DB = "sqlite+aiosqlite:///./membership.db"
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-if not DATABASE_URL:
-    DATABASE_URL = DEFAULT_DB
-elif DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+def _normalize_url(url: str) -> str:
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+DATABASE_URL = _normalize_url(DATABASE_URL) if DATABASE_URL else DEFAULT_DB
+
+# Réplica de solo lectura (opcional). Sin réplica, las lecturas pesadas usan un
+# pool separado sobre el primario para no competir con webhooks de pago.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+DATABASE_READ_URL = _normalize_url(DATABASE_READ_URL) if DATABASE_READ_URL else None
+
+# Tamaños de pool por tipo de carga
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "3"))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "5"))
+
+# Si la réplica va más atrasada que esto, las lecturas vuelven al primario
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "30"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "10"))
 
 # Supabase generalmente requiere SSL, pero a veces asyncpg lo negocia mejor sin forzarlo explícitamente en el connect_args
 # si falla la conexión. Vamos a probar sin forzar el contexto SSL manual.
@@ -24,8 +51,8 @@ if "postgresql" in DATABASE_URL:
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,  # Desactivado en producción para rendimiento
-    pool_size=5,  # Reduced for Cloud Run autoscaling (prevent connection exhaust)
-    max_overflow=10,  # Cap overflow
+    pool_size=DB_POOL_SIZE,  # Reduced for Cloud Run autoscaling (prevent connection exhaust)
+    max_overflow=DB_MAX_OVERFLOW,  # Cap overflow
     pool_timeout=30,  # Segundos antes de error si no hay conexión libre
     pool_recycle=1800,  # Reciclar conexión cada 30 min para evitar desconexiones de red
     connect_args=connect_args,
@@ -34,6 +61,81 @@ AsyncSessionLocal = async_sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
+# Engine de lectura (dashboards, analítica, listados admin)
+read_engine = create_async_engine(
+    DATABASE_READ_URL or DATABASE_URL,
+    echo=False,
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=DB_READ_MAX_OVERFLOW,
+    pool_timeout=30,
+    pool_recycle=1800,
+    connect_args=connect_args,
+)
+
+# Conteo de consultas / tiempo en BD por request y por update del bot
+install_query_instrumentation(engine)
+install_query_instrumentation(read_engine)
+
+
+class ReplicaHealth:
+    """Estado de retraso de la réplica, revisado como máximo cada N segundos."""
+
+    def __init__(self):
+        self.healthy = True
+        self.lag_seconds = 0.0
+        self._checked_at = 0.0
+
+    async def refresh(self):
+        if not DATABASE_READ_URL or "postgresql" not in DATABASE_READ_URL:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < DB_REPLICA_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            async with read_engine.connect() as conn:
+                # Con el primario ocioso `now() - replay_timestamp` crece sin
+                # que haya nada pendiente: si ya se aplicó todo lo recibido,
+                # el retraso es 0.
+                res = await conn.execute(
+                    text(
+                        "SELECT CASE WHEN pg_last_wal_receive_lsn() IS NULL"
+                        " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+                        " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                    )
+                )
+                self.lag_seconds = float(res.scalar() or 0)
+            self.healthy = self.lag_seconds <= DB_REPLICA_MAX_LAG_SECONDS
+        except Exception as e:
+            logger.warning(f"Replica health check failed, using primary: {e}")
+            self.healthy = False
+        if not self.healthy:
+            logger.warning(f"Replica lag {self.lag_seconds:.1f}s, routing reads to primary")
+
+
+replica_health = ReplicaHealth()
+
+
+class ReadRoutingSession(Session):
+    """
+    Enruta por sentencia: SELECTs al engine de lectura, escrituras y flush al
+    primario. Tras la primera escritura la sesión queda fijada al primario para
+    que las lecturas siguientes vean lo escrito. Si la réplica está atrasada,
+    todo va al primario.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["pinned_primary"] = True
+        if self.info.get("pinned_primary") or not replica_health.healthy:
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+
+AsyncReadSessionLocal = async_sessionmaker(
+    expire_on_commit=False, class_=AsyncSession, sync_session_class=ReadRoutingSession
+)
+
 # Redis Configuration
 REDIS_URL = os.getenv("REDIS_URL")
 if not REDIS_URL or REDIS_URL.strip() == "":
@@ -55,6 +157,13 @@ async def get_db():
         yield session
 
 
+async def get_read_db():
+    """Dependency para endpoints de solo lectura (réplica o pool de lectura)"""
+    await replica_health.refresh()
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
 async def get_redis():
     """Dependency to get Redis client"""
     return redis_client
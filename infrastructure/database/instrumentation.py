@@ -0,0 +1,108 @@
+"""
+Instrumentación de consultas SQL por request / update del bot.
+
+Se engancha a los eventos de cursor de SQLAlchemy y acumula, dentro del
+contexto activo (ContextVar), el número de consultas, el tiempo total en BD,
+las filas afectadas/devueltas y las sentencias repetidas (posibles N+1).
+"""
+
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+
+# Una sentencia idéntica ejecutada este número de veces se marca como N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0  # segundos
+        self.rows = 0
+        self.statements: Counter = Counter()
+
+    @property
+    def total_time_ms(self) -> float:
+        return round(self.total_time * 1000, 2)
+
+    def repeated_statements(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[str]:
+        return [sql for sql, n in self.statements.items() if n >= threshold]
+
+    def as_log_fields(self) -> dict:
+        repeated = self.repeated_statements()
+        return {
+            "db_queries": self.count,
+            "db_time_ms": self.total_time_ms,
+            "db_rows": self.rows,
+            "db_n_plus_one": len(repeated),
+            "db_repeated_statements": [sql[:200] for sql in repeated],
+        }
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Activa el conteo de consultas para el bloque (y las tareas que herede)."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # En el contexto de la sentencia: si falla no queda nada en la conexión del pool
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = context._query_start_time
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.total_time += time.perf_counter() - started
+    stats.statements[statement] += 1
+    rowcount = getattr(cursor, "rowcount", -1)
+    if rowcount and rowcount > 0:
+        stats.rows += rowcount
+
+
+def install_query_instrumentation(engine):
+    """Registra los listeners en un Engine (o AsyncEngine)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def assert_query_budget(max_queries: int, allow_n_plus_one: bool = False) -> Iterator[QueryStats]:
+    """Falla si el bloque ejecuta más consultas que el presupuesto o tiene N+1."""
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"Query budget exceeded: {stats.count} > {max_queries}\n"
+            + "\n".join(f"{n}x {sql}" for sql, n in stats.statements.most_common(5))
+        )
+    repeated = stats.repeated_statements()
+    if repeated and not allow_n_plus_one:
+        raise QueryBudgetExceeded(f"N+1 detected: {repeated}")
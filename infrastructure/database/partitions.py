@@ -0,0 +1,127 @@
+"""
+Particiones mensuales por rango de `created_at` (solo PostgreSQL).
+
+`payments` y `affiliate_earnings` son tablas particionadas desde la migración
+6f1c2a9e4b70: una partición `<tabla>_pYYYYMM` por mes más `<tabla>_default`
+como red de seguridad. `ensure_partitions` crea los meses siguientes (se
+ejecuta al arrancar la API y desde scripts/manage_partitions.py) y
+`archive_partitions` vuelca los meses antiguos a CSV comprimido y los elimina.
+
+Archivar es definitivo para la base: los rollups (`owner_daily_stats`,
+`platform_monthly_revenue`, `affiliate_earning_totals`) conservan los
+agregados, pero sus scripts de reconstrucción ya no verán esos meses.
+"""
+
+import gzip
+import os
+import re
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.use_cases.cohorts import add_months, month_start
+from infrastructure.storage.local_disk import LocalStorageService
+
+PARTITIONED_TABLES = ("payments", "affiliate_earnings")
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+ARCHIVE_PATH = os.getenv("PARTITION_ARCHIVE_PATH", "data/archive")
+
+_PARTITION_RE = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_ddl(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def is_partitioned(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+async def list_partitions(db: AsyncSession, table: str) -> List[date]:
+    """Meses con partición adjunta a `table`, en orden."""
+    result = await db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    )
+    months = []
+    for (name,) in result:
+        match = _PARTITION_RE.match(name)
+        if match and match["table"] == table:
+            months.append(date(int(match["year"]), int(match["month"]), 1))
+    return sorted(months)
+
+
+async def ensure_partitions(
+    db: AsyncSession, months_ahead: int = MONTHS_AHEAD, now: Optional[datetime] = None
+) -> List[str]:
+    """Crea las particiones del mes en curso y de los `months_ahead` siguientes."""
+    if not is_partitioned(db):
+        return []
+    first = month_start(now or datetime.utcnow())
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = set(await list_partitions(db, table))
+        for offset in range(months_ahead + 1):
+            month = add_months(first, offset)
+            if month not in existing:
+                await db.execute(text(partition_ddl(table, month)))
+                created.append(partition_name(table, month))
+    await db.commit()
+    return created
+
+
+async def _dump_partition(db: AsyncSession, name: str, path: str) -> int:
+    """COPY de la partición a `path` (CSV con cabecera, gzip) sin cargarla en memoria."""
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    written = 0
+
+    with gzip.open(path, "wb") as archive:
+        async def _write(chunk: bytes):
+            nonlocal written
+            written += len(chunk)
+            archive.write(chunk)
+
+        await raw.driver_connection.copy_from_table(name, output=_write, format="csv", header=True)
+    return written
+
+
+async def archive_partitions(db: AsyncSession, before: date, dry_run: bool = False) -> List[str]:
+    """
+    Archiva las particiones de meses anteriores a `before`: las vuelca a
+    `ARCHIVE_PATH/<partición>.csv.gz` y después las desadjunta y elimina.
+    Cada partición se confirma por separado; si falla a mitad, se reintenta.
+    """
+    if not is_partitioned(db):
+        return []
+    storage = LocalStorageService(ARCHIVE_PATH)
+    archived = []
+    # affiliate_earnings primero: sus filas cuelgan de los pagos del mismo mes
+    for table in reversed(PARTITIONED_TABLES):
+        for month in await list_partitions(db, table):
+            if month >= month_start(before):
+                continue
+            name = partition_name(table, month)
+            archived.append(name)
+            if dry_run:
+                continue
+            path = storage.get_absolute_path(f"{name}.csv.gz")
+            await _dump_partition(db, name, path)
+            await db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            await db.execute(text(f"DROP TABLE {name}"))
+            await db.commit()
+    return archived
@@ -0,0 +1,235 @@
+"""
+Gateway hacia los proveedores de pago (Stripe / Wompi).
+
+- Un único httpx.AsyncClient compartido (keep-alive, HTTP/2 si `h2` está instalado)
+  para no pagar un handshake TLS por cada link.
+- El SDK de Stripe es síncrono: sus llamadas corren en un pool de hilos acotado
+  para no bloquear el event loop.
+- Timeouts y circuit breaker por proveedor.
+- Cache en Redis de checkouts reutilizables por (usuario, plan, promo, método).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+import stripe
+
+from infrastructure.database.connection import redis_client
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+WOMPI_API_BASE = os.getenv("WOMPI_API_BASE", "https://sandbox.wompi.co/v1")
+WOMPI_PUBLIC_KEY = os.getenv("WOMPI_PUBLIC_KEY")
+
+# Timeouts por proveedor (segundos)
+PROVIDER_TIMEOUTS = {
+    "stripe": float(os.getenv("STRIPE_TIMEOUT_SECONDS", "10")),
+    "wompi": float(os.getenv("WOMPI_TIMEOUT_SECONDS", "8")),
+}
+
+STRIPE_MAX_WORKERS = int(os.getenv("STRIPE_MAX_WORKERS", "8"))
+
+# Ventana de reutilización de un checkout (Stripe expira sesiones a las 24h,
+# Wompi mantiene el link single_use hasta que se paga).
+CHECKOUT_CACHE_TTL = int(os.getenv("CHECKOUT_CACHE_TTL_SECONDS", "1800"))
+
+
+class ProviderUnavailableError(Exception):
+    """El proveedor está caído o su circuit breaker está abierto."""
+
+    def __init__(self, provider: str, message: str = ""):
+        self.provider = provider
+        super().__init__(message or f"Proveedor {provider} no disponible")
+
+
+class ProviderRequestError(Exception):
+    """El proveedor respondió, pero rechazó la solicitud."""
+
+    def __init__(self, provider: str, message: str):
+        self.provider = provider
+        super().__init__(message)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simple: tras `failure_threshold` fallos consecutivos se abre
+    durante `reset_timeout` segundos; después deja pasar una llamada de prueba
+    (half-open) y se cierra si tiene éxito.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            logger.warning(f"Circuit breaker '{self.name}' abierto tras {self._failures} fallos")
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], timeout: float) -> Any:
+        if not self.allow_request():
+            raise ProviderUnavailableError(self.name)
+        try:
+            result = await asyncio.wait_for(fn(), timeout=timeout)
+        except ProviderRequestError:
+            # Error de negocio (4xx): el proveedor está sano
+            self.record_success()
+            raise
+        except (
+            asyncio.TimeoutError,
+            httpx.TransportError,
+            httpx.HTTPStatusError,
+            stripe.APIConnectionError,
+        ) as e:
+            self.record_failure()
+            raise ProviderUnavailableError(self.name, f"{self.name}: {e!r}") from e
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class PaymentGateway:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stripe_executor = ThreadPoolExecutor(
+            max_workers=STRIPE_MAX_WORKERS, thread_name_prefix="stripe"
+        )
+        self.breakers: Dict[str, CircuitBreaker] = {
+            "stripe": CircuitBreaker("stripe"),
+            "wompi": CircuitBreaker("wompi"),
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartido (se crea perezosamente dentro del event loop)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_ENABLED,
+                timeout=httpx.Timeout(max(PROVIDER_TIMEOUTS.values())),
+                limits=httpx.Limits(
+                    max_connections=50,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=60,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def create_stripe_checkout(self, **params) -> str:
+        """Crea una sesión de Stripe Checkout fuera del event loop y retorna su URL."""
+
+        async def _create():
+            loop = asyncio.get_running_loop()
+            try:
+                session = await loop.run_in_executor(
+                    self._stripe_executor,
+                    lambda: stripe.checkout.Session.create(**params),
+                )
+            except (stripe.InvalidRequestError, stripe.CardError) as e:
+                raise ProviderRequestError("stripe", str(e)) from e
+            return session.url
+
+        return await self.breakers["stripe"].call(_create, PROVIDER_TIMEOUTS["stripe"])
+
+    async def create_wompi_link(self, payload: dict) -> str:
+        """Crea un link de pago de Wompi usando el cliente compartido."""
+
+        async def _create():
+            resp = await self.client.post(
+                f"{WOMPI_API_BASE}/payment_links",
+                json=payload,
+                headers={"Authorization": f"Bearer {WOMPI_PUBLIC_KEY}"},
+            )
+            if resp.status_code >= 500:
+                raise httpx.HTTPStatusError(
+                    f"Wompi {resp.status_code}", request=resp.request, response=resp
+                )
+            if resp.status_code != 201:
+                raise ProviderRequestError("wompi", resp.text)
+            wompi_data = resp.json().get("data", {})
+            return f"https://checkout.wompi.co/l/{wompi_data.get('id')}"
+
+        return await self.breakers["wompi"].call(_create, PROVIDER_TIMEOUTS["wompi"])
+
+
+# --- Cache de checkouts reutilizables ---
+
+
+def _checkout_cache_key(user_id: int, plan_id: int, promo_id: Optional[int], method: str) -> str:
+    return f"checkout:{method}:{user_id}:{plan_id}:{promo_id or 0}"
+
+
+async def get_cached_checkout(
+    user_id: int, plan_id: int, promo_id: Optional[int], method: str
+) -> Optional[dict]:
+    try:
+        cached = await redis_client.get(_checkout_cache_key(user_id, plan_id, promo_id, method))
+        return json.loads(cached) if cached else None
+    except Exception as e:
+        logger.warning(f"Checkout cache read error: {e}")
+        return None
+
+
+async def cache_checkout(
+    user_id: int, plan_id: int, promo_id: Optional[int], method: str, data: dict
+):
+    try:
+        await redis_client.setex(
+            _checkout_cache_key(user_id, plan_id, promo_id, method),
+            CHECKOUT_CACHE_TTL,
+            json.dumps(data),
+        )
+    except Exception as e:
+        logger.warning(f"Checkout cache write error: {e}")
+
+
+async def invalidate_checkout(
+    user_id: int, plan_id: int, promo_id: Optional[int], method: str
+):
+    """Se llama cuando el checkout se completa: ya no es reutilizable."""
+    try:
+        await redis_client.delete(_checkout_cache_key(user_id, plan_id, promo_id, method))
+    except Exception as e:
+        logger.warning(f"Checkout cache invalidation error: {e}")
+
+
+# Global instance
+payment_gateway = PaymentGateway()
@@ -1,8 +1,23 @@
+import asyncio
 import os
+import time
+from typing import Optional, Tuple, Union
+
 import aiohttp
 import logging
+from redis.asyncio import Redis
+
+from infrastructure.database.connection import redis_client
 
 API_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+# Límite global de la Bot API para envíos masivos (~30 mensajes/s)
+SEND_RATE = float(os.getenv("TELEGRAM_SEND_RATE", 30))
+SEND_RATE_KEY = "telegram:send_rate"
+
+SENT = "sent"
+BLOCKED = "blocked"  # El usuario bloqueó al bot o el chat ya no existe
+FAILED = "failed"
 
 
 async def send_telegram_notification(telegram_id: int, message: str):
@@ -12,7 +27,7 @@ async def send_telegram_notification(telegram_id: int, message: str):
     if not API_TOKEN or not telegram_id:
         return
 
-    url = f"https://api.telegram.org/bot{API_TOKEN}/sendMessage"
+    url = f"{API_URL}/bot{API_TOKEN}/sendMessage"
     payload = {"chat_id": telegram_id, "text": message, "parse_mode": "Markdown"}
 
     try:
@@ -24,3 +39,136 @@ async def send_telegram_notification(telegram_id: int, message: str):
                     )
     except Exception as e:
         logging.error(f"Excepción al enviar notificación TG: {str(e)}")
+
+
+# GCRA (token bucket de una sola clave) con el reloj de Redis.
+# KEYS: marca | ARGV: ms por token, tolerancia en ms (ráfaga - 1 tokens)
+# Devuelve 0 si hay token, o los ms que faltan para el siguiente.
+_GCRA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+if tat - tolerance > now then
+    return math.ceil(tat - tolerance - now)
+end
+redis.call('SET', KEYS[1], tostring(tat + interval), 'PX', math.ceil(tat + interval - now) + 1000)
+return 0
+"""
+
+
+class RateLimiter:
+    """Token bucket compartido por todas las tareas de envío del proceso."""
+
+    def __init__(self, rate: float = SEND_RATE, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RedisRateLimiter:
+    """
+    El mismo límite, compartido por todos los procesos y réplicas (API,
+    scripts de difusiones y recordatorios). Si Redis falla se aplica el límite
+    local del proceso.
+    """
+
+    def __init__(self, redis: Redis, rate: float = SEND_RATE, burst: Optional[float] = None, key: str = SEND_RATE_KEY):
+        self.redis = redis
+        self.key = key
+        self.interval_ms = 1000 / rate
+        self.tolerance_ms = ((burst if burst is not None else rate) - 1) * self.interval_ms
+        self._local = RateLimiter(rate, burst)
+
+    async def acquire(self) -> None:
+        while True:
+            try:
+                wait_ms = await self.redis.eval(_GCRA, 1, self.key, self.interval_ms, self.tolerance_ms)
+            except Exception as e:
+                logging.warning(f"Límite de envío en Redis no disponible, se usa el local: {e}")
+                await self._local.acquire()
+                return
+            if not wait_ms:
+                return
+            await asyncio.sleep(int(wait_ms) / 1000)
+
+
+class TelegramSender:
+    """
+    Envíos masivos por la Bot API con límite global y backoff por chat.
+
+    Un 429 respeta el `retry_after` de ese chat y reintenta; 403 (bot
+    bloqueado) y "chat not found" no se reintentan.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: str = API_URL,
+        limiter: Optional[Union[RateLimiter, RedisRateLimiter]] = None,
+        max_attempts: int = 5,
+    ):
+        self.token = token or API_TOKEN
+        self.base_url = base_url.rstrip("/")
+        self.limiter = limiter or RateLimiter()
+        self.max_attempts = max_attempts
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _client(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        return self._session
+
+    async def send_message(self, chat_id: int, text: str, **extra) -> Tuple[str, Optional[str]]:
+        """Devuelve (SENT | BLOCKED | FAILED, descripción del error)."""
+        url = f"{self.base_url}/bot{self.token}/sendMessage"
+        payload = {"chat_id": chat_id, "text": text, **extra}
+        error = None
+        for attempt in range(self.max_attempts):
+            await self.limiter.acquire()
+            try:
+                async with self._client().post(url, json=payload) as response:
+                    body = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = str(e) or type(e).__name__
+                await asyncio.sleep(min(2 ** attempt * 0.5, 10))
+                continue
+
+            if body.get("ok"):
+                return SENT, None
+            error = body.get("description") or f"HTTP {response.status}"
+            code = body.get("error_code", response.status)
+            if code == 429:
+                retry_after = (body.get("parameters") or {}).get("retry_after", 1)
+                await asyncio.sleep(retry_after)
+            elif code == 403 or (code == 400 and "chat not found" in error.lower()):
+                return BLOCKED, error
+            elif code >= 500:
+                await asyncio.sleep(min(2 ** attempt * 0.5, 10))
+            else:
+                return FAILED, error
+        return FAILED, error
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# Límite en Redis: la Bot API cuenta por bot, no por proceso
+telegram_sender = TelegramSender(limiter=RedisRateLimiter(redis_client))
@@ -49,3 +49,41 @@ def generate_calendar_links(title: str, start_time: datetime, end_time: datetime
         "outlook": outlook_url,
         "yahoo": yahoo_url
     }
+
+
+def _ics_escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def generate_ics(events: list) -> str:
+    """
+    Builds an iCalendar feed. Each event is a dict with uid, title, start_time,
+    end_time and optional description/location (times in UTC).
+    """
+    fmt = "%Y%m%dT%H%M%SZ"
+    stamp = datetime.utcnow().strftime(fmt)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//FGate//Calls//ES",
+        "CALSCALE:GREGORIAN",
+    ]
+    for event in events:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{event['uid']}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{event['start_time'].strftime(fmt)}",
+            f"DTEND:{event['end_time'].strftime(fmt)}",
+            f"SUMMARY:{_ics_escape(event['title'])}",
+            f"DESCRIPTION:{_ics_escape(event.get('description', ''))}",
+            f"LOCATION:{_ics_escape(event.get('location', ''))}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
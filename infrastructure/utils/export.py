@@ -0,0 +1,143 @@
+"""
+Codificadores incrementales para exportaciones masivas.
+
+Cada codificador recibe lotes de filas (tuplas en el orden de `columns`) y
+emite bytes a medida que llegan; `gzip_stream` comprime al vuelo. Parquet es
+opcional (requiere `pyarrow`).
+"""
+
+import asyncio
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    PARQUET_ENABLED = True
+except ImportError:
+    PARQUET_ENABLED = False
+
+# formato -> (media type, extensión)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+async def encode_csv(columns: Sequence, batches: AsyncIterator[Sequence[tuple]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    async for batch in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+            for row in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def encode_ndjson(columns: Sequence, batches: AsyncIterator[Sequence[tuple]]) -> AsyncIterator[bytes]:
+    names = [column.name for column in columns]
+    async for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=_json_default, separators=(",", ":")) + "\n"
+            for row in batch
+        ).encode()
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, (Float, Numeric)):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _ChunkSink:
+    """Destino tipo archivo para ParquetWriter que se vacía tras cada row group."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def encode_parquet(columns: Sequence, batches: AsyncIterator[Sequence[tuple]]) -> AsyncIterator[bytes]:
+    """Un row group por lote; la codificación corre en un hilo para no bloquear el loop."""
+    if not PARQUET_ENABLED:
+        raise RuntimeError("pyarrow no está instalado")
+    schema = pa.schema([(column.name, _arrow_type(column)) for column in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        async for batch in batches:
+            table = pa.Table.from_pydict(
+                {name: [row[i] for row in batch] for i, name in enumerate(schema.names)},
+                schema=schema,
+            )
+            await asyncio.to_thread(writer.write_table, table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> contenedor gzip
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
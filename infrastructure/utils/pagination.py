@@ -0,0 +1,122 @@
+"""
+Paginación keyset compartida para los listados grandes.
+
+- Cursores opacos: codifican los valores de la última fila de la página
+  (p. ej. `(created_at, id)`); el cliente lo devuelve tal cual.
+- Orden estable: siempre descendente por las columnas de orden + `id` como
+  desempate, con índices compuestos que cubren filtro y orden.
+- Totales estimados con las estadísticas del planner (`EXPLAIN`), sin
+  `COUNT(*)` sobre tablas de millones de filas.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return tuple(_decode_value(v) for v in values)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def apply_filters(
+    query,
+    equals: Sequence[Tuple[Any, Any]] = (),
+    date_column=None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    """Filtros opcionales: igualdad `(columna, valor)` y rango `[date_from, date_to)`. None = sin filtro."""
+    for column, value in equals:
+        if value is not None:
+            query = query.where(column == value)
+    if date_column is not None and date_from is not None:
+        query = query.where(date_column >= date_from)
+    if date_column is not None and date_to is not None:
+        query = query.where(date_column < date_to)
+    return query
+
+
+async def estimate_count(db: AsyncSession, query) -> Optional[int]:
+    """
+    Filas estimadas por el planner para `query` (Postgres). En otros motores
+    (SQLite en tests/dev) las tablas son pequeñas y se cuenta de verdad.
+    """
+    query = query.order_by(None).limit(None)
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        total = await db.execute(select(func.count()).select_from(query.subquery()))
+        return total.scalar_one()
+    try:
+        sql = query.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        conn = await db.connection()
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    except SQLAlchemyError:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    order_columns: Sequence,
+    cursor: Optional[str],
+    limit: int,
+    scalars: bool = False,
+    estimate: bool = True,
+) -> dict:
+    """
+    Ejecuta una página keyset de `query` ordenada por `order_columns`
+    (descendente; la última debe ser única, normalmente `id`).
+
+    Devuelve `{items, next_cursor, total_estimate}`; el total solo se estima en
+    la primera página (sin cursor) y si `estimate`, el cliente lo conserva al avanzar.
+    """
+    total_estimate = await estimate_count(db, query) if estimate and not cursor else None
+
+    page = query.order_by(*[column.desc() for column in order_columns]).limit(limit + 1)
+    if cursor:
+        values = decode_cursor(cursor, len(order_columns))
+        page = page.where(tuple_(*order_columns) < tuple_(*values))
+
+    result = await db.execute(page)
+    rows = result.scalars().all() if scalars else result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(*[getattr(last, column.key) for column in order_columns])
+    return {"items": rows, "next_cursor": next_cursor, "total_estimate": total_estimate}
@@ -6,14 +6,23 @@ from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from api.main import app as api_app
-from bot.main import app as bot_app, on_bot_startup
+from bot.main import (
+    app as bot_app,
+    bot_metrics,
+    on_bot_shutdown,
+    on_bot_startup,
+    start_stream_worker,
+    stop_stream_worker,
+)
 import os
 from dotenv import load_dotenv
 
 # load_dotenv(override=True)  # Disabled for production to use Cloud Run env vars
 
 # Selective service mounting based on SERVICE_TYPE env var
-# Options: unified (default), api, bot
+# Options: unified (default), api, bot, bot-worker
+# bot-worker: sin webhook ni API; consume el stream de updates del bot
+# (requiere BOT_DISPATCH_MODE=stream en el servicio que recibe el webhook)
 SERVICE_TYPE = os.getenv("SERVICE_TYPE", "unified").lower()
 
 # Create main application
@@ -114,6 +123,19 @@ async def root_path():
 if SERVICE_TYPE in ["unified", "bot"]:
     app.mount("/bot", bot_app)
 
+# 4b. Bot Worker (consume updates publicados por el webhook en Redis Streams)
+if SERVICE_TYPE == "bot-worker":
+
+    app.add_api_route("/metrics", bot_metrics, methods=["GET"])
+
+    @app.on_event("startup")
+    async def start_bot_worker():
+        await start_stream_worker()
+
+    @app.on_event("shutdown")
+    async def stop_bot_worker():
+        await stop_stream_worker()
+
 # 5. API Mounts
 if SERVICE_TYPE in ["unified", "api"]:
     app.mount("/api", api_app)
@@ -124,6 +146,15 @@ if SERVICE_TYPE in ["unified", "api"]:
     async def startup():
         await on_bot_startup()
 
+    @app.on_event("shutdown")
+    async def shutdown():
+        from infrastructure.external_apis.payment_gateway import payment_gateway
+        from infrastructure.external_apis.telegram import telegram_sender
+
+        await on_bot_shutdown()
+        await payment_gateway.aclose()
+        await telegram_sender.aclose()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,54 @@
+"""add keyset indexes for admin withdrawals, tickets, payments and ledger
+
+Revision ID: 3a7e5c1d9b42
+Revises: f0197bf88c7f
+Create Date: 2026-10-19 17:12:31.508114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a7e5c1d9b42'
+down_revision: Union[str, None] = 'f0197bf88c7f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabla, columna de orden, respaldo para filas antiguas sin fecha)
+SORT_COLUMNS = (
+    ('withdrawals', 'created_at', "TIMESTAMP '1970-01-01'"),
+    ('payments', 'created_at', "TIMESTAMP '1970-01-01'"),
+    ('affiliate_earnings', 'created_at', "TIMESTAMP '1970-01-01'"),
+    ('support_tickets', 'updated_at', "COALESCE(created_at, TIMESTAMP '1970-01-01')"),
+)
+
+INDEXES = (
+    ('ix_withdrawals_created_at_id', 'withdrawals', ['created_at', 'id']),
+    ('ix_withdrawals_status_created_at_id', 'withdrawals', ['status', 'created_at', 'id']),
+    ('ix_support_tickets_updated_at_id', 'support_tickets', ['updated_at', 'id']),
+    ('ix_support_tickets_status_updated_at_id', 'support_tickets', ['status', 'updated_at', 'id']),
+    ('ix_payments_status_created_at_id', 'payments', ['status', 'created_at', 'id']),
+    ('ix_affiliate_earnings_created_at_id', 'affiliate_earnings', ['created_at', 'id']),
+    ('ix_affiliate_earnings_affiliate_created_at_id', 'affiliate_earnings', ['affiliate_id', 'created_at', 'id']),
+)
+
+
+def upgrade() -> None:
+    # La paginación keyset no admite NULL en la clave de orden
+    for table, column, fallback in SORT_COLUMNS:
+        op.execute(f"UPDATE {table} SET {column} = {fallback} WHERE {column} IS NULL")
+        op.alter_column(table, column, existing_type=sa.DateTime(), nullable=False,
+                        server_default=sa.text('now()'))
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for table, column, _ in SORT_COLUMNS:
+        op.alter_column(table, column, existing_type=sa.DateTime(), nullable=True,
+                        server_default=None)
@@ -0,0 +1,77 @@
+"""add append-only balance journal and snapshots
+
+Revision ID: 5b9f0e3c7d21
+Revises: 8c41d2e7a5f3
+Create Date: 2026-10-19 18:26:44.903517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9f0e3c7d21'
+down_revision: Union[str, None] = '8c41d2e7a5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'balance_entries',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('account', sa.String(length=16), nullable=False),
+        sa.Column('amount_cents', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('payment_id', sa.Integer(), sa.ForeignKey('payments.id'), nullable=True),
+        sa.Column('withdrawal_id', sa.Integer(), sa.ForeignKey('withdrawals.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_balance_entries_user_account_id', 'balance_entries', ['user_id', 'account', 'id'], unique=False)
+    op.create_table(
+        'balance_snapshots',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('account', sa.String(length=16), nullable=False),
+        sa.Column('balance_cents', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('last_entry_id', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'account'),
+    )
+
+    # Saldos legacy (Float) como asiento de apertura en centavos
+    for column, account in (('balance', 'main'), ('affiliate_balance', 'affiliate')):
+        op.execute(
+            f"""
+            INSERT INTO balance_entries (user_id, account, amount_cents, kind, created_at)
+            SELECT id, '{account}', ROUND({column}::numeric * 100)::bigint, 'opening', now()
+            FROM users
+            WHERE COALESCE({column}, 0) <> 0
+            """
+        )
+    # Consolidar con: python scripts/snapshot_balances.py
+
+
+def downgrade() -> None:
+    # Devuelve el saldo vigente a las columnas legacy antes de borrar el diario
+    for column, account in (('balance', 'main'), ('affiliate_balance', 'affiliate')):
+        op.execute(
+            f"""
+            UPDATE users SET {column} = totals.cents / 100.0
+            FROM (
+                SELECT e.user_id, COALESCE(MAX(s.balance_cents), 0) + COALESCE(SUM(e.amount_cents)
+                    FILTER (WHERE e.id > COALESCE(s.last_entry_id, 0)), 0) AS cents
+                FROM balance_entries e
+                LEFT JOIN balance_snapshots s ON s.user_id = e.user_id AND s.account = e.account
+                WHERE e.account = '{account}'
+                GROUP BY e.user_id
+            ) AS totals
+            WHERE users.id = totals.user_id
+            """
+        )
+    op.drop_table('balance_snapshots')
+    op.drop_index('ix_balance_entries_user_account_id', table_name='balance_entries')
+    op.drop_table('balance_entries')
@@ -0,0 +1,63 @@
+"""add affiliate earning totals and sharded platform counters
+
+Revision ID: 6e3a8b1f2d57
+Revises: 9d2b6f4a1c83
+Create Date: 2026-10-19 22:31:09.640128
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3a8b1f2d57'
+down_revision: Union[str, None] = '9d2b6f4a1c83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'affiliate_earning_totals',
+        sa.Column('affiliate_id', sa.Integer(), nullable=False),
+        sa.Column('level', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('earnings_count', sa.Integer(), nullable=False),
+        sa.Column('last_earned_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['affiliate_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('affiliate_id', 'level'),
+    )
+    op.create_table(
+        'platform_counters',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('name', 'shard'),
+    )
+
+    # Relleno inicial desde el histórico; después se mantiene en cada pago
+    op.execute("""
+        INSERT INTO affiliate_earning_totals (affiliate_id, level, amount, earnings_count, last_earned_at)
+        SELECT affiliate_id, level, COALESCE(SUM(amount), 0), COUNT(*), MAX(created_at)
+        FROM affiliate_earnings
+        WHERE affiliate_id IS NOT NULL AND level IS NOT NULL
+        GROUP BY affiliate_id, level
+    """)
+    op.execute("""
+        INSERT INTO platform_counters (name, shard, value)
+        SELECT 'affiliate_level_' || level || '_commissions', 0, COALESCE(SUM(amount), 0)
+        FROM affiliate_earnings
+        WHERE affiliate_id IS NOT NULL AND level IS NOT NULL
+        GROUP BY level
+    """)
+    op.execute("""
+        INSERT INTO platform_counters (name, shard, value)
+        SELECT 'active_recruiters', 0, COUNT(*) FROM users WHERE direct_referral_count > 0
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('platform_counters')
+    op.drop_table('affiliate_earning_totals')
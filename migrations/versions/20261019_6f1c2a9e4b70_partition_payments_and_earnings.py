@@ -0,0 +1,134 @@
+"""partition payments and affiliate_earnings by month on created_at
+
+Revision ID: 6f1c2a9e4b70
+Revises: 6e3a8b1f2d57
+Create Date: 2026-10-19 23:48:52.113907
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f1c2a9e4b70'
+down_revision: Union[str, None] = '6e3a8b1f2d57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+# tabla -> índices (nombre, columnas) a recrear sobre la tabla particionada
+INDEXES = {
+    'payments': (
+        ('ix_payments_id', ['id']),
+        ('ix_payments_status_created_at_id', ['status', 'created_at', 'id']),
+        ('ix_payments_provider_tx_id', ['provider_tx_id']),
+    ),
+    'affiliate_earnings': (
+        ('ix_affiliate_earnings_id', ['id']),
+        ('ix_affiliate_earnings_affiliate_id', ['affiliate_id']),
+        ('ix_affiliate_earnings_created_at_id', ['created_at', 'id']),
+        ('ix_affiliate_earnings_affiliate_created_at_id', ['affiliate_id', 'created_at', 'id']),
+    ),
+}
+
+
+def _add_months(value: date, months: int) -> date:
+    total = value.year * 12 + value.month - 1 + months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _swap_table(table: str, partitioned: bool) -> None:
+    """
+    Copia `table` a una tabla nueva (particionada o no), elimina la original
+    y ocupa su nombre. La secuencia del id se conserva.
+    """
+    bind = op.get_bind()
+    new = f'{table}_new'
+    sequence = bind.execute(sa.text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+    partition_clause = ' PARTITION BY RANGE (created_at)' if partitioned else ''
+    op.execute(f'CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS){partition_clause}')
+    pk = '(id, created_at)' if partitioned else '(id)'
+    op.execute(f'ALTER TABLE {new} ADD CONSTRAINT {new}_pkey PRIMARY KEY {pk}')
+
+    if partitioned:
+        first = bind.execute(sa.text(f'SELECT MIN(created_at) FROM {table}')).scalar()
+        today = date.today()
+        month = date(first.year, first.month, 1) if first else date(today.year, today.month, 1)
+        last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {new} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            )
+            month = _add_months(month, 1)
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {new} DEFAULT')
+
+    op.execute(f'INSERT INTO {new} SELECT * FROM {table}')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+    # CASCADE: elimina también las FKs que apuntaban a la tabla original
+    op.execute(f'DROP TABLE {table} CASCADE')
+    op.execute(f'ALTER TABLE {new} RENAME TO {table}')
+    op.execute(f'ALTER TABLE {table} RENAME CONSTRAINT {new}_pkey TO {table}_pkey')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    for name, columns in INDEXES[table]:
+        op.create_index(name, table, columns)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Unicidad global de provider_tx_id fuera de la tabla particionada
+    op.create_table(
+        'payment_provider_txs',
+        sa.Column('provider_tx_id', sa.String(), nullable=False),
+        sa.Column('payment_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('provider_tx_id'),
+    )
+    op.execute("""
+        INSERT INTO payment_provider_txs (provider_tx_id, payment_id, created_at)
+        SELECT provider_tx_id, id, created_at FROM payments WHERE provider_tx_id IS NOT NULL
+    """)
+
+    # affiliate_earnings antes: su FK hacia payments desaparece con el CASCADE
+    _swap_table('affiliate_earnings', partitioned=True)
+    op.create_foreign_key(
+        'affiliate_earnings_affiliate_id_fkey', 'affiliate_earnings', 'users', ['affiliate_id'], ['id']
+    )
+    _swap_table('payments', partitioned=True)
+    op.create_foreign_key('payments_user_id_fkey', 'payments', 'users', ['user_id'], ['id'])
+    op.create_foreign_key('payments_plan_id_fkey', 'payments', 'plans', ['plan_id'], ['id'])
+    op.create_foreign_key('payments_affiliate_id_fkey', 'payments', 'users', ['affiliate_id'], ['id'])
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    _swap_table('payments', partitioned=False)
+    op.create_foreign_key('payments_user_id_fkey', 'payments', 'users', ['user_id'], ['id'])
+    op.create_foreign_key('payments_plan_id_fkey', 'payments', 'plans', ['plan_id'], ['id'])
+    op.create_foreign_key('payments_affiliate_id_fkey', 'payments', 'users', ['affiliate_id'], ['id'])
+    op.create_index(
+        'payments_provider_tx_id_unique_idx', 'payments', ['provider_tx_id'],
+        unique=True, postgresql_where=sa.text('provider_tx_id IS NOT NULL'),
+    )
+
+    _swap_table('affiliate_earnings', partitioned=False)
+    op.create_foreign_key(
+        'affiliate_earnings_affiliate_id_fkey', 'affiliate_earnings', 'users', ['affiliate_id'], ['id']
+    )
+    op.create_foreign_key(
+        'affiliate_earnings_payment_id_fkey', 'affiliate_earnings', 'payments', ['payment_id'], ['id']
+    )
+    op.create_foreign_key(
+        'balance_entries_payment_id_fkey', 'balance_entries', 'payments', ['payment_id'], ['id']
+    )
+    op.drop_table('payment_provider_txs')
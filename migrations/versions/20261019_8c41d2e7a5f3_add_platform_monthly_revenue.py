@@ -0,0 +1,37 @@
+"""add platform monthly revenue rollup and expense index
+
+Revision ID: 8c41d2e7a5f3
+Revises: 3a7e5c1d9b42
+Create Date: 2026-10-19 17:48:09.215640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41d2e7a5f3'
+down_revision: Union[str, None] = '3a7e5c1d9b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'platform_monthly_revenue',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('gross_revenue', sa.Float(), server_default='0', nullable=False),
+        sa.Column('payments_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('closed', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('month'),
+    )
+    op.create_index('ix_business_expenses_user_id_date', 'business_expenses', ['user_id', 'date'], unique=False)
+    # Se puebla bajo demanda desde /admin/tax/summary o con scripts/rebuild_platform_revenue.py
+
+
+def downgrade() -> None:
+    op.drop_index('ix_business_expenses_user_id_date', table_name='business_expenses')
+    op.drop_table('platform_monthly_revenue')
@@ -0,0 +1,57 @@
+"""denormalize direct referral count, rank and max depth on users
+
+Revision ID: 9d2b6f4a1c83
+Revises: 5b9f0e3c7d21
+Create Date: 2026-10-19 21:04:17.226391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2b6f4a1c83'
+down_revision: Union[str, None] = '5b9f0e3c7d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('direct_referral_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('rank_id', sa.Integer(), nullable=True))
+    op.add_column('users', sa.Column('max_depth', sa.Integer(), server_default='1', nullable=False))
+    op.create_foreign_key(
+        'fk_users_rank_id_affiliate_ranks', 'users', 'affiliate_ranks',
+        ['rank_id'], ['id'], ondelete='SET NULL',
+    )
+    op.create_index(op.f('ix_users_referred_by_id'), 'users', ['referred_by_id'], unique=False)
+
+    # Relleno inicial; después se mantiene de forma incremental
+    op.execute("""
+        UPDATE users SET direct_referral_count = (
+            SELECT COUNT(*) FROM users AS referral WHERE referral.referred_by_id = users.id
+        )
+    """)
+    op.execute("""
+        UPDATE users SET
+            rank_id = (
+                SELECT r.id FROM affiliate_ranks r
+                WHERE r.min_referrals <= users.direct_referral_count
+                ORDER BY r.min_referrals DESC LIMIT 1
+            ),
+            max_depth = COALESCE((
+                SELECT r.max_depth FROM affiliate_ranks r
+                WHERE r.min_referrals <= users.direct_referral_count
+                ORDER BY r.min_referrals DESC LIMIT 1
+            ), 1)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_referred_by_id'), table_name='users')
+    op.drop_constraint('fk_users_rank_id_affiliate_ranks', 'users', type_='foreignkey')
+    op.drop_column('users', 'max_depth')
+    op.drop_column('users', 'rank_id')
+    op.drop_column('users', 'direct_referral_count')
@@ -0,0 +1,55 @@
+"""add broadcasts and the subscriber lookup index
+
+Revision ID: a4d7c2e9b153
+Revises: 6f1c2a9e4b70
+Create Date: 2026-10-19 23:58:14.402871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7c2e9b153'
+down_revision: Union[str, None] = '6f1c2a9e4b70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'broadcasts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.Integer(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('cursor_user_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('delivered', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('blocked', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_broadcasts_id', 'broadcasts', ['id'])
+    op.create_index('ix_broadcasts_owner_id_created_at', 'broadcasts', ['owner_id', 'created_at'])
+    op.create_index('ix_broadcasts_status_heartbeat_at', 'broadcasts', ['status', 'heartbeat_at'])
+    # Destinatarios de un canal: suscripciones por plan, recorridas por usuario
+    op.create_index('ix_subscriptions_plan_id_user_id', 'subscriptions', ['plan_id', 'user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_subscriptions_plan_id_user_id', table_name='subscriptions')
+    op.drop_index('ix_broadcasts_status_heartbeat_at', table_name='broadcasts')
+    op.drop_index('ix_broadcasts_owner_id_created_at', table_name='broadcasts')
+    op.drop_index('ix_broadcasts_id', table_name='broadcasts')
+    op.drop_table('broadcasts')
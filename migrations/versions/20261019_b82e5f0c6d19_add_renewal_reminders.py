@@ -0,0 +1,48 @@
+"""add renewal reminders and the expiration range index
+
+Revision ID: b82e5f0c6d19
+Revises: a4d7c2e9b153
+Create Date: 2026-10-20 00:21:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b82e5f0c6d19'
+down_revision: Union[str, None] = 'a4d7c2e9b153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'renewal_reminders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('subscription_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('offset_days', sa.Integer(), nullable=False),
+        sa.Column('end_date', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['subscription_id'], ['subscriptions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ux_renewal_reminders_subscription_offset_end',
+        'renewal_reminders',
+        ['subscription_id', 'offset_days', 'end_date'],
+        unique=True,
+    )
+    op.create_index('ix_subscriptions_is_active_end_date', 'subscriptions', ['is_active', 'end_date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_subscriptions_is_active_end_date', table_name='subscriptions')
+    op.drop_index('ux_renewal_reminders_subscription_offset_end', table_name='renewal_reminders')
+    op.drop_table('renewal_reminders')
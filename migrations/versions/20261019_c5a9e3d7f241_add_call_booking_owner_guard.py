@@ -0,0 +1,52 @@
+"""add call_bookings.owner_id and the one-booking-per-owner-slot guard
+
+Revision ID: c5a9e3d7f241
+Revises: b82e5f0c6d19
+Create Date: 2026-10-20 00:47:05.228916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e3d7f241'
+down_revision: Union[str, None] = 'b82e5f0c6d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('call_bookings', sa.Column('owner_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'call_bookings_owner_id_fkey', 'call_bookings', 'users', ['owner_id'], ['id']
+    )
+    op.execute("""
+        UPDATE call_bookings SET owner_id = call_services.owner_id
+        FROM call_services
+        WHERE call_services.id = call_bookings.service_id
+    """)
+    # Reservas dobles previas: se conserva la más antigua de cada horario
+    op.execute("""
+        UPDATE call_bookings SET status = 'cancelled'
+        WHERE status != 'cancelled' AND id NOT IN (
+            SELECT MIN(id) FROM call_bookings
+            WHERE status != 'cancelled'
+            GROUP BY owner_id, start_time
+        )
+    """)
+    op.create_index(
+        'ux_call_bookings_owner_start_time',
+        'call_bookings',
+        ['owner_id', 'start_time'],
+        unique=True,
+        postgresql_where=sa.text("status != 'cancelled'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ux_call_bookings_owner_start_time', table_name='call_bookings')
+    op.drop_constraint('call_bookings_owner_id_fkey', 'call_bookings', type_='foreignkey')
+    op.drop_column('call_bookings', 'owner_id')
@@ -0,0 +1,52 @@
+"""add subscription cohorts and mrr movements
+
+Revision ID: cbba1628a170
+Revises: cd1442ce7726
+Create Date: 2026-10-19 14:37:05.412866
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cbba1628a170'
+down_revision: Union[str, None] = 'cd1442ce7726'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('subscriptions', sa.Column('monthly_value', sa.Float(), nullable=True))
+    op.create_table(
+        'subscription_cohorts',
+        sa.Column('channel_id', sa.Integer(), sa.ForeignKey('channels.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('plan_id', sa.Integer(), sa.ForeignKey('plans.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('cohort_month', sa.Date(), nullable=False),
+        sa.Column('size', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('active_counts', sa.JSON(), nullable=False),
+        sa.Column('active_mrr', sa.JSON(), nullable=False),
+        sa.PrimaryKeyConstraint('channel_id', 'plan_id', 'cohort_month'),
+    )
+    op.create_table(
+        'mrr_movements',
+        sa.Column('channel_id', sa.Integer(), sa.ForeignKey('channels.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('plan_id', sa.Integer(), sa.ForeignKey('plans.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('new_mrr', sa.Float(), server_default='0', nullable=False),
+        sa.Column('expansion_mrr', sa.Float(), server_default='0', nullable=False),
+        sa.Column('churned_mrr', sa.Float(), server_default='0', nullable=False),
+        sa.Column('new_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('renewals', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('churned_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('channel_id', 'plan_id', 'month'),
+    )
+    # Poblar con: python scripts/rebuild_cohorts.py
+
+
+def downgrade() -> None:
+    op.drop_table('mrr_movements')
+    op.drop_table('subscription_cohorts')
+    op.drop_column('subscriptions', 'monthly_value')
@@ -0,0 +1,36 @@
+"""add owner_daily_stats rollup
+
+Revision ID: cd1442ce7726
+Revises: 26c4a9892639
+Create Date: 2026-10-19 10:12:41.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd1442ce7726'
+down_revision: Union[str, None] = '26c4a9892639'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'owner_daily_stats',
+        sa.Column('owner_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('revenue', sa.Float(), server_default='0', nullable=False),
+        sa.Column('new_subscribers', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('ending_subscribers', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('mlm_earnings', sa.Float(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('owner_id', 'day'),
+    )
+    # Poblar con: python scripts/rebuild_daily_stats.py
+
+
+def downgrade() -> None:
+    op.drop_table('owner_daily_stats')
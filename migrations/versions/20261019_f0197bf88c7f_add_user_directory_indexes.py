@@ -0,0 +1,47 @@
+"""add user directory indexes (keyset + trigram search)
+
+Revision ID: f0197bf88c7f
+Revises: cbba1628a170
+Create Date: 2026-10-19 16:05:48.730214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0197bf88c7f'
+down_revision: Union[str, None] = 'cbba1628a170'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = ('email', 'full_name', 'username')
+
+
+def upgrade() -> None:
+    # La paginación keyset no admite NULL en la clave de orden
+    op.execute("UPDATE users SET created_at = TIMESTAMP '1970-01-01' WHERE created_at IS NULL")
+    op.alter_column('users', 'created_at', existing_type=sa.DateTime(), nullable=False,
+                    server_default=sa.text('now()'))
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in TRGM_COLUMNS:
+        op.create_index(
+            f'ix_users_{column}_trgm',
+            'users',
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    for column in TRGM_COLUMNS:
+        op.drop_index(f'ix_users_{column}_trgm', table_name='users')
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.alter_column('users', 'created_at', existing_type=sa.DateTime(), nullable=True,
+                    server_default=None)
@@ -0,0 +1,39 @@
+"""page admin tickets by (created_at, id) instead of the mutable updated_at
+
+Revision ID: d7e2a4c9f815
+Revises: c5a9e3d7f241
+Create Date: 2026-10-20 09:14:52.604113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e2a4c9f815'
+down_revision: Union[str, None] = 'c5a9e3d7f241'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE support_tickets SET created_at = updated_at WHERE created_at IS NULL")
+    op.alter_column('support_tickets', 'created_at', existing_type=sa.DateTime(), nullable=False,
+                    server_default=sa.text('now()'))
+    op.drop_index('ix_support_tickets_status_updated_at_id', table_name='support_tickets')
+    op.drop_index('ix_support_tickets_updated_at_id', table_name='support_tickets')
+    op.create_index('ix_support_tickets_created_at_id', 'support_tickets', ['created_at', 'id'], unique=False)
+    op.create_index('ix_support_tickets_status_created_at_id', 'support_tickets',
+                    ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_support_tickets_status_created_at_id', table_name='support_tickets')
+    op.drop_index('ix_support_tickets_created_at_id', table_name='support_tickets')
+    op.create_index('ix_support_tickets_updated_at_id', 'support_tickets', ['updated_at', 'id'], unique=False)
+    op.create_index('ix_support_tickets_status_updated_at_id', 'support_tickets',
+                    ['status', 'updated_at', 'id'], unique=False)
+    op.alter_column('support_tickets', 'created_at', existing_type=sa.DateTime(), nullable=True,
+                    server_default=None)
@@ -0,0 +1,63 @@
+"""fold balance entries by inserting transaction xid instead of id + time lag
+
+Revision ID: e3b8d5f1a627
+Revises: d7e2a4c9f815
+Create Date: 2026-10-20 11:02:37.418260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b8d5f1a627'
+down_revision: Union[str, None] = 'd7e2a4c9f815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('balance_entries', sa.Column('txid', sa.BigInteger(), nullable=True))
+    op.add_column('balance_snapshots', sa.Column('folded_txid', sa.BigInteger(), server_default='0', nullable=False))
+
+    # Histórico: 0 = ya consolidada, 1 = en la cola. Los xid reales empiezan en 3.
+    op.execute(
+        """
+        UPDATE balance_entries e SET txid = CASE WHEN e.id <= COALESCE((
+            SELECT s.last_entry_id FROM balance_snapshots s
+            WHERE s.user_id = e.user_id AND s.account = e.account
+        ), 0) THEN 0 ELSE 1 END
+        """
+    )
+    op.execute("UPDATE balance_snapshots SET folded_txid = 1")
+    op.alter_column('balance_entries', 'txid', existing_type=sa.BigInteger(), nullable=False,
+                    server_default=sa.text('pg_current_xact_id()::text::bigint'))
+
+    op.drop_index('ix_balance_entries_user_account_id', table_name='balance_entries')
+    op.create_index('ix_balance_entries_user_account_fold', 'balance_entries',
+                    ['user_id', 'account', sa.text('COALESCE(txid, id)')], unique=False)
+    op.drop_column('balance_snapshots', 'last_entry_id')
+
+
+def downgrade() -> None:
+    op.add_column('balance_snapshots', sa.Column('last_entry_id', sa.BigInteger(), server_default='0', nullable=False))
+    # Aproximación: última entrada consolidada por usuario/cuenta
+    op.execute(
+        """
+        UPDATE balance_snapshots s SET last_entry_id = folded.max_id
+        FROM (
+            SELECT e.user_id, e.account, MAX(e.id) AS max_id
+            FROM balance_entries e
+            JOIN balance_snapshots s2 ON s2.user_id = e.user_id AND s2.account = e.account
+            WHERE e.txid < s2.folded_txid
+            GROUP BY e.user_id, e.account
+        ) AS folded
+        WHERE s.user_id = folded.user_id AND s.account = folded.account
+        """
+    )
+    op.drop_index('ix_balance_entries_user_account_fold', table_name='balance_entries')
+    op.create_index('ix_balance_entries_user_account_id', 'balance_entries', ['user_id', 'account', 'id'], unique=False)
+    op.drop_column('balance_snapshots', 'folded_txid')
+    op.drop_column('balance_entries', 'txid')
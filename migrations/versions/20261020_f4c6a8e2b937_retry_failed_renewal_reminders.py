@@ -0,0 +1,31 @@
+"""track attempts and claim time of renewal reminders so failed ones are retried
+
+Revision ID: f4c6a8e2b937
+Revises: e3b8d5f1a627
+Create Date: 2026-10-20 12:40:18.225904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c6a8e2b937'
+down_revision: Union[str, None] = 'e3b8d5f1a627'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('renewal_reminders', sa.Column('attempts', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('renewal_reminders', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE renewal_reminders SET claimed_at = created_at")
+    op.alter_column('renewal_reminders', 'claimed_at', existing_type=sa.DateTime(), nullable=False,
+                    server_default=sa.text('now()'))
+
+
+def downgrade() -> None:
+    op.drop_column('renewal_reminders', 'claimed_at')
+    op.drop_column('renewal_reminders', 'attempts')
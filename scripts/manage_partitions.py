@@ -0,0 +1,47 @@
+"""
+Mantenimiento de las particiones mensuales de `payments` y `affiliate_earnings`.
+
+    ensure   crea las particiones del mes en curso y de los siguientes
+             (PARTITION_MONTHS_AHEAD; también se ejecuta al arrancar la API)
+    archive  vuelca a PARTITION_ARCHIVE_PATH/<partición>.csv.gz los meses
+             anteriores a --before (YYYY-MM) y elimina esas particiones
+
+Uso:
+    PYTHONPATH=. python scripts/manage_partitions.py ensure [--months-ahead 6]
+    PYTHONPATH=. python scripts/manage_partitions.py archive --before 2025-01 [--dry-run]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+
+from infrastructure.database.connection import AsyncSessionLocal
+from infrastructure.database.partitions import (
+    ARCHIVE_PATH,
+    MONTHS_AHEAD,
+    archive_partitions,
+    ensure_partitions,
+)
+
+
+async def main(args):
+    async with AsyncSessionLocal() as db:
+        if args.command == "ensure":
+            created = await ensure_partitions(db, months_ahead=args.months_ahead)
+            print(f"✅ Particiones creadas: {', '.join(created) or 'ninguna'}")
+        else:
+            before = datetime.strptime(args.before, "%Y-%m").date()
+            archived = await archive_partitions(db, before, dry_run=args.dry_run)
+            action = "A archivar" if args.dry_run else f"Archivadas en {ARCHIVE_PATH}"
+            print(f"✅ {action}: {', '.join(archived) or 'ninguna'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure")
+    ensure.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    archive = commands.add_parser("archive")
+    archive.add_argument("--before", required=True, help="Primer mes que se conserva (YYYY-MM)")
+    archive.add_argument("--dry-run", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,27 @@
+"""
+Reconstruye las cohortes mensuales y movimientos de MRR desde `subscriptions`.
+
+Uso:
+    PYTHONPATH=. python scripts/rebuild_cohorts.py            # todos los owners
+    PYTHONPATH=. python scripts/rebuild_cohorts.py --owner 42 # solo uno
+"""
+
+import argparse
+import asyncio
+
+from infrastructure.database.connection import AsyncSessionLocal
+from core.use_cases.cohorts import rebuild_cohorts
+
+
+async def main(owner_id=None):
+    async with AsyncSessionLocal() as db:
+        count = await rebuild_cohorts(db, owner_id)
+    scope = f"owner {owner_id}" if owner_id else "todos los owners"
+    print(f"✅ Cohortes reconstruidas ({scope}): {count} suscripciones")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--owner", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.owner))
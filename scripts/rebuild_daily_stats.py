@@ -0,0 +1,27 @@
+"""
+Reconstruye el rollup diario `owner_daily_stats` desde el histórico.
+
+Uso:
+    PYTHONPATH=. python scripts/rebuild_daily_stats.py            # todos los owners
+    PYTHONPATH=. python scripts/rebuild_daily_stats.py --owner 42 # solo uno
+"""
+
+import argparse
+import asyncio
+
+from infrastructure.database.connection import AsyncSessionLocal
+from core.use_cases.daily_stats import rebuild_daily_stats
+
+
+async def main(owner_id=None):
+    async with AsyncSessionLocal() as db:
+        count = await rebuild_daily_stats(db, owner_id)
+    scope = f"owner {owner_id}" if owner_id else "todos los owners"
+    print(f"✅ Rollup reconstruido ({scope}): {count} filas")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--owner", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.owner))
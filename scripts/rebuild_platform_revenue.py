@@ -0,0 +1,31 @@
+"""
+Reabre y recalcula el rollup mensual de ingresos de plataforma.
+
+Los pagos suman su mes al completarse; el resumen fiscal solo lee. Usar este
+script para rellenar el histórico en el primer despliegue y tras corregir
+pagos de meses pasados.
+
+Uso:
+    PYTHONPATH=. python scripts/rebuild_platform_revenue.py             # todo el histórico
+    PYTHONPATH=. python scripts/rebuild_platform_revenue.py --year 2025 # solo un año
+"""
+
+import argparse
+import asyncio
+
+from infrastructure.database.connection import AsyncSessionLocal
+from core.use_cases.tax import rebuild_platform_revenue
+
+
+async def main(year=None):
+    async with AsyncSessionLocal() as db:
+        count = await rebuild_platform_revenue(db, year)
+    scope = f"año {year}" if year else "todo el histórico"
+    print(f"✅ Ingresos mensuales recalculados ({scope}): {count} meses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.year))
@@ -0,0 +1,31 @@
+"""
+Recalcula los contadores de red desnormalizados en `users`.
+
+Por defecto solo rango/profundidad (lo mismo que dispara /admin/ranks);
+con --recount también recuenta los referidos directos (reparación).
+
+Uso:
+    PYTHONPATH=. python scripts/recompute_referrals.py [--recount]
+"""
+
+import argparse
+import asyncio
+
+from infrastructure.database.connection import AsyncSessionLocal
+from core.use_cases.referrals import recompute_ranks, recompute_referral_stats
+
+
+async def main(recount: bool):
+    async with AsyncSessionLocal() as db:
+        if recount:
+            count = await recompute_referral_stats(db)
+        else:
+            count = await recompute_ranks(db)
+    print(f"✅ Usuarios recalculados: {count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recount", action="store_true", help="Recontar también los referidos directos")
+    args = parser.parse_args()
+    asyncio.run(main(args.recount))
@@ -0,0 +1,31 @@
+"""
+Verifica los acumulados de red (`affiliate_earning_totals`, `platform_counters`)
+contra `affiliate_earnings` y `users`.
+
+Uso:
+    PYTHONPATH=. python scripts/reconcile_affiliate_counters.py [--fix]
+"""
+
+import argparse
+import asyncio
+
+from infrastructure.database.connection import AsyncSessionLocal
+from core.use_cases.affiliate_stats import reconcile_affiliate_counters
+
+
+async def main(fix: bool):
+    async with AsyncSessionLocal() as db:
+        mismatches = await reconcile_affiliate_counters(db, fix=fix)
+    for mismatch in mismatches:
+        print(f"⚠️ {mismatch}")
+    if not mismatches:
+        print("✅ Contadores de afiliados consistentes")
+    elif fix:
+        print(f"✅ Discrepancias corregidas: {len(mismatches)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fix", action="store_true", help="Corregir las discrepancias encontradas")
+    args = parser.parse_args()
+    asyncio.run(main(args.fix))
@@ -0,0 +1,27 @@
+"""
+Envía las difusiones en cola y retoma las que quedaron a medias (proceso
+caído: `running` sin latido reciente), desde el último cursor confirmado.
+
+Pensado para ejecutarse de forma periódica (cron / Cloud Scheduler).
+
+Uso:
+    PYTHONPATH=. python scripts/run_broadcasts.py
+"""
+
+import asyncio
+
+from infrastructure.database.connection import AsyncSessionLocal
+from infrastructure.external_apis.telegram import telegram_sender
+from core.use_cases.broadcasts import run_pending_broadcasts
+
+
+async def main():
+    try:
+        finished = await run_pending_broadcasts(AsyncSessionLocal, telegram_sender)
+    finally:
+        await telegram_sender.aclose()
+    print(f"✅ Difusiones terminadas: {finished}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,30 @@
+"""
+Envía los recordatorios de renovación (7, 3 y 1 días antes de vencer).
+
+Pensado para ejecutarse de forma periódica (cron / Cloud Scheduler, cada
+15-30 minutos); varias réplicas pueden correrlo a la vez. Los envíos fallidos o
+interrumpidos se reintentan en las pasadas siguientes de la misma ventana.
+
+Uso:
+    PYTHONPATH=. python scripts/send_renewal_reminders.py
+"""
+
+import asyncio
+
+from infrastructure.database.connection import AsyncSessionLocal
+from infrastructure.external_apis.telegram import telegram_sender
+from core.use_cases.renewal_reminders import send_renewal_reminders
+
+
+async def main():
+    try:
+        async with AsyncSessionLocal() as db:
+            results = await send_renewal_reminders(db, telegram_sender)
+    finally:
+        await telegram_sender.aclose()
+    for offset, counts in results.items():
+        print(f"✅ {offset} días: {counts}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
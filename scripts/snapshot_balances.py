@@ -0,0 +1,24 @@
+"""
+Consolida el diario de saldos (`balance_entries`) en `balance_snapshots`.
+
+Pensado para ejecutarse de forma periódica (cron / Cloud Scheduler); entre
+ejecuciones los saldos se calculan como snapshot + cola.
+
+Uso:
+    PYTHONPATH=. python scripts/snapshot_balances.py
+"""
+
+import asyncio
+
+from infrastructure.database.connection import AsyncSessionLocal
+from core.use_cases.balances import snapshot_balances
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        count = await snapshot_balances(db)
+    print(f"✅ Snapshots de saldo actualizados: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.dialects.postgresql import INET
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from core.entities import Base
+from infrastructure.database.instrumentation import assert_query_budget, install_query_instrumentation
+
+
+@compiles(INET, "sqlite")
+def _inet_as_text(type_, compiler, **kw):
+    # owner_legal_info/signed_contracts usan INET (solo Postgres)
+    return "VARCHAR"
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Uso: `with query_budget(3): await endpoint(...)` falla si el bloque supera
+    3 consultas o repite la misma sentencia (N+1).
+    """
+    return assert_query_budget
+
+
+@pytest_asyncio.fixture
+async def sqlite_sessionmaker(request):
+    """
+    Fábrica de sesiones sobre un SQLite en memoria con el esquema completo e
+    instrumentado para `query_budget`. Para crear solo algunas tablas:
+    `@pytest.mark.parametrize("sqlite_sessionmaker", [[User, ...]], indirect=True)`.
+    """
+    models = getattr(request, "param", None)
+    tables = [m.__table__ for m in models] if models is not None else None
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    install_query_instrumentation(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
+    yield async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def sqlite_session(sqlite_sessionmaker):
+    async with sqlite_sessionmaker() as session:
+        yield session
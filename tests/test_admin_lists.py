@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+
+from application.controllers.admin_controller import (
+    get_admin_affiliate_ledger,
+    get_admin_tickets,
+    get_admin_withdrawals,
+    get_pending_payments,
+)
+from core.entities import AffiliateEarning, Payment, SupportTicket, User, Withdrawal
+
+BASE = datetime(2026, 1, 1)
+ADMIN = User(id=1, is_admin=True)
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add_all([
+        User(id=1, email="root@fgate.co", full_name="Root"),
+        User(id=2, email="payer@test.com", username="payer"),
+    ])
+    sqlite_session.add_all([
+        Withdrawal(
+            id=i,
+            owner_id=1,
+            amount=10.0,
+            status="pending" if i % 3 else "completed",
+            # Pares con la misma fecha para probar el desempate por id
+            created_at=BASE + timedelta(hours=i // 2),
+        )
+        for i in range(1, 31)
+    ])
+    sqlite_session.add_all([
+        Payment(
+            id=i,
+            user_id=2,
+            amount=5.0,
+            status="pending" if i % 2 else "completed",
+            payment_method="crypto" if i < 10 else "manual",
+            created_at=BASE + timedelta(days=i),
+        )
+        for i in range(1, 21)
+    ])
+    sqlite_session.add_all([
+        AffiliateEarning(
+            id=i,
+            payment_id=1 if i % 2 else None,
+            affiliate_id=1 if i < 8 else 99,
+            level=i % 3 + 1,
+            amount=0.5,
+            created_at=BASE + timedelta(hours=i // 2),
+        )
+        for i in range(1, 13)
+    ])
+    sqlite_session.add_all([
+        SupportTicket(id=i, user_id=2, subject=f"T{i}", created_at=BASE + timedelta(hours=i))
+        for i in range(1, 11)
+    ])
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+def _params(**overrides):
+    params = dict(limit=50, cursor=None, date_from=None, date_to=None, current_user=ADMIN)
+    params.update(overrides)
+    return params
+
+
+async def _all_pages(endpoint, db, **filters):
+    ids, cursor, first = [], None, None
+    while True:
+        page = await endpoint(db=db, **_params(cursor=cursor, **filters))
+        first = first or page
+        ids += [item["id"] if isinstance(item, dict) else item.id for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids, first
+
+
+@pytest.mark.asyncio
+async def test_withdrawal_pages_filtered_by_status_are_stable(db, query_budget):
+    with query_budget(20):
+        ids, first = await _all_pages(
+            get_admin_withdrawals, db, limit=4, status="pending", owner_id=None
+        )
+    expected = sorted((i for i in range(1, 31) if i % 3), key=lambda i: (i // 2, i), reverse=True)
+    assert ids == expected
+    assert first["total_estimate"] == len(expected)
+
+
+@pytest.mark.asyncio
+async def test_pending_payments_filters_by_method_and_date(db):
+    page = await get_pending_payments(
+        db=db, **_params(method="manual", date_from=BASE + timedelta(days=12), date_to=BASE + timedelta(days=19))
+    )
+    assert [p.id for p in page["items"]] == [17, 15, 13]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_ledger_keyset_projects_names_without_extra_queries(db, query_budget):
+    with query_budget(2):
+        page = await get_admin_affiliate_ledger(db=db, **_params(limit=5, affiliate_id=None, level=None))
+    assert [e["id"] for e in page["items"]] == [12, 11, 10, 9, 8]
+    assert page["items"][0]["affiliate_name"] == "N/A"
+    assert page["items"][1]["source_user"] == "payer"
+    assert page["items"][2]["source_user"] == "N/A"
+
+    with query_budget(1):
+        rest = await get_admin_affiliate_ledger(
+            db=db, **_params(limit=5, cursor=page["next_cursor"], affiliate_id=None, level=None)
+        )
+    assert [e["id"] for e in rest["items"]] == [7, 6, 5, 4, 3]
+    assert rest["items"][0]["affiliate_name"] == "Root"
+    assert rest["total_estimate"] is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(db):
+    with pytest.raises(HTTPException) as exc:
+        await get_admin_withdrawals(db=db, **_params(cursor="no-es-un-cursor", status=None, owner_id=None))
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_ticket_pages_ignore_activity_while_paging(db):
+    first = await get_admin_tickets(db=db, **_params(limit=4, status=None, priority=None))
+    ids = [t.id for t in first["items"]]
+    # Un ticket ya visto y otro pendiente reciben respuesta entre páginas
+    for ticket_id in (9, 2):
+        (await db.get(SupportTicket, ticket_id)).subject += " (respondido)"
+    await db.commit()
+
+    cursor = first["next_cursor"]
+    while cursor:
+        page = await get_admin_tickets(db=db, **_params(limit=4, cursor=cursor, status=None, priority=None))
+        ids += [t.id for t in page["items"]]
+        cursor = page["next_cursor"]
+    assert ids == list(range(10, 0, -1))
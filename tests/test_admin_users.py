@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+
+from application.controllers.admin_controller import get_admin_users
+from core.entities import User
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    base = datetime(2026, 1, 1)
+    sqlite_session.add(User(id=1, email="root@fgate.co", full_name="Root", created_at=base))
+    sqlite_session.add_all([
+        User(
+            id=i,
+            email=f"user{i}@test.com",
+            full_name=f"Usuario {i}",
+            referred_by_id=1,
+            # Dos usuarios comparten created_at para probar el desempate por id
+            created_at=base + timedelta(hours=i // 2),
+        )
+        for i in range(2, 26)
+    ])
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_all_users_once(db, query_budget):
+    admin = User(id=1, is_admin=True)
+    seen, cursor = [], None
+    while True:
+        with query_budget(1):
+            page = await get_admin_users(limit=7, cursor=cursor, q=None, current_user=admin, db=db)
+        seen += [u.id for u in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+    assert seen[-1] == 1
+    assert page["items"][-1].referrer_name is None
+
+
+@pytest.mark.asyncio
+async def test_search_by_prefix_and_substring(db):
+    admin = User(id=1, is_admin=True)
+    page = await get_admin_users(limit=50, cursor=None, q="user1", current_user=admin, db=db)
+    ids = {u.id for u in page["items"]}
+    assert ids == {10, 11, 12, 13, 14, 15, 16, 17, 18, 19}
+    assert all(u.referrer_name == "Root" for u in page["items"])
+
+    page = await get_admin_users(limit=50, cursor=None, q="ro", current_user=admin, db=db)
+    assert [u.id for u in page["items"]] == [1]
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_rejected(db):
+    with pytest.raises(HTTPException):
+        await get_admin_users(limit=5, cursor="not-a-cursor", q=None, current_user=User(id=1), db=db)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, func, select, update
+
+from core.entities import (
+    AffiliateEarningTotals,
+    AffiliateRank,
+    Channel,
+    Plan,
+    PlatformCounter,
+    User,
+)
+from core.use_cases.affiliate_stats import (
+    get_affiliate_summary,
+    get_platform_affiliate_summary,
+    reconcile_affiliate_counters,
+)
+from core.use_cases.distribute_funds import distribute_payment_funds
+from core.use_cases.referrals import attach_referral, detach_user
+from infrastructure.database.instrumentation import track_queries
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add_all([
+        AffiliateRank(id=1, name="Plata", min_referrals=1, max_depth=2),
+        User(id=1, email="leader@test.com"),
+        User(id=2, email="mid@test.com"),
+        User(id=3, email="owner@test.com"),
+        User(id=4, email="buyer@test.com"),
+        Channel(id=10, owner_id=3, title="VIP"),
+        Plan(id=20, channel_id=10, name="Mensual", price=100.0, duration_days=30),
+    ])
+    await sqlite_session.commit()
+    # 1 <- 2 <- 3 (dueño del canal)
+    await attach_referral(sqlite_session, await sqlite_session.get(User, 2), 1)
+    await attach_referral(sqlite_session, await sqlite_session.get(User, 3), 2)
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_payments(db):
+    for i in range(3):
+        await distribute_payment_funds(db, 4, 20, 100.0, "stripe", f"tx_{i}")
+
+    summary = await get_affiliate_summary(db, 1)
+    assert summary["earnings_by_level"] == [{"level": 2, "amount": 3.0, "count": 3}]
+    assert summary["total_earnings"] == pytest.approx(3.0)
+    assert summary["last_30_days_earnings"] == pytest.approx(3.0)
+    # La ventana de 30 días sale del rollup diario
+    later = await get_affiliate_summary(db, 1, now=datetime.utcnow() + timedelta(days=31))
+    assert later["last_30_days_earnings"] == 0.0 and later["total_earnings"] == pytest.approx(3.0)
+
+    with track_queries() as stats:
+        platform = await get_platform_affiliate_summary(db)
+    assert not [sql for sql in stats.statements if "affiliate_earnings" in sql]
+    assert platform["total_commissions_paid"] == pytest.approx(12.0)
+    assert platform["active_recruiters"] == 2
+    assert platform["earnings_by_level"] == [
+        {"level": 1, "amount": pytest.approx(9.0)},
+        {"level": 2, "amount": pytest.approx(3.0)},
+    ]
+    assert await reconcile_affiliate_counters(db) == []
+
+
+@pytest.mark.asyncio
+async def test_recruiters_follow_reparenting(db):
+    await attach_referral(db, await db.get(User, 3), 1)
+    await db.commit()
+    assert (await get_platform_affiliate_summary(db))["active_recruiters"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_sponsor_drops_it_from_recruiters(db):
+    await detach_user(db, await db.get(User, 2))
+    await db.execute(delete(User).where(User.id == 2))
+    await db.commit()
+    # 3 pasa a 1: solo 1 sigue reclutando
+    assert (await get_platform_affiliate_summary(db))["active_recruiters"] == 1
+    assert await reconcile_affiliate_counters(db) == []
+
+
+@pytest.mark.asyncio
+async def test_reconcile_reports_and_fixes_drift(db):
+    await distribute_payment_funds(db, 4, 20, 100.0, "stripe", "tx_1")
+    await db.execute(
+        update(AffiliateEarningTotals).where(AffiliateEarningTotals.affiliate_id == 2).values(amount=99.0)
+    )
+    db.add(PlatformCounter(name="affiliate_level_1_commissions", shard=999, value=5.0))
+    await db.commit()
+
+    mismatches = await reconcile_affiliate_counters(db, fix=True)
+    assert {m["counter"] for m in mismatches} == {"affiliate_earning_totals", "affiliate_level_1_commissions"}
+    assert await reconcile_affiliate_counters(db) == []
+    assert (await get_affiliate_summary(db, 2))["total_earnings"] == pytest.approx(3.0)
+    shards = (await db.execute(select(func.count()).select_from(PlatformCounter).where(
+        PlatformCounter.name == "affiliate_level_1_commissions"
+    ))).scalar()
+    assert shards == 1
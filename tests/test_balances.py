@@ -0,0 +1,100 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from core.entities import BalanceEntry, BalanceSnapshot, Channel, Plan, User
+from core.use_cases import balances
+from core.use_cases.balances import (
+    InsufficientBalance,
+    get_balances,
+    snapshot_balances,
+    withdraw_from_balances,
+)
+from core.use_cases.distribute_funds import distribute_payment_funds
+from infrastructure.database.instrumentation import track_queries
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add_all([
+        User(id=1, email="leader@test.com"),
+        User(id=2, email="owner@test.com", referred_by_id=1),
+        User(id=3, email="buyer@test.com"),
+        Channel(id=10, owner_id=2, title="VIP"),
+        Plan(id=20, channel_id=10, name="Mensual", price=100.0, duration_days=30),
+    ])
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+@pytest.mark.asyncio
+async def test_payments_only_insert_journal_entries(db):
+    with track_queries() as stats:
+        for i in range(3):
+            await distribute_payment_funds(db, 3, 20, 100.0, "stripe", f"tx_{i}")
+
+    assert not [sql for sql in stats.statements if sql.lstrip().upper().startswith("UPDATE USERS")]
+    assert await get_balances(db, 2) == {"main": 270.0, "affiliate": 0.0}
+    assert await get_balances(db, 1) == {"main": 0.0, "affiliate": 9.0}
+    cents = (await db.execute(select(func.sum(BalanceEntry.amount_cents)))).scalar()
+    assert cents == 27900
+
+
+@pytest.mark.asyncio
+async def test_snapshot_plus_tail_matches_journal(db):
+    await distribute_payment_funds(db, 3, 20, 100.0, "stripe", "tx_a")
+    assert await snapshot_balances(db) == 2
+
+    await distribute_payment_funds(db, 3, 20, 100.0, "stripe", "tx_b")
+    assert await get_balances(db, 2) == {"main": 180.0, "affiliate": 0.0}
+
+    # Un segundo snapshot solo suma la cola nueva
+    await snapshot_balances(db)
+    snap = (await db.execute(select(BalanceSnapshot).where(BalanceSnapshot.user_id == 2))).scalar_one()
+    assert snap.balance_cents == 18000
+    assert await get_balances(db, 2) == {"main": 180.0, "affiliate": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_get_balances_is_one_query(db, query_budget):
+    await distribute_payment_funds(db, 3, 20, 100.0, "stripe", "tx_a")
+    await snapshot_balances(db)
+    with query_budget(1):
+        assert await get_balances(db, 1) == {"main": 0.0, "affiliate": 3.0}
+
+
+@pytest.mark.asyncio
+async def test_late_committing_entry_is_not_skipped(db, monkeypatch):
+    # Como en Postgres: la transacción 100 tomó un id menor, pero confirma
+    # después de la 105. El xmin del snapshot (100) la deja fuera del pliegue.
+    async def xmin(_db):
+        return watermark
+
+    monkeypatch.setattr(balances, "fold_watermark", xmin)
+    db.add(BalanceEntry(id=60, user_id=2, account="main", amount_cents=500, kind="sale", txid=105))
+    await db.commit()
+    watermark = 100
+    assert await snapshot_balances(db) == 0
+
+    db.add(BalanceEntry(id=50, user_id=2, account="main", amount_cents=700, kind="sale", txid=100))
+    await db.commit()
+    watermark = 106
+    assert await snapshot_balances(db) == 1
+
+    snap = (await db.execute(select(BalanceSnapshot).where(BalanceSnapshot.user_id == 2))).scalar_one()
+    assert (snap.balance_cents, snap.folded_txid) == (1200, 106)
+    assert await get_balances(db, 2) == {"main": 12.0, "affiliate": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_withdrawal_debits_main_then_affiliate(db):
+    await distribute_payment_funds(db, 3, 20, 100.0, "stripe", "tx_a")
+    db.add(BalanceEntry(user_id=2, account="affiliate", amount_cents=1000, kind="opening"))
+    await db.commit()
+
+    await withdraw_from_balances(db, 2, 95.0, withdrawal_id=None)
+    await db.commit()
+    assert await get_balances(db, 2) == {"main": 0.0, "affiliate": 5.0}
+
+    with pytest.raises(InsufficientBalance):
+        await withdraw_from_balances(db, 2, 5.01, withdrawal_id=None)
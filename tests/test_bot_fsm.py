@@ -0,0 +1,140 @@
+import importlib
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.methods import SendDocument, SendMessage
+from aiogram.types import Chat, Message, Update
+from sqlalchemy import select
+
+from bot.dispatcher import create_dispatcher
+from bot.storage import GroupTTLRedisStorage
+from core.entities import SignedContract, User
+from infrastructure.external_apis.pdf_generator import PDFContractService
+from infrastructure.storage.local_disk import LocalStorageService
+from infrastructure.storage.storage_factory import StorageFactory
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Lock de aislamiento por chat (scripts Lua)
+
+CHAT_ID = 555
+TOKEN = "42:TEST"
+
+
+class RecordingSession(BaseSession):
+    """Sesión HTTP falsa: registra las llamadas a la Bot API."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls.append(method)
+        if isinstance(method, (SendMessage, SendDocument)):
+            return Message(message_id=len(self.calls), date=datetime.utcnow(), chat=Chat(id=CHAT_ID, type="private"))
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def _message(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": CHAT_ID, "type": "private"},
+            "from": {"id": CHAT_ID, "is_bot": False, "first_name": "Ana"},
+            "text": text,
+        },
+    }
+
+
+def _callback(update_id: int, data: str) -> dict:
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": "chat",
+            "from": {"id": CHAT_ID, "is_bot": False, "first_name": "Ana"},
+            "data": data,
+            "message": _message(update_id, "...")["message"],
+        },
+    }
+
+
+@pytest_asyncio.fixture
+async def sessionmaker(monkeypatch, tmp_path, sqlite_sessionmaker):
+    monkeypatch.setattr(PDFContractService, "generate_contract_pdf", staticmethod(lambda *args: b"%PDF-1.4"))
+    monkeypatch.setattr(StorageFactory, "_instance", LocalStorageService(str(tmp_path)))
+    yield sqlite_sessionmaker
+
+
+@pytest.mark.asyncio
+async def test_signature_flow_survives_switching_replicas(sessionmaker):
+    server = fakeredis.FakeServer()
+
+    # Dos "réplicas": cliente Redis, storage, bot y router propios; mismo Redis
+    replicas = []
+    for _ in range(2):
+        handlers = importlib.reload(importlib.import_module("bot.handlers.signature_handlers"))
+        storage = GroupTTLRedisStorage(fakeredis.FakeAsyncRedis(server=server))
+        bot = Bot(TOKEN, session=RecordingSession())
+        replicas.append((create_dispatcher(storage, [handlers.signature_router], sessionmaker), bot))
+
+    steps = [
+        _message(1, "/legal"),
+        _message(2, "👤 Persona Natural"),
+        _message(3, "Ana Pérez"),
+        _message(4, "Cédula de Ciudadanía (CC)"),
+        _message(5, "1020304050"),
+        _message(6, "Calle 1 # 2-3"),
+        _message(7, "Bogotá, Cundinamarca"),
+        _message(8, "3001234567"),
+        _message(9, "Bancolombia"),
+        _message(10, "Ahorros"),
+        _message(11, "123456789"),
+        _callback(12, "legal_confirm_data"),
+        _callback(13, "legal_sign_now"),
+    ]
+    for i, payload in enumerate(steps):
+        dp, bot = replicas[i % 2]
+        await dp.feed_update(bot, Update.model_validate(payload, context={"bot": bot}))
+
+    storage = replicas[0][0].storage
+    key = StorageKey(bot_id=42, chat_id=CHAT_ID, user_id=CHAT_ID)
+    assert await storage.get_state(key) == "SignatureFlow:waiting_for_otp"
+    data = await storage.get_data(key)
+    assert data["full_legal_name"] == "Ana Pérez" and data["bank_name"] == "Bancolombia"
+    # TTL del grupo SignatureFlow en estado y datos
+    for part in ("state", "data"):
+        assert 7000 < await storage.redis.ttl(storage.key_builder.build(key, part)) <= 7200
+
+    dp, bot = replicas[1]
+    await dp.feed_update(bot, Update.model_validate(_message(14, data["signature_otp"]), context={"bot": bot}))
+
+    assert await storage.get_state(key) is None
+    async with sessionmaker() as session:
+        user = (await session.execute(select(User).where(User.telegram_id == CHAT_ID))).scalar_one()
+        contract = (await session.execute(select(SignedContract))).scalar_one()
+    assert contract.owner_id == user.id and contract.signature_code == data["signature_otp"]
+    assert user.can_create_channels and user.legal_verification_status == "contract_signed"
+    # Cada réplica atendió la mitad del flujo
+    assert all(bot.session.calls for _, bot in replicas)
+
+
+@pytest.mark.asyncio
+async def test_data_without_state_gets_default_ttl():
+    storage = GroupTTLRedisStorage(fakeredis.FakeAsyncRedis())
+    key = StorageKey(bot_id=42, chat_id=CHAT_ID, user_id=CHAT_ID)
+    await storage.set_data(key, {"legal_info_id": 7})
+    data_key = storage.key_builder.build(key, "data")
+    assert 0 < await storage.redis.ttl(data_key) <= 30 * 60
+    assert await storage.redis.get(data_key) == b'{"legal_info_id":7}'
@@ -0,0 +1,82 @@
+import pytest
+from aiogram.types import User as TgUser
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.handlers.initial import get_or_create_user
+from bot.middlewares import DbSessionMiddleware
+from bot.middlewares.db_session import user_cache_key
+from core.entities import User
+from core.use_cases.telegram_users import get_or_create_telegram_user
+from infrastructure.database.instrumentation import track_queries
+
+fakeredis = pytest.importorskip("fakeredis")
+
+TG_USER = TgUser(id=777, is_bot=False, first_name="Ana", last_name="Pérez", username="ana")
+
+
+@pytest.fixture
+def sessionmaker(sqlite_sessionmaker):
+    return sqlite_sessionmaker
+
+
+async def _run(middleware, tg_user=TG_USER):
+    seen = {}
+
+    async def handler(event, data):
+        seen.update(data)
+        return "ok"
+
+    with track_queries() as stats:
+        assert await middleware(handler, None, {"event_from_user": tg_user}) == "ok"
+    return seen, stats
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_is_one_insert_for_new_users(sessionmaker):
+    async with sessionmaker() as session:
+        with track_queries() as stats:
+            user = await get_or_create_telegram_user(session, 777, "ana", "Ana Pérez")
+        assert stats.count == 1
+        assert user.id and user.referral_code and user.full_name == "Ana Pérez"
+
+    async with sessionmaker() as session:
+        again = await get_or_create_telegram_user(session, 777, "otro", "Otro")
+        assert again.id == user.id and again.username == "ana"
+        assert (await session.execute(select(func.count(User.id)))).scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_resolves_user_from_cache_without_checkout(sessionmaker):
+    redis = fakeredis.FakeAsyncRedis()
+    middleware = DbSessionMiddleware(sessionmaker, redis)
+
+    # Usuario desconocido: no se crea ni se cachea
+    data, _ = await _run(middleware)
+    assert data["user_id"] is None
+    assert await redis.get(user_cache_key(777)) is None
+
+    async with sessionmaker() as session:
+        user = await get_or_create_user(TG_USER, session)
+
+    data, stats = await _run(middleware)
+    assert data["user_id"] == user.id and stats.count == 1
+    assert int(await redis.get(user_cache_key(777))) == user.id
+
+    # Con caché: ningún query (la sesión nunca pidió conexión)
+    data, stats = await _run(middleware)
+    assert data["user_id"] == user.id and stats.count == 0
+    assert isinstance(data["session"], AsyncSession)
+
+    # Con el user_id resuelto, el handler obtiene el usuario por PK
+    with track_queries() as stats:
+        assert (await get_or_create_user(TG_USER, data["session"], data["user_id"])).id == user.id
+    assert stats.count == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_cached_id_falls_back_to_upsert(sessionmaker):
+    async with sessionmaker() as session:
+        other = await get_or_create_telegram_user(session, 1, None, "Otro")
+        user = await get_or_create_user(TG_USER, session, user_id=other.id)
+    assert user.id != other.id and user.telegram_id == 777
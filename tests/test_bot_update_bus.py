@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from aiogram.types import Update
+
+from bot import update_bus
+from bot.update_bus import STREAM_GROUP, StreamWorker, UpdateBus, stream_key
+from bot.updates import UpdateDeduplicator
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Leases de partición (scripts Lua)
+
+PARTITIONS = 4
+
+
+class WorkerCrash(BaseException):
+    """Simula la caída del proceso: no es un Exception, nadie lo captura."""
+
+
+class RecordingDispatcher:
+    def __init__(self, crash_on=None):
+        self.handled = []
+        self.crash_on = crash_on
+
+    async def feed_update(self, bot, update):
+        if update.update_id == self.crash_on:
+            raise WorkerCrash
+        self.handled.append((update.message.chat.id, update.update_id))
+
+
+def _payload(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Ana"},
+            "text": "hola",
+        },
+    }
+
+
+async def _publish(bus, update_id, chat_id):
+    payload = _payload(update_id, chat_id)
+    return await bus.publish(Update.model_validate(payload), payload)
+
+
+@pytest.mark.asyncio
+async def test_updates_flow_through_stream_in_chat_order():
+    redis = fakeredis.FakeAsyncRedis()
+    bus = UpdateBus(redis, UpdateDeduplicator(redis, 42), partitions=PARTITIONS)
+    dp = RecordingDispatcher()
+    worker = StreamWorker(dp, None, redis, name="w1", partitions=PARTITIONS)
+    assert await worker.rebalance() == [0, 1, 2, 3]
+
+    for update_id, chat_id in [(1, 5), (2, 6), (3, 5), (4, 5)]:
+        assert await _publish(bus, update_id, chat_id)
+    assert await _publish(bus, 3, 5) is None  # reintento de Telegram
+
+    assert await worker.poll_once(block_ms=10) == 4
+    assert [u for chat, u in dp.handled if chat == 5] == [1, 3, 4]
+    for partition in range(PARTITIONS):
+        assert (await redis.xpending(stream_key(partition), STREAM_GROUP))["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_next_owner_reclaims_entries_of_crashed_worker(monkeypatch):
+    server = fakeredis.FakeServer()
+    bus = UpdateBus(fakeredis.FakeAsyncRedis(server=server), partitions=PARTITIONS)
+    crashing = StreamWorker(RecordingDispatcher(crash_on=2), None, fakeredis.FakeAsyncRedis(server=server), name="w1", partitions=PARTITIONS)
+    await crashing.rebalance()
+
+    for update_id in (1, 2, 3):
+        await _publish(bus, update_id, 5)
+    with pytest.raises(WorkerCrash):
+        await crashing.poll_once(block_ms=10)
+
+    # El lease del worker caído vence; otro worker toma la partición
+    redis = fakeredis.FakeAsyncRedis(server=server)
+    for partition in range(PARTITIONS):
+        await redis.delete(f"{stream_key(partition)}:owner")
+    await redis.zrem("bot:workers", "w1")
+    dp = RecordingDispatcher()
+    successor = StreamWorker(dp, None, redis, name="w2", partitions=PARTITIONS)
+    await successor.rebalance()
+
+    # Recién entregadas: podrían ser de un worker vivo con un handler lento
+    assert await successor.reclaim(5 % PARTITIONS) == 0
+    monkeypatch.setattr(update_bus, "CLAIM_MIN_IDLE_MS", 0)  # ya pasó un lease completo
+    assert await successor.reclaim(5 % PARTITIONS) == 2
+    assert dp.handled == [(5, 2), (5, 3)]
+    assert (await redis.xpending(stream_key(5 % PARTITIONS), STREAM_GROUP))["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_workers_split_partitions():
+    server = fakeredis.FakeServer()
+    first = StreamWorker(RecordingDispatcher(), None, fakeredis.FakeAsyncRedis(server=server), name="w1", partitions=PARTITIONS)
+    second = StreamWorker(RecordingDispatcher(), None, fakeredis.FakeAsyncRedis(server=server), name="w2", partitions=PARTITIONS)
+
+    assert await first.rebalance() == [0, 1, 2, 3]
+    assert await second.rebalance() == []  # todo tomado; ya cuenta como vivo
+    assert len(await first.rebalance()) == 2  # suelta el exceso
+    assert await second.rebalance() == sorted(set(range(PARTITIONS)) - set(first.leases))
+
+    await first.shutdown()
+    assert await second.rebalance() == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_keeps_its_lease(monkeypatch):
+    monkeypatch.setattr(update_bus, "LEASE_TTL", 1)
+    monkeypatch.setattr(update_bus, "LEASE_REFRESH", 0.2)
+    server = fakeredis.FakeServer()
+    redis = fakeredis.FakeAsyncRedis(server=server)
+    release = asyncio.Event()
+
+    class SlowDispatcher(RecordingDispatcher):
+        async def feed_update(self, bot, update):
+            await release.wait()
+            await super().feed_update(bot, update)
+
+    worker = StreamWorker(SlowDispatcher(), None, redis, name="w1", partitions=1)
+    await _publish(UpdateBus(redis, partitions=1), 1, 5)
+    task = asyncio.create_task(worker.run())
+    try:
+        await asyncio.sleep(1.5)  # handler bloqueado más que el TTL del lease
+        assert worker.leases == {0: worker.leases[0]}
+        intruder = StreamWorker(RecordingDispatcher(), None, fakeredis.FakeAsyncRedis(server=server), name="w2", partitions=1)
+        assert await intruder.rebalance() == []
+    finally:
+        release.set()
+        worker.stop()
+        await asyncio.wait_for(task, 5)
+    assert worker.dp.handled == [(5, 1)]
+
+
+@pytest.mark.asyncio
+async def test_new_owner_waits_for_pending_entries_of_crashed_worker(monkeypatch):
+    server = fakeredis.FakeServer()
+    bus = UpdateBus(fakeredis.FakeAsyncRedis(server=server), partitions=1)
+    crashing = StreamWorker(RecordingDispatcher(crash_on=2), None, fakeredis.FakeAsyncRedis(server=server), name="w1", partitions=1)
+    await crashing.rebalance()
+    for update_id in (1, 2, 3):
+        await _publish(bus, update_id, 5)
+    with pytest.raises(WorkerCrash):
+        await crashing.poll_once(block_ms=10)
+
+    redis = fakeredis.FakeAsyncRedis(server=server)
+    await redis.delete(f"{stream_key(0)}:owner")  # el lease vence antes que CLAIM_MIN_IDLE_MS
+    dp = RecordingDispatcher()
+    successor = StreamWorker(dp, None, redis, name="w2", partitions=1)
+    assert await successor.rebalance() == [0]
+    await _publish(bus, 4, 5)
+
+    # 2 y 3 siguen pendientes de w1: el update 4 no se lee todavía
+    assert await successor.reclaim(0) == 0
+    assert await successor.poll_once(block_ms=10) == 0
+    monkeypatch.setattr(update_bus, "CLAIM_MIN_IDLE_MS", 0)
+    assert await successor.reclaim(0) == 2
+    assert await successor.poll_once(block_ms=10) == 1
+    assert dp.handled == [(5, 2), (5, 3), (5, 4)]
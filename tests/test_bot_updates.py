@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from aiogram.types import Update
+
+from bot.updates import BUSY, DUPLICATE, QUEUED, UpdateDeduplicator, UpdateWorkerPool
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class SlowDispatcher:
+    """Dispatcher falso: registra el orden y bloquea el chat 1 hasta `release`."""
+
+    def __init__(self):
+        self.handled = []
+        self.release = asyncio.Event()
+
+    async def feed_update(self, bot, update):
+        if update.message.chat.id == 1:
+            await self.release.wait()
+        if update.message.text == "boom":
+            raise RuntimeError("handler roto")
+        self.handled.append((update.message.chat.id, update.update_id))
+
+
+def _update(update_id: int, chat_id: int, text: str = "hola") -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Ana"},
+            "text": text,
+        },
+    })
+
+
+async def _drain(pool):
+    await asyncio.wait_for(asyncio.gather(*(q.join() for q in pool.queues)), 2)
+
+
+@pytest.mark.asyncio
+async def test_slow_chat_does_not_block_others_and_keeps_its_order():
+    dp = SlowDispatcher()
+    pool = UpdateWorkerPool(dp, bot=None, workers=2, queue_size=10)
+    pool.start()
+    try:
+        for update_id, chat_id in [(1, 1), (2, 2), (3, 1), (4, 2), (5, 1)]:
+            assert await pool.submit(_update(update_id, chat_id)) == QUEUED
+        # El chat 2 avanza aunque el handler del chat 1 siga ocupado
+        await asyncio.wait_for(pool.queues[0].join(), 2)
+        assert dp.handled == [(2, 2), (2, 4)]
+        assert pool.snapshot()["queue_depth"] == 2
+
+        dp.release.set()
+        await pool.submit(_update(6, 2, "boom"))
+        await _drain(pool)
+        assert dp.handled == [(2, 2), (2, 4), (1, 1), (1, 3), (1, 5)]
+        metrics = pool.snapshot()
+        assert metrics["processed"] == 5 and metrics["failed"] == 1
+        assert metrics["handler_latency_ms"]["max"] > 0
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_retried_updates_are_dropped_across_replicas():
+    server = fakeredis.FakeServer()
+    dp = SlowDispatcher()
+    dp.release.set()
+    pools = [
+        UpdateWorkerPool(dp, None, dedupe=UpdateDeduplicator(fakeredis.FakeAsyncRedis(server=server), 42), workers=2)
+        for _ in range(2)
+    ]
+    for pool in pools:
+        pool.start()
+    try:
+        assert await pools[0].submit(_update(100, 1)) == QUEUED
+        assert await pools[0].submit(_update(100, 1)) == DUPLICATE  # aún en cola
+        await _drain(pools[0])
+        assert await pools[1].submit(_update(100, 1)) == DUPLICATE
+        assert await pools[1].submit(_update(101, 1)) == QUEUED
+        for pool in pools:
+            await _drain(pool)
+        assert dp.handled == [(1, 100), (1, 101)]
+        assert pools[1].snapshot()["duplicates_dropped"] == 1
+    finally:
+        for pool in pools:
+            await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_dedupe_window_slides():
+    dedupe = UpdateDeduplicator(fakeredis.FakeAsyncRedis(), 42, window=10)
+    assert await dedupe.mark_seen(1)
+    assert not await dedupe.mark_seen(1)
+    assert await dedupe.mark_seen(20)
+    # update 1 salió de la ventana
+    assert await dedupe.redis.zcard(dedupe.key) == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_without_marking_update_seen():
+    dp = SlowDispatcher()
+    dedupe = UpdateDeduplicator(fakeredis.FakeAsyncRedis(), 42)
+    pool = UpdateWorkerPool(dp, None, dedupe=dedupe, workers=1, queue_size=1)
+    pool.start()
+    try:
+        assert await pool.submit(_update(1, 1)) == QUEUED
+        await asyncio.sleep(0)  # el worker toma el update 1 y queda bloqueado
+        assert await pool.submit(_update(2, 1)) == QUEUED
+        assert await pool.submit(_update(3, 1)) == BUSY
+        dp.release.set()
+        await _drain(pool)
+        # El reintento de Telegram se procesa: no quedó marcado como visto
+        assert await pool.submit(_update(3, 1)) == QUEUED
+        await _drain(pool)
+        assert [u for _, u in dp.handled] == [1, 2, 3]
+        assert pool.snapshot()["rejected_busy"] == 1
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_update_is_marked_seen_only_after_its_handler():
+    dp = SlowDispatcher()
+    dedupe = UpdateDeduplicator(fakeredis.FakeAsyncRedis(), 42)
+    pool = UpdateWorkerPool(dp, None, dedupe=dedupe, workers=1)
+    pool.start()
+    try:
+        assert await pool.submit(_update(1, 1)) == QUEUED
+        await asyncio.sleep(0)  # handler en curso
+        assert not await dedupe.is_seen(1)
+
+        dp.release.set()
+        await _drain(pool)
+        assert await dedupe.is_seen(1)
+        assert await pool.submit(_update(1, 1)) == DUPLICATE
+    finally:
+        await pool.stop()
@@ -0,0 +1,193 @@
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from sqlalchemy import update
+
+from application.controllers import owner_controller
+from core.entities import Broadcast, Channel, Plan, Subscription, User
+from core.use_cases.broadcasts import (
+    BroadcastTakenOver,
+    claim_broadcast,
+    enqueue_broadcast,
+    run_broadcast,
+    run_pending_broadcasts,
+)
+from infrastructure.external_apis.telegram import RateLimiter, RedisRateLimiter, TelegramSender
+
+N_SUBSCRIBERS = 25
+BLOCKED_CHATS = {1003, 1017}
+FLOOD_CHATS = {1008}  # Primer intento: 429
+BAD_CHATS = {1020}
+
+
+class FakeTelegram:
+    """Bot API local: registra cada sendMessage y responde según el chat."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.delivered = Counter()
+
+    async def send_message(self, request):
+        chat_id = (await request.json())["chat_id"]
+        self.calls[chat_id] += 1
+        if chat_id in BLOCKED_CHATS:
+            return web.json_response(
+                {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}, status=403
+            )
+        if chat_id in FLOOD_CHATS and self.calls[chat_id] == 1:
+            return web.json_response(
+                {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 0",
+                 "parameters": {"retry_after": 0}},
+                status=429,
+            )
+        if chat_id in BAD_CHATS:
+            return web.json_response(
+                {"ok": False, "error_code": 400, "description": "Bad Request: can't parse entities"}, status=400
+            )
+        self.delivered[chat_id] += 1
+        return web.json_response({"ok": True, "result": {"message_id": self.calls.total()}})
+
+
+@pytest_asyncio.fixture
+async def telegram():
+    fake = FakeTelegram()
+    app = web.Application()
+    app.router.add_post("/bottest-token/sendMessage", fake.send_message)
+    server = TestServer(app)
+    await server.start_server()
+    sender = TelegramSender("test-token", str(server.make_url("")), RateLimiter(rate=1000))
+    yield fake, sender
+    await sender.aclose()
+    await server.close()
+
+
+@pytest_asyncio.fixture
+async def sessionmaker(sqlite_sessionmaker):
+    now = datetime.utcnow()
+    async with sqlite_sessionmaker() as session:
+        session.add(User(id=1, email="owner@test.com"))
+        session.add(Channel(id=1, owner_id=1, title="VIP", validation_code="V-1"))
+        session.add(Channel(id=2, owner_id=1, title="Otro", validation_code="V-2"))
+        session.add(Plan(id=1, channel_id=1, name="Mensual", price=10.0, duration_days=30))
+        session.add(Plan(id=2, channel_id=1, name="Anual", price=90.0, duration_days=365))
+        session.add(Plan(id=3, channel_id=2, name="Mensual", price=10.0, duration_days=30))
+        for i in range(1, N_SUBSCRIBERS + 1):
+            session.add(User(id=100 + i, telegram_id=1000 + i, referral_code=f"ref{i}"))
+            session.add(Subscription(user_id=100 + i, plan_id=1, is_active=True, end_date=now + timedelta(days=5)))
+        # Dos planes del mismo canal: un solo mensaje
+        session.add(Subscription(user_id=101, plan_id=2, is_active=True, end_date=now + timedelta(days=300)))
+        # Fuera: vencida, inactiva, sin Telegram, de otro canal
+        session.add(User(id=201, telegram_id=2001, referral_code="x1"))
+        session.add(Subscription(user_id=201, plan_id=1, is_active=True, end_date=now - timedelta(days=1)))
+        session.add(User(id=202, telegram_id=2002, referral_code="x2"))
+        session.add(Subscription(user_id=202, plan_id=1, is_active=False, end_date=now + timedelta(days=5)))
+        session.add(User(id=203, email="web@test.com", referral_code="x3"))
+        session.add(Subscription(user_id=203, plan_id=1, is_active=True, end_date=now + timedelta(days=5)))
+        session.add(User(id=204, telegram_id=2004, referral_code="x4"))
+        session.add(Subscription(user_id=204, plan_id=3, is_active=True, end_date=now + timedelta(days=5)))
+        await session.commit()
+    yield sqlite_sessionmaker
+
+
+class CrashingSender:
+    """Se cae a mitad de la segunda página."""
+
+    def __init__(self, sender, crash_after):
+        self.sender = sender
+        self.remaining = crash_after
+
+    async def send_message(self, chat_id, text, **extra):
+        if self.remaining == 0:
+            raise RuntimeError("proceso caído")
+        self.remaining -= 1
+        return await self.sender.send_message(chat_id, text, **extra)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_each_active_subscriber_once(sessionmaker, telegram):
+    fake, sender = telegram
+    async with sessionmaker() as db:
+        broadcast = await enqueue_broadcast(db, 1, 1, "Hola")
+        assert broadcast.total == N_SUBSCRIBERS
+
+        done = await run_broadcast(db, broadcast.id, sender, page_size=10)
+    assert done.status == "completed" and done.finished_at is not None
+    assert (done.delivered, done.blocked, done.failed) == (N_SUBSCRIBERS - 3, 2, 1)
+    assert done.total == N_SUBSCRIBERS and done.cursor_user_id == 100 + N_SUBSCRIBERS
+    assert "can't parse entities" in done.last_error
+
+    assert set(fake.calls) == {1000 + i for i in range(1, N_SUBSCRIBERS + 1)}
+    assert all(count == 1 for count in fake.delivered.values())
+    assert fake.calls[1008] == 2  # 429 y reintento
+
+    # Ya terminada: nadie la vuelve a tomar
+    async with sessionmaker() as db:
+        assert await claim_broadcast(db, broadcast.id) is None
+
+
+@pytest.mark.asyncio
+async def test_crashed_broadcast_resumes_from_last_page(sessionmaker, telegram):
+    fake, sender = telegram
+    async with sessionmaker() as db:
+        broadcast = await enqueue_broadcast(db, 1, 1, "Hola")
+        with pytest.raises(RuntimeError):
+            await run_broadcast(db, broadcast.id, CrashingSender(sender, crash_after=15), page_size=10)
+
+    async with sessionmaker() as db:
+        state = await db.get(Broadcast, broadcast.id)
+        assert state.status == "running" and state.cursor_user_id == 110
+        # Latido reciente: otro proceso no la toma todavía
+        assert await run_pending_broadcasts(sessionmaker, sender) == 0
+        await db.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast.id)
+            .values(heartbeat_at=datetime.utcnow() - timedelta(minutes=10))
+        )
+        await db.commit()
+
+    assert await run_pending_broadcasts(sessionmaker, sender) == 1
+    async with sessionmaker() as db:
+        state = await db.get(Broadcast, broadcast.id)
+    assert state.status == "completed"
+    assert (state.delivered, state.blocked, state.failed) == (N_SUBSCRIBERS - 3, 2, 1)
+    # Solo la página interrumpida se repite
+    assert all(fake.calls[1000 + i] == 1 for i in range(1, 11) if 1000 + i not in FLOOD_CHATS)
+    assert {chat for chat, n in fake.delivered.items() if n > 1} <= {1000 + i for i in range(11, 21)}
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_caps_throughput():
+    limiter = RateLimiter(rate=50, burst=1)
+    started = time.monotonic()
+    for _ in range(11):
+        await limiter.acquire()
+    assert time.monotonic() - started >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_redis_rate_limiter_is_shared_across_processes():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    limiters = [RedisRateLimiter(fakeredis.FakeAsyncRedis(server=server), rate=50, burst=1) for _ in range(2)]
+    started = time.monotonic()
+    for i in range(11):
+        await limiters[i % 2].acquire()
+    # 11 envíos a 50/s entre los dos procesos, no 50/s cada uno
+    assert time.monotonic() - started >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_background_job_logs_a_taken_over_broadcast(sessionmaker, monkeypatch, caplog):
+    async def taken_over(db, broadcast_id, sender):
+        raise BroadcastTakenOver(broadcast_id)
+
+    monkeypatch.setattr(owner_controller, "AsyncSessionLocal", sessionmaker)
+    monkeypatch.setattr(owner_controller, "run_broadcast", taken_over)
+    await owner_controller._run_broadcast_job(7)
+    assert "Difusión 7 retomada por otro proceso" in caplog.text
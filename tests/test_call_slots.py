@@ -0,0 +1,167 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+
+from application.controllers import call_controller
+from application.controllers.call_controller import (
+    CallSlotIn,
+    GenerateSlotsIn,
+    add_slots,
+    generate_slots,
+    get_owner_calendar_feed,
+    get_services,
+    get_slot_calendar_links,
+)
+from core.entities import CallBooking, CallService, CallSlot
+
+
+@pytest_asyncio.fixture
+async def session_factory(monkeypatch, sqlite_sessionmaker):
+    monkeypatch.setattr(call_controller, "AsyncSessionLocal", sqlite_sessionmaker)
+    async with sqlite_sessionmaker() as session:
+        session.add(CallService(id=1, owner_id=7, price=10, duration_minutes=15, description="Mentoría"))
+        await session.commit()
+    yield sqlite_sessionmaker
+
+
+def _weekdays(start: str, end: str) -> GenerateSlotsIn:
+    return GenerateSlotsIn(
+        service_id=1,
+        days_of_week=[0, 1, 2, 3, 4],
+        start_time="09:00",
+        end_time="17:00",
+        start_date=datetime.fromisoformat(start),
+        end_date=datetime.fromisoformat(end),
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_slots_uses_bulk_insert(session_factory, query_budget):
+    user = SimpleNamespace(id=7)
+    async with session_factory() as db:
+        # Lunes a viernes, 8h de 15 min = 32 slots/día -> 160 slots
+        with query_budget(4):
+            slots = await generate_slots(_weekdays("2026-03-02", "2026-03-06"), user, db)
+
+    assert len(slots) == 160
+    assert all(s.id for s in slots)
+    assert slots[0].start_time == datetime(2026, 3, 2, 9, 0)
+
+
+@pytest.mark.asyncio
+async def test_generate_slots_skips_existing(session_factory):
+    user = SimpleNamespace(id=7)
+    async with session_factory() as db:
+        await generate_slots(_weekdays("2026-03-02", "2026-03-03"), user, db)
+        slots = await generate_slots(_weekdays("2026-03-02", "2026-03-04"), user, db)
+        total = await db.scalar(select(func.count(CallSlot.id)))
+
+    assert len(slots) == 32
+    assert total == 96
+
+
+@pytest.mark.asyncio
+async def test_generate_slots_streams_large_ranges(session_factory, monkeypatch):
+    monkeypatch.setattr(call_controller, "SLOT_STREAM_THRESHOLD", 50)
+    monkeypatch.setattr(call_controller, "SLOT_INSERT_CHUNK_SIZE", 40)
+    user = SimpleNamespace(id=7)
+    async with session_factory() as db:
+        response = await generate_slots(_weekdays("2026-03-02", "2026-03-06"), user, db)
+
+    assert isinstance(response, StreamingResponse)
+    body = "".join([part async for part in response.body_iterator])
+    assert len(json.loads(body)) == 160
+
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count(CallSlot.id))) == 160
+
+
+@pytest.mark.asyncio
+async def test_add_slots_normalizes_utc_input(session_factory):
+    user = SimpleNamespace(id=7)
+    async with session_factory() as db:
+        await generate_slots(_weekdays("2026-03-02", "2026-03-02"), user, db)
+        slots = await add_slots(
+            [
+                CallSlotIn(service_id=1, start_time="2026-03-02T09:00:00Z"),  # ya existe
+                CallSlotIn(service_id=1, start_time="2026-03-02T19:00:00+02:00"),
+                CallSlotIn(service_id=1, start_time="2026-03-02T17:00:00"),  # naive, el mismo instante
+                CallSlotIn(service_id=1, start_time="2026-03-02T18:00:00Z"),
+            ],
+            user,
+            db,
+        )
+        total = await db.scalar(select(func.count(CallSlot.id)))
+
+    assert [s.start_time for s in slots] == [datetime(2026, 3, 2, 17, 0), datetime(2026, 3, 2, 18, 0)]
+    assert total == 34
+
+
+async def _seed_bookings(db):
+    db.add_all([
+        CallSlot(id=1, service_id=1, start_time=datetime(2026, 3, 2, 9, 0), is_booked=True, jitsi_link="https://meet.jit.si/a"),
+        CallSlot(id=2, service_id=1, start_time=datetime(2026, 3, 2, 10, 0), is_booked=False),
+        # Mismo horario que el slot 1: no debe duplicarse
+        CallBooking(id=1, service_id=1, start_time=datetime(2026, 3, 2, 9, 0), status="confirmed"),
+        CallBooking(id=2, service_id=1, start_time=datetime(2026, 3, 2, 9, 30), status="confirmed", meeting_link="https://meet.jit.si/b"),
+        CallBooking(id=3, service_id=1, start_time=datetime(2026, 4, 1, 9, 0), status="confirmed"),
+    ])
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_get_services_merges_bookings_without_calendar_links(session_factory, query_budget):
+    user = SimpleNamespace(id=7)
+    async with session_factory() as db:
+        await _seed_bookings(db)
+        with query_budget(5):
+            services = await get_services(None, None, None, user, db)
+
+    slots = services[0]["slots"]
+    assert [s["start_time"] for s in slots] == [
+        datetime(2026, 3, 2, 9, 0),
+        datetime(2026, 3, 2, 9, 30),
+        datetime(2026, 3, 2, 10, 0),
+        datetime(2026, 4, 1, 9, 0),
+    ]
+    assert (slots[1]["kind"], slots[1]["id"]) == ("booking", 2)
+    assert (slots[0]["kind"], slots[0]["id"]) == ("slot", 1)
+    assert all(s["calendar_links"] is None for s in slots)
+
+
+@pytest.mark.asyncio
+async def test_get_services_date_window(session_factory):
+    user = SimpleNamespace(id=7)
+    async with session_factory() as db:
+        await _seed_bookings(db)
+        services = await get_services(None, datetime(2026, 3, 2, 9, 15), datetime(2026, 3, 31), user, db)
+
+    assert [s["start_time"] for s in services[0]["slots"]] == [
+        datetime(2026, 3, 2, 9, 30),
+        datetime(2026, 3, 2, 10, 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_calendar_links_on_demand(session_factory):
+    user = SimpleNamespace(id=7)
+    async with session_factory() as db:
+        await _seed_bookings(db)
+        slot_links = await get_slot_calendar_links(1, "slot", user, db)
+        booking_links = await get_slot_calendar_links(2, "booking", user, db)
+        # El booking 3 existe, pero kind=slot solo mira CallSlot
+        with pytest.raises(HTTPException):
+            await get_slot_calendar_links(3, "slot", user, db)
+        feed = await get_owner_calendar_feed(None, None, user, db)
+
+    assert "20260302T090000Z/20260302T091500Z" in slot_links["google"]
+    assert "location=https%3A//meet.jit.si/b" in booking_links["google"]
+    body = feed.body.decode()
+    assert body.count("BEGIN:VEVENT") == 3
+    assert "UID:slot-1@fgate" in body
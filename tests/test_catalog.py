@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from bot.handlers import menu
+from core.entities import Channel, Plan, User
+from infrastructure.cache.catalog_cache import PAGE_SIZE, CatalogCache
+from infrastructure.database.instrumentation import track_queries
+
+fakeredis = pytest.importorskip("fakeredis")
+
+N_CHANNELS = 20
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add(User(id=1, email="owner@test.com"))
+    for i in range(1, N_CHANNELS + 1):
+        sqlite_session.add(Channel(id=i, owner_id=1, title=f"Canal {i:02d}", validation_code=f"V-{i}", is_verified=True))
+        sqlite_session.add(Plan(channel_id=i, name="Mensual", price=10.0, duration_days=30, is_active=True))
+        sqlite_session.add(Plan(channel_id=i, name="Viejo", price=5.0, duration_days=30, is_active=False))
+    sqlite_session.add(Channel(id=99, owner_id=1, title="Sin verificar", validation_code="V-99", is_verified=False))
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+def _callback(data: str):
+    return SimpleNamespace(data=data, message=SimpleNamespace(edit_text=AsyncMock()), answer=AsyncMock())
+
+
+def _buttons(callback):
+    markup = callback.message.edit_text.call_args.kwargs["reply_markup"]
+    return [button.callback_data for row in markup.inline_keyboard for button in row]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_cached_per_version(db):
+    cache = CatalogCache(fakeredis.FakeAsyncRedis())
+    with track_queries() as stats:
+        catalog = await cache.get(db)
+    assert stats.count == 2  # canales + planes
+    assert len(catalog.channels) == N_CHANNELS and catalog.get_channel(99) is None
+    assert [p["name"] for p in catalog.get_channel(1)["plans"]] == ["Mensual"]
+
+    # Otra réplica: lee el snapshot de Redis; misma réplica: memoria
+    other = CatalogCache(cache.redis)
+    with track_queries() as stats:
+        assert (await other.get(db)).version == catalog.version
+        assert await cache.get(db) is catalog
+    assert stats.count == 0
+
+    (await db.get(Channel, 1)).title = "Renombrado"
+    await db.commit()
+    await cache.invalidate()
+    assert (await other.get(db)).get_channel(1)["title"] == "Renombrado"
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination(db):
+    catalog = await CatalogCache(fakeredis.FakeAsyncRedis()).get(db)
+    seen, cursor = [], 0
+    while cursor is not None:
+        page, next_cursor = catalog.page(cursor)
+        seen += [c["id"] for c in page]
+        if next_cursor is not None:
+            assert catalog.previous_cursor(next_cursor) == cursor
+        cursor = next_cursor
+    assert seen == list(range(1, N_CHANNELS + 1))
+    assert catalog.cursor_before(PAGE_SIZE + 2) == PAGE_SIZE
+    assert catalog.page(12345)[0][0]["id"] == 1  # cursor de un canal borrado
+
+
+@pytest.mark.asyncio
+async def test_bot_browses_catalog_without_queries(db, monkeypatch):
+    monkeypatch.setattr(menu, "catalog_cache", CatalogCache(fakeredis.FakeAsyncRedis()))
+    await menu.catalog_cache.get(db)
+
+    with track_queries() as stats:
+        first = _callback("channels")
+        await menu.handle_channels_callback(first, db)
+        second = _callback(f"catalog_page_{PAGE_SIZE}")
+        await menu.handle_channels_callback(second, db)
+        plans = _callback(f"channel_view_{PAGE_SIZE + 1}")
+        await menu.view_channel_plans(plans, db)
+    assert stats.count == 0
+
+    assert _buttons(first)[-1] == f"catalog_page_{PAGE_SIZE}"
+    assert _buttons(second)[-2:] == ["catalog_page_0", f"catalog_page_{2 * PAGE_SIZE}"]
+    assert _buttons(plans) == [f"select_plan_{2 * (PAGE_SIZE + 1) - 1}", f"catalog_page_{PAGE_SIZE}"]
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from core.entities import Channel, Plan, Subscription, User
+from core.use_cases.activate_membership import activate_membership
+from core.use_cases.cohorts import (
+    add_months,
+    get_cohort_retention,
+    get_mrr_series,
+    month_start,
+    rebuild_cohorts,
+    record_subscription_end,
+)
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add_all([
+        User(id=1, email="owner@test.com", affiliate_balance=0.0, balance=0.0),
+        User(id=2, email="a@test.com", affiliate_balance=0.0, balance=0.0),
+        User(id=3, email="b@test.com", affiliate_balance=0.0, balance=0.0),
+        Channel(id=10, owner_id=1, title="VIP"),
+        Plan(id=20, channel_id=10, name="Mensual", price=30.0, duration_days=30),
+        Plan(id=21, channel_id=10, name="Trimestral", price=60.0, duration_days=90),
+    ])
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+def _this_month():
+    return month_start(datetime.utcnow())
+
+
+@pytest.mark.asyncio
+async def test_lifecycle_updates_cohorts_and_mrr(db):
+    await activate_membership(2, 20, db)  # alta: 30/mes
+    await activate_membership(3, 21, db)  # alta: 60 cada 90 días = 20/mes
+    await activate_membership(2, 20, db)  # renovación
+    await activate_membership(2, 21, db)  # expansión (ya tenía el plan 20)
+
+    now_month = _this_month()
+    series = await get_mrr_series(db, [10], now_month, now_month)
+    point = series[0]
+    assert point["mrr"] == pytest.approx(70.0)
+    assert point["new_mrr"] == pytest.approx(50.0)
+    assert point["expansion_mrr"] == pytest.approx(20.0)
+    assert point["new_subscriptions"] == 2
+    assert point["renewals"] == 1
+
+    cohorts = await get_cohort_retention(db, [10], now_month, now_month)
+    assert cohorts[0]["size"] == 3
+    assert cohorts[0]["active"] == [3]
+
+    # Los meses futuros siguen activos según los vencimientos
+    future = await get_mrr_series(db, [10], add_months(now_month, 1), add_months(now_month, 1))
+    assert future[0]["active_subscriptions"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_early_end_moves_churn(db):
+    sub = await activate_membership(3, 21, db)
+    plan = await db.get(Plan, 21)
+    sub.is_active = False
+    await record_subscription_end(db, sub, plan, datetime.utcnow())
+    await db.commit()
+
+    now_month = _this_month()
+    series = await get_mrr_series(db, [10], now_month, add_months(now_month, 3))
+    assert series[0]["churned_subscriptions"] == 1
+    assert all(p["active_subscriptions"] == 0 for p in series[1:])
+    assert sum(p["churned_subscriptions"] for p in series[1:]) == 0
+
+
+@pytest.mark.asyncio
+async def test_rebuild_from_history(db):
+    start = datetime.utcnow() - timedelta(days=75)
+    db.add(Subscription(user_id=2, plan_id=20, start_date=start, end_date=start + timedelta(days=30), is_active=True))
+    db.add(Subscription(user_id=3, plan_id=21, start_date=start, end_date=start + timedelta(days=90), is_active=True))
+    await db.commit()
+
+    assert await rebuild_cohorts(db, owner_id=1) == 2
+    cohorts = await get_cohort_retention(db, [10], month_start(start), _this_month())
+    first = cohorts[0]
+    assert first["size"] == 2
+    assert first["retention"][0] == 1.0
+    assert first["active"][-1] == 1  # Solo el trimestral sigue activo
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from core.entities import Channel, OwnerDailyStats, Plan, Subscription, User
+from core.use_cases import daily_stats
+from core.use_cases.activate_membership import activate_membership
+from core.use_cases.daily_stats import get_active_subscribers, rebuild_daily_stats
+from core.use_cases.telegram_users import get_or_create_telegram_user
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add_all([
+        User(id=1, email="affiliate@test.com", affiliate_balance=0.0, balance=0.0),
+        User(id=2, email="owner@test.com", referred_by_id=1, affiliate_balance=0.0, balance=0.0),
+        User(id=3, email="buyer@test.com", affiliate_balance=0.0, balance=0.0),
+        User(id=4, email="buyer2@test.com", affiliate_balance=0.0, balance=0.0),
+        Channel(id=10, owner_id=2, title="VIP"),
+        Plan(id=20, channel_id=10, name="Mensual", price=100.0, duration_days=30),
+    ])
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+async def _snapshot(db):
+    rows = (await db.execute(select(OwnerDailyStats).order_by(OwnerDailyStats.owner_id, OwnerDailyStats.day))).scalars().all()
+    return [
+        (r.owner_id, r.day, round(r.revenue, 6), r.new_subscribers, r.ending_subscribers, round(r.mlm_earnings, 6))
+        for r in rows
+    ]
+
+
+@pytest.mark.asyncio
+async def test_incremental_rollup_matches_rebuild(db):
+    await activate_membership(3, 20, db)
+    await activate_membership(3, 20, db)  # extensión
+    await activate_membership(4, 20, db)
+
+    incremental = await _snapshot(db)
+    today = datetime.utcnow().date()
+    owner_today = next(r for r in incremental if r[0] == 2 and r[1] == today)
+    assert owner_today[2] == pytest.approx(270.0)  # 3 pagos de 100 menos 10%
+    assert owner_today[3] == 2
+    affiliate_today = next(r for r in incremental if r[0] == 1)
+    assert affiliate_today[5] == pytest.approx(9.0)  # 3% nivel 1
+    assert await get_active_subscribers(db, 2) == 2
+
+    await rebuild_daily_stats(db)
+    # Los buckets con 0 tras mover un vencimiento no existen en la reconstrucción
+    assert [r for r in incremental if any(r[2:])] == await _snapshot(db)
+
+
+@pytest.mark.asyncio
+async def test_expired_subscription_not_active(db):
+    db.add(Subscription(
+        user_id=3,
+        plan_id=20,
+        start_date=datetime.utcnow() - timedelta(days=40),
+        end_date=datetime.utcnow() - timedelta(days=10),
+        is_active=True,
+    ))
+    await db.commit()
+    await rebuild_daily_stats(db, owner_id=2)
+    assert await get_active_subscribers(db, 2) == 0
+
+    await activate_membership(4, 20, db)
+    assert await get_active_subscribers(db, 2) == 1
+
+
+@pytest.mark.asyncio
+async def test_portable_upsert_matches_native(db, monkeypatch):
+    # Motor sin ON CONFLICT nativo: INSERT en savepoint + UPDATE al chocar
+    monkeypatch.setattr(daily_stats, "_NATIVE_INSERTS", {})
+    await activate_membership(3, 20, db)
+    await activate_membership(3, 20, db)
+    await activate_membership(4, 20, db)
+    portable = await _snapshot(db)
+
+    await rebuild_daily_stats(db)
+    assert [r for r in portable if any(r[2:])] == await _snapshot(db)
+    assert await get_active_subscribers(db, 2) == 2
+
+    created = await get_or_create_telegram_user(db, 555, "nuevo")
+    again = await get_or_create_telegram_user(db, 555, "nuevo")
+    assert created.id == again.id and created.telegram_id == 555
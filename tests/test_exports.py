@@ -0,0 +1,101 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from core.entities import Channel, Payment, Plan, User
+from core.use_cases import exports
+from core.use_cases.exports import export_columns, iter_export_batches
+from infrastructure.utils.export import encode_csv, encode_ndjson, gzip_stream
+
+BASE = datetime(2026, 1, 1)
+ADMIN = User(id=1, is_admin=True)
+OWNER = User(id=2, is_admin=False)
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add_all([User(id=1, email="admin@fgate.co"), User(id=2, email="owner@test.com")])
+    sqlite_session.add_all([Channel(id=1, owner_id=2, title="Propio"), Channel(id=2, owner_id=1, title="Ajeno")])
+    sqlite_session.add_all([Plan(id=1, channel_id=1, price=10), Plan(id=2, channel_id=2, price=10)])
+    sqlite_session.add_all([
+        Payment(
+            id=i,
+            user_id=1,
+            plan_id=1 if i % 2 else 2,
+            amount=float(i),
+            status="completed",
+            # Varios pagos por día, repartidos en ~4 meses
+            created_at=BASE + timedelta(days=i // 3),
+        )
+        for i in range(1, 301)
+    ])
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+async def _ids(db, user, date_from=BASE, date_to=BASE + timedelta(days=200), after_id=None):
+    ids = []
+    async for batch in iter_export_batches(db, "payments", user, date_from, date_to, after_id):
+        ids += [row[0] for row in batch]
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_export_reads_in_bounded_batches_across_date_chunks(db, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 40)
+    monkeypatch.setattr(exports, "EXPORT_CHUNK_DAYS", 7)
+    sizes = []
+    async for batch in iter_export_batches(db, "payments", ADMIN, BASE, BASE + timedelta(days=200)):
+        sizes.append(len(batch))
+    assert sum(sizes) == 300
+    assert max(sizes) <= 40 and len(sizes) > 300 // 40
+
+
+@pytest.mark.asyncio
+async def test_owner_only_exports_payments_of_own_channels(db):
+    ids = await _ids(db, OWNER)
+    assert ids == [i for i in range(1, 301) if i % 2]
+
+
+@pytest.mark.asyncio
+async def test_resume_after_last_row(db):
+    full = await _ids(db, ADMIN)
+    # Corte a mitad de un día: 3 pagos comparten created_at
+    cut = full.index(151)
+    resumed = await _ids(db, ADMIN, date_from=BASE + timedelta(days=151 // 3), after_id=151)
+    assert full[: cut + 1] + resumed == full
+
+
+@pytest.mark.asyncio
+async def test_csv_and_ndjson_encoding_with_gzip(db):
+    columns = export_columns("payments", OWNER)
+
+    async def batches():
+        async for batch in iter_export_batches(db, "payments", OWNER, BASE, BASE + timedelta(days=2)):
+            yield batch
+
+    raw = b"".join([chunk async for chunk in gzip_stream(encode_csv(columns, batches()))])
+    rows = list(csv.reader(io.StringIO(gzip.decompress(raw).decode())))
+    assert rows[0][:3] == ["id", "plan_id", "amount"]
+    assert [r[0] for r in rows[1:]] == ["1", "3", "5"]
+
+    body = b"".join([chunk async for chunk in encode_ndjson(columns, batches())])
+    first = json.loads(body.decode().splitlines()[0])
+    assert first["id"] == 1 and first["created_at"] == BASE.isoformat()
+
+
+@pytest.mark.asyncio
+async def test_owner_exports_never_include_platform_or_payer_fields(db):
+    hidden = {"platform_amount", "affiliate_amount", "affiliate_id", "provider_tx_id", "user_id"}
+    owner_columns = [c.name for c in export_columns("payments", OWNER)]
+    assert not hidden & set(owner_columns)
+    assert hidden <= {c.name for c in export_columns("payments", ADMIN)}
+    assert "user_id" not in {c.name for c in export_columns("subscriptions", OWNER)}
+
+    async for batch in iter_export_batches(db, "payments", OWNER, BASE, BASE + timedelta(days=2)):
+        assert all(len(row) == len(owner_columns) for row in batch)
@@ -0,0 +1,34 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from core.entities import PaymentProviderTx
+from infrastructure.database.partitions import archive_partitions, ensure_partitions, partition_ddl
+
+
+@pytest.fixture
+def db(sqlite_session):
+    return sqlite_session
+
+
+def test_partition_ddl_covers_one_month():
+    assert partition_ddl("payments", date(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS payments_p202612 PARTITION OF payments "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+@pytest.mark.asyncio
+async def test_partition_maintenance_is_noop_without_postgres(db):
+    assert await ensure_partitions(db, now=datetime(2026, 10, 19)) == []
+    assert await archive_partitions(db, date(2026, 1, 1)) == []
+
+
+@pytest.mark.asyncio
+async def test_provider_tx_id_stays_globally_unique(db):
+    db.add(PaymentProviderTx(provider_tx_id="tx_1", payment_id=1))
+    await db.commit()
+    db.add(PaymentProviderTx(provider_tx_id="tx_1", payment_id=2))
+    with pytest.raises(IntegrityError):
+        await db.commit()
@@ -0,0 +1,113 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from infrastructure.external_apis import payment_gateway as gw
+
+
+class StubWompiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        server = self.server
+        server.requests += 1
+        server.client_ports.add(self.client_address[1])
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        status = server.status
+        body = json.dumps({"data": {"id": f"link{server.requests}"}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWompiHandler)
+    server.requests = 0
+    server.client_ports = set()
+    server.status = 201
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(gw, "WOMPI_API_BASE", f"http://127.0.0.1:{server.server_port}/v1")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_wompi_links_reuse_one_connection(stub_server):
+    gateway = gw.PaymentGateway()
+    try:
+        first = await gateway.create_wompi_link({"sku": "a"})
+        second = await gateway.create_wompi_link({"sku": "b"})
+    finally:
+        await gateway.aclose()
+
+    assert first == "https://checkout.wompi.co/l/link1"
+    assert second == "https://checkout.wompi.co/l/link2"
+    assert stub_server.requests == 2
+    assert len(stub_server.client_ports) == 1
+
+
+@pytest.mark.asyncio
+async def test_wompi_breaker_opens_after_server_errors(stub_server):
+    stub_server.status = 500
+    gateway = gw.PaymentGateway()
+    gateway.breakers["wompi"] = gw.CircuitBreaker("wompi", failure_threshold=2, reset_timeout=60)
+    try:
+        for _ in range(2):
+            with pytest.raises(gw.ProviderUnavailableError):
+                await gateway.create_wompi_link({"sku": "a"})
+        assert gateway.breakers["wompi"].state == "open"
+
+        # Con el circuito abierto no se llega al proveedor
+        with pytest.raises(gw.ProviderUnavailableError):
+            await gateway.create_wompi_link({"sku": "a"})
+    finally:
+        await gateway.aclose()
+
+    assert stub_server.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_wompi_rejection_does_not_trip_breaker(stub_server):
+    stub_server.status = 422
+    gateway = gw.PaymentGateway()
+    try:
+        with pytest.raises(gw.ProviderRequestError):
+            await gateway.create_wompi_link({"sku": "a"})
+    finally:
+        await gateway.aclose()
+
+    assert gateway.breakers["wompi"].state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_stripe_checkout_runs_off_the_event_loop(monkeypatch):
+    calls = []
+
+    class FakeSession:
+        url = "https://checkout.stripe.com/c/pay/cs_test"
+
+    def fake_create(**params):
+        calls.append((threading.current_thread().name, params))
+        return FakeSession()
+
+    monkeypatch.setattr(gw.stripe.checkout.Session, "create", fake_create)
+
+    gateway = gw.PaymentGateway()
+    url = await gateway.create_stripe_checkout(mode="payment")
+
+    assert url == FakeSession.url
+    thread_name, params = calls[0]
+    assert thread_name.startswith("stripe")
+    assert params == {"mode": "payment"}
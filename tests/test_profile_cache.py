@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from aiogram.types import User as TgUser
+
+from bot.handlers import menu
+from core.entities import Channel, Plan, Subscription, User
+from core.use_cases.balances import ACCOUNT_MAIN, balance_entry, post_entries
+from infrastructure.cache.profile_cache import profile_cache, profile_key
+from infrastructure.database.instrumentation import track_queries
+
+fakeredis = pytest.importorskip("fakeredis")
+
+TG_USER = TgUser(id=777, is_bot=False, first_name="Ana")
+
+
+@pytest_asyncio.fixture
+async def db(monkeypatch, sqlite_session):
+    monkeypatch.setattr(profile_cache, "redis", fakeredis.FakeAsyncRedis())
+    sqlite_session.add(User(id=1, telegram_id=777, full_name="Ana", referral_code="ana123"))
+    sqlite_session.add(Channel(id=1, owner_id=1, title="VIP", validation_code="V-1"))
+    sqlite_session.add(Plan(id=1, channel_id=1, name="Mensual", price=10.0, duration_days=30))
+    sqlite_session.add(Subscription(
+        user_id=1, plan_id=1, is_active=True,
+        start_date=datetime.utcnow(), end_date=datetime.utcnow() + timedelta(days=10, hours=3),
+    ))
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+async def _flush_invalidations():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def _message():
+    bot = SimpleNamespace(me=AsyncMock(return_value=SimpleNamespace(username="fgate_bot")))
+    return SimpleNamespace(bot=bot, answer=AsyncMock())
+
+
+def test_card_ttl_stops_at_next_days_left_change():
+    now = datetime(2026, 10, 19, 12, 0)
+    assert menu.profile_card_ttl([], now) == 3600
+    assert menu.profile_card_ttl([now + timedelta(days=10, minutes=5)], now) == 301
+    assert menu.profile_card_ttl([now + timedelta(seconds=30)], now) == 31
+
+
+@pytest.mark.asyncio
+async def test_profile_card_is_cached_and_invalidated_on_balance_change(db):
+    first = _message()
+    await menu.show_profile(first, TG_USER, db, user_id=1)
+    card = first.answer.call_args.args[0]
+    assert "VIP" in card and "10 días restantes" in card and "$0.00" in card
+
+    with track_queries() as stats:
+        second = _message()
+        await menu.show_profile(second, TG_USER, db, user_id=1)
+    assert stats.count == 0 and second.answer.call_args.args[0] == card
+    second.bot.me.assert_not_awaited()
+
+    await post_entries(db, [balance_entry(1, ACCOUNT_MAIN, 25.0, "sale")])
+    await db.commit()
+    await _flush_invalidations()
+    assert await profile_cache.get(1) is None
+
+    third = _message()
+    await menu.show_profile(third, TG_USER, db, user_id=1)
+    assert "$25.00" in third.answer.call_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_changes_keep_the_card(db):
+    await profile_cache.set(1, "tarjeta")
+    await post_entries(db, [balance_entry(1, ACCOUNT_MAIN, 5.0, "sale")])
+    await db.rollback()
+    await db.commit()
+    await _flush_invalidations()
+    assert await profile_cache.redis.get(profile_key(1)) == b"tarjeta"
@@ -0,0 +1,82 @@
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from application.middlewares.query_stats import QueryStatsMiddleware
+from infrastructure.database.instrumentation import (
+    QueryBudgetExceeded,
+    install_query_instrumentation,
+    track_queries,
+)
+
+
+@pytest_asyncio.fixture
+async def sqlite_engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    install_query_instrumentation(engine)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_budget_counts_queries(sqlite_engine, query_budget):
+    async with sqlite_engine.connect() as conn:
+        with query_budget(2) as stats:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+    assert stats.count == 2
+    assert stats.total_time_ms >= 0
+
+
+@pytest.mark.asyncio
+async def test_budget_exceeded(sqlite_engine, query_budget):
+    async with sqlite_engine.connect() as conn:
+        with pytest.raises(QueryBudgetExceeded):
+            with query_budget(1):
+                await conn.execute(text("SELECT 1"))
+                await conn.execute(text("SELECT 2"))
+
+
+@pytest.mark.asyncio
+async def test_repeated_statement_flagged_as_n_plus_one(sqlite_engine, query_budget):
+    async with sqlite_engine.connect() as conn:
+        with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+            with query_budget(100):
+                for i in range(10):
+                    await conn.execute(text("SELECT :i"), {"i": i})
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_leaves_nothing_on_the_connection(sqlite_engine):
+    async with sqlite_engine.connect() as conn:
+        with track_queries() as stats:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    await conn.execute(text("SELECT * FROM missing_table"))
+            await conn.execute(text("SELECT 1"))
+        raw = await conn.get_raw_connection()
+        assert "query_start_time" not in raw.info
+    assert stats.count == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_exposes_headers(sqlite_engine):
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/items")
+    async def items():
+        async with sqlite_engine.connect() as conn:
+            for _ in range(3):
+                await conn.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/items")
+
+    assert response.headers["X-DB-Query-Count"] == "3"
+    assert response.headers["X-DB-N-Plus-One"] == "0"
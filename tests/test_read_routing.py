@@ -0,0 +1,21 @@
+from sqlalchemy import insert, select
+
+from core.entities import User
+from infrastructure.database import connection
+from infrastructure.database.connection import ReadRoutingSession
+
+
+def test_reads_follow_the_first_write_to_primary(monkeypatch):
+    monkeypatch.setattr(connection.replica_health, "healthy", True)
+    session = ReadRoutingSession()
+    assert session.get_bind(clause=select(User)) is connection.read_engine.sync_engine
+
+    assert session.get_bind(clause=insert(User)) is connection.engine.sync_engine
+    # Leer lo recién escrito: ya no va a la réplica
+    assert session.get_bind(clause=select(User)) is connection.engine.sync_engine
+    assert ReadRoutingSession().get_bind(clause=select(User)) is connection.read_engine.sync_engine
+
+
+def test_lagging_replica_routes_reads_to_primary(monkeypatch):
+    monkeypatch.setattr(connection.replica_health, "healthy", False)
+    assert ReadRoutingSession().get_bind(clause=select(User)) is connection.engine.sync_engine
@@ -0,0 +1,111 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+
+from core.entities import AffiliateEarning, AffiliateRank, Channel, Plan, User
+from core.use_cases.distribute_funds import distribute_payment_funds, get_affiliate_tier_info
+from core.use_cases.referrals import (
+    attach_referral,
+    detach_user,
+    recompute_ranks,
+    recompute_referral_stats,
+)
+from infrastructure.database.instrumentation import track_queries
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add_all([
+        AffiliateRank(id=1, name="Plata", min_referrals=2, max_depth=2),
+        AffiliateRank(id=2, name="Oro", min_referrals=3, max_depth=5),
+        User(id=1, email="leader@test.com"),
+        User(id=2, email="mid@test.com"),
+        User(id=3, email="owner@test.com"),
+        User(id=4, email="buyer@test.com"),
+    ])
+    await sqlite_session.commit()
+    yield sqlite_session
+
+
+async def _stats(db, user_id):
+    row = (
+        await db.execute(
+            select(User.direct_referral_count, User.rank_id, User.max_depth).where(User.id == user_id)
+        )
+    ).one()
+    return tuple(row)
+
+
+@pytest.mark.asyncio
+async def test_attach_and_reparent_keep_counters_and_rank(db):
+    for user_id in (2, 3):
+        await attach_referral(db, await db.get(User, user_id), 1)
+    await db.commit()
+    assert await _stats(db, 1) == (2, 1, 2)
+
+    # Re-vincular: el anterior patrocinador baja de rango
+    await attach_referral(db, await db.get(User, 3), 2)
+    await db.commit()
+    assert await _stats(db, 1) == (1, None, 1)
+    assert await _stats(db, 2) == (1, None, 1)
+
+
+@pytest.mark.asyncio
+async def test_detach_moves_children_to_parent(db):
+    await attach_referral(db, await db.get(User, 2), 1)
+    await attach_referral(db, await db.get(User, 3), 2)
+    await attach_referral(db, await db.get(User, 4), 2)
+    await db.commit()
+
+    mid = await db.get(User, 2)
+    await detach_user(db, mid)
+    await db.execute(delete(User).where(User.id == 2))
+    await db.commit()
+
+    assert await _stats(db, 1) == (2, 1, 2)
+    parents = (await db.execute(select(User.referred_by_id).where(User.id.in_([3, 4])))).scalars().all()
+    assert parents == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_rank_edit_recompute_and_full_recount(db):
+    for user_id in (2, 3, 4):
+        await attach_referral(db, await db.get(User, user_id), 1)
+    await db.commit()
+    assert await _stats(db, 1) == (3, 2, 5)
+
+    rank = await db.get(AffiliateRank, 2)
+    rank.min_referrals = 10
+    await db.commit()
+    assert await recompute_ranks(db, batch_size=2) == 4
+    assert await _stats(db, 1) == (3, 1, 2)
+
+    # Reparación: contador corrompido se recuenta desde referred_by_id
+    user = await db.get(User, 1)
+    user.direct_referral_count = 0
+    await db.commit()
+    await recompute_referral_stats(db)
+    assert await _stats(db, 1) == (3, 1, 2)
+    assert await get_affiliate_tier_info(db, 1) == {"tier": "Plata", "count": 3, "next_min": 10}
+
+
+@pytest.mark.asyncio
+async def test_payment_reads_depth_without_counting_referrals(db):
+    # 1 <- 2 <- 3 (dueño del canal); 1 tiene rango Plata (profundidad 2)
+    await attach_referral(db, await db.get(User, 2), 1)
+    await attach_referral(db, await db.get(User, 3), 2)
+    await attach_referral(db, await db.get(User, 4), 1)
+    db.add_all([
+        Channel(id=10, owner_id=3, title="VIP"),
+        Plan(id=20, channel_id=10, name="Mensual", price=100.0, duration_days=30),
+    ])
+    await db.commit()
+
+    with track_queries() as stats:
+        await distribute_payment_funds(db, 4, 20, 100.0, "stripe", "tx_1")
+
+    assert not [sql for sql in stats.statements if "count(" in sql.lower()]
+    earnings = (
+        await db.execute(select(AffiliateEarning.affiliate_id, AffiliateEarning.level).order_by(AffiliateEarning.level))
+    ).all()
+    assert [tuple(e) for e in earnings] == [(2, 1), (1, 2)]
@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+
+from core.entities import Channel, Plan, RenewalReminder, Subscription, User
+from core.use_cases import auth, renewal_reminders
+from core.use_cases.renewal_reminders import (
+    claim_reminders,
+    due_reminders,
+    send_renewal_reminders,
+)
+from infrastructure.external_apis.telegram import BLOCKED, FAILED, SENT
+
+NOW = datetime(2026, 10, 20, 12, 0)
+BLOCKED_CHAT = 1004
+
+
+class RecordingSender:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **extra):
+        self.sent.append((chat_id, text, extra["reply_markup"]["inline_keyboard"][0][0]["url"]))
+        return (BLOCKED, "Forbidden") if chat_id == BLOCKED_CHAT else (SENT, None)
+
+
+@pytest_asyncio.fixture
+async def sessionmaker(monkeypatch, sqlite_sessionmaker):
+    monkeypatch.setattr(auth, "SECRET_KEY", "test-secret")
+    ends = {
+        1: NOW + timedelta(days=7, hours=-1),  # balde 7
+        2: NOW + timedelta(days=3, hours=-2),  # balde 3
+        3: NOW + timedelta(hours=20),  # balde 1
+        4: NOW + timedelta(days=3, hours=-5),  # balde 3 (bloqueó al bot)
+        5: NOW + timedelta(days=5),  # entre baldes
+        6: NOW + timedelta(days=7, hours=-13),  # fuera de la ventana de recuperación
+    }
+    async with sqlite_sessionmaker() as session:
+        session.add(User(id=1, email="owner@test.com"))
+        session.add(Channel(id=1, owner_id=1, title="VIP", validation_code="V-1"))
+        session.add(Plan(id=1, channel_id=1, name="Mensual", price=10.0, duration_days=30))
+        for i, end in ends.items():
+            session.add(User(id=100 + i, telegram_id=1000 + i, referral_code=f"ref{i}"))
+            session.add(Subscription(id=i, user_id=100 + i, plan_id=1, is_active=True, end_date=end))
+        session.add(User(id=107, email="web@test.com", referral_code="ref7"))
+        session.add(Subscription(id=7, user_id=107, plan_id=1, is_active=True, end_date=ends[1]))
+        session.add(Subscription(id=8, user_id=101, plan_id=1, is_active=False, end_date=ends[3]))
+        await session.commit()
+    yield sqlite_sessionmaker
+
+
+@pytest.mark.asyncio
+async def test_each_window_sends_once(sessionmaker):
+    sender = RecordingSender()
+    async with sessionmaker() as db:
+        results = await send_renewal_reminders(db, sender, NOW)
+    assert results[7][SENT] == 1 and results[3] == {SENT: 1, BLOCKED: 1, "failed": 0, "skipped": 0}
+    assert results[1][SENT] == 1
+    assert sorted(chat for chat, _, _ in sender.sent) == [1001, 1002, 1003, 1004]
+
+    by_chat = {chat: (text, url) for chat, text, url in sender.sent}
+    assert "vence mañana" in by_chat[1003][0] and "en 7 días" in by_chat[1001][0]
+    token = by_chat[1001][1].rsplit("/", 1)[1]
+    payload = auth.AuthService.decode_token(token)
+    assert payload["type"] == "renewal" and payload["sub"] == "101" and payload["plan_id"] == 1
+
+    # Otra pasada (o una hora después): nada nuevo
+    async with sessionmaker() as db:
+        again = await send_renewal_reminders(db, sender, NOW + timedelta(hours=1))
+        statuses = dict((await db.execute(select(RenewalReminder.subscription_id, RenewalReminder.status))).all())
+    assert all(c[SENT] == 0 for c in again.values()) and len(sender.sent) == 4
+    assert statuses == {1: SENT, 2: SENT, 3: SENT, 4: BLOCKED}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_replicas_claim_each_reminder_once(sessionmaker):
+    async with sessionmaker() as first, sessionmaker() as second:
+        rows_a = await due_reminders(first, 3, NOW)
+        rows_b = await due_reminders(second, 3, NOW)
+        assert [r.id for r in rows_a] == [r.id for r in rows_b] == [4, 2]  # por end_date
+
+        assert set(await claim_reminders(first, 3, rows_a)) == {2, 4}
+        assert await claim_reminders(second, 3, rows_b) == {}
+
+
+@pytest.mark.asyncio
+async def test_renewal_starts_a_new_cycle(sessionmaker):
+    sender = RecordingSender()
+    async with sessionmaker() as db:
+        await send_renewal_reminders(db, sender, NOW)
+        sub = await db.get(Subscription, 3)
+        sub.end_date += timedelta(days=30)
+        await db.commit()
+
+        later = NOW + timedelta(days=24)
+        results = await send_renewal_reminders(db, sender, later)
+    assert results[7][SENT] == 1 and sender.sent[-1][0] == 1003
+
+
+class FlakySender(RecordingSender):
+    """Falla el primer intento de cada chat."""
+
+    async def send_message(self, chat_id, text, **extra):
+        if chat_id not in {chat for chat, _, _ in self.sent}:
+            self.sent.append((chat_id, text, None))
+            return FAILED, "HTTP 502"
+        return await super().send_message(chat_id, text, **extra)
+
+
+@pytest.mark.asyncio
+async def test_failed_reminders_are_retried_within_the_window(sessionmaker):
+    sender = FlakySender()
+    async with sessionmaker() as db:
+        first = await send_renewal_reminders(db, sender, NOW)
+        assert first[3][FAILED] == 2
+
+        again = await send_renewal_reminders(db, sender, NOW + timedelta(minutes=30))
+        assert again[3] == {SENT: 1, BLOCKED: 1, FAILED: 0, "skipped": 0}
+        attempts = dict((await db.execute(select(RenewalReminder.subscription_id, RenewalReminder.attempts))).all())
+    assert attempts == {1: 2, 2: 2, 3: 2, 4: 2}
+
+    # Ya entregados: una tercera pasada no repite nada
+    async with sessionmaker() as db:
+        third = await send_renewal_reminders(db, sender, NOW + timedelta(hours=1))
+    assert all(c[SENT] == 0 for c in third.values())
+
+
+@pytest.mark.asyncio
+async def test_stale_pending_claim_is_taken_over_once(sessionmaker):
+    async with sessionmaker() as first, sessionmaker() as second:
+        rows = await due_reminders(first, 3, NOW)
+        await claim_reminders(first, 3, rows)  # el proceso muere sin enviar
+
+        # Reclamo reciente: nadie lo toma
+        assert await due_reminders(second, 3, NOW) == []
+        await second.execute(
+            update(RenewalReminder).values(claimed_at=datetime.utcnow() - renewal_reminders.STALE_CLAIM * 2)
+        )
+        await second.commit()
+        stale = await due_reminders(second, 3, NOW)
+        assert [r.id for r in stale] == [4, 2]
+        assert set(await claim_reminders(second, 3, stale)) == {2, 4}
+        # Otra réplica con la misma página llega tarde
+        assert await claim_reminders(first, 3, stale) == {}
@@ -0,0 +1,133 @@
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from bot.handlers import call_handlers
+from core.entities import AvailabilityRange, CallBooking, CallService, User
+from core.use_cases.call_bookings import create_call_booking
+from infrastructure.cache import availability_cache
+from infrastructure.cache.availability_cache import (
+    build_day_entry,
+    day_cache_key,
+    day_slot_starts,
+    get_available_slots,
+    invalidate_owner_days,
+)
+from infrastructure.cache.slot_holds import SlotHolds
+from infrastructure.database.instrumentation import track_queries
+
+fakeredis = pytest.importorskip("fakeredis")
+
+TODAY = datetime.utcnow().date()
+FULL_DAY = TODAY + timedelta(days=2)
+PARTIAL_DAY = TODAY + timedelta(days=3)
+
+
+def _at(day, hhmm):
+    h, m = map(int, hhmm.split(":"))
+    return datetime.combine(day, time(h, m))
+
+
+@pytest_asyncio.fixture
+async def sessionmaker(monkeypatch, sqlite_sessionmaker):
+    async with sqlite_sessionmaker() as session:
+        session.add(User(id=7, email="owner@test.com"))
+        session.add(CallService(id=1, owner_id=7, price=10, duration_minutes=30, description="Mentoría", is_active=True))
+        session.add(CallService(id=2, owner_id=7, price=50, duration_minutes=60, description="Consultoría", is_active=True))
+        for weekday in range(7):
+            session.add(AvailabilityRange(owner_id=7, day_of_week=weekday, start_time="09:00", end_time="11:00"))
+        # Día lleno con una reserva de otro servicio del mismo owner
+        for hhmm in ("09:00", "10:00"):
+            session.add(CallBooking(service_id=2, owner_id=7, start_time=_at(FULL_DAY, hhmm),
+                                    end_time=_at(FULL_DAY, hhmm) + timedelta(minutes=60)))
+        session.add(CallBooking(service_id=1, owner_id=7, start_time=_at(PARTIAL_DAY, "09:30"),
+                                end_time=_at(PARTIAL_DAY, "10:00")))
+        await session.commit()
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(availability_cache, "redis_client", redis)
+    monkeypatch.setattr(call_handlers, "slot_holds", SlotHolds(redis))
+    yield sqlite_sessionmaker
+
+
+def _callback(data: str):
+    return SimpleNamespace(
+        data=data,
+        from_user=SimpleNamespace(id=111),
+        message=SimpleNamespace(edit_text=AsyncMock()),
+        answer=AsyncMock(),
+    )
+
+
+def _buttons(callback):
+    markup = callback.message.edit_text.call_args.kwargs["reply_markup"]
+    return [button.callback_data for row in markup.inline_keyboard for button in row]
+
+
+def test_day_entry_matches_slot_grid():
+    day = PARTIAL_DAY
+    ranges = [SimpleNamespace(day_of_week=day.weekday(), is_recurring=True, start_time="09:00", end_time="11:00")]
+    bookings = [SimpleNamespace(start_time=_at(day, "09:45"), end_time=_at(day, "10:15"))]
+    entry = build_day_entry(day, ranges, bookings)
+    # Rejilla de 30 min desde las 09:00; la reserva pisa 09:30 y 10:00
+    assert list(day_slot_starts(entry, 30, day, now=_at(day, "00:00"))) == [9 * 60, 10 * 60 + 30]
+    assert list(day_slot_starts(entry, 30, day, now=_at(day, "10:31"))) == []
+
+
+@pytest.mark.asyncio
+async def test_day_picker_flags_days_without_generating_slots(sessionmaker):
+    with track_queries() as stats:
+        picker = _callback("view_slots_1")
+        async with sessionmaker() as db:
+            await call_handlers.show_slots(picker, db)
+    assert stats.count == 3  # servicio + horarios + reservas de los 15 días
+    days = _buttons(picker)
+    assert f"slot_day_1_{PARTIAL_DAY:%Y%m%d}" in days
+    assert f"slot_day_1_{FULL_DAY:%Y%m%d}" not in days
+    assert days[-1] == "cancel_booking"
+
+    # Entradas por día ya en Redis: solo el servicio
+    with track_queries() as stats:
+        async with sessionmaker() as db:
+            await call_handlers.show_slots(_callback("view_slots_1"), db)
+        day_view = _callback(f"slot_day_1_{PARTIAL_DAY:%Y%m%d}")
+        async with sessionmaker() as db:
+            await call_handlers.show_day_slots(day_view, db)
+    assert stats.count == 2
+
+    expected = [f"book_slot_1_{PARTIAL_DAY:%Y%m%d}{hhmm}" for hhmm in ("0900", "1000", "1030")]
+    assert _buttons(day_view) == expected + ["view_slots_1"]
+
+
+@pytest.mark.asyncio
+async def test_day_view_matches_full_slot_computation(sessionmaker):
+    async with sessionmaker() as db:
+        full = await get_available_slots(db, 1, f"{PARTIAL_DAY}", f"{PARTIAL_DAY}")
+        day_view = _callback(f"slot_day_1_{PARTIAL_DAY:%Y%m%d}")
+        await call_handlers.show_day_slots(day_view, db)
+    assert _buttons(day_view)[:-1] == [f"book_slot_1_{s['start_time']:%Y%m%d%H%M}" for s in full]
+
+
+@pytest.mark.asyncio
+async def test_booking_invalidates_only_its_day(sessionmaker):
+    async with sessionmaker() as db:
+        await call_handlers.show_slots(_callback("view_slots_1"), db)
+    redis = availability_cache.redis_client
+    assert await redis.exists(day_cache_key(7, PARTIAL_DAY))
+
+    async with sessionmaker() as db:
+        service = await db.get(CallService, 1)
+        booking = await create_call_booking(db, service, _at(PARTIAL_DAY, "10:00"))
+    await invalidate_owner_days(7, booking.start_time, booking.end_time)
+    assert not await redis.exists(day_cache_key(7, PARTIAL_DAY))
+    assert await redis.exists(day_cache_key(7, FULL_DAY))
+
+    day_view = _callback(f"slot_day_1_{PARTIAL_DAY:%Y%m%d}")
+    async with sessionmaker() as db:
+        await call_handlers.show_day_slots(day_view, db)
+    assert _buttons(day_view) == [f"book_slot_1_{PARTIAL_DAY:%Y%m%d}0900", f"book_slot_1_{PARTIAL_DAY:%Y%m%d}1030", "view_slots_1"]
+
+    await invalidate_owner_days(7)  # Cambio de horarios: todos los días del owner
+    assert not await redis.keys("avail_day:7:*")
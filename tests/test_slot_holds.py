@@ -0,0 +1,125 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from bot.handlers import call_handlers
+from core.entities import CallBooking, CallService, User
+from core.use_cases.call_bookings import create_call_booking
+from infrastructure.cache import slot_holds as slot_holds_module
+from infrastructure.cache.slot_holds import SlotHolds, slot_member
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Scripts Lua en fakeredis
+
+START = datetime(2030, 1, 7, 10, 0)
+TS = START.strftime("%Y%m%d%H%M")
+
+
+@pytest_asyncio.fixture
+async def sessionmaker(monkeypatch, sqlite_sessionmaker):
+    async with sqlite_sessionmaker() as session:
+        session.add(User(id=7, email="owner@test.com"))
+        session.add(User(id=8, telegram_id=111, referral_code="ana"))
+        session.add(CallService(id=1, owner_id=7, price=10, duration_minutes=30, description="Mentoría"))
+        session.add(CallService(id=2, owner_id=7, price=50, duration_minutes=60, description="Consultoría"))
+        await session.commit()
+    monkeypatch.setattr(call_handlers, "invalidate_service_cache", AsyncMock())
+    monkeypatch.setattr(call_handlers, "slot_holds", SlotHolds(fakeredis.FakeAsyncRedis()))
+    yield sqlite_sessionmaker
+
+
+def _callback(data: str, tg_id: int):
+    return SimpleNamespace(
+        data=data,
+        from_user=SimpleNamespace(id=tg_id),
+        message=SimpleNamespace(edit_text=AsyncMock()),
+        answer=AsyncMock(),
+    )
+
+
+async def _dispatch(sessionmaker, handler, callback, **data):
+    """Como DbSessionMiddleware: una sesión por update."""
+    async with sessionmaker() as session:
+        await handler(callback, session, **data)
+
+
+@pytest.mark.asyncio
+async def test_hold_is_exclusive_until_released_or_expired(monkeypatch):
+    holds = SlotHolds(fakeredis.FakeAsyncRedis(), ttl=600)
+    assert await holds.hold(7, START, 111)
+    assert not await holds.hold(7, START, 222)
+    assert await holds.hold(7, START, 111)  # Renovar la propia
+    assert await holds.held_by_others(7, 222) == {slot_member(START)}
+    assert await holds.held_by_others(7, 111) == set()
+
+    slots = [{"start_time": START}, {"start_time": START + timedelta(minutes=30)}]
+    assert [s["start_time"] for s in await holds.filter_available(7, slots, 222)] == [START + timedelta(minutes=30)]
+
+    await holds.release(7, START, 222)  # No es suya: no hace nada
+    assert await holds.holder(7, START) == 111
+    await holds.release(7, START, 111)
+    assert await holds.held_by_others(7, 222) == set()
+
+    # Vencida: desaparece de la vista aunque Redis aún no haya expirado la clave
+    assert await holds.hold(7, START, 222)
+    now = time.time()
+    monkeypatch.setattr(slot_holds_module.time, "time", lambda: now + 601)
+    assert await holds.held_by_others(7, 111) == set()
+
+
+@pytest.mark.asyncio
+async def test_unique_index_rejects_double_booking_across_services(sessionmaker):
+    async with sessionmaker() as db:
+        first, other = await db.get(CallService, 1), await db.get(CallService, 2)
+        assert await create_call_booking(db, first, START) is not None
+        assert await create_call_booking(db, other, START) is None  # Mismo owner, otro servicio
+
+        cancelled = await create_call_booking(db, first, START + timedelta(hours=1), status="cancelled")
+        assert await create_call_booking(db, first, START + timedelta(hours=1)) is not None
+        assert cancelled.owner_id == 7
+
+
+@pytest.mark.asyncio
+async def test_racing_users_get_one_booking(sessionmaker):
+    ana, beto = _callback(f"book_slot_1_{TS}", 111), _callback(f"book_slot_1_{TS}", 222)
+    await asyncio.gather(
+        _dispatch(sessionmaker, call_handlers.ask_payment, ana),
+        _dispatch(sessionmaker, call_handlers.ask_payment, beto),
+    )
+
+    winners = [c for c in (ana, beto) if c.message.edit_text.await_count]
+    losers = [c for c in (ana, beto) if c.answer.await_count]
+    assert len(winners) == 1 and len(losers) == 1
+    assert "Otro usuario" in losers[0].answer.call_args.args[0]
+
+    loser_pay = _callback(f"pay_slot_1_{TS}", losers[0].from_user.id)
+    await _dispatch(sessionmaker, call_handlers.finalize_booking, loser_pay)
+    assert "otro usuario" in loser_pay.answer.call_args.args[0]
+
+    winner_pay = _callback(f"pay_slot_1_{TS}", winners[0].from_user.id)
+    winner_id = 8 if winners[0].from_user.id == 111 else None
+    await _dispatch(sessionmaker, call_handlers.finalize_booking, winner_pay, user_id=winner_id)
+    assert "Reserva Confirmada" in winner_pay.message.edit_text.call_args.args[0]
+    call_handlers.invalidate_service_cache.assert_awaited_once_with(1)
+
+    async with sessionmaker() as db:
+        assert (await db.execute(select(CallBooking.booker_id))).scalars().all() == [winner_id]
+    # Reservado y con el hold liberado: el siguiente choca contra la BD, no contra Redis
+    late = _callback(f"book_slot_2_{TS}", 333)
+    await _dispatch(sessionmaker, call_handlers.ask_payment, late)
+    assert "ya ha sido ocupado" in late.answer.call_args.args[0]
+    assert await call_handlers.slot_holds.holder(7, START) is None
+
+
+@pytest.mark.asyncio
+async def test_cancel_releases_the_hold(sessionmaker):
+    await _dispatch(sessionmaker, call_handlers.ask_payment, _callback(f"book_slot_1_{TS}", 111))
+    assert await call_handlers.slot_holds.holder(7, START) == 111
+    await _dispatch(sessionmaker, call_handlers.release_slot, _callback(f"release_slot_1_{TS}", 111))
+    assert await call_handlers.slot_holds.holder(7, START) is None
@@ -0,0 +1,83 @@
+import csv
+import io
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+
+from core.entities import BusinessExpense, Payment, PlatformMonthlyRevenue, User
+from core.use_cases.tax import bump_platform_revenue, get_tax_years, iter_tax_csv, rebuild_platform_revenue
+
+NOW = datetime(2026, 3, 15)
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_session):
+    sqlite_session.add(User(id=1, email="admin@fgate.co", is_admin=True))
+    sqlite_session.add_all([
+        Payment(user_id=1, amount=100, platform_amount=10.0, status="completed", created_at=datetime(2025, 6, 1)),
+        Payment(user_id=1, amount=100, platform_amount=10.0, status="completed", created_at=datetime(2026, 1, 10)),
+        Payment(user_id=1, amount=100, platform_amount=5.0, status="completed", created_at=datetime(2026, 3, 2)),
+        Payment(user_id=1, amount=100, platform_amount=50.0, status="pending", created_at=datetime(2026, 3, 3)),
+    ])
+    sqlite_session.add_all([
+        BusinessExpense(user_id=1, description="Hosting", amount=3.0, category="Software", date=datetime(2026, 1, 5)),
+        BusinessExpense(user_id=1, description="Ads", amount=2.0, category="Ads", date=datetime(2026, 2, 5)),
+        BusinessExpense(user_id=1, description="Ads", amount=1.5, category="Ads", date=datetime(2026, 3, 1)),
+        BusinessExpense(user_id=1, description="Abogado", amount=4.0, category="Legal", date=datetime(2025, 7, 1)),
+    ])
+    await sqlite_session.commit()
+    await rebuild_platform_revenue(sqlite_session)  # Relleno inicial del rollup
+    yield sqlite_session
+
+
+@pytest.mark.asyncio
+async def test_summary_uses_sql_aggregates_and_compares_years(db):
+    totals = await get_tax_years(db, 1, [2025, 2026], now=NOW)
+
+    assert totals[2026]["gross_revenue"] == 15.0
+    assert totals[2026]["expenses_by_category"] == {"Software": 3.0, "Ads": 3.5}
+    assert totals[2026]["net_income"] == 8.5
+    assert totals[2025]["gross_revenue"] == 10.0
+    assert totals[2025]["total_expenses"] == 4.0
+    # Solo hasta el mes en curso
+    assert [m["month"] for m in totals[2026]["monthly_revenue"]] == ["2026-01-01", "2026-02-01", "2026-03-01"]
+
+
+@pytest.mark.asyncio
+async def test_payments_bump_their_month_and_summary_only_reads(db):
+    totals = await get_tax_years(db, 1, [2026], now=NOW)
+    assert [m["closed"] for m in totals[2026]["monthly_revenue"]] == [True, True, False]
+
+    # Pago verificado tarde en un mes cerrado y otro del mes en curso
+    for created_at in (datetime(2026, 1, 20), datetime(2026, 3, 14)):
+        db.add(Payment(user_id=1, amount=1, platform_amount=7.0, status="completed", created_at=created_at))
+        await bump_platform_revenue(db, created_at, 7.0)
+    await db.commit()
+
+    totals = await get_tax_years(db, 1, [2026], now=NOW)
+    monthly = {m["month"]: (m["gross_revenue"], m["payments_count"]) for m in totals[2026]["monthly_revenue"]}
+    assert monthly == {"2026-01-01": (17.0, 2), "2026-02-01": (0.0, 0), "2026-03-01": (12.0, 2)}
+
+    # El resumen no escribe: sin filas, no las crea
+    await db.execute(delete(PlatformMonthlyRevenue))
+    await db.commit()
+    totals = await get_tax_years(db, 1, [2026], now=NOW)
+    assert totals[2026]["gross_revenue"] == 0.0
+    assert (await db.execute(select(PlatformMonthlyRevenue))).first() is None
+
+    await rebuild_platform_revenue(db, 2026)
+    rebuilt = await get_tax_years(db, 1, [2026], now=NOW)
+    assert {m["month"]: (m["gross_revenue"], m["payments_count"]) for m in rebuilt[2026]["monthly_revenue"]} == monthly
+
+
+@pytest.mark.asyncio
+async def test_csv_export_streams_revenue_and_expenses(db):
+    body = "".join([chunk async for chunk in iter_tax_csv(db, 1, 2026)])
+    rows = list(csv.reader(io.StringIO(body)))
+
+    assert rows[0] == ["tipo", "fecha", "referencia", "categoria", "descripcion", "moneda", "monto"]
+    assert [r[0] for r in rows[1:]] == ["ingreso", "ingreso", "gasto", "gasto", "gasto"]
+    assert rows[1][6] == "10.0"
+    assert rows[3][3:5] == ["Software", "Hosting"]